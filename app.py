@@ -5,11 +5,9 @@ Converts plain English questions into Cypher queries using LLM + few-shot prompt
 
 import streamlit as st
 import traceback
-import time
-from datetime import datetime
 
-import os
-from config import setup_environment, get_llm, _get_secret
+from config import get_query_history, get_query_deadline, get_result_limits
+from src.startup import boot
 
 st.set_page_config(
     page_title="GraphQuery AI",
@@ -85,25 +83,59 @@ def get_custom_css(theme):
 # ── Session State ────────────────────────────────────────────────────────────
 
 def init_session_state():
-    for key, default in [("query_history", []), ("chain", None), ("graph", None), ("theme", "light")]:
+    for key, default in [("chain", None), ("graph", None), ("theme", "light"),
+                         ("current_result", None), ("active_deadline", None)]:
         if key not in st.session_state:
             st.session_state[key] = default
+    if "query_history" not in st.session_state:
+        # Metadata ring buffer in memory; result payloads are spilled to disk
+        st.session_state.query_history = get_query_history(session_id=history_identity())
+
+
+def history_identity():
+    # The signed-in user's email keys persisted history, so a new browser
+    # session gets it back; without sign-in config falls back to HISTORY_SESSION
+    user = getattr(st, "user", None) or getattr(st, "experimental_user", None)
+    try:
+        return user.get("email") if user is not None else None
+    except Exception:
+        return None
 
 
 # ── Database Connection ───────────────────────────────────────────────────────
 
-def initialize_connection():
-    try:
-        from langchain_neo4j import Neo4jGraph
-        from src.query_chain import create_qa_chain
+def shared_resources():
+    # Built once per process by the boot-time warm-up (src.startup): the driver
+    # pool, LLM client, chain and tracer are shared by every session
+    return boot().wait()
+
+
+def shared_tracer():
+    return shared_resources().tracer
+
+
+def record_traffic(question, total_ms, **fields):
+    # Sampled questions feed the replay load tester (python -m src.traffic)
+    recorder = shared_resources().recorder
+    if recorder is not None:
+        recorder.record(question, total_ms, **fields)
+
+
+def record_failure(question, deadline, traces, status, error=None):
+    # The trace outlives the failed question and still holds its Cypher
+    trace = traces[0] if traces else None
+    record_traffic(question, (deadline.budget - deadline.remaining()) * 1000, status=status, error=error,
+                   cypher=trace.cypher if trace else None, breakdown=trace.breakdown() if trace else None)
+
 
-        neo4j_uri, neo4j_username, neo4j_password, _ = setup_environment()
-        llm = get_llm()
+def shared_connection():
+    resources = shared_resources()
+    return resources.graph, resources.chain
 
-        neo4j_database = _get_secret("NEO4J_DATABASE") or os.getenv("NEO4J_DATABASE") or "neo4j"
-        graph = Neo4jGraph(url=neo4j_uri, username=neo4j_username, password=neo4j_password, database=neo4j_database)
-        chain = create_qa_chain(graph, llm)
-        return graph, chain
+
+def initialize_connection():
+    try:
+        return shared_connection()
     except Exception as e:
         st.error(f"Connection failed: {str(e)}")
         traceback.print_exc()
@@ -116,41 +148,105 @@ def execute_query(question: str):
     chain = st.session_state.chain
     if not chain:
         st.error("Not connected to database.")
-        return None, 0
+        return None, 0, None
+
+    from src.deadline import DeadlineExceeded, QueryCancelled, run_with_deadline
+
+    # A new question abandons the session's previous one, transactions included
+    previous = st.session_state.get("active_deadline")
+    if previous is not None:
+        previous.cancel("superseded by a new question")
+    deadline = st.session_state.active_deadline = get_query_deadline()
+    status = st.empty()
+    traces = []
 
     try:
-        start = time.time()
-        result = chain.invoke({"query": question})
-        elapsed = time.time() - start
-
-        st.session_state.query_history.append({
-            "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "question": question,
-            "result": result,
-            "execution_time": elapsed,
-        })
-        return result, elapsed
+        # Polling keeps this script run interruptible; a rerun or disconnect
+        # raises out of on_wait and cancels the query
+        result, trace = run_with_deadline(
+            lambda: shared_tracer().invoke(chain, question, on_trace=traces.append),
+            deadline,
+            on_wait=lambda d: status.caption(f"Running for {d.budget - d.remaining():.1f}s"),
+        )
+        elapsed = trace.total_ms / 1000
+
+        st.session_state.query_history.add(
+            question, result, elapsed,
+            cypher=generated_cypher(result),
+            trace=trace.breakdown(),
+        )
+        rows = result.get("result") if isinstance(result, dict) else None
+        record_traffic(question, trace.total_ms, cypher=generated_cypher(result), breakdown=trace.breakdown(),
+                       rows=len(rows) if hasattr(rows, "__len__") else None)
+        return result, elapsed, trace.breakdown()
+    except DeadlineExceeded:
+        st.error(f"Query timed out after {deadline.budget:.0f}s.")
+        record_failure(question, deadline, traces, "timeout")
+        return None, 0, None
+    except QueryCancelled:
+        record_failure(question, deadline, traces, "cancelled")
+        return None, 0, None
     except Exception as e:
         st.error(f"Query failed: {str(e)}")
+        record_failure(question, deadline, traces, "error", error=str(e))
         traceback.print_exc()
-        return None, 0
+        return None, 0, None
+    finally:
+        status.empty()
+        if st.session_state.get("active_deadline") is deadline:
+            st.session_state.active_deadline = None
+
+
+def generated_cypher(result):
+    if not isinstance(result, dict):
+        return None
+    steps = result.get("intermediate_steps") or []
+    return steps[0].get("query") if steps else result.get("query")
+
+
+def raw_view(result):
+    # Rows stay columnar; the raw view only summarizes them
+    if not isinstance(result, dict) or not hasattr(result.get("result"), "columns"):
+        return result
+    rows = result["result"]
+    return {**result, "result": {"rows": len(rows), "columns": rows.columns}}
+
+
+def create_pager(result):
+    # Later pages are fetched on demand, re-running the Cypher with SKIP/LIMIT
+    from src.results import ResultPager
+
+    cypher = generated_cypher(result)
+    rows = result.get("result") if isinstance(result, dict) else None
+    if not cypher or not hasattr(rows, "__len__") or st.session_state.graph is None:
+        return None
+    return ResultPager(st.session_state.graph, cypher, rows=rows, **get_result_limits())
 
 
 # ── Result Display ────────────────────────────────────────────────────────────
 
-def display_result(result):
+def display_result(result, key=None):
+    from src.columnar import ColumnarResult
+
     if isinstance(result, dict) and "result" in result:
-        display_result(result["result"])
+        display_result(result["result"], key)
+    elif isinstance(result, ColumnarResult) and result.scalar() is not None:
+        display_scalar(*result.scalar())
+    elif isinstance(result, ColumnarResult):
+        if len(result):
+            # The DataFrame is built once per result and reused on reruns
+            st.dataframe(result.to_pandas(), use_container_width=True, hide_index=True)
+            if key:
+                csv_col, parquet_col = st.columns(2)
+                csv_col.download_button("Download CSV", result.to_csv(), "result.csv",
+                                        "text/csv", key=f"{key}_csv", use_container_width=True)
+                parquet_col.download_button("Download Parquet", result.to_parquet(), "result.parquet",
+                                            "application/octet-stream", key=f"{key}_parquet",
+                                            use_container_width=True)
+        else:
+            st.info("No results found.")
     elif isinstance(result, list) and len(result) == 1 and len(result[0]) == 1:
-        key = list(result[0].keys())[0]
-        value = result[0][key]
-        st.markdown(f"""
-        <div class="result-card" style="text-align:center;">
-            <p style="font-size:0.9rem;text-transform:uppercase;letter-spacing:0.05em;opacity:0.7;">{key}</p>
-            <h1 style="font-size:3.5rem;margin:0;background:linear-gradient(135deg,#10B981 0%,#3B82F6 100%);
-                -webkit-background-clip:text;-webkit-text-fill-color:transparent;">{value}</h1>
-        </div>
-        """, unsafe_allow_html=True)
+        display_scalar(*next(iter(result[0].items())))
     elif isinstance(result, list):
         if result:
             st.dataframe(result, use_container_width=True, hide_index=True)
@@ -160,6 +256,16 @@ def display_result(result):
         st.json(result)
 
 
+def display_scalar(key, value):
+    st.markdown(f"""
+        <div class="result-card" style="text-align:center;">
+            <p style="font-size:0.9rem;text-transform:uppercase;letter-spacing:0.05em;opacity:0.7;">{key}</p>
+            <h1 style="font-size:3.5rem;margin:0;background:linear-gradient(135deg,#10B981 0%,#3B82F6 100%);
+                -webkit-background-clip:text;-webkit-text-fill-color:transparent;">{value}</h1>
+        </div>
+        """, unsafe_allow_html=True)
+
+
 # ── Main App ──────────────────────────────────────────────────────────────────
 
 def main():
@@ -187,6 +293,11 @@ def main():
             except Exception:
                 pass
     else:
+        # A warm instance attaches straight away; otherwise the button waits
+        # for the warm-up already running in the background
+        if boot().ready:
+            st.session_state.graph, st.session_state.chain = initialize_connection()
+            st.rerun()
         if st.button("Connect Database", type="primary"):
             with st.spinner("Connecting..."):
                 graph, chain = initialize_connection()
@@ -228,27 +339,55 @@ def main():
     # Results
     if execute_btn and question:
         with st.spinner("Querying graph..."):
-            result, elapsed = execute_query(question)
+            result, elapsed, breakdown = execute_query(question)
             if result is not None:
-                tab_res, tab_cypher, tab_trace = st.tabs(["Result", "Cypher", "Raw"])
-                with tab_res:
-                    st.markdown("")
-                    display_result(result)
-                with tab_cypher:
-                    cypher = result.get("query", "N/A") if isinstance(result, dict) else "N/A"
-                    st.code(cypher, language="cypher")
-                with tab_trace:
-                    st.json(result)
-                    st.caption(f"Execution time: {elapsed:.3f}s")
+                st.session_state.current_result = {
+                    "result": result,
+                    "elapsed": elapsed,
+                    "breakdown": breakdown,
+                    "pager": create_pager(result),
+                }
+
+    current = st.session_state.current_result
+    if current:
+        result, pager = current["result"], current["pager"]
+        tab_res, tab_cypher, tab_trace = st.tabs(["Result", "Cypher", "Raw"])
+        with tab_res:
+            st.markdown("")
+            display_result(pager.rows if pager else result, key="current")
+            if pager and pager.has_more:
+                st.button("Load more", on_click=pager.load_more)
+            elif pager and pager.truncated:
+                st.caption(f"Showing the first {len(pager.rows)} rows (result size limit reached).")
+        with tab_cypher:
+            st.code(generated_cypher(result) or "N/A", language="cypher")
+        with tab_trace:
+            st.json(raw_view(result))
+            st.caption(f"Execution time: {current['elapsed']:.3f}s")
+            if current["breakdown"]:
+                st.caption("Latency breakdown")
+                st.json(current["breakdown"], expanded=False)
 
     # History
-    if st.session_state.query_history:
+    history = st.session_state.query_history
+    if len(history):
         st.markdown("---")
         st.markdown("### Recent Queries")
-        for entry in reversed(st.session_state.query_history[-3:]):
+        search = st.text_input("Search past questions", key="history_search", label_visibility="collapsed",
+                               placeholder="Search past questions")
+        entries = history.search(search, limit=10) if search else list(reversed(history.recent(3)))
+        for entry in entries:
             with st.expander(f"{entry['timestamp']} — {entry['question']}", expanded=False):
                 st.caption(f"Latency: {entry['execution_time']:.3f}s")
-                display_result(entry["result"])
+                if entry["cypher"]:
+                    st.code(entry["cypher"], language="cypher")
+                # Expander bodies run even when collapsed, so results load on request
+                if st.toggle("Show result", key=f"history_{entry['id']}"):
+                    rows = history.load(entry["id"])
+                    if rows is None:
+                        st.info("This result is no longer stored.")
+                    else:
+                        display_result(rows)
 
     st.markdown("---")
     st.markdown(
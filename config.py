@@ -41,6 +41,148 @@ def setup_environment():
     return neo4j_uri, neo4j_username, neo4j_password, groq_api_key
 
 def get_llm():
-    from langchain_groq import ChatGroq
-    groq_api_key = _get_secret("GROQ_API_KEY") or os.getenv("GROQ_API_KEY")
-    return ChatGroq(groq_api_key=groq_api_key, model_name="llama-3.1-8b-instant")
+    """Build the Cypher LLM; LLM_BACKENDS (a JSON list of backend specs) routes across several."""
+    backends = _get_secret("LLM_BACKENDS")
+    if not backends:
+        from langchain_groq import ChatGroq
+        groq_api_key = _get_secret("GROQ_API_KEY") or os.getenv("GROQ_API_KEY")
+        return ChatGroq(groq_api_key=groq_api_key, model_name="llama-3.1-8b-instant")
+    import json
+    from src.llm_router import BackendPool, LLMRouter, backend_from_spec
+    specs = json.loads(backends) if isinstance(backends, str) else list(backends)
+    hedge_delay = _get_secret("LLM_HEDGE_DELAY")
+    pool = BackendPool(
+        [backend_from_spec(spec) for spec in specs],
+        hedge_delay=float(hedge_delay) if hedge_delay else None,
+        hedge_percentile=float(_get_secret("LLM_HEDGE_PERCENTILE") or 95),
+        timeout=float(_get_secret("LLM_TIMEOUT") or 60),
+    )
+    return LLMRouter(pool=pool)
+
+def get_cypher_cache():
+    """Build the question-to-Cypher cache from CYPHER_CACHE_* settings."""
+    from src.cache import CypherCache
+    ttl = _get_secret("CYPHER_CACHE_TTL")
+    return CypherCache(
+        max_size=int(_get_secret("CYPHER_CACHE_SIZE") or 1024),
+        ttl=float(ttl) if ttl else 3600.0,
+        path=_get_secret("CYPHER_CACHE_PATH") or None,
+    )
+
+
+def get_semantic_cache():
+    """Build the near-duplicate Cypher cache from SEMANTIC_CACHE_* settings."""
+    from src.semantic_cache import SemanticCypherCache
+    return SemanticCypherCache(
+        capacity=int(_get_secret("SEMANTIC_CACHE_SIZE") or 10000),
+        threshold=float(_get_secret("SEMANTIC_CACHE_THRESHOLD") or 0.9),
+    )
+
+
+def get_schema_snapshot(uri, database):
+    """Build the on-disk schema snapshot from SCHEMA_SNAPSHOT_* settings."""
+    from src.schema_snapshot import SchemaSnapshot
+    return SchemaSnapshot(
+        path=_get_secret("SCHEMA_SNAPSHOT_PATH") or ".schema_snapshot.json",
+        source=f"{uri}/{database}",
+        check_interval=float(_get_secret("SCHEMA_SNAPSHOT_INTERVAL") or 300),
+    )
+
+
+def get_neo4j_manager(uri, username, password, database):
+    """Get the process-wide Neo4j connection pool, sized from NEO4J_POOL_* settings."""
+    from src.connection import get_connection_manager
+    return get_connection_manager(
+        uri, username, password, database,
+        pool_size=int(_get_secret("NEO4J_POOL_SIZE") or 50),
+        acquisition_timeout=float(_get_secret("NEO4J_POOL_ACQUIRE_TIMEOUT") or 60),
+        max_connection_lifetime=float(_get_secret("NEO4J_POOL_MAX_LIFETIME") or 3600),
+        liveness_check_timeout=float(_get_secret("NEO4J_POOL_LIVENESS_TIMEOUT") or 30),
+    )
+
+
+def get_tracer():
+    """Build the QA tracer, exporting to TRACE_LOG_PATH and serving METRICS_PORT if set."""
+    from src.tracing import JsonlExporter, Tracer
+    path = _get_secret("TRACE_LOG_PATH")
+    tracer = Tracer(exporters=[JsonlExporter(path)] if path else [])
+    port = _get_secret("METRICS_PORT")
+    if port:
+        tracer.metrics.serve(int(port))
+    return tracer
+
+
+def get_result_limits():
+    """Page size and per-query memory caps for result display from RESULT_* settings."""
+    return {
+        "page_size": int(_get_secret("RESULT_PAGE_SIZE") or 50),
+        "max_rows": int(_get_secret("RESULT_MAX_ROWS") or 10000),
+        "max_bytes": int(_get_secret("RESULT_MAX_BYTES") or 32 * 1024 * 1024),
+    }
+
+
+def get_query_history(session_id=None):
+    """Build a session's query history from HISTORY_* settings (HISTORY_PATH persists it)."""
+    from src.history import QueryHistory
+    # Entries are keyed by session: the caller's stable id (the signed-in user),
+    # else HISTORY_SESSION for single-user deployments, else a random id whose
+    # entries no later session gets back
+    max_age = _get_secret("HISTORY_MAX_AGE_DAYS") or "30"
+    max_total = _get_secret("HISTORY_MAX_TOTAL") or "100000"
+    return QueryHistory(
+        capacity=int(_get_secret("HISTORY_SIZE") or 50),
+        path=_get_secret("HISTORY_PATH") or None,
+        session_id=session_id or _get_secret("HISTORY_SESSION") or None,
+        max_stored=int(_get_secret("HISTORY_MAX_STORED") or 1000),
+        max_age_days=float(max_age) if float(max_age) > 0 else None,
+        max_total=int(max_total) if int(max_total) > 0 else None,
+    )
+
+
+def get_traffic_recorder():
+    """Build the production traffic recorder, or None when TRAFFIC_LOG_PATH is unset."""
+    from src.traffic import TrafficRecorder
+    path = _get_secret("TRAFFIC_LOG_PATH")
+    if not path:
+        return None
+    return TrafficRecorder(path, sample_rate=float(_get_secret("TRAFFIC_SAMPLE_RATE") or 1.0))
+
+
+def get_parameterizer():
+    """Build the Cypher literal rewriter, or None when PARAMETERIZE_CYPHER is off."""
+    from src.parameterize import QueryParameterizer
+    if (_get_secret("PARAMETERIZE_CYPHER") or "true").lower() in ("0", "false", "no"):
+        return None
+    return QueryParameterizer(plan_cache_size=int(_get_secret("PLAN_CACHE_SIZE") or 1000))
+
+
+def get_template_matcher():
+    """Build the LLM-free template fast path, or None when TEMPLATE_FAST_PATH is off."""
+    from src.query_chain import get_few_shot_examples
+    from src.templates import EntityIndex, TemplateMatcher
+    if (_get_secret("TEMPLATE_FAST_PATH") or "true").lower() in ("0", "false", "no"):
+        return None
+    entities = EntityIndex(max_values=int(_get_secret("TEMPLATE_MAX_ENTITIES") or 100_000))
+    return TemplateMatcher(get_few_shot_examples(), entities)
+
+
+def get_query_deadline():
+    """Start a deadline for one question from QUERY_BUDGET_SECONDS and QUERY_LLM_SHARE."""
+    from src.deadline import Deadline
+    return Deadline(
+        budget=float(_get_secret("QUERY_BUDGET_SECONDS") or 30),
+        llm_share=float(_get_secret("QUERY_LLM_SHARE") or 0.5),
+    )
+
+
+def get_cost_guard():
+    """Build the EXPLAIN cost guard from COST_GUARD_* settings."""
+    from src.cost_guard import CostGuard
+    return CostGuard(
+        max_estimated_rows=float(_get_secret("COST_GUARD_MAX_ROWS") or 10_000_000),
+        limit_rows=float(_get_secret("COST_GUARD_LIMIT_ROWS") or 10_000),
+        inject_limit=int(_get_secret("COST_GUARD_INJECT_LIMIT") or 1000),
+        risky_action=_get_secret("COST_GUARD_ACTION") or "regenerate",
+        max_regenerations=int(_get_secret("COST_GUARD_REGENERATIONS") or 1),
+        decision_log=_get_secret("COST_GUARD_LOG") or None,
+    )
@@ -0,0 +1,254 @@
+"""
+Asyncio-native question answering pipeline alongside create_qa_chain
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import neo4j
+from langchain_core.output_parsers import StrOutputParser
+from langchain_neo4j.chains.graph_qa.cypher import construct_schema, extract_cypher
+from langchain_neo4j.chains.graph_qa.cypher_utils import CypherQueryCorrector, Schema
+
+from src.cache import CypherCache
+from src.example_store import ExampleStore
+from src.query_chain import create_cypher_prompt, get_few_shot_examples, get_prompt_version
+from src.results import LimitedGraph
+from src.schema_pruning import SchemaPruner
+from src.semantic_cache import SemanticCypherCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNeo4jGraph:
+    """Query-only graph wrapper around the async Neo4j driver"""
+
+    def __init__(
+        self,
+        uri: str,
+        username: str,
+        password: str,
+        database: str = "neo4j",
+        pool_size: int = 100,
+        timeout: Optional[float] = None,
+        driver: Optional[Any] = None,
+    ):
+        """
+        Initialize the async graph
+
+        Args:
+            uri: Neo4j connection URI
+            username: Database username
+            password: Database password
+            database: Database name
+            pool_size: Maximum pooled connections of the async driver
+            timeout: Transaction timeout in seconds
+            driver: Existing neo4j.AsyncDriver to use instead of creating one
+        """
+        self.database = database
+        self.timeout = timeout
+        self._driver = driver or neo4j.AsyncGraphDatabase.driver(
+            uri, auth=(username, password), max_connection_pool_size=pool_size
+        )
+
+    async def query(self, query: str, params: Optional[dict] = None, max_rows: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Run a Cypher query
+
+        Args:
+            query: Cypher statement
+            params: Query parameters
+            max_rows: Stop pulling records after this many; the rest of the
+                result is discarded on the server
+
+        Returns:
+            Query results as list of dicts
+        """
+        if max_rows is not None:
+            rows = []
+            async with self._driver.session(database=self.database, fetch_size=max_rows) as session:
+                result = await session.run(neo4j.Query(query, timeout=self.timeout), params or {})
+                async for record in result:
+                    rows.append(record.data())
+                    if len(rows) >= max_rows:
+                        break
+                await result.consume()
+            return rows
+        records, _, _ = await self._driver.execute_query(
+            neo4j.Query(query, timeout=self.timeout),
+            parameters_=params or {},
+            database_=self.database,
+        )
+        return [record.data() for record in records]
+
+    async def close(self):
+        """Close the async driver"""
+        await self._driver.close()
+
+
+class AsyncQAPipeline:
+    """Async NL-to-Cypher pipeline: concurrent prompt inputs, async LLM and driver"""
+
+    def __init__(
+        self,
+        graph: Any,
+        llm: Any,
+        async_graph: Optional[AsyncNeo4jGraph] = None,
+        cache: Optional[CypherCache] = None,
+        semantic_cache: Optional[SemanticCypherCache] = None,
+        example_store: Optional[ExampleStore] = None,
+        schema_pruner: Optional[SchemaPruner] = None,
+        validate_cypher: bool = True,
+        top_k: int = 10,
+        max_concurrency: int = 256,
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            graph: Neo4jGraph supplying the schema (refreshed or snapshot-loaded)
+            llm: Chat model or LLM with native ainvoke
+            async_graph: AsyncNeo4jGraph used to run queries; when omitted,
+                graph.query runs in a worker thread
+            cache: Optional CypherCache shared with the sync chain
+            semantic_cache: Optional SemanticCypherCache shared with the sync chain
+            example_store: Optional ExampleStore selecting examples per question
+            schema_pruner: Optional SchemaPruner trimming the schema per question
+            validate_cypher: Correct relationship directions against the schema
+            top_k: Maximum rows returned per question, as in the sync chain
+            max_concurrency: Maximum questions processed at the same time
+        """
+        self.graph = graph
+        self.async_graph = async_graph
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.example_store = example_store
+        self.schema_pruner = schema_pruner
+        self.validate_cypher = validate_cypher
+        self.top_k = top_k
+        self.generator = llm.bind(stop=["\n\n", "```"]) | StrOutputParser()
+        self._prompt = create_cypher_prompt(example_store)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._structured: Optional[Dict[str, Any]] = None
+        self._graph_schema = ""
+        self._corrector: Optional[CypherQueryCorrector] = None
+
+    @property
+    def prompt_version(self) -> str:
+        """Fingerprint of the prompt, current with example store edits"""
+        return get_prompt_version(self._prompt)
+
+    def _sync_schema(self):
+        """Rebuild derived schema state when the graph's schema object changed"""
+        structured = self.graph.get_structured_schema
+        if structured is self._structured:
+            return
+        self._structured = structured
+        self._graph_schema = construct_schema(
+            structured, [], [], bool(getattr(self.graph, "_enhanced_schema", False))
+        )
+        self._corrector = CypherQueryCorrector(
+            [Schema(el["start"], el["type"], el["end"]) for el in structured.get("relationships", [])]
+        )
+        if self.schema_pruner is not None:
+            self.schema_pruner.load(structured)
+
+    async def schema_for(self, question: str) -> str:
+        """Schema text for the prompt of a question"""
+        self._sync_schema()
+        if self.schema_pruner is None:
+            return self._graph_schema
+        return await asyncio.to_thread(self.schema_pruner.prune, question)
+
+    async def examples_for(self, question: str) -> List[Dict[str, str]]:
+        """Few-shot examples for the prompt of a question"""
+        if self.example_store is None:
+            return get_few_shot_examples()
+        return await self.example_store.aselect_examples({"question": question})
+
+    def _cache_lookup(self, question: str) -> Optional[str]:
+        schema = self.graph.schema or ""
+        for tier in (self.cache, self.semantic_cache):
+            if tier is not None:
+                cypher = tier.get(question, schema, self.prompt_version)
+                if cypher is not None:
+                    return cypher
+        return None
+
+    def _cache_store(self, question: str, cypher: str):
+        schema = self.graph.schema or ""
+        for tier in (self.cache, self.semantic_cache):
+            if tier is not None:
+                tier.put(question, schema, self.prompt_version, cypher)
+
+    async def generate(self, question: str) -> str:
+        """
+        Generate Cypher for a question
+
+        Schema retrieval and example selection run concurrently, then the
+        LLM is awaited; cache hits skip both.
+
+        Args:
+            question: Natural language question
+
+        Returns:
+            Cypher statement (empty if the corrector rejected it)
+        """
+        raw = self._cache_lookup(question)
+        if raw is None:
+            schema, examples = await asyncio.gather(
+                self.schema_for(question), self.examples_for(question)
+            )
+            prompt = create_cypher_prompt(examples=examples).format(schema=schema, question=question)
+            raw = await self.generator.ainvoke(prompt)
+            if raw and raw.strip():
+                self._cache_store(question, raw)
+        cypher = extract_cypher(raw)
+        if self.validate_cypher:
+            self._sync_schema()
+            cypher = self._corrector(cypher)
+        return cypher
+
+    async def execute(self, cypher: str) -> List[Dict[str, Any]]:
+        """Run generated Cypher, pulling no more than top_k rows"""
+        if not cypher:
+            return []
+        if self.async_graph is not None:
+            return await self.async_graph.query(cypher, max_rows=self.top_k)
+        return await asyncio.to_thread(LimitedGraph(self.graph, self.top_k).query, cypher)
+
+    async def answer(self, question: str) -> Dict[str, Any]:
+        """
+        Answer a question end to end
+
+        Args:
+            question: Natural language question
+
+        Returns:
+            Dict with the generated 'query' and the 'result' rows
+        """
+        async with self._semaphore:
+            cypher = await self.generate(question)
+            rows = await self.execute(cypher)
+        return {"query": cypher, "result": rows}
+
+    async def ainvoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Chain-compatible entry point: {'query': question} -> {'result': rows}"""
+        answer = await self.answer(inputs["query"])
+        return {"query": inputs["query"], "result": answer["result"]}
+
+
+def create_async_qa_pipeline(graph: Any, llm: Any, **kwargs: Any) -> AsyncQAPipeline:
+    """
+    Creates the async counterpart of create_qa_chain
+
+    Args:
+        graph: Neo4jGraph whose schema is already loaded
+        llm: Chat model used for Cypher generation
+        **kwargs: AsyncQAPipeline options
+
+    Returns:
+        AsyncQAPipeline exposing answer() and ainvoke()
+    """
+    return AsyncQAPipeline(graph, llm, **kwargs)
@@ -0,0 +1,287 @@
+"""
+Batch question runner with bounded concurrency and rate limiting
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to stay under LLM request quotas"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity, defaults to max(1, rate)
+        """
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedGeneration(Runnable):
+    """Runnable that takes a token from a TokenBucket before each LLM call"""
+
+    def __init__(self, generator: Runnable, bucket: TokenBucket):
+        self.generator = generator
+        self.bucket = bucket
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        self.bucket.acquire()
+        return self.generator.invoke(input, config, **kwargs)
+
+
+def rate_limit_llm(chain: Any, bucket: TokenBucket) -> Any:
+    """
+    Rate-limit the LLM calls of a QA chain
+
+    The bucket wraps the innermost Cypher generator, below the cache, template
+    and cost guard layers: cache and template hits take no token, and every
+    cost guard regeneration takes one.
+
+    Returns:
+        The same chain
+    """
+    owner, attr = chain, "cypher_generation_chain"
+    while hasattr(getattr(owner, attr), "generator"):
+        owner, attr = getattr(owner, attr), "generator"
+    setattr(owner, attr, RateLimitedGeneration(getattr(owner, attr), bucket))
+    return chain
+
+
+def load_questions(path: str) -> List[str]:
+    """
+    Read questions from a file
+
+    Supports plain text (one question per line), JSON Lines with a
+    'question' field, and JSON: a list of strings, or nested objects like
+    data/sample_queries.json where questions sit under 'examples',
+    'example' or 'question' keys.
+
+    Args:
+        path: Question file
+
+    Returns:
+        Questions in file order
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8") as f:
+        if ext == ".txt":
+            return [line.strip() for line in f if line.strip()]
+        if ext in (".jsonl", ".ndjson"):
+            return [json.loads(line)["question"] for line in f if line.strip()]
+        data = json.load(f)
+
+    questions: List[str] = []
+
+    def walk(node: Any):
+        if isinstance(node, str):
+            questions.append(node)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+        elif isinstance(node, dict):
+            if "examples" in node:
+                walk(node["examples"])
+            elif isinstance(node.get("example"), str):
+                questions.append(node["example"])
+            elif isinstance(node.get("question"), str):
+                questions.append(node["question"])
+            else:
+                for key, value in node.items():
+                    if isinstance(value, (list, dict)) and key != "query_templates":
+                        walk(value)
+
+    walk(data)
+    return questions
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class BatchRunner:
+    """Runs many questions through the QA chain and streams results to JSONL"""
+
+    def __init__(
+        self,
+        answer_fn: Callable[[str], Dict[str, Any]],
+        concurrency: int = 4,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            answer_fn: Callable answering one question, e.g.
+                lambda q: chain.invoke({"query": q})
+            concurrency: Maximum questions in flight
+            rate: Maximum question starts per second (including retries), or None
+            burst: Token bucket capacity for short bursts
+            max_retries: Retries per question after the first attempt
+            backoff_base: First retry delay in seconds, doubled each retry
+            backoff_max: Upper bound on the retry delay
+        """
+        self.answer_fn = answer_fn
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _answer(self, question: str) -> Dict[str, Any]:
+        delay = self.backoff_base
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                result = self.answer_fn(question)
+                return {"ok": True, "result": result, "attempts": attempt + 1, "latency": time.perf_counter() - start}
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    return {"ok": False, "error": str(e), "attempts": attempt + 1, "latency": time.perf_counter() - start}
+                attempt += 1
+                logger.warning(f"Question failed ({str(e)}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay * (0.5 + random.random() / 2))
+                delay = min(delay * 2, self.backoff_max)
+
+    def run(self, questions: Iterable[str], out_path: str) -> Dict[str, Any]:
+        """
+        Answer every question and append one JSON line per result as it completes
+
+        Args:
+            questions: Questions to run
+            out_path: JSONL output file
+
+        Returns:
+            Throughput stats: total, succeeded, failed, retries, seconds,
+            questions_per_sec and latency percentiles
+        """
+        questions = list(questions)
+        lock = threading.Lock()
+        latencies: List[float] = []
+        summary = {"total": len(questions), "succeeded": 0, "failed": 0, "retries": 0}
+        start = time.perf_counter()
+
+        with open(out_path, "w", encoding="utf-8") as out:
+
+            def work(index: int, question: str):
+                outcome = self._answer(question)
+                record = {"index": index, "question": question, **_describe(outcome)}
+                with lock:
+                    out.write(json.dumps(record, default=str) + "\n")
+                    out.flush()
+                    latencies.append(outcome["latency"])
+                    summary["succeeded" if outcome["ok"] else "failed"] += 1
+                    summary["retries"] += outcome["attempts"] - 1
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for future in [executor.submit(work, i, q) for i, q in enumerate(questions)]:
+                    future.result()
+
+        elapsed = time.perf_counter() - start
+        summary.update(
+            seconds=elapsed,
+            questions_per_sec=len(questions) / elapsed if elapsed else 0.0,
+            latency_p50=percentile(latencies, 50),
+            latency_p95=percentile(latencies, 95),
+            latency_max=max(latencies, default=0.0),
+        )
+        logger.info(
+            f"Batch finished: {summary['succeeded']}/{summary['total']} ok in {elapsed:.1f}s "
+            f"({summary['questions_per_sec']:.2f} q/s)"
+        )
+        return summary
+
+
+def _describe(outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a chain outcome into the JSONL record fields"""
+    record = {"ok": outcome["ok"], "attempts": outcome["attempts"], "latency": round(outcome["latency"], 4)}
+    if not outcome["ok"]:
+        record["error"] = outcome["error"]
+        return record
+    result = outcome["result"]
+    if isinstance(result, dict):
+        steps = result.get("intermediate_steps") or []
+        record["cypher"] = steps[0].get("query") if steps else result.get("cypher")
+        record["result"] = result.get("result")
+    else:
+        record["result"] = result
+    return record
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m src.batch data/sample_queries.json -o results.jsonl"""
+    import argparse
+
+    from config import get_llm, get_neo4j_manager, setup_environment
+    from src.query_chain import create_qa_chain
+
+    parser = argparse.ArgumentParser(description="Translate and run a file of questions")
+    parser.add_argument("questions", help="Question file (.txt, .json, .jsonl)")
+    parser.add_argument("-o", "--out", default="results.jsonl", help="JSONL output file")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=None, help="Max LLM calls per second")
+    parser.add_argument("--question-rate", type=float, default=None, help="Max question starts per second")
+    parser.add_argument("--burst", type=int, default=None)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    uri, username, password, _ = setup_environment()
+    graph = get_neo4j_manager(uri, username, password, os.getenv("NEO4J_DATABASE", "neo4j")).graph()
+    chain = create_qa_chain(graph, get_llm(), verbose=False, return_intermediate_steps=True)
+    if args.rate:
+        rate_limit_llm(chain, TokenBucket(args.rate, args.burst))
+
+    runner = BatchRunner(
+        lambda q: chain.invoke({"query": q}),
+        concurrency=args.concurrency,
+        rate=args.question_rate,
+        burst=args.burst,
+        max_retries=args.retries,
+    )
+    summary = runner.run(load_questions(args.questions), args.out)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,374 @@
+"""
+Offline benchmark of the QA chain with a stub LLM and a stub graph
+"""
+
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+from langchain_core.language_models.llms import LLM
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from src.batch import load_questions, percentile
+from src.query_chain import create_qa_chain
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUERIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "sample_queries.json")
+
+STAGES = ("prompt", "generation", "validation", "execution", "render", "total")
+
+# Deterministic answers for the stub LLM, picked per question
+STUB_CYPHER = [
+    "MATCH (m:Movie) RETURN count(m) AS count",
+    "MATCH (m:Movie) WHERE m.imdbRating IS NOT NULL RETURN m.title AS title, m.imdbRating AS rating ORDER BY rating DESC LIMIT 10",
+    "MATCH (p:Person)-[:ACTED_IN]->(m:Movie) RETURN p.name AS actor, count(m) AS movies ORDER BY movies DESC LIMIT 10",
+    "MATCH (p:Person)-[:DIRECTED]->(m:Movie) RETURN p.name AS director, collect(m.title) AS movies LIMIT 10",
+    "MATCH (m:Movie)-[:IN_GENRE]->(g:Genre) RETURN g.name AS genre, count(m) AS movies ORDER BY movies DESC",
+]
+
+MOVIE_SCHEMA = {
+    "node_props": {
+        "Movie": [
+            {"property": "id", "type": "STRING"},
+            {"property": "title", "type": "STRING"},
+            {"property": "released", "type": "DATE"},
+            {"property": "imdbRating", "type": "FLOAT"},
+        ],
+        "Person": [{"property": "name", "type": "STRING"}],
+        "Genre": [{"property": "name", "type": "STRING"}],
+    },
+    "rel_props": {},
+    "relationships": [
+        {"start": "Person", "type": "ACTED_IN", "end": "Movie"},
+        {"start": "Person", "type": "DIRECTED", "end": "Movie"},
+        {"start": "Movie", "type": "IN_GENRE", "end": "Genre"},
+    ],
+    "metadata": {"constraint": [], "index": []},
+}
+
+
+class StubLLM(LLM):
+    """Deterministic LLM returning canned movie Cypher after a fixed delay"""
+
+    latency: float = 0.0
+    responses: List[str] = STUB_CYPHER
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        question = prompt.rsplit("User input:", 1)[-1].split("\nCypher query:", 1)[0].strip()
+        return self.responses[zlib.crc32(question.encode("utf-8")) % len(self.responses)]
+
+
+class StubGraph:
+    """Local Neo4jGraph stand-in with the movie schema and synthetic rows"""
+
+    def __init__(self, rows: int = 10, latency: float = 0.0):
+        """
+        Initialize the graph
+
+        Args:
+            rows: Rows returned by every query
+            latency: Seconds each query takes
+        """
+        self.latency = latency
+        self.rows = [
+            {"title": f"Movie {i}", "rating": round(9.0 - i * 0.1, 1), "year": 1990 + i}
+            for i in range(rows)
+        ]
+        self.structured_schema = MOVIE_SCHEMA
+        self.schema = "\n".join(
+            f"{label} {{{', '.join(p['property'] + ': ' + p['type'] for p in props)}}}"
+            for label, props in MOVIE_SCHEMA["node_props"].items()
+        )
+        self._enhanced_schema = False
+
+    @property
+    def get_schema(self) -> str:
+        return self.schema
+
+    @property
+    def get_structured_schema(self) -> Dict[str, Any]:
+        return self.structured_schema
+
+    def refresh_schema(self):
+        pass
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        if self.latency:
+            time.sleep(self.latency)
+        if "count(" in query and "ORDER BY" not in query:
+            return [{"count": len(self.rows)}]
+        return [dict(row) for row in self.rows]
+
+    def add_graph_documents(self, graph_documents: Any, include_source: bool = False):
+        pass
+
+
+class StageTimer:
+    """Collects per-question stage durations, one sample per thread at a time"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.samples: List[Dict[str, float]] = []
+
+    def begin(self):
+        self._local.sample = {}
+
+    def record(self, stage: str, seconds: float):
+        sample = getattr(self._local, "sample", None)
+        if sample is not None:
+            sample[stage] = sample.get(stage, 0.0) + seconds
+
+    def end(self):
+        sample = self._local.__dict__.pop("sample", None)
+        if sample is not None:
+            with self._lock:
+                self.samples.append(sample)
+
+    def time(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99/mean in milliseconds for every stage seen"""
+        result = {}
+        for stage in STAGES:
+            values = [s[stage] * 1000 for s in self.samples if stage in s]
+            if values:
+                result[stage] = {
+                    "count": len(values),
+                    "mean_ms": sum(values) / len(values),
+                    "p50_ms": percentile(values, 50),
+                    "p95_ms": percentile(values, 95),
+                    "p99_ms": percentile(values, 99),
+                }
+        return result
+
+
+class _TimedRunnable(Runnable):
+    """Runnable recording the duration of the wrapped step under a stage name"""
+
+    def __init__(self, stage: str, inner: Runnable, timer: StageTimer):
+        self.stage = stage
+        self.inner = inner
+        self.timer = timer
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.timer.time(self.stage, self.inner.invoke, input, config)
+
+
+class _TimedCorrector:
+    def __init__(self, inner: Callable[[str], str], timer: StageTimer):
+        self.inner = inner
+        self.timer = timer
+
+    def __call__(self, query: str) -> str:
+        return self.timer.time("validation", self.inner, query)
+
+
+class _TimedGraph:
+    def __init__(self, inner: Any, timer: StageTimer):
+        self._inner = inner
+        self._timer = timer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        return self._timer.time("execution", self._inner.query, query, params)
+
+
+def instrument_chain(chain: Any, timer: StageTimer):
+    """
+    Time the prompt, generation, validation and execution stages of a chain
+
+    The innermost prompt | llm | parser sequence is found below any cache or
+    pruning wrappers, so cache hits show up as missing prompt/generation samples.
+
+    Args:
+        chain: Chain built by create_qa_chain
+        timer: StageTimer receiving the durations
+    """
+    holder, attr = chain, "cypher_generation_chain"
+    while hasattr(getattr(holder, attr), "generator"):
+        holder, attr = getattr(holder, attr), "generator"
+    sequence = getattr(holder, attr)
+    steps = sequence.steps
+    generation = steps[1]
+    for step in steps[2:]:
+        generation = generation | step
+    setattr(holder, attr, _TimedRunnable("prompt", steps[0], timer) | _TimedRunnable("generation", generation, timer))
+    if chain.cypher_query_corrector is not None:
+        chain.cypher_query_corrector = _TimedCorrector(chain.cypher_query_corrector, timer)
+    chain.graph = _TimedGraph(chain.graph, timer)
+
+
+def prepare_render(result: Any) -> Any:
+    """Mirror the work app.display_result does before handing rows to Streamlit"""
+    if isinstance(result, dict) and "result" in result:
+        return prepare_render(result["result"])
+    if isinstance(result, list) and len(result) == 1 and len(result[0]) == 1:
+        return str(next(iter(result[0].values())))
+    if isinstance(result, list):
+        return pd.DataFrame(result)
+    return json.dumps(result, default=str)
+
+
+def run_benchmark(
+    questions: Sequence[str],
+    llm_latency: float = 0.0,
+    db_latency: float = 0.0,
+    rows: int = 10,
+    concurrency: Sequence[int] = (1, 4, 16),
+    rounds: int = 3,
+    trace_memory: bool = True,
+    chain_kwargs: Optional[Dict[str, Any]] = None,
+    graph: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    Run the real create_qa_chain pipeline against the stubs
+
+    Args:
+        questions: Questions asked in every round
+        llm_latency: Seconds each stub LLM call sleeps
+        db_latency: Seconds each stub graph query sleeps
+        rows: Rows returned by every stub graph query
+        concurrency: Client counts to measure; one chain is shared by all clients
+        rounds: Times the question list is run per concurrency level
+        trace_memory: Track peak Python heap with tracemalloc (adds overhead)
+        chain_kwargs: Extra create_qa_chain arguments, e.g. a cache
+        graph: Graph answering the generated Cypher instead of the stub graph,
+            e.g. a MemoryGraph loaded with the movie data; db_latency and rows
+            then do not apply
+
+    Returns:
+        JSON-serializable report with per-level throughput, stage percentiles
+        and peak memory
+    """
+    report: Dict[str, Any] = {
+        "config": {
+            "questions": len(questions),
+            "llm_latency": llm_latency,
+            "db_latency": db_latency,
+            "rows": rows,
+            "rounds": rounds,
+            "concurrency": list(concurrency),
+            "graph": type(graph).__name__ if graph is not None else "StubGraph",
+        },
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "runs": [],
+    }
+    work = [q for _ in range(rounds) for q in questions]
+
+    for clients in concurrency:
+        timer = StageTimer()
+        chain = create_qa_chain(
+            graph if graph is not None else StubGraph(rows=rows, latency=db_latency),
+            StubLLM(latency=llm_latency),
+            verbose=False,
+            **(chain_kwargs or {}),
+        )
+        instrument_chain(chain, timer)
+
+        def ask(question: str):
+            timer.begin()
+            start = time.perf_counter()
+            result = chain.invoke({"query": question})
+            timer.time("render", prepare_render, result)
+            timer.record("total", time.perf_counter() - start)
+            timer.end()
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(ask, work))
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        run = {
+            "clients": clients,
+            "questions": len(work),
+            "seconds": elapsed,
+            "throughput_qps": len(work) / elapsed if elapsed else 0.0,
+            "stages": timer.summary(),
+            "peak_traced_bytes": peak,
+        }
+        report["runs"].append(run)
+        logger.info(f"{clients} clients: {run['throughput_qps']:.1f} q/s")
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["peak_rss_bytes"] = maxrss if sys.platform == "darwin" else maxrss * 1024
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m src.benchmark -o bench.json"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline benchmark of the QA chain")
+    parser.add_argument("--questions", default=SAMPLE_QUERIES)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM seconds per call")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Stub graph seconds per query")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--data", default=None, help="Movies file loaded into an in-memory graph instead of the stub graph")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--no-trace-memory", action="store_true")
+    parser.add_argument("-o", "--out", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    graph = None
+    if args.data:
+        from src.memory_graph import MemoryGraph
+        graph = MemoryGraph.from_file(args.data)
+
+    report = run_benchmark(
+        load_questions(args.questions),
+        llm_latency=args.llm_latency,
+        db_latency=args.db_latency,
+        rows=args.rows,
+        concurrency=args.concurrency,
+        rounds=args.rounds,
+        trace_memory=not args.no_trace_memory,
+        graph=graph,
+    )
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
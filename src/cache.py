@@ -0,0 +1,253 @@
+"""
+Question-to-Cypher caching for the QA chain
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+# Sentence punctuation is dropped, but decimal points ("8.5") are kept so that
+# numeric literals never collapse into each other.
+_PUNCTUATION = re.compile(r"(?<!\d)\.|\.(?!\d)|[!?,;:'\"`()\[\]{}]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache lookups
+
+    Args:
+        question: Raw user question
+
+    Returns:
+        Lowercased question with punctuation removed and whitespace collapsed
+    """
+    text = _PUNCTUATION.sub("", question.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def hash_text(text: str) -> str:
+    """Return a short, stable fingerprint of a string"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class CypherCache:
+    """LRU/TTL cache of generated Cypher keyed on question, schema and prompt"""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = 3600.0,
+        path: Optional[str] = None,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries kept
+            ttl: Seconds an entry stays valid, or None for no expiry
+            path: Optional SQLite file used to persist entries across restarts
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[str, str, Optional[float]]]" = OrderedDict()
+        self._schema_hash: Optional[str] = None
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_store(path)
+
+    def _open_store(self, path: str):
+        """Open the on-disk backend and warm the in-memory LRU from it"""
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cypher_cache ("
+            "key TEXT PRIMARY KEY, cypher TEXT, schema_hash TEXT, "
+            "expires_at REAL, last_used REAL)"
+        )
+        self._db.execute("DELETE FROM cypher_cache WHERE expires_at < ?", (time.time(),))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, cypher, schema_hash, expires_at FROM cypher_cache "
+            "ORDER BY last_used DESC LIMIT ?",
+            (self.max_size,),
+        ).fetchall()
+        for key, cypher, schema_hash, expires_at in reversed(rows):
+            self._entries[key] = (cypher, schema_hash, expires_at)
+        logger.info(f"Loaded {len(rows)} cached Cypher entries from {path}")
+
+    def make_key(self, question: str, schema: str, prompt_version: str) -> Tuple[str, str]:
+        """
+        Build the cache key for a question
+
+        Args:
+            question: Raw user question
+            schema: Graph schema the prompt is built from
+            prompt_version: Fingerprint of the prompt template and examples
+
+        Returns:
+            Tuple of (cache key, schema hash)
+        """
+        schema_hash = hash_text(schema)
+        key = hash_text(f"{normalize_question(question)}\x00{schema_hash}\x00{prompt_version}")
+        return key, schema_hash
+
+    def _check_schema(self, schema_hash: str):
+        """Drop every entry generated against a different schema"""
+        if schema_hash == self._schema_hash:
+            return
+        if self._schema_hash is not None or self._entries:
+            stale = [k for k, (_, h, _) in self._entries.items() if h != schema_hash]
+            for key in stale:
+                del self._entries[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM cypher_cache WHERE schema_hash != ?", (schema_hash,))
+                self._db.commit()
+            if stale:
+                logger.info(f"Schema changed, invalidated {len(stale)} cached queries")
+        self._schema_hash = schema_hash
+
+    def get(self, question: str, schema: str, prompt_version: str) -> Optional[str]:
+        """
+        Look up cached Cypher for a question
+
+        Returns:
+            The cached Cypher statement, or None on a miss
+        """
+        key, schema_hash = self.make_key(question, schema, prompt_version)
+        with self._lock:
+            self._check_schema(schema_hash)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.time():
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self._db is not None:
+                self._db.execute(
+                    "UPDATE cypher_cache SET last_used = ? WHERE key = ?", (time.time(), key)
+                )
+                self._db.commit()
+            return entry[0]
+
+    def put(self, question: str, schema: str, prompt_version: str, cypher: str):
+        """Store generated Cypher for a question"""
+        key, schema_hash = self.make_key(question, schema, prompt_version)
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._check_schema(schema_hash)
+            self._entries[key] = (cypher, schema_hash, expires_at)
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cypher_cache VALUES (?, ?, ?, ?, ?)",
+                    (key, cypher, schema_hash, expires_at, time.time()),
+                )
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._delete(oldest)
+                self.evictions += 1
+            if self._db is not None:
+                self._db.commit()
+
+    def _delete(self, key: str):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM cypher_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry from memory and disk"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cypher_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with size, hits, misses, evictions and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Close the on-disk backend"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def wrap(
+        self,
+        generator: Runnable,
+        schema_source: Callable[[], str],
+        prompt_version: Union[str, Callable[[], str]],
+    ) -> "CachedCypherGeneration":
+        """
+        Put this cache in front of a Cypher generation runnable
+
+        Args:
+            generator: The prompt | llm | parser runnable of the chain
+            schema_source: Callable returning the current graph schema
+            prompt_version: Fingerprint of the prompt template and examples, or a
+                callable returning it on each lookup
+
+        Returns:
+            Runnable that serves cached Cypher and falls back to the generator
+        """
+        return CachedCypherGeneration(generator, self, schema_source, prompt_version)
+
+
+class CachedCypherGeneration(Runnable):
+    """Runnable that consults a CypherCache or SemanticCypherCache before calling the LLM"""
+
+    def __init__(
+        self,
+        generator: Runnable,
+        cache: Any,
+        schema_source: Callable[[], str],
+        prompt_version: Union[str, Callable[[], str]],
+    ):
+        self.generator = generator
+        self.cache = cache
+        self.schema_source = schema_source
+        self.prompt_version = prompt_version
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        question = input["question"]
+        schema = self.schema_source() or ""
+        version = self.prompt_version() if callable(self.prompt_version) else self.prompt_version
+        cached = self.cache.get(question, schema, version)
+        if cached is not None:
+            return cached
+        cypher = self.generator.invoke(input, config, **kwargs)
+        if cypher and cypher.strip():
+            self.cache.put(question, schema, version, cypher)
+        return cypher
@@ -0,0 +1,147 @@
+"""
+Columnar query results shared by display, history and export
+"""
+
+import io
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+def _native(value: Any) -> Any:
+    """Convert driver temporal/spatial values (and containers of them) to plain Python"""
+    if hasattr(value, "to_native"):
+        return value.to_native()
+    if isinstance(value, dict):
+        return {k: _native(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_native(v) for v in value]
+    return value
+
+
+def _column(values: List[Any]) -> pa.Array:
+    """Build a typed Arrow column, falling back to strings for mixed values"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        pass
+    values = [_native(v) for v in values]
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        return pa.array(
+            [None if v is None else v if isinstance(v, str) else json.dumps(v, default=str) for v in values],
+            pa.string(),
+        )
+
+
+class ColumnarResult:
+    """Query rows held once as an Arrow table; slices and exports reuse its buffers"""
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self._frame = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "ColumnarResult":
+        """
+        Convert a list of row dicts (Neo4jGraph.query output)
+
+        Args:
+            rows: Row dicts; columns are the union of keys in first-seen order
+
+        Returns:
+            ColumnarResult with one typed column per key
+        """
+        rows = list(rows)
+        columns: Dict[str, None] = {}
+        for row in rows:
+            for key in row:
+                columns.setdefault(key, None)
+        arrays = [_column([row.get(name) for row in rows]) for name in columns]
+        return cls(pa.Table.from_arrays(arrays, names=list(columns)))
+
+    @classmethod
+    def concat(cls, results: Sequence["ColumnarResult"]) -> "ColumnarResult":
+        """Append results without copying their buffers"""
+        tables = [r.table for r in results if r.table.num_columns]
+        if not tables:
+            return cls(pa.table({}))
+        return cls(pa.concat_tables(tables, promote_options="permissive"))
+
+    @property
+    def columns(self) -> List[str]:
+        return self.table.column_names
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def __getitem__(self, item: Union[int, slice]) -> Any:
+        """Row dict for an index; zero-copy ColumnarResult for a slice such as [:top_k]"""
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise TypeError("ColumnarResult slices must be contiguous")
+            return ColumnarResult(self.table.slice(start, max(stop - start, 0)))
+        return self.table.slice(item % len(self) if item < 0 else item, 1).to_pylist()[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for batch in self.table.to_batches():
+            yield from batch.to_pylist()
+
+    def __repr__(self) -> str:
+        return f"ColumnarResult(rows={len(self)}, columns={self.columns})"
+
+    def scalar(self) -> Optional[Tuple[str, Any]]:
+        """(column, value) when the result is a single value, else None"""
+        if len(self) == 1 and len(self.columns) == 1:
+            return self.columns[0], self.table.column(0)[0].as_py()
+        return None
+
+    def to_pylist(self) -> List[Dict[str, Any]]:
+        return self.table.to_pylist()
+
+    def to_pandas(self):
+        """DataFrame view, converted on first use and reused afterwards"""
+        if self._frame is None:
+            self._frame = self.table.to_pandas()
+        return self._frame
+
+    def to_csv(self) -> bytes:
+        """CSV export"""
+        buffer = io.BytesIO()
+        try:
+            pa_csv.write_csv(self.table, buffer)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Arrow's CSV writer has no nested types; pandas stringifies them
+            return self.to_pandas().to_csv(index=False).encode("utf-8")
+        return buffer.getvalue()
+
+    def to_parquet(self) -> bytes:
+        """Parquet export"""
+        buffer = io.BytesIO()
+        pq.write_table(self.table, buffer)
+        return buffer.getvalue()
+
+
+class ColumnarGraph:
+    """Graph proxy converting every query result to a ColumnarResult once"""
+
+    def __init__(self, graph: Any):
+        self._graph = graph
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._graph, name)
+
+    def query(self, query: str, params: Optional[dict] = None) -> ColumnarResult:
+        return ColumnarResult.from_rows(self._graph.query(query, params))
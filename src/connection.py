@@ -0,0 +1,397 @@
+"""
+Process-wide pooled Neo4j driver shared by every session
+"""
+
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import neo4j
+from langchain_neo4j import Neo4jGraph
+from langchain_neo4j.graphs.neo4j_graph import _value_sanitize
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+from neo4j_graphrag.schema import format_schema
+
+from src.cost_guard import is_write
+from src.deadline import Deadline, current_deadline
+from src.results import ResultCursor
+from src.stats import hide_stats_label
+
+logger = logging.getLogger(__name__)
+
+_managers: Dict[Tuple[str, str, str], "ConnectionManager"] = {}
+_managers_lock = threading.Lock()
+
+
+class ConnectionManager:
+    """Owns one bounded driver pool and hands it out to graphs and databases"""
+
+    def __init__(
+        self,
+        uri: str,
+        username: str,
+        password: str,
+        database: str = "neo4j",
+        pool_size: int = 50,
+        acquisition_timeout: float = 60.0,
+        max_connection_lifetime: float = 3600.0,
+        liveness_check_timeout: float = 30.0,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        driver_factory: Optional[Callable[..., Any]] = None,
+    ):
+        """
+        Initialize the manager (the driver is created lazily)
+
+        Args:
+            uri: Neo4j connection URI
+            username: Database username
+            password: Database password
+            database: Database name queries run against
+            pool_size: Maximum number of pooled connections
+            acquisition_timeout: Seconds to wait for a free pooled connection
+            max_connection_lifetime: Seconds before a pooled connection is recycled
+            liveness_check_timeout: Idle seconds after which a pooled connection is
+                pinged before reuse
+            max_retries: Connection attempts before giving up
+            backoff_base: First retry delay in seconds, doubled each attempt
+            backoff_max: Upper bound on the retry delay
+            driver_factory: Callable building the driver, defaults to
+                neo4j.GraphDatabase.driver
+        """
+        self.uri = uri
+        self.username = username
+        self.password = password
+        self.database = database
+        self.pool_size = pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self.max_connection_lifetime = max_connection_lifetime
+        self.liveness_check_timeout = liveness_check_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.driver_factory = driver_factory or neo4j.GraphDatabase.driver
+        self.reconnects = 0
+        self._driver: Optional[Any] = None
+        self._leases = 0
+        self._lock = threading.RLock()
+
+    @property
+    def driver(self) -> Any:
+        """The shared driver, connecting on first use"""
+        driver = self._driver
+        if driver is None:
+            with self._lock:
+                if self._driver is None:
+                    self._driver = self._connect()
+                driver = self._driver
+        return driver
+
+    def _connect(self) -> Any:
+        """Create and verify a driver, retrying with exponential backoff"""
+        delay = self.backoff_base
+        for attempt in range(1, self.max_retries + 1):
+            driver = None
+            try:
+                driver = self.driver_factory(
+                    self.uri,
+                    auth=(self.username, self.password),
+                    max_connection_pool_size=self.pool_size,
+                    connection_acquisition_timeout=self.acquisition_timeout,
+                    max_connection_lifetime=self.max_connection_lifetime,
+                    liveness_check_timeout=self.liveness_check_timeout,
+                )
+                driver.verify_connectivity()
+                logger.info(f"Connected shared Neo4j driver to {self.uri} (pool size {self.pool_size})")
+                return driver
+            except (ServiceUnavailable, SessionExpired, OSError) as e:
+                if driver is not None:
+                    driver.close()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Neo4j connection attempt {attempt} failed: {str(e)}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+
+    def reconnect(self, stale: Optional[Any] = None) -> Any:
+        """
+        Replace a broken driver
+
+        Args:
+            stale: The driver that failed; if another thread already replaced
+                it, the new driver is returned without reconnecting again
+
+        Returns:
+            A working driver
+        """
+        with self._lock:
+            if stale is not None and self._driver is not stale:
+                return self.driver
+            old, self._driver = self._driver, None
+            if old is not None:
+                try:
+                    old.close()
+                except Exception:
+                    pass
+            self.reconnects += 1
+            return self.driver
+
+    def is_alive(self) -> bool:
+        """
+        Check that the database is reachable
+
+        Returns:
+            True if connectivity could be verified, False otherwise
+        """
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception as e:
+            logger.warning(f"Neo4j liveness check failed: {str(e)}")
+            return False
+
+    def acquire(self) -> "ConnectionManager":
+        """Register a user of the pool; pair every call with release()"""
+        with self._lock:
+            self._leases += 1
+        return self
+
+    def release(self):
+        """Drop a user of the pool and close the driver once nobody holds it"""
+        with self._lock:
+            self._leases = max(self._leases - 1, 0)
+            if self._leases == 0:
+                self._close_driver()
+
+    def retire(self):
+        """Close the driver as soon as no lease holds it: now, or at the last release()"""
+        with self._lock:
+            if self._leases == 0:
+                self._close_driver()
+
+    def _close_driver(self):
+        if self._driver is not None:
+            self._driver.close()
+            self._driver = None
+            logger.info("Closed shared Neo4j driver")
+
+    @property
+    def leases(self) -> int:
+        return self._leases
+
+    def graph(self, refresh_schema: bool = True, **kwargs: Any) -> "PooledNeo4jGraph":
+        """
+        Build a Neo4jGraph backed by the shared pool
+
+        Args:
+            refresh_schema: Whether to introspect the schema immediately
+            **kwargs: timeout, sanitize or enhanced_schema, as for Neo4jGraph
+
+        Returns:
+            PooledNeo4jGraph holding a lease on this manager
+        """
+        return PooledNeo4jGraph(self, refresh_schema=refresh_schema, **kwargs)
+
+
+class PooledNeo4jGraph(Neo4jGraph):
+    """Neo4jGraph that borrows the driver of a ConnectionManager instead of owning one"""
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        timeout: Optional[float] = None,
+        sanitize: bool = False,
+        refresh_schema: bool = True,
+        enhanced_schema: bool = False,
+    ):
+        # Neo4jGraph.__init__ would open a private driver, so set its state directly
+        self._manager = manager.acquire()
+        # Callers should close() graphs; one collected without it still gives
+        # its lease back, or the manager's driver would never close
+        self._lease = weakref.finalize(self, manager.release)
+        self._database = manager.database
+        self.timeout = timeout
+        self.sanitize = sanitize
+        self._enhanced_schema = enhanced_schema
+        self.schema: str = ""
+        self.structured_schema: Dict[str, Any] = {}
+        if refresh_schema:
+            self.refresh_schema()
+
+    @property
+    def _driver(self) -> Any:
+        return self._manager.driver
+
+    def refresh_schema(self) -> None:
+        """Refresh the schema, leaving out the statistics counters node"""
+        super().refresh_schema()
+        self.structured_schema = hide_stats_label(self.structured_schema)
+        self.schema = format_schema(self.structured_schema, self._enhanced_schema)
+
+    def query(self, query: str, params: Optional[dict] = None, session_params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        """
+        Run a query, reconnecting if the pooled connection has gone away
+
+        Read-only statements are then run again. A write may already have
+        committed when the connection dropped, so its error is raised instead
+        of applying it twice.
+        """
+        self._check_driver_state()
+        deadline = current_deadline()
+        run = super().query if deadline is None or session_params else self._query_within
+        driver = self._driver
+        try:
+            return run(query, params, session_params)
+        except (ServiceUnavailable, SessionExpired) as e:
+            logger.warning(f"Neo4j connection lost ({str(e)}), reconnecting")
+            self._manager.reconnect(driver)
+            if is_write(query):
+                raise
+            return run(query, params, session_params)
+
+    def _query_within(self, query: str, params: Optional[dict], session_params: Optional[dict]) -> List[Dict[str, Any]]:
+        """query() under the current deadline: server-side timeout and tagged for termination"""
+        deadline = self._watch(current_deadline())
+        data, _, _ = self._driver.execute_query(
+            neo4j.Query(query, metadata=deadline.metadata(), timeout=deadline.db_timeout()),
+            parameters_=params or {},
+            database_=self._database,
+        )
+        rows = [record.data() for record in data]
+        return [_value_sanitize(row) for row in rows] if self.sanitize else rows
+
+    def _watch(self, deadline: Deadline) -> Deadline:
+        deadline.on_cancel((id(self), "terminate"), lambda: self.terminate(deadline.query_id))
+        return deadline
+
+    def terminate(self, query_id: str) -> int:
+        """
+        Terminate the running transactions of a query on the server
+
+        Args:
+            query_id: Deadline.query_id recorded in the transaction metadata
+
+        Returns:
+            Number of transactions terminated
+        """
+        records, _, _ = self._driver.execute_query(
+            "SHOW TRANSACTIONS YIELD transactionId, metaData "
+            "WHERE metaData.qa_query_id = $id RETURN collect(transactionId) AS ids",
+            parameters_={"id": query_id},
+            database_=self._database,
+        )
+        ids = records[0]["ids"] if records else []
+        if ids:
+            self._driver.execute_query("TERMINATE TRANSACTIONS $ids", parameters_={"ids": ids}, database_=self._database)
+            logger.info(f"Terminated {len(ids)} transactions of query {query_id}")
+        return len(ids)
+
+    def explain(self, query: str, params: Optional[dict] = None) -> Dict[str, Any]:
+        """
+        Plan a query without running it
+
+        Returns:
+            The EXPLAIN plan tree (operatorType, arguments, children)
+        """
+        self._check_driver_state()
+        _, summary, _ = self._driver.execute_query(
+            neo4j.Query(f"EXPLAIN {query}", timeout=self.timeout),
+            parameters_=params or {},
+            database_=self._database,
+        )
+        return summary.plan or {}
+
+    def profile(self, query: str, params: Optional[dict] = None) -> Dict[str, Any]:
+        """
+        Run a query under PROFILE, discarding its rows
+
+        Returns:
+            The profiled plan tree; operators carry dbHits and rows
+        """
+        self._check_driver_state()
+        _, summary, _ = self._driver.execute_query(
+            neo4j.Query(f"PROFILE {query}", timeout=self.timeout),
+            parameters_=params or {},
+            database_=self._database,
+        )
+        return summary.profile or {}
+
+    def stream(
+        self,
+        query: str,
+        params: Optional[dict] = None,
+        fetch_size: int = 1000,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> ResultCursor:
+        """
+        Run a query lazily on the shared pool
+
+        Args:
+            query: Cypher statement
+            params: Query parameters
+            fetch_size: Records pulled per round-trip
+            max_rows: Stop after this many rows
+            max_bytes: Stop once the estimated size of returned rows exceeds this
+
+        Returns:
+            ResultCursor; close it (or read it to the end) to free the session.
+            Under a current deadline the transaction timeout is what is left
+            of it and the transaction is terminated if the query is cancelled
+        """
+        self._check_driver_state()
+        deadline = current_deadline()
+        if deadline is not None:
+            self._watch(deadline)
+        return ResultCursor(
+            self._driver, query, params,
+            database=self._database,
+            fetch_size=fetch_size,
+            max_rows=max_rows,
+            max_bytes=max_bytes,
+            timeout=self.timeout if deadline is None else deadline.db_timeout(),
+            transform=_value_sanitize if self.sanitize else None,
+            metadata=None if deadline is None else deadline.metadata(),
+        )
+
+    def close(self) -> None:
+        """Give the lease back; the driver closes when the last lease is released"""
+        self.__dict__.pop("_manager", None)
+        lease = self.__dict__.get("_lease")
+        if lease is not None:
+            lease()
+
+    def __del__(self) -> None:
+        # Neo4jGraph.__del__ closes the driver, which the manager owns here; the
+        # lease is released by the finalizer registered in __init__
+        pass
+
+
+def get_connection_manager(uri: str, username: str, password: str, database: str = "neo4j", **pool_options: Any) -> ConnectionManager:
+    """
+    Get the process-wide manager for a database, creating it on first use
+
+    Args:
+        uri: Neo4j connection URI
+        username: Database username
+        password: Database password
+        database: Database name
+        **pool_options: Extra ConnectionManager arguments, used on creation only
+
+    Returns:
+        The shared ConnectionManager
+    """
+    key = (uri, username, database)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or manager.password != password:
+            if manager is not None:
+                # Graphs still holding the old credentials keep working until
+                # they close; its driver goes with the last of them
+                manager.retire()
+            manager = ConnectionManager(uri, username, password, database, **pool_options)
+            _managers[key] = manager
+        return manager
@@ -0,0 +1,297 @@
+"""
+EXPLAIN-based cost guard for generated Cypher
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+from neo4j.exceptions import ClientError
+
+from src.parameterize import template_key
+
+logger = logging.getLogger(__name__)
+
+RISKY_OPERATORS = ("CartesianProduct", "AllNodesScan")
+
+ACTIONS = ("allow", "limit", "regenerate", "reject")
+
+# Variable-length relationship without an upper bound: [*], [:R*], [*2..], [r:R*1..]
+UNBOUNDED_PATH = re.compile(r"\[[^\[\]]*\*\s*(?:\d+\s*\.\.\s*)?\]")
+TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+|\$\w+)\s*;?\s*$", re.IGNORECASE)
+WRITE_CLAUSE = re.compile(r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|LOAD\s+CSV)\b", re.IGNORECASE)
+# String literals, backtick names and comments, whose text is not Cypher keywords
+INERT_TEXT = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def is_write(cypher: str) -> bool:
+    """Whether a statement has a write clause outside its string literals, quoted names and comments"""
+    return bool(WRITE_CLAUSE.search(INERT_TEXT.sub(" ", cypher)))
+
+
+class QueryRejected(ValueError):
+    """Raised when generated Cypher is judged too expensive to run"""
+
+    def __init__(self, decision: "GuardDecision"):
+        super().__init__(f"Query rejected by cost guard: {'; '.join(decision.reasons)}")
+        self.decision = decision
+
+
+class GuardDecision:
+    """Outcome of checking one statement"""
+
+    def __init__(
+        self,
+        action: str,
+        cypher: str,
+        reasons: Optional[List[str]] = None,
+        estimated_rows: Optional[float] = None,
+        operators: Optional[List[str]] = None,
+    ):
+        self.action = action
+        self.cypher = cypher
+        self.reasons = reasons or []
+        self.estimated_rows = estimated_rows
+        self.operators = operators or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "action": self.action,
+            "cypher": self.cypher,
+            "reasons": self.reasons,
+            "estimated_rows": self.estimated_rows,
+            "operators": self.operators,
+        }
+
+
+def plan_operators(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten an EXPLAIN plan tree into (operator, estimated rows, details) dicts"""
+    operators = []
+    stack = [plan] if plan else []
+    while stack:
+        node = stack.pop()
+        arguments = node.get("arguments") or node.get("args") or {}
+        operators.append({
+            "operator": str(node.get("operatorType", "")).split("@")[0],
+            "estimated_rows": float(arguments.get("EstimatedRows", 0) or 0),
+            "details": str(arguments.get("Details", "")),
+        })
+        stack.extend(node.get("children") or [])
+    return operators
+
+
+def inject_limit(cypher: str, limit: int) -> Optional[str]:
+    """
+    Append a LIMIT to a read query that returns rows and has none
+
+    Returns:
+        The limited query, or None when a LIMIT cannot be added safely
+        (UNION, write or non-returning statements)
+    """
+    statement = cypher.strip().rstrip(";").rstrip()
+    if TRAILING_LIMIT.search(statement):
+        return statement
+    if re.search(r"\bUNION\b", statement, re.IGNORECASE) or is_write(statement):
+        return None
+    if not re.search(r"\bRETURN\b", statement, re.IGNORECASE):
+        return None
+    return f"{statement}\nLIMIT {limit}"
+
+
+class CostGuard:
+    """Inspects EXPLAIN plans and decides whether generated Cypher may run"""
+
+    def __init__(
+        self,
+        max_estimated_rows: float = 10_000_000,
+        limit_rows: float = 10_000,
+        inject_limit: int = 1000,
+        risky_action: str = "regenerate",
+        max_regenerations: int = 1,
+        decision_log: Optional[str] = None,
+        cache_size: int = 256,
+        recheck_ratio: float = 0.1,
+    ):
+        """
+        Initialize the guard
+
+        Args:
+            max_estimated_rows: Estimated rows on any operator above which the
+                query is treated as risky
+            limit_rows: Estimated result rows above which a LIMIT is injected
+            inject_limit: The LIMIT value injected
+            risky_action: 'regenerate' or 'reject' for risky queries (cartesian
+                products, all-nodes scans, unbounded variable-length paths,
+                oversized estimates); after max_regenerations it rejects
+            max_regenerations: LLM retries with feedback before rejecting
+            decision_log: Optional JSON Lines file receiving every decision
+            cache_size: Decisions remembered per statement template; statements
+                differing only in literal values share one EXPLAIN
+            recheck_ratio: Allow decisions whose estimates reached this fraction
+                of limit_rows or max_estimated_rows are not shared: another
+                literal may match far more rows, so each one is EXPLAINed
+        """
+        if risky_action not in ("regenerate", "reject"):
+            raise ValueError(f"risky_action must be 'regenerate' or 'reject', not {risky_action!r}")
+        self.max_estimated_rows = max_estimated_rows
+        self.limit_rows = limit_rows
+        self.inject_limit = inject_limit
+        self.risky_action = risky_action
+        self.max_regenerations = max_regenerations
+        self.decision_log = decision_log
+        self.cache_size = cache_size
+        self.recheck_ratio = recheck_ratio
+        self.counts = dict.fromkeys(ACTIONS, 0)
+        self._decisions: "OrderedDict[str, GuardDecision]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def explain(self, graph: Any, cypher: str) -> Dict[str, Any]:
+        """EXPLAIN a statement without running it"""
+        if hasattr(graph, "explain"):
+            return graph.explain(cypher)
+        _, summary, _ = graph._driver.execute_query(f"EXPLAIN {cypher}", database_=graph._database)
+        return summary.plan or {}
+
+    def check(self, graph: Any, cypher: str) -> GuardDecision:
+        """
+        Decide what to do with a statement
+
+        Args:
+            graph: Graph used to EXPLAIN the statement
+            cypher: Generated Cypher
+
+        Returns:
+            GuardDecision with action allow, limit (cypher carries the LIMIT)
+            or the configured risky action
+        """
+        key = template_key(cypher)
+        with self._lock:
+            if key in self._decisions:
+                self._decisions.move_to_end(key)
+                return self._rebind(self._decisions[key], cypher)
+
+        reasons = []
+        try:
+            operators = plan_operators(self.explain(graph, cypher))
+        except ClientError as e:
+            # Syntax and semantic errors: the statement would fail anyway
+            decision = GuardDecision(self.risky_action, cypher, [f"EXPLAIN failed: {e.message or str(e)}"])
+            return self._remember(key, decision)
+        except Exception as e:
+            # The guard fails open if the database cannot be asked
+            logger.warning(f"Cost guard could not EXPLAIN query, allowing it: {str(e)}")
+            return GuardDecision("allow", cypher, [f"EXPLAIN unavailable: {str(e)}"])
+
+        names = [op["operator"] for op in operators]
+        for risky in RISKY_OPERATORS:
+            if risky in names:
+                reasons.append(f"plan contains {risky}")
+        if UNBOUNDED_PATH.search(cypher) or any(
+            op["operator"].startswith("VarLengthExpand") and UNBOUNDED_PATH.search(op["details"]) for op in operators
+        ):
+            reasons.append("unbounded variable-length path")
+        peak = max((op["estimated_rows"] for op in operators), default=0.0)
+        if peak > self.max_estimated_rows:
+            reasons.append(f"estimated {peak:.0f} rows exceeds {self.max_estimated_rows:.0f}")
+        result_rows = operators[0]["estimated_rows"] if operators else 0.0
+
+        if reasons:
+            decision = GuardDecision(self.risky_action, cypher, reasons, peak, names)
+        elif result_rows > self.limit_rows:
+            limited = inject_limit(cypher, self.inject_limit)
+            if limited is None:
+                decision = GuardDecision("allow", cypher, [f"estimated {result_rows:.0f} result rows, LIMIT not applicable"], peak, names)
+            elif limited == cypher.strip().rstrip(";").rstrip():
+                decision = GuardDecision("allow", cypher, [], peak, names)
+            else:
+                decision = GuardDecision("limit", limited, [f"estimated {result_rows:.0f} result rows"], peak, names)
+        else:
+            decision = GuardDecision("allow", cypher, [], peak, names)
+            if (result_rows >= self.limit_rows * self.recheck_ratio
+                    or peak >= self.max_estimated_rows * self.recheck_ratio):
+                # Close to a threshold: the estimate depends on the literal
+                return decision
+        return self._remember(key, decision)
+
+    def _remember(self, key: str, decision: GuardDecision) -> GuardDecision:
+        with self._lock:
+            self._decisions[key] = decision
+            self._decisions.move_to_end(key)
+            while len(self._decisions) > self.cache_size:
+                self._decisions.popitem(last=False)
+        return decision
+
+    def _rebind(self, decision: GuardDecision, cypher: str) -> GuardDecision:
+        """Apply a cached decision to a statement with other literal values"""
+        if decision.action == "limit":
+            cypher = inject_limit(cypher, self.inject_limit) or cypher
+        return GuardDecision(decision.action, cypher, decision.reasons, decision.estimated_rows, decision.operators)
+
+    def record(self, question: str, original: str, decision: GuardDecision, attempt: int):
+        """Count and log a decision for threshold tuning"""
+        with self._lock:
+            self.counts[decision.action] += 1
+        level = logging.INFO if decision.action == "allow" else logging.WARNING
+        logger.log(level, f"Cost guard {decision.action}: {'; '.join(decision.reasons) or 'within thresholds'}")
+        if not self.decision_log:
+            return
+        entry = {"timestamp": time.time(), "question": question, "attempt": attempt, "original": original}
+        entry.update(decision.to_dict())
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.decision_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def wrap(self, generator: Runnable, graph: Any) -> "GuardedCypherGeneration":
+        """
+        Put the guard after a Cypher generation runnable
+
+        Args:
+            generator: Runnable producing Cypher from {'question', 'schema'}
+            graph: Graph used for EXPLAIN
+
+        Returns:
+            Runnable returning approved (possibly limited) Cypher
+        """
+        return GuardedCypherGeneration(generator, self, graph)
+
+
+class GuardedCypherGeneration(Runnable):
+    """Runnable that checks generated Cypher and limits, regenerates or rejects it"""
+
+    def __init__(self, generator: Runnable, guard: CostGuard, graph: Any):
+        self.generator = generator
+        self.guard = guard
+        self.graph = graph
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        question = input["question"]
+        attempt_input = input
+        attempt = 0
+        while True:
+            raw = self.generator.invoke(attempt_input, config, **kwargs)
+            cypher = extract_cypher(raw) if raw else raw
+            if not cypher or not cypher.strip():
+                return raw
+            decision = self.guard.check(self.graph, cypher)
+            self.guard.record(question, cypher, decision, attempt)
+            if decision.action in ("allow", "limit"):
+                return decision.cypher
+            if decision.action == "reject" or attempt >= self.guard.max_regenerations:
+                raise QueryRejected(decision)
+            attempt += 1
+            attempt_input = dict(input, question=(
+                f"{question}\n(A previous attempt `{cypher}` was rejected: {'; '.join(decision.reasons)}. "
+                "Write a cheaper query: connect every pattern, anchor it on labelled nodes "
+                "and bound variable-length paths.)"
+            ))
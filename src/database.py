@@ -3,9 +3,20 @@ Database utilities for Neo4j connection and data management
 """
 
 from langchain_neo4j import Neo4jGraph
+from contextlib import nullcontext
 from typing import Optional, Dict, Any
 import logging
 
+from src.connection import ConnectionManager, get_connection_manager
+from src.deadline import Deadline
+from src.index_advisor import IndexAdvisor
+from src.loader import BulkLoader
+from src.memory_graph import MemoryGraph
+from src.results import ResultCursor
+from src.schema_snapshot import SchemaSnapshot
+from src.stats import GraphStats
+from src.tracing import span
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -13,7 +24,18 @@ logger = logging.getLogger(__name__)
 class Neo4jDatabase:
     """Wrapper class for Neo4j database operations"""
     
-    def __init__(self, uri: str, username: str, password: str):
+    def __init__(
+        self,
+        uri: str,
+        username: str,
+        password: str,
+        schema_snapshot: Optional[SchemaSnapshot] = None,
+        database: str = "neo4j",
+        manager: Optional[ConnectionManager] = None,
+        stats_ttl: float = 30.0,
+        stats_counters: bool = False,
+        graph: Optional[Any] = None,
+    ):
         """
         Initialize Neo4j database connection
         
@@ -21,11 +43,26 @@ class Neo4jDatabase:
             uri: Neo4j connection URI
             username: Database username
             password: Database password
+            schema_snapshot: Optional SchemaSnapshot serving the schema from disk
+                and refreshing it in the background only when it changes
+            database: Database name
+            manager: Connection pool to use; defaults to the process-wide
+                manager for this URI, user and database
+            stats_ttl: Seconds get_stats() results are cached
+            stats_counters: Serve stats from counters maintained on ingestion
+            graph: Graph to use instead of connecting to Neo4j, e.g. a
+                MemoryGraph for offline tests and benchmarks
         """
         self.uri = uri
         self.username = username
         self.password = password
-        self.graph: Optional[Neo4jGraph] = None
+        self.schema_snapshot = schema_snapshot
+        self.database = database
+        self.manager = manager
+        self.stats_ttl = stats_ttl
+        self.stats_counters = stats_counters
+        self.graph: Optional[Neo4jGraph] = graph
+        self.stats: Optional[GraphStats] = None
     
     def connect(self) -> bool:
         """
@@ -35,23 +72,45 @@ class Neo4jDatabase:
             True if connection successful, False otherwise
         """
         try:
-            self.graph = Neo4jGraph(
-                url=self.uri,
-                username=self.username,
-                password=self.password
-            )
+            if self.graph is None:
+                if self.manager is None:
+                    self.manager = get_connection_manager(
+                        self.uri, self.username, self.password, self.database
+                    )
+                self.graph = self.manager.graph(refresh_schema=self.schema_snapshot is None)
+            self.stats = GraphStats(self.graph, ttl=self.stats_ttl, counters=self.stats_counters)
             # Test connection
             self.graph.query("RETURN 1 AS ok")
+            if self.schema_snapshot is not None:
+                self.schema_snapshot.attach(self.graph)
+                self.schema_snapshot.start(self.graph)
             logger.info("Successfully connected to Neo4j database")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {str(e)}")
+            if self.graph:
+                self.graph.close()
+                self.graph = None
             return False
     
-    def load_movie_data(self) -> bool:
+    def load_movie_data(
+        self,
+        path: Optional[str] = None,
+        batch_size: int = 1000,
+        workers: int = 4,
+        checkpoint_path: Optional[str] = None,
+    ) -> bool:
         """
         Load sample movie data into the database
         
+        Args:
+            path: Local CSV/JSON file in the movies_small.csv layout; when given
+                it is bulk loaded in parallel batches, otherwise the remote
+                sample CSV is streamed through LOAD CSV
+            batch_size: Rows per batch for local files
+            workers: Parallel sessions for local files
+            checkpoint_path: Checkpoint file making a local load resumable
+        
         Returns:
             True if data loaded successfully, False otherwise
         """
@@ -59,6 +118,34 @@ class Neo4jDatabase:
             logger.error("Database not connected")
             return False
         
+        if isinstance(self.graph, MemoryGraph):
+            if not path:
+                logger.error("The in-memory graph loads from a local file only")
+                return False
+            self.graph.load(path)
+            if self.stats:
+                self.stats.recount()
+            return True
+        
+        loader = BulkLoader(
+            self.graph,
+            batch_size=batch_size,
+            workers=workers,
+            checkpoint_path=checkpoint_path,
+            on_delta=self.stats.apply_delta if self.stats else None,
+        )
+        if path:
+            try:
+                if self.stats and self.stats.counters:
+                    # Seed the counters before any batch commits, so each
+                    # batch's delta lands on a count that excludes it
+                    self.stats.get(refresh=True)
+                loader.load(path)
+                return True
+            except Exception as e:
+                logger.error(f"Failed to bulk load {path}: {str(e)}")
+                return False
+        
         movie_query = """
         LOAD CSV WITH HEADERS FROM
         'https://raw.githubusercontent.com/tomasonjo/blog-datasets/main/movies/movies_small.csv' as row
@@ -79,7 +166,10 @@ class Neo4jDatabase:
         """
         
         try:
+            loader.create_schema()
             self.graph.query(movie_query)
+            if self.stats:
+                self.stats.recount()
             logger.info("Successfully loaded movie data")
             return True
         except Exception as e:
@@ -96,49 +186,40 @@ class Neo4jDatabase:
         if not self.graph:
             return "Database not connected"
         
-        self.graph.refresh_schema()
+        # With a snapshot the background checker keeps graph.schema current
+        if self.schema_snapshot is None:
+            self.graph.refresh_schema()
         return self.graph.schema
     
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, refresh: bool = False) -> Dict[str, Any]:
         """
         Get database statistics
         
+        Args:
+            refresh: Bypass the stats cache
+            
         Returns:
             Dictionary with database stats
         """
-        if not self.graph:
+        if not self.graph or not self.stats:
             return {}
         
         try:
-            stats = {}
-            
-            # Count movies
-            result = self.graph.query("MATCH (m:Movie) RETURN count(m) AS count")
-            stats['movies'] = result[0]['count'] if result else 0
-            
-            # Count actors
-            result = self.graph.query("MATCH (p:Person)-[:ACTED_IN]->(:Movie) RETURN count(DISTINCT p) AS count")
-            stats['actors'] = result[0]['count'] if result else 0
-            
-            # Count directors
-            result = self.graph.query("MATCH (p:Person)-[:DIRECTED]->(:Movie) RETURN count(DISTINCT p) AS count")
-            stats['directors'] = result[0]['count'] if result else 0
-            
-            # Count genres
-            result = self.graph.query("MATCH (g:Genre) RETURN count(g) AS count")
-            stats['genres'] = result[0]['count'] if result else 0
-            
-            return stats
+            return self.stats.get(refresh=refresh)
         except Exception as e:
             logger.error(f"Failed to get stats: {str(e)}")
             return {}
     
-    def execute_query(self, query: str) -> list:
+    def execute_query(self, query: str, max_rows: Optional[int] = None, deadline: Optional[Deadline] = None) -> list:
         """
         Execute a Cypher query
         
         Args:
             query: Cypher query string
+            max_rows: Stream and keep only the first max_rows rows instead of
+                materializing the whole result
+            deadline: Optional Deadline; its remaining time becomes the
+                transaction timeout and cancelling it terminates the transaction
             
         Returns:
             Query results as list
@@ -148,14 +229,71 @@ class Neo4jDatabase:
             return []
         
         try:
-            return self.graph.query(query)
+            with (deadline.scope() if deadline is not None else nullcontext()), span("execution") as attrs:
+                if max_rows is None:
+                    rows = self.graph.query(query)
+                elif hasattr(self.graph, "stream"):
+                    rows = self.graph.stream(query, fetch_size=min(max_rows, 1000))[:max_rows]
+                else:
+                    rows = self.graph.query(query)[:max_rows]
+                attrs["rows"] = len(rows)
+            return rows
         except Exception as e:
             logger.error(f"Query execution failed: {str(e)}")
             return []
     
+    def stream_query(
+        self,
+        query: str,
+        params: Optional[dict] = None,
+        fetch_size: int = 1000,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Optional[ResultCursor]:
+        """
+        Execute a Cypher query lazily
+        
+        Args:
+            query: Cypher query string
+            params: Query parameters
+            fetch_size: Records pulled per round-trip
+            max_rows: Stop after this many rows
+            max_bytes: Stop once the estimated size of returned rows exceeds this
+            
+        Returns:
+            ResultCursor yielding rows as they arrive, or None if not connected
+        """
+        if not self.graph:
+            logger.error("Database not connected")
+            return None
+        return self.graph.stream(query, params, fetch_size=fetch_size, max_rows=max_rows, max_bytes=max_bytes)
+    
+    def advise_indexes(self, queries: list, create: bool = False, min_uses: int = 2) -> Dict[str, Any]:
+        """
+        Recommend indexes for the properties executed Cypher filters on
+        
+        Args:
+            queries: Executed Cypher statements
+            create: Create the recommended indexes and constraints
+            min_uses: Observations of a property before an index is suggested
+            
+        Returns:
+            IndexAdvisor report with recommendations and PROFILE db-hits
+        """
+        if not self.graph:
+            logger.error("Database not connected")
+            return {}
+        advisor = IndexAdvisor(min_uses=min_uses)
+        advisor.observe_all(queries)
+        return advisor.report(self.graph, create=create)
+    
     def close(self):
         """Close database connection"""
+        if self.schema_snapshot is not None:
+            self.schema_snapshot.stop()
         if self.graph:
-            # Neo4jGraph doesn't have explicit close, but we can clear the reference
+            # Releases this wrapper's lease; the shared driver closes with the last one
+            self.graph.close()
             self.graph = None
+            self.stats = None
             logger.info("Database connection closed")
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+End-to-end query deadlines with cancellation of in-flight work
+"""
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("qa_deadline", default=None)
+
+# Abandoned LLM calls finish here in the background; their answers are dropped
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline")
+
+POLL_SECONDS = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a query runs out of its time budget"""
+
+
+class QueryCancelled(RuntimeError):
+    """Raised when a query was cancelled, e.g. superseded by a newer one"""
+
+
+class Deadline:
+    """Time budget of one question, split between generation and execution"""
+
+    def __init__(self, budget: float = 30.0, llm_share: float = 0.5):
+        """
+        Start the clock
+
+        Args:
+            budget: Seconds for the whole question
+            llm_share: Fraction of the budget Cypher generation may use; the
+                database gets whatever is left after it
+        """
+        self.budget = budget
+        self.llm_share = llm_share
+        self.query_id = uuid.uuid4().hex
+        self.reason: Optional[str] = None
+        self._end = time.monotonic() + budget
+        self._cancelled = threading.Event()
+        self._callbacks: Dict[Any, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return self._end - time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        """
+        Raises:
+            QueryCancelled: The query was cancelled
+            DeadlineExceeded: The budget is used up
+        """
+        if self.cancelled:
+            raise QueryCancelled(f"Query cancelled: {self.reason}")
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"Query exceeded its {self.budget:.0f}s budget")
+
+    def llm_timeout(self) -> float:
+        """Seconds the generation stage may take"""
+        self.check()
+        return min(self.remaining(), self.budget * self.llm_share)
+
+    def db_timeout(self) -> float:
+        """Seconds left for execution, used as the server-side transaction timeout"""
+        self.check()
+        return self.remaining()
+
+    def metadata(self) -> Dict[str, str]:
+        """Transaction metadata identifying this query's transactions for termination"""
+        return {"qa_query_id": self.query_id}
+
+    def on_cancel(self, key: Any, callback: Callable[[], Any]):
+        """Register work to abort on cancel(); one callback per key"""
+        with self._lock:
+            run_now = self.cancelled
+            if not run_now:
+                self._callbacks.setdefault(key, callback)
+        if run_now:
+            callback()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Stop the query: waiting stages raise and registered work is aborted"""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        logger.info(f"Cancelling query {self.query_id}: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation of query {self.query_id} failed: {str(e)}")
+
+    def wait(self, future: Future, timeout: float) -> Any:
+        """
+        Wait for work running elsewhere, giving up on timeout or cancellation
+
+        Raises:
+            QueryCancelled: cancel() was called while waiting
+            DeadlineExceeded: The work did not finish within timeout
+        """
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                return future.result(timeout=max(min(POLL_SECONDS, end - time.monotonic()), 0))
+            except FutureTimeout:
+                if self.cancelled:
+                    raise QueryCancelled(f"Query cancelled: {self.reason}")
+                if time.monotonic() >= end:
+                    raise DeadlineExceeded(f"Stage exceeded its {timeout:.1f}s share of the budget")
+
+    @contextmanager
+    def scope(self) -> Iterator["Deadline"]:
+        """Make this the current deadline for the enclosed block"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the question being answered, if any"""
+    return _current.get()
+
+
+def submit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Run fn on the background pool with the caller's trace and deadline"""
+    context = contextvars.copy_context()
+    return _executor.submit(context.run, fn, *args, **kwargs)
+
+
+def run_with_deadline(
+    fn: Callable[[], Any],
+    deadline: Deadline,
+    on_wait: Optional[Callable[[Deadline], Any]] = None,
+    poll: float = 0.1,
+    grace: float = 1.0,
+) -> Any:
+    """
+    Run fn under a deadline, cancelling it if the caller stops waiting
+
+    The caller's thread only polls, so it stays interruptible: whatever
+    on_wait raises (a Streamlit rerun, KeyboardInterrupt) cancels the query
+    and its transactions before propagating.
+
+    Args:
+        fn: Work to run, e.g. answering one question
+        deadline: Its deadline
+        on_wait: Called every poll seconds while waiting
+        poll: Seconds between on_wait calls
+        grace: Seconds past the deadline before the caller gives up on fn
+
+    Returns:
+        fn's result
+    """
+    def scoped() -> Any:
+        with deadline.scope():
+            return fn()
+
+    future = submit(scoped)
+    try:
+        while True:
+            try:
+                return future.result(timeout=poll)
+            except FutureTimeout:
+                pass
+            if deadline.cancelled:
+                raise QueryCancelled(f"Query cancelled: {deadline.reason}")
+            if deadline.remaining() < -grace:
+                raise DeadlineExceeded(f"Query exceeded its {deadline.budget:.0f}s budget")
+            if on_wait is not None:
+                on_wait(deadline)
+    except BaseException as e:
+        if not future.done():
+            deadline.cancel(f"abandoned ({type(e).__name__})")
+        raise
+
+
+class DeadlineGeneration(Runnable):
+    """Runnable giving Cypher generation its share of the current deadline"""
+
+    def __init__(self, generator: Runnable):
+        self.generator = generator
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        deadline = current_deadline()
+        if deadline is None:
+            return self.generator.invoke(input, config, **kwargs)
+        timeout = deadline.llm_timeout()
+        return deadline.wait(submit(self.generator.invoke, input, config, **kwargs), timeout)
@@ -0,0 +1,174 @@
+"""
+Indexed few-shot example store with similarity-based selection
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.example_selectors.base import BaseExampleSelector
+
+from src.cache import hash_text
+from src.semantic_cache import HashedEmbedder
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate used for prompt budgeting
+
+    Args:
+        text: Prompt fragment
+
+    Returns:
+        Approximate token count (about four characters per token)
+    """
+    return len(text) // 4 + 1
+
+
+class ExampleStore(BaseExampleSelector):
+    """Example selector that keeps precomputed question vectors for every example"""
+
+    def __init__(
+        self,
+        examples: Optional[Iterable[Dict[str, str]]] = None,
+        k: int = 4,
+        token_budget: Optional[int] = 400,
+        embedder: Optional[HashedEmbedder] = None,
+    ):
+        """
+        Initialize the store
+
+        Args:
+            examples: Initial examples, dicts with 'question' and 'query' keys
+            k: Maximum number of examples placed in a prompt
+            token_budget: Maximum estimated tokens spent on examples, or None
+            embedder: Embedding used for questions, defaults to HashedEmbedder()
+        """
+        self.k = k
+        self.token_budget = token_budget
+        self.embedder = embedder or HashedEmbedder()
+        self._examples: List[Dict[str, str]] = []
+        self._tokens: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        if examples:
+            self.add_examples(examples)
+
+    @staticmethod
+    def example_id(example: Dict[str, str]) -> str:
+        """Stable identifier of an example, derived from its question"""
+        return hash_text(example["question"].strip().lower())
+
+    def add_examples(self, examples: Iterable[Dict[str, str]]) -> List[str]:
+        """
+        Index several examples at once
+
+        Args:
+            examples: Dicts with 'question' and 'query' keys
+
+        Returns:
+            Identifiers of the added examples
+        """
+        examples = list(examples)
+        vectors = [self.embedder.embed(e["question"]) for e in examples]
+        ids = []
+        with self._lock:
+            self._version = None
+            base = len(self._matrix)
+            pending: List[np.ndarray] = []
+            for example, vec in zip(examples, vectors):
+                example_id = self.example_id(example)
+                ids.append(example_id)
+                tokens = estimate_tokens(example["question"] + example["query"])
+                row = self._ids.get(example_id)
+                if row is None:
+                    self._ids[example_id] = len(self._examples)
+                    self._examples.append(example)
+                    self._tokens.append(tokens)
+                    pending.append(vec)
+                    continue
+                self._examples[row] = example
+                self._tokens[row] = tokens
+                if row < base:
+                    self._matrix[row] = vec
+                else:
+                    pending[row - base] = vec
+            if pending:
+                self._matrix = np.vstack([self._matrix, np.stack(pending)])
+        return ids
+
+    def add_example(self, example: Dict[str, str]) -> str:
+        """Index a single example and return its identifier"""
+        return self.add_examples([example])[0]
+
+    def remove_example(self, example_id: str) -> bool:
+        """
+        Remove an example from the index
+
+        Args:
+            example_id: Identifier returned by add_example
+
+        Returns:
+            True if the example existed, False otherwise
+        """
+        with self._lock:
+            row = self._ids.pop(example_id, None)
+            if row is None:
+                return False
+            self._version = None
+            last = len(self._examples) - 1
+            if row != last:
+                # Move the last example into the freed row to keep the matrix dense
+                self._examples[row] = self._examples[last]
+                self._tokens[row] = self._tokens[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[self.example_id(self._examples[row])] = row
+            self._examples.pop()
+            self._tokens.pop()
+            self._matrix = self._matrix[:last]
+            return True
+
+    def select_examples(self, input_variables: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Pick the most similar examples that fit the token budget
+
+        Args:
+            input_variables: Prompt inputs, must contain 'question'
+
+        Returns:
+            Up to k examples, most similar first
+        """
+        vec = self.embedder.embed(input_variables.get("question", ""))
+        with self._lock:
+            if not self._examples:
+                return []
+            scores = self._matrix @ vec
+            k = min(self.k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            selected, spent = [], 0
+            for row in top:
+                cost = self._tokens[row]
+                if self.token_budget is not None and spent + cost > self.token_budget:
+                    continue
+                selected.append(self._examples[row])
+                spent += cost
+            return selected
+
+    @property
+    def version(self) -> str:
+        """Fingerprint of the indexed examples, used in cache keys"""
+        with self._lock:
+            if self._version is None:
+                pairs = sorted((e["question"], e["query"]) for e in self._examples)
+                self._version = hash_text(json.dumps(pairs))
+            return self._version
+
+    def __len__(self) -> int:
+        return len(self._examples)
@@ -0,0 +1,282 @@
+"""
+Bounded query history with result payloads spilled to disk
+"""
+
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_payload(rows: Any) -> Tuple[str, bytes]:
+    """
+    Compress result rows for storage
+
+    Args:
+        rows: ColumnarResult or JSON-serializable rows
+
+    Returns:
+        Tuple of (format, bytes); Parquet for columnar results, zlib JSON otherwise
+    """
+    # Duck-typed so the history, created on first paint, does not import pyarrow
+    if hasattr(rows, "to_parquet"):
+        return "parquet", rows.to_parquet()
+    return "json", zlib.compress(json.dumps(rows, default=str).encode("utf-8"))
+
+
+def deserialize_payload(fmt: str, data: bytes) -> Any:
+    """Inverse of serialize_payload"""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        from src.columnar import ColumnarResult
+        return ColumnarResult(pq.read_table(io.BytesIO(data)))
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def _remove(path: str):
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+class QueryHistory:
+    """Ring buffer of recent query metadata; results live in SQLite until needed"""
+
+    _META_COLUMNS = "id, created, question, cypher, execution_time, rows, trace"
+
+    def __init__(
+        self,
+        capacity: int = 50,
+        path: Optional[str] = None,
+        session_id: Optional[str] = None,
+        max_stored: int = 1000,
+        payload_cache: int = 3,
+        max_age_days: Optional[float] = 30.0,
+        max_total: Optional[int] = 100_000,
+    ):
+        """
+        Initialize the history
+
+        Args:
+            capacity: Entries kept in memory (metadata only)
+            path: SQLite file persisting history across restarts; a temporary
+                file removed with this object is used when omitted
+            session_id: Session the entries are recorded under; a session
+                only ever sees its own entries, so pass a stable id (e.g. the
+                signed-in user) to get history back after a restart
+            max_stored: Entries kept on disk per session before its oldest
+                are deleted
+            payload_cache: Loaded results kept in memory for redisplay
+            max_age_days: Entries of any session older than this are deleted,
+                or None to keep them
+            max_total: Entries kept on disk across all sessions, or None for
+                no global cap
+        """
+        self.capacity = capacity
+        self.max_stored = max_stored
+        self.max_age_days = max_age_days
+        self.max_total = max_total
+        self.persistent = path is not None
+        self.session_id = session_id or uuid.uuid4().hex
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._payloads: "OrderedDict[int, Any]" = OrderedDict()
+        self._payload_cache = payload_cache
+        self._lock = threading.RLock()
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="query_history_", suffix=".sqlite")
+            os.close(fd)
+            self._cleanup = weakref.finalize(self, _remove, path)
+        else:
+            self._cleanup = None
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT, created REAL, "
+            "question TEXT, cypher TEXT, execution_time REAL, rows INTEGER, "
+            "trace TEXT, format TEXT, payload BLOB)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS query_history_created ON query_history (created)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS query_history_session ON query_history (session, id)")
+        self._db.commit()
+        if self.persistent:
+            with self._lock:
+                self._prune()
+                self._db.commit()
+            self._warm()
+
+    def _warm(self):
+        """Load this session's most recent metadata from a persistent store"""
+        rows = self._db.execute(
+            f"SELECT {self._META_COLUMNS} FROM query_history WHERE session = ? ORDER BY id DESC LIMIT ?",
+            (self.session_id, self.capacity),
+        ).fetchall()
+        for row in reversed(rows):
+            self._entries.append(self._meta(row))
+        logger.info(f"Loaded {len(rows)} history entries from {self.path}")
+
+    @staticmethod
+    def _meta(row: tuple) -> Dict[str, Any]:
+        entry_id, created, question, cypher, execution_time, rows, trace = row
+        return {
+            "id": entry_id,
+            "timestamp": datetime.fromtimestamp(created).strftime("%H:%M:%S"),
+            "created": created,
+            "question": question,
+            "cypher": cypher,
+            "execution_time": execution_time,
+            "rows": rows,
+            "trace": json.loads(trace) if trace else None,
+        }
+
+    def add(
+        self,
+        question: str,
+        result: Any,
+        execution_time: float,
+        cypher: Optional[str] = None,
+        trace: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Record a query; its result is written to disk, not kept in memory
+
+        Args:
+            question: Natural language question
+            result: Chain output dict (its 'result' is stored) or the rows themselves
+            execution_time: Seconds the query took
+            cypher: Generated Cypher
+            trace: Latency breakdown
+
+        Returns:
+            The metadata entry
+        """
+        rows = result.get("result") if isinstance(result, dict) and "result" in result else result
+        fmt, payload = serialize_payload(rows)
+        created = time.time()
+        count = len(rows) if hasattr(rows, "__len__") else None
+        trace_json = json.dumps(trace, default=str) if trace else None
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO query_history (session, created, question, cypher, execution_time, rows, trace, format, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.session_id, created, question, cypher, execution_time, count, trace_json, fmt, payload),
+            )
+            self._prune()
+            self._db.commit()
+            entry = self._meta((cursor.lastrowid, created, question, cypher, execution_time, count, trace_json))
+            self._entries.append(entry)
+        return entry
+
+    def _prune(self):
+        """Apply retention; the caller holds the lock and commits"""
+        # max_stored is per session, so a busy session cannot evict the others;
+        # age and the global cap also clear out sessions that never come back
+        self._db.execute(
+            "DELETE FROM query_history WHERE session = ? AND id <= ("
+            "SELECT id FROM query_history WHERE session = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.session_id, self.session_id, self.max_stored),
+        )
+        if self.max_age_days is not None:
+            self._db.execute(
+                "DELETE FROM query_history WHERE created < ?",
+                (time.time() - self.max_age_days * 86400,),
+            )
+        if self.max_total is not None:
+            self._db.execute(
+                "DELETE FROM query_history WHERE id <= ("
+                "SELECT id FROM query_history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_total,),
+            )
+
+    def recent(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest-last metadata of up to n recent entries"""
+        with self._lock:
+            entries = list(self._entries)
+        return entries if n is None else entries[-n:]
+
+    def load(self, entry_id: int) -> Any:
+        """
+        Load the stored result of one of this session's entries
+
+        Args:
+            entry_id: Entry id from the metadata
+
+        Returns:
+            The result rows, or None if the entry was pruned or belongs to
+            another session
+        """
+        with self._lock:
+            if entry_id in self._payloads:
+                self._payloads.move_to_end(entry_id)
+                return self._payloads[entry_id]
+            row = self._db.execute(
+                "SELECT format, payload FROM query_history WHERE id = ? AND session = ?",
+                (entry_id, self.session_id),
+            ).fetchone()
+            if row is None:
+                return None
+            payload = deserialize_payload(*row)
+            self._payloads[entry_id] = payload
+            while len(self._payloads) > self._payload_cache:
+                self._payloads.popitem(last=False)
+            return payload
+
+    def search(self, text: str, limit: int = 20, all_sessions: bool = False) -> List[Dict[str, Any]]:
+        """
+        Find past questions containing text (case-insensitive), newest first
+
+        Args:
+            text: Substring to look for
+            limit: Maximum entries returned
+            all_sessions: Include entries recorded by other sessions (they may
+                belong to other users; never show them to end users)
+
+        Returns:
+            Metadata entries
+        """
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = f"SELECT {self._META_COLUMNS} FROM query_history WHERE question LIKE ? ESCAPE '\\'"
+        params: List[Any] = [pattern]
+        if not all_sessions:
+            query += " AND session = ?"
+            params.append(self.session_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [self._meta(row) for row in rows]
+
+    def clear(self):
+        """Forget this session's entries"""
+        with self._lock:
+            self._db.execute("DELETE FROM query_history WHERE session = ?", (self.session_id,))
+            self._db.commit()
+            self._entries.clear()
+            self._payloads.clear()
+
+    def close(self):
+        """Close the store; a temporary store is deleted"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def __len__(self) -> int:
+        return len(self._entries)
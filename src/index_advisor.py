@@ -0,0 +1,299 @@
+"""
+Index advisor driven by the predicates of executed Cypher
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.cost_guard import is_write
+from src.parameterize import parameterize
+
+logger = logging.getLogger(__name__)
+
+# (var:Label:Other {key: value, ...}); strings were lifted out by parameterize()
+NODE_PATTERN = re.compile(r"\(\s*(\w*)\s*:\s*`?(\w+)`?[^(){}]*?(\{[^{}]*\})?\s*\)")
+MAP_KEY = re.compile(r"(\w+)\s*:")
+PREDICATE = re.compile(
+    r"\b(\w+)\.`?(\w+)`?\s*(<=|>=|=~|<>|=|<|>|IN\b|CONTAINS\b|STARTS\s+WITH\b|ENDS\s+WITH\b)",
+    re.IGNORECASE,
+)
+
+# Predicate operator -> the index type that serves it
+INDEX_FOR = {
+    "=": "RANGE", "IN": "RANGE", "<": "RANGE", ">": "RANGE", "<=": "RANGE", ">=": "RANGE",
+    "STARTS WITH": "RANGE", "CONTAINS": "TEXT", "ENDS WITH": "TEXT",
+}
+EQUALITY = ("=", "IN")
+
+SHOW_INDEXES = "SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, owningConstraint"
+
+
+def _quote(name: str) -> str:
+    return f"`{name.replace('`', '``')}`"
+
+
+def predicate_properties(cypher: str) -> List[Tuple[str, str, str]]:
+    """
+    Node properties a statement filters on
+
+    Args:
+        cypher: Cypher statement
+
+    Returns:
+        (label, property, operator) for inline pattern maps and WHERE
+        comparisons on labelled variables; '<>' and '=~' are skipped since no
+        index serves them
+    """
+    template, _ = parameterize(cypher)
+    labels: Dict[str, str] = {}
+    found = []
+    for match in NODE_PATTERN.finditer(template):
+        var, label, props = match.groups()
+        if var:
+            labels.setdefault(var, label)
+        for key in MAP_KEY.findall(props or ""):
+            found.append((label, key, "="))
+    for match in PREDICATE.finditer(template):
+        var, prop, op = match.groups()
+        op = " ".join(op.upper().split())
+        if var in labels and op in INDEX_FOR:
+            found.append((labels[var], prop, op))
+    return found
+
+
+def db_hits(profile: Dict[str, Any]) -> int:
+    """Total database hits of a PROFILE plan tree"""
+    total = 0
+    stack = [profile] if profile else []
+    while stack:
+        node = stack.pop()
+        total += int(node.get("dbHits", 0) or 0)
+        stack.extend(node.get("children") or [])
+    return total
+
+
+class IndexAdvisor:
+    """Aggregates filtered properties and recommends the indexes they lack"""
+
+    def __init__(self, min_uses: int = 2, check_unique: bool = True, max_replay: int = 20):
+        """
+        Initialize the advisor
+
+        Args:
+            min_uses: Observations of a property before an index is suggested
+            check_unique: Suggest a uniqueness constraint instead of a range
+                index for equality lookups on properties without duplicates
+            max_replay: Most frequent statement templates profiled in reports
+        """
+        self.min_uses = min_uses
+        self.check_unique = check_unique
+        self.max_replay = max_replay
+        self.uses: Counter = Counter()
+        self.operators: Dict[Tuple[str, str], Set[str]] = {}
+        self._templates: Counter = Counter()
+        self._samples: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, cypher: str):
+        """Record the predicates of one executed statement"""
+        if not cypher or is_write(cypher):
+            return
+        predicates = predicate_properties(cypher)
+        template, _ = parameterize(cypher)
+        with self._lock:
+            self._templates[template] += 1
+            self._samples.setdefault(template, cypher)
+            for label, prop, op in predicates:
+                self.uses[(label, prop)] += 1
+                self.operators.setdefault((label, prop), set()).add(op)
+
+    def observe_all(self, statements: Iterable[str]):
+        for cypher in statements:
+            self.observe(cypher)
+
+    def observe_history(self, history: Any, limit: int = 1000):
+        """Record the Cypher of stored QueryHistory entries, from every session"""
+        entries = history.search("", limit=limit, all_sessions=True)
+        self.observe_all(entry["cypher"] for entry in entries if entry.get("cypher"))
+
+    def replay_queries(self) -> List[str]:
+        """One sample statement for each of the most frequent templates"""
+        with self._lock:
+            return [self._samples[t] for t, _ in self._templates.most_common(self.max_replay)]
+
+    def existing(self, graph: Any) -> Dict[Tuple[str, str], Set[str]]:
+        """
+        Single-property node indexes from SHOW INDEXES
+
+        Returns:
+            {(label, property): {'RANGE', 'TEXT', ...}}; constraint-backed
+            indexes are included
+        """
+        covered: Dict[Tuple[str, str], Set[str]] = {}
+        for row in graph.query(SHOW_INDEXES):
+            if row.get("entityType") != "NODE" or len(row.get("properties") or []) != 1:
+                continue
+            for label in row.get("labelsOrTypes") or []:
+                covered.setdefault((label, row["properties"][0]), set()).add(row["type"])
+        return covered
+
+    def _has_duplicates(self, graph: Any, label: str, prop: str) -> bool:
+        rows = graph.query(
+            f"MATCH (n:{_quote(label)}) WHERE n.{_quote(prop)} IS NOT NULL "
+            f"WITH n.{_quote(prop)} AS value, count(*) AS c WHERE c > 1 RETURN count(*) AS duplicates"
+        )
+        return bool(rows and rows[0].get("duplicates"))
+
+    def recommend(self, graph: Any) -> List[Dict[str, Any]]:
+        """
+        Indexes and constraints missing for frequently filtered properties
+
+        Args:
+            graph: Graph to read existing indexes (and duplicates) from
+
+        Returns:
+            Recommendations, most used first, each with label, property,
+            index_type (RANGE, TEXT or UNIQUE), uses, operators and statement
+        """
+        covered = self.existing(graph)
+        with self._lock:
+            candidates = [(key, n, sorted(self.operators[key])) for key, n in self.uses.most_common()]
+        recommendations = []
+        for (label, prop), uses, operators in candidates:
+            if uses < self.min_uses:
+                continue
+            for index_type in sorted({INDEX_FOR[op] for op in operators}):
+                if index_type in covered.get((label, prop), set()):
+                    continue
+                name = re.sub(r"\W", "_", f"advisor_{label}_{prop}").lower()
+                target = f"FOR (n:{_quote(label)})"
+                if index_type == "RANGE" and self.check_unique and any(op in EQUALITY for op in operators):
+                    try:
+                        unique = not self._has_duplicates(graph, label, prop)
+                    except Exception as e:
+                        logger.warning(f"Could not check {label}.{prop} for duplicates: {str(e)}")
+                        unique = False
+                    if unique:
+                        index_type = "UNIQUE"
+                if index_type == "UNIQUE":
+                    statement = f"CREATE CONSTRAINT {name}_unique IF NOT EXISTS {target} REQUIRE n.{_quote(prop)} IS UNIQUE"
+                else:
+                    statement = f"CREATE {index_type} INDEX {name}_{index_type.lower()} IF NOT EXISTS {target} ON (n.{_quote(prop)})"
+                recommendations.append({
+                    "label": label,
+                    "property": prop,
+                    "index_type": index_type,
+                    "uses": uses,
+                    "operators": operators,
+                    "statement": statement,
+                })
+        return recommendations
+
+    def apply(self, graph: Any, recommendations: List[Dict[str, Any]], wait: float = 300) -> List[str]:
+        """
+        Create recommended indexes and wait for them to come online
+
+        Returns:
+            Statements that succeeded
+        """
+        created = []
+        for rec in recommendations:
+            try:
+                graph.query(rec["statement"])
+                created.append(rec["statement"])
+                logger.info(f"Created {rec['index_type']} index on {rec['label']}.{rec['property']}")
+            except Exception as e:
+                logger.error(f"Failed to create index on {rec['label']}.{rec['property']}: {str(e)}")
+        if created:
+            graph.query(f"CALL db.awaitIndexes({int(wait)})")
+        return created
+
+    def profile(self, graph: Any, queries: List[str]) -> Dict[str, Optional[int]]:
+        """Database hits of each statement under PROFILE (None if it failed)"""
+        hits: Dict[str, Optional[int]] = {}
+        for cypher in queries:
+            try:
+                if hasattr(graph, "profile"):
+                    plan = graph.profile(cypher)
+                else:
+                    _, summary, _ = graph._driver.execute_query(f"PROFILE {cypher}", database_=graph._database)
+                    plan = summary.profile or {}
+                hits[cypher] = db_hits(plan)
+            except Exception as e:
+                logger.warning(f"PROFILE failed: {str(e)}")
+                hits[cypher] = None
+        return hits
+
+    def report(self, graph: Any, create: bool = False) -> Dict[str, Any]:
+        """
+        Recommend indexes and measure their effect on replayed statements
+
+        Args:
+            graph: Graph to inspect and profile against
+            create: Create the recommended indexes; db-hits are then profiled
+                before and after, otherwise only before
+
+        Returns:
+            Dict with recommendations, created statements and per-query
+            before/after db-hits
+        """
+        recommendations = self.recommend(graph)
+        queries = self.replay_queries()
+        before = self.profile(graph, queries)
+        created = self.apply(graph, recommendations) if create and recommendations else []
+        after = self.profile(graph, queries) if created else {}
+        return {
+            "recommendations": recommendations,
+            "created": created,
+            "queries": [
+                {"cypher": q, "db_hits_before": before[q], "db_hits_after": after.get(q)} for q in queries
+            ],
+        }
+
+
+def load_statements(path: str) -> List[str]:
+    """Cypher from batch results (.jsonl with a 'cypher' field) or one statement per line"""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [c for c in (json.loads(line).get("cypher") for line in lines) if c]
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m src.index_advisor --history history.sqlite [--create]"""
+    import argparse
+
+    from config import get_neo4j_manager, setup_environment
+    from src.history import QueryHistory
+
+    parser = argparse.ArgumentParser(description="Recommend indexes for the Cypher that was executed")
+    parser.add_argument("--history", default=os.getenv("HISTORY_PATH"), help="Query history SQLite file")
+    parser.add_argument("--queries", help="Batch results (.jsonl) or a file of Cypher statements")
+    parser.add_argument("--min-uses", type=int, default=2)
+    parser.add_argument("--create", action="store_true", help="Create the recommended indexes")
+    args = parser.parse_args(argv)
+    if not args.history and not args.queries:
+        parser.error("give --history or --queries")
+
+    advisor = IndexAdvisor(min_uses=args.min_uses)
+    if args.history:
+        history = QueryHistory(path=args.history)
+        advisor.observe_history(history)
+        history.close()
+    if args.queries:
+        advisor.observe_all(load_statements(args.queries))
+
+    uri, username, password, _ = setup_environment()
+    graph = get_neo4j_manager(uri, username, password, os.getenv("NEO4J_DATABASE", "neo4j")).graph(refresh_schema=False)
+    print(json.dumps(advisor.report(graph, create=args.create), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,325 @@
+"""
+Latency-aware routing of Cypher generation across several LLM backends
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+from src.batch import percentile
+from src.deadline import QueryCancelled, current_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class NoBackendAvailable(RuntimeError):
+    """Raised when every backend's circuit is open"""
+
+
+class Backend:
+    """One LLM with its moving latency, error rate and circuit breaker"""
+
+    def __init__(
+        self,
+        name: str,
+        llm: Any,
+        alpha: float = 0.2,
+        window: int = 200,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Initialize the backend
+
+        Args:
+            name: Label used in stats and logs
+            llm: Chat model or LLM; its invoke() gets the prompt messages
+            alpha: Weight of the newest sample in the moving averages
+            window: Latencies kept for the hedging percentile
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before one trial call
+        """
+        self.name = name
+        self.llm = llm
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._trial = False
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.calls += 1
+            self.latency = seconds if self.latency is None else self.alpha * seconds + (1 - self.alpha) * self.latency
+            self.error_rate *= 1 - self.alpha
+            self._latencies.append(seconds)
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            self.consecutive_failures += 1
+            self._trial = False
+            if self.consecutive_failures >= self.failure_threshold:
+                if not self.open_until:
+                    logger.warning(f"LLM backend {self.name} failing, circuit opened for {self.reset_timeout}s")
+                self.open_until = time.monotonic() + self.reset_timeout
+
+    def acquire(self) -> bool:
+        """Whether a call may go to this backend; a half-open circuit admits one trial"""
+        with self._lock:
+            if not self.open_until:
+                return True
+            if time.monotonic() < self.open_until or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    @property
+    def healthy(self) -> bool:
+        return not self.open_until or (time.monotonic() >= self.open_until and not self._trial)
+
+    def score(self) -> float:
+        """Expected seconds per useful answer; untried backends score 0 so they get measured"""
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(1.0 - self.error_rate, 0.05)
+
+    def quantile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latencies)
+        return percentile(samples, pct) if samples else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "p95": self.quantile(95),
+            "error_rate": self.error_rate,
+            "calls": self.calls,
+            "failures": self.failures,
+            "circuit": "closed" if not self.open_until else "open" if not self.healthy else "half-open",
+        }
+
+
+class BackendPool:
+    """Routes each call to the fastest healthy backend, hedging slow ones"""
+
+    def __init__(
+        self,
+        backends: List[Backend],
+        hedge_delay: Optional[float] = None,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20,
+        hedge_default: float = 2.0,
+        timeout: float = 60.0,
+        max_workers: int = 16,
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            backends: Backends in order of preference while none has latency data
+            hedge_delay: Fixed seconds before a duplicate request goes to the
+                next backend; when None the primary's latency percentile is used
+            hedge_percentile: Percentile of the primary's latency used as delay
+            hedge_min_samples: Samples needed before the percentile is trusted
+            hedge_default: Delay while there are too few samples
+            timeout: Seconds a call may take across all attempts
+            max_workers: Threads running backend calls
+        """
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self.backends = backends
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default = hedge_default
+        self.timeout = timeout
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    def ranked(self) -> List[Backend]:
+        """Healthy backends, fastest first (stable for ties)"""
+        return sorted((b for b in self.backends if b.healthy), key=lambda b: b.score())
+
+    def delay_for(self, backend: Backend) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if len(backend._latencies) < self.hedge_min_samples:
+            return self.hedge_default
+        return backend.quantile(self.hedge_percentile)
+
+    def _call(self, backend: Backend, messages: Any, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = backend.llm.invoke(messages, stop=stop, **kwargs)
+        except Exception:
+            backend.record_failure()
+            raise
+        backend.record_success(time.perf_counter() - start)
+        return result
+
+    def _submit(self, candidates: List[Backend], running: Dict[Future, Backend], messages: Any,
+                stop: Optional[List[str]], kwargs: Dict[str, Any]) -> bool:
+        while candidates:
+            backend = candidates.pop(0)
+            if backend.acquire():
+                running[self._executor.submit(self._call, backend, messages, stop, kwargs)] = backend
+                return True
+        return False
+
+    def invoke(self, messages: Any, stop: Optional[List[str]] = None, **kwargs: Any) -> Any:
+        """
+        Run one generation call
+
+        The fastest healthy backend is called first. If it has not answered
+        after its hedge delay, the next backend gets the same request and the
+        first answer wins; a failed backend is replaced by the next one.
+
+        Returns:
+            The winning backend's output
+
+        Raises:
+            NoBackendAvailable: Every circuit is open
+            TimeoutError: No answer within timeout (or what is left of the
+                current query deadline)
+            QueryCancelled: The current query was cancelled while waiting
+        """
+        with self._lock:
+            self.requests += 1
+        candidates = self.ranked()
+        running: Dict[Future, Backend] = {}
+        if not self._submit(candidates, running, messages, stop, kwargs):
+            raise NoBackendAvailable("No healthy LLM backend")
+        primary = next(iter(running.values()))
+        query_deadline = current_deadline()
+        timeout = self.timeout if query_deadline is None else min(self.timeout, max(query_deadline.remaining(), 0))
+        deadline = time.monotonic() + timeout
+        hedge_at = time.monotonic() + self.delay_for(primary)
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        while running:
+            now = time.monotonic()
+            if query_deadline is not None and query_deadline.cancelled:
+                raise QueryCancelled(f"Query cancelled: {query_deadline.reason}")
+            if now >= deadline:
+                raise TimeoutError(f"No LLM answer within {timeout:.1f}s")
+            wake = deadline if hedged or not candidates else min(hedge_at, deadline)
+            if query_deadline is not None:
+                wake = min(wake, now + 0.1)
+            done, _ = wait(list(running), timeout=max(wake - now, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                backend = running.pop(future)
+                if future.exception() is None:
+                    if backend is not primary:
+                        with self._lock:
+                            self.hedge_wins += hedged
+                    return future.result()
+                last_error = future.exception()
+                logger.warning(f"LLM backend {backend.name} failed: {str(last_error)}")
+                if self._submit(candidates, running, messages, stop, kwargs):
+                    with self._lock:
+                        self.failovers += 1
+            if not done and not hedged and time.monotonic() >= hedge_at:
+                hedged = self._submit(candidates, running, messages, stop, kwargs)
+                if hedged:
+                    with self._lock:
+                        self.hedges += 1
+        raise last_error or NoBackendAvailable("No healthy LLM backend")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "failovers": self.failovers,
+            }
+        totals["backends"] = {b.name: b.stats() for b in self.backends}
+        return totals
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def backend_from_spec(spec: Dict[str, Any]) -> Backend:
+    """
+    Build a backend from a configuration entry
+
+    Args:
+        spec: Dict with 'provider' ('groq' or 'stub'), 'model' for Groq,
+            optional 'name', 'api_key', 'latency' (stub seconds) and the
+            Backend breaker settings 'failure_threshold' and 'reset_timeout'
+
+    Returns:
+        Backend wrapping the model
+    """
+    spec = dict(spec)
+    provider = spec.get("provider", "groq")
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        # Retries inside one backend would only add to the tail; the pool fails over instead
+        llm = ChatGroq(
+            groq_api_key=spec.get("api_key") or os.getenv("GROQ_API_KEY"),
+            model_name=spec["model"],
+            max_retries=int(spec.get("max_retries", 0)),
+        )
+    elif provider == "stub":
+        from src.benchmark import StubLLM
+        llm = StubLLM(latency=float(spec.get("latency", 0.0)))
+    else:
+        raise ValueError(f"Unknown LLM provider {provider!r}")
+    return Backend(
+        spec.get("name") or f"{provider}:{spec.get('model', 'stub')}",
+        llm,
+        failure_threshold=int(spec.get("failure_threshold", 3)),
+        reset_timeout=float(spec.get("reset_timeout", 30.0)),
+    )
+
+
+class LLMRouter(BaseChatModel):
+    """Chat model facade over a BackendPool, usable wherever the chain takes an LLM"""
+
+    pool: BackendPool
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        output = self.pool.invoke(messages, stop=stop, **kwargs)
+        message = output if isinstance(output, BaseMessage) else AIMessage(content=str(output))
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,381 @@
+"""
+Offline bulk ingestion of the movie dataset from local files
+"""
+
+import csv
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT movie_id IF NOT EXISTS FOR (m:Movie) REQUIRE m.id IS UNIQUE",
+    "CREATE CONSTRAINT person_name IF NOT EXISTS FOR (p:Person) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT genre_name IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE",
+    "CREATE INDEX movie_title IF NOT EXISTS FOR (m:Movie) ON (m.title)",
+]
+
+# Person and Genre nodes are shared by many movies. Parallel batches merging
+# them lock the same nodes and deadlock, so one writer creates them first and
+# the parallel batches only MATCH them.
+# Both also report what the graph held before, for the statistics deltas.
+PERSON_QUERY = """
+UNWIND $names AS name
+OPTIONAL MATCH (existing:Person {name: name})
+WITH name,
+     existing IS NOT NULL AND EXISTS { (existing)-[:ACTED_IN]->() } AS acted,
+     existing IS NOT NULL AND EXISTS { (existing)-[:DIRECTED]->() } AS directed
+MERGE (:Person {name: name})
+RETURN name, acted, directed
+"""
+
+GENRE_QUERY = """
+UNWIND $names AS name
+OPTIONAL MATCH (existing:Genre {name: name})
+WITH name, existing IS NULL AS created
+MERGE (:Genre {name: name})
+RETURN count(CASE WHEN created THEN 1 END) AS created
+"""
+
+BATCH_QUERY = """
+UNWIND $batch AS row
+OPTIONAL MATCH (existing:Movie {id: row.id})
+WITH row, existing IS NULL AS created
+MERGE (m:Movie {id: row.id})
+SET m.released = date(row.released),
+    m.title = row.title,
+    m.imdbRating = row.imdbRating
+WITH m, row, created
+CALL {
+    WITH m, row
+    UNWIND row.directors AS director
+    MATCH (p:Person {name: director})
+    MERGE (p)-[:DIRECTED]->(m)
+}
+CALL {
+    WITH m, row
+    UNWIND row.actors AS actor
+    MATCH (p:Person {name: actor})
+    MERGE (p)-[:ACTED_IN]->(m)
+}
+CALL {
+    WITH m, row
+    UNWIND row.genres AS genre
+    MATCH (g:Genre {name: genre})
+    MERGE (m)-[:IN_GENRE]->(g)
+}
+RETURN count(CASE WHEN created THEN 1 END) AS movies
+"""
+
+
+def _split(value: Any) -> List[str]:
+    """Turn a pipe-separated string or a list into a clean list of names"""
+    if value is None:
+        return []
+    items = value if isinstance(value, list) else str(value).split("|")
+    return [item.strip() for item in items if item and item.strip()]
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a raw CSV/JSON record into the row shape BATCH_QUERY expects
+
+    Args:
+        record: Record with movieId, title, released, imdbRating, director,
+            actors and genres fields (movies_small.csv layout)
+
+    Returns:
+        Row dict with typed values and name lists
+    """
+    rating = record.get("imdbRating")
+    return {
+        "id": str(record.get("movieId") or record.get("id")),
+        "title": record.get("title"),
+        "released": record.get("released") or None,
+        "imdbRating": float(rating) if rating not in (None, "") else None,
+        "directors": _split(record.get("director") or record.get("directors")),
+        "actors": _split(record.get("actors")),
+        "genres": _split(record.get("genres")),
+    }
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from a local CSV, JSON Lines or JSON array file
+
+    CSV and JSON Lines are read row by row; a JSON array is parsed in one go.
+
+    Args:
+        path: File path ending in .csv, .jsonl/.ndjson or .json
+
+    Returns:
+        Iterator of normalized rows
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if ext == ".csv":
+            for record in csv.DictReader(f):
+                yield normalize_record(record)
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield normalize_record(json.loads(line))
+        elif ext == ".json":
+            for record in json.load(f):
+                yield normalize_record(record)
+        else:
+            raise ValueError(f"Unsupported data file type: {ext}")
+
+
+def batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group an iterable into lists of at most size items"""
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class BulkLoader:
+    """Loads movie rows in UNWIND batches over several parallel sessions"""
+
+    def __init__(
+        self,
+        graph: Any,
+        batch_size: int = 1000,
+        workers: int = 4,
+        checkpoint_path: Optional[str] = None,
+        max_retries: int = 5,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_delta: Optional[Callable[..., Any]] = None,
+    ):
+        """
+        Initialize the loader
+
+        Args:
+            graph: Neo4jGraph (or compatible) instance; its driver pool must allow
+                at least `workers` concurrent sessions
+            batch_size: Rows sent per UNWIND $batch statement
+            workers: Number of batches written in parallel
+            checkpoint_path: JSON file recording finished batches so an
+                interrupted load can resume
+            max_retries: Attempts per statement before the load is aborted;
+                transient errors such as deadlocks are retried with backoff
+            progress: Callback receiving a progress dict after each batch
+            on_delta: Called with movies/actors/directors/genres increments as
+                each write commits, e.g. GraphStats.apply_delta
+        """
+        self.graph = graph
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.max_retries = max_retries
+        self.progress = progress
+        self.on_delta = on_delta
+        self._lock = threading.Lock()
+
+    def create_schema(self):
+        """Create uniqueness constraints and indexes so every MERGE is an index lookup"""
+        for statement in SCHEMA_STATEMENTS:
+            self.graph.query(statement)
+
+    def _load_checkpoint(self, source: str) -> Set[int]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if data.get("source") != source or data.get("batch_size") != self.batch_size:
+            logger.info("Ignoring checkpoint written for a different file or batch size")
+            return set()
+        return set(data.get("done", []))
+
+    def _save_checkpoint(self, source: str, done: Set[int]):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "batch_size": self.batch_size, "done": sorted(done)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _run(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        delay = 0.5
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return self.graph.query(query, params)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                # Jitter keeps batches that deadlocked on each other from
+                # colliding again on the retry
+                wait_for = delay * (0.5 + random.random())
+                logger.warning(f"Batch write failed ({str(e)}), retry {attempt} in {wait_for:.1f}s")
+                time.sleep(wait_for)
+                delay = min(delay * 2, 10.0)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        """Write one batch and return the number of movies it created"""
+        rows = self._run(BATCH_QUERY, {"batch": batch})
+        return int(rows[0]["movies"]) if rows else 0
+
+    def _delta(self, **deltas: int):
+        if self.on_delta is not None and any(deltas.values()):
+            self.on_delta(**deltas)
+
+    def create_entities(self, path: str) -> Dict[str, Set[str]]:
+        """
+        Merge every Person and Genre in the file from a single writer
+
+        Returns:
+            'actors' and 'directors': people in the file not yet in that role,
+            who are counted as their first batch commits
+        """
+        actors: Set[str] = set()
+        directors: Set[str] = set()
+        genres: Set[str] = set()
+        for row in read_records(path):
+            actors.update(row["actors"])
+            directors.update(row["directors"])
+            genres.update(row["genres"])
+        for chunk in batched(sorted(actors | directors), self.batch_size):
+            for row in self._run(PERSON_QUERY, {"names": chunk}):
+                if row.get("acted"):
+                    actors.discard(row["name"])
+                if row.get("directed"):
+                    directors.discard(row["name"])
+        created = 0
+        for chunk in batched(sorted(genres), self.batch_size):
+            rows = self._run(GENRE_QUERY, {"names": chunk})
+            created += int(rows[0]["created"]) if rows else 0
+        self._delta(genres=created)
+        logger.info(f"Merged people and {len(genres)} genres ({created} new)")
+        return {"actors": actors, "directors": directors}
+
+    def load(self, path: str) -> Dict[str, Any]:
+        """
+        Load a local data file
+
+        Args:
+            path: CSV, JSON Lines or JSON file in the movies_small.csv layout
+
+        Returns:
+            Report with rows, batches, skipped batches, seconds and rows/sec
+
+        Raises:
+            Exception: The error of a batch that failed after all retries; the
+                checkpoint keeps every batch finished before it
+        """
+        source = os.path.abspath(path)
+        done = self._load_checkpoint(source)
+        self.create_schema()
+        # MERGE is idempotent, so a resumed load simply repeats this pass
+        new_roles = self.create_entities(path)
+
+        report = {"rows": 0, "batches": 0, "skipped_batches": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        start = time.time()
+        in_flight: Dict[Future, int] = {}
+        sizes: Dict[int, int] = {}
+        roles: Dict[int, Tuple[Set[str], Set[str]]] = {}
+
+        def finish(futures: Iterable[Future]):
+            # Record every successful batch before surfacing a failure, so the
+            # checkpoint never loses finished work
+            error = None
+            for future in sorted(futures, key=in_flight.get):
+                index = in_flight.pop(future)
+                batch_actors, batch_directors = roles.pop(index)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                # A person gains a role with the first committed batch naming them in it
+                actors = new_roles["actors"] & batch_actors
+                directors = new_roles["directors"] & batch_directors
+                new_roles["actors"] -= actors
+                new_roles["directors"] -= directors
+                self._delta(movies=future.result(), actors=len(actors), directors=len(directors))
+                with self._lock:
+                    done.add(index)
+                    self._save_checkpoint(source, done)
+                    report["rows"] += sizes.pop(index)
+                    report["batches"] += 1
+                    report["seconds"] = time.time() - start
+                    report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+                logger.info(f"Loaded batch {index}: {report['rows']} rows, {report['rows_per_sec']:.0f} rows/sec")
+                if self.progress:
+                    self.progress(dict(report))
+            if error is not None:
+                raise error
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for index, batch in enumerate(batched(read_records(path), self.batch_size)):
+                    if index in done:
+                        report["skipped_batches"] += 1
+                        continue
+                    # Bound the rows held in memory while the file is streamed
+                    if len(in_flight) >= self.workers * 2:
+                        completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        finish(completed)
+                    sizes[index] = len(batch)
+                    roles[index] = (
+                        {name for row in batch for name in row["actors"]},
+                        {name for row in batch for name in row["directors"]},
+                    )
+                    in_flight[executor.submit(self._write, batch)] = index
+                finish(list(in_flight))
+            except Exception:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        report["seconds"] = time.time() - start
+        report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        logger.info(
+            f"Bulk load finished: {report['rows']} rows in {report['seconds']:.1f}s "
+            f"({report['rows_per_sec']:.0f} rows/sec), {report['skipped_batches']} batches resumed"
+        )
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m src.loader movies.csv"""
+    import argparse
+
+    from src.database import Neo4jDatabase
+
+    parser = argparse.ArgumentParser(description="Bulk load the movie dataset from a local file")
+    parser.add_argument("path", help="CSV, JSON Lines or JSON file")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file for resumable loads")
+    args = parser.parse_args(argv)
+
+    db = Neo4jDatabase(
+        os.environ["NEO4J_URI"],
+        os.environ["NEO4J_USERNAME"],
+        os.environ["NEO4J_PASSWORD"],
+        database=os.getenv("NEO4J_DATABASE", "neo4j"),
+    )
+    if not db.connect():
+        return 1
+    try:
+        ok = db.load_movie_data(args.path, args.batch_size, args.workers, args.checkpoint)
+    finally:
+        db.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
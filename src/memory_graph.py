@@ -0,0 +1,1599 @@
+"""
+In-process movie graph answering a read-only Cypher subset, an offline stand-in for Neo4j
+"""
+
+import datetime
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from src.loader import read_records
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedCypher(ValueError):
+    """Raised for statements the in-memory engine cannot parse or run"""
+
+
+class Node:
+    """A node: internal id, labels and properties"""
+
+    __slots__ = ("id", "labels", "props")
+
+    def __init__(self, id: int, labels: Iterable[str], props: Dict[str, Any]):
+        self.id = id
+        self.labels = frozenset(labels)
+        self.props = props
+
+
+class Relationship:
+    """A typed relationship between two node ids"""
+
+    __slots__ = ("id", "type", "start", "end", "props")
+
+    def __init__(self, id: int, type: str, start: int, end: int, props: Dict[str, Any]):
+        self.id = id
+        self.type = type
+        self.start = start
+        self.end = end
+        self.props = props
+
+
+class Path:
+    """Alternating nodes and relationships bound to a path variable"""
+
+    __slots__ = ("nodes", "rels")
+
+    def __init__(self, nodes: List[Node], rels: List[Relationship]):
+        self.nodes = nodes
+        self.rels = rels
+
+
+# ── Parsing ──────────────────────────────────────────────────────────────────
+
+_TOKEN = re.compile(r"""
+    \s+ | //[^\n]* | /\*.*?\*/
+  | (?P<number>\d+\.\d+(?:[eE][-+]?\d+)?|\d+(?:[eE][-+]?\d+)?)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<param>\$(?:\w+|`[^`]+`))
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<quoted>`(?:[^`]|``)+`)
+  | (?P<op><>|<=|>=|=~|!=|\.\.|[-+*/%^=<>(){}\[\],.:|;])
+""", re.X | re.S)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+_Token = namedtuple("_Token", "kind value start end")
+
+WRITE_KEYWORDS = {"CREATE", "MERGE", "SET", "DELETE", "DETACH", "REMOVE", "FOREACH", "LOAD", "DROP"}
+
+AGGREGATES = {"count", "collect", "sum", "avg", "min", "max"}
+
+
+def _unescape(text: str) -> str:
+    def replace(match: "re.Match") -> str:
+        escape = match.group(1)
+        if escape[0] == "u":
+            return chr(int(escape[1:], 16))
+        return _ESCAPES.get(escape, escape)
+
+    return re.sub(r"\\(u[0-9a-fA-F]{4}|.)", replace, text[1:-1])
+
+
+def _tokenize(text: str) -> List[_Token]:
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise UnsupportedCypher(f"Unexpected character {text[pos]!r} at position {pos}")
+        kind = match.lastgroup
+        if kind == "number":
+            raw = match.group(kind)
+            value: Any = float(raw) if any(c in raw for c in ".eE") else int(raw)
+        elif kind == "string":
+            value = _unescape(match.group(kind))
+        elif kind == "param":
+            value = match.group(kind)[1:].strip("`")
+        elif kind == "quoted":
+            value = match.group(kind)[1:-1].replace("``", "`")
+        elif kind is not None:
+            value = match.group(kind)
+        if kind is not None:
+            tokens.append(_Token(kind, value, match.start(), match.end()))
+        pos = match.end()
+    tokens.append(_Token("end", "", len(text), len(text)))
+    return tokens
+
+
+class _NodePattern:
+    __slots__ = ("var", "labels", "props")
+
+    def __init__(self, var: Optional[str], labels: List[str], props: List[Tuple[str, Any]]):
+        self.var = var
+        self.labels = labels
+        self.props = props
+
+
+class _RelPattern:
+    __slots__ = ("var", "types", "direction", "props", "length")
+
+    def __init__(self, var, types, direction, props, length):
+        self.var = var
+        self.types = types
+        self.direction = direction
+        self.props = props
+        self.length = length
+
+
+class _Part:
+    __slots__ = ("var", "shortest", "elements")
+
+    def __init__(self, var: Optional[str], shortest: Optional[str], elements: list):
+        self.var = var
+        self.shortest = shortest
+        self.elements = elements
+
+
+class _Projection:
+    __slots__ = ("distinct", "star", "items", "order", "skip", "limit", "where")
+
+    def __init__(self, distinct, star, items, order, skip, limit, where):
+        self.distinct = distinct
+        self.star = star
+        self.items = items
+        self.order = order
+        self.skip = skip
+        self.limit = limit
+        self.where = where
+
+
+def _conjuncts(expr: Any) -> Iterator[Any]:
+    if expr[0] == "and":
+        yield from _conjuncts(expr[1])
+        yield from _conjuncts(expr[2])
+    else:
+        yield expr
+
+
+def _push_equalities(parts: List[_Part], where: Any):
+    """Copy `var.prop = literal` conjuncts into the node patterns so matching can use the hash indexes"""
+    patterns = {}
+    for part in parts:
+        for element in part.elements[0::2]:
+            if element.var:
+                patterns.setdefault(element.var, element)
+    for expr in _conjuncts(where):
+        if expr[0] != "cmp" or expr[1] != "=":
+            continue
+        for left, right in ((expr[2], expr[3]), (expr[3], expr[2])):
+            if left[0] == "prop" and left[1][0] == "var" and left[1][1] in patterns and right[0] in ("lit", "param"):
+                patterns[left[1][1]].props.append((left[2], right))
+                break
+
+
+class _Parser:
+    """Recursive descent parser for the supported read-only Cypher subset"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    # Token helpers
+
+    def peek(self, offset: int = 0) -> _Token:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> _Token:
+        token = self.peek()
+        self.pos = min(self.pos + 1, len(self.tokens) - 1)
+        return token
+
+    def at(self, *ops: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token.kind == "op" and token.value in ops
+
+    def at_kw(self, *words: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token.kind == "name" and token.value.upper() in words
+
+    def accept(self, op: str) -> bool:
+        if self.at(op):
+            self.next()
+            return True
+        return False
+
+    def accept_kw(self, *words: str) -> bool:
+        if all(self.at_kw(word, offset=i) for i, word in enumerate(words)):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect(self, op: str):
+        if not self.accept(op):
+            self.error(f"Expected {op!r}")
+
+    def expect_kw(self, *words: str):
+        if not self.accept_kw(*words):
+            self.error(f"Expected {' '.join(words)}")
+
+    def error(self, message: str):
+        token = self.peek()
+        raise UnsupportedCypher(f"{message} at position {token.start}: {self.text[token.start:token.start + 30]!r}")
+
+    def at_identifier(self, offset: int = 0) -> bool:
+        return self.peek(offset).kind in ("name", "quoted")
+
+    def identifier(self) -> str:
+        if not self.at_identifier():
+            self.error("Expected a name")
+        return self.next().value
+
+    # Clauses
+
+    def query(self, nested: bool = False) -> List[tuple]:
+        clauses = []
+        while True:
+            if self.accept_kw("MATCH"):
+                clauses.append(self.match(False))
+            elif self.accept_kw("OPTIONAL", "MATCH"):
+                clauses.append(self.match(True))
+            elif self.accept_kw("UNWIND"):
+                expr = self.expression()
+                self.expect_kw("AS")
+                clauses.append(("unwind", expr, self.identifier()))
+            elif self.accept_kw("WITH"):
+                clauses.append(("with", self.projection(True)))
+            elif self.accept_kw("RETURN"):
+                clauses.append(("return", self.projection(False)))
+                break
+            elif self.accept_kw("CALL"):
+                if self.accept("{"):
+                    clauses.append(("subquery", self.query(nested=True)))
+                    self.expect("}")
+                else:
+                    clauses.append(self.procedure())
+            elif self.at_kw(*WRITE_KEYWORDS):
+                raise UnsupportedCypher(f"The in-memory graph is read-only: {self.peek().value.upper()} is not supported")
+            elif self.peek().kind == "end" or self.at("}", ";"):
+                break
+            else:
+                self.error("Unsupported clause")
+        if self.at_kw("UNION"):
+            self.error("UNION is not supported")
+        if not nested:
+            self.accept(";")
+            if self.peek().kind != "end":
+                self.error("Unexpected input")
+        if not clauses:
+            self.error("Empty query")
+        return clauses
+
+    def match(self, optional: bool) -> tuple:
+        parts = [self.pattern_part()]
+        while self.accept(","):
+            parts.append(self.pattern_part())
+        where = self.expression() if self.accept_kw("WHERE") else None
+        if where is not None:
+            _push_equalities(parts, where)
+        return ("match", optional, parts, where)
+
+    def procedure(self) -> tuple:
+        name = self.identifier()
+        while self.accept("."):
+            name += "." + self.identifier()
+        args = []
+        if self.accept("("):
+            if not self.at(")"):
+                args.append(self.expression())
+                while self.accept(","):
+                    args.append(self.expression())
+            self.expect(")")
+        yields = None
+        if self.accept_kw("YIELD"):
+            yields = []
+            if not self.accept("*"):
+                while True:
+                    column = self.identifier()
+                    yields.append((column, self.identifier() if self.accept_kw("AS") else column))
+                    if not self.accept(","):
+                        break
+        where = self.expression() if yields is not None and self.accept_kw("WHERE") else None
+        return ("procedure", name.lower(), args, yields, where)
+
+    def projection(self, with_clause: bool) -> _Projection:
+        distinct = self.accept_kw("DISTINCT")
+        star = self.accept("*")
+        items = []
+        if not star or self.accept(","):
+            items.append(self.item())
+            while self.accept(","):
+                items.append(self.item())
+        order = []
+        if self.accept_kw("ORDER", "BY"):
+            while True:
+                start = self.peek().start
+                expr = self.expression()
+                text = " ".join(self.text[start:self.tokens[self.pos - 1].end].split())
+                desc = False
+                if self.at_kw("DESC", "DESCENDING", "ASC", "ASCENDING"):
+                    desc = self.next().value.upper().startswith("DESC")
+                order.append((expr, text, desc))
+                if not self.accept(","):
+                    break
+        skip = self.expression() if self.accept_kw("SKIP") else None
+        limit = self.expression() if self.accept_kw("LIMIT") else None
+        where = self.expression() if with_clause and self.accept_kw("WHERE") else None
+        return _Projection(distinct, star, items, order, skip, limit, where)
+
+    def item(self) -> Tuple[Any, str, str]:
+        start = self.peek().start
+        expr = self.as_value(self.expression())
+        text = self.text[start:self.tokens[self.pos - 1].end]
+        alias = self.identifier() if self.accept_kw("AS") else text
+        return expr, alias, " ".join(text.split())
+
+    # Patterns
+
+    def pattern_part(self) -> _Part:
+        var = None
+        if self.at_identifier() and self.at("=", offset=1):
+            var = self.identifier()
+            self.next()
+        shortest = None
+        if self.at_kw("SHORTESTPATH", "ALLSHORTESTPATHS") and self.at("(", offset=1):
+            shortest = "all" if self.next().value.upper().startswith("ALL") else "shortest"
+            self.next()
+        elements: list = [self.node_pattern()]
+        while self.at("-") or (self.at("<") and self.at("-", offset=1)):
+            elements.append(self.rel_pattern())
+            elements.append(self.node_pattern())
+        if shortest:
+            self.expect(")")
+            if len(elements) != 3:
+                self.error("shortestPath needs a single relationship pattern")
+        return _Part(var, shortest, elements)
+
+    def node_pattern(self) -> _NodePattern:
+        self.expect("(")
+        var = self.identifier() if self.at_identifier() else None
+        labels = []
+        while self.accept(":"):
+            labels.append(self.identifier())
+        props = self.map_items() if self.at("{") else []
+        self.expect(")")
+        return _NodePattern(var, labels, props)
+
+    def rel_pattern(self) -> _RelPattern:
+        left = self.accept("<")
+        self.expect("-")
+        var, types, props, length = None, [], [], None
+        if self.accept("["):
+            if self.at_identifier():
+                var = self.identifier()
+            if self.accept(":"):
+                types.append(self.identifier())
+                while self.accept("|"):
+                    self.accept(":")
+                    types.append(self.identifier())
+            if self.accept("*"):
+                low, high = 1, None
+                if self.peek().kind == "number":
+                    low = high = int(self.next().value)
+                if self.accept(".."):
+                    high = int(self.next().value) if self.peek().kind == "number" else None
+                length = (low, high)
+            if self.at("{"):
+                props = self.map_items()
+            self.expect("]")
+        self.expect("-")
+        right = self.accept(">")
+        direction = "out" if right and not left else "in" if left and not right else "both"
+        return _RelPattern(var, types, direction, props, length)
+
+    def map_items(self) -> List[Tuple[str, Any]]:
+        self.expect("{")
+        items = []
+        if not self.at("}"):
+            while True:
+                key = self.identifier()
+                self.expect(":")
+                items.append((key, self.expression()))
+                if not self.accept(","):
+                    break
+        self.expect("}")
+        return items
+
+    @staticmethod
+    def as_value(expr: Any) -> Any:
+        """Turn a pattern used as a value, e.g. in size((m)<-[:ACTED_IN]-()), into its list of paths"""
+        if expr[0] != "pattern":
+            return expr
+        part = expr[1]
+        return ("paths", part if part.var else _Part(" path", part.shortest, part.elements))
+
+    def pattern_ahead(self) -> bool:
+        """Whether the '(' at the cursor starts a pattern rather than a parenthesized expression"""
+        first, second = self.peek(1), self.peek(2)
+        if not (first.kind == "op" and first.value in (")", ":")):
+            if first.kind not in ("name", "quoted") or not (second.kind == "op" and second.value in (")", ":", "{")):
+                return False
+        depth, i = 0, self.pos
+        while True:
+            token = self.tokens[i]
+            if token.kind == "end":
+                return False
+            if token.kind == "op" and token.value == "(":
+                depth += 1
+            elif token.kind == "op" and token.value == ")":
+                depth -= 1
+                if depth == 0:
+                    break
+            i += 1
+        after, then = self.tokens[min(i + 1, len(self.tokens) - 1)], self.tokens[min(i + 2, len(self.tokens) - 1)]
+        if after.kind != "op" or then.kind != "op":
+            return False
+        return (after.value == "-" and then.value in ("[", "-")) or (after.value == "<" and then.value == "-")
+
+    # Expressions, lowest precedence first
+
+    def expression(self) -> Any:
+        left = self.xor_expr()
+        while self.accept_kw("OR"):
+            left = ("or", left, self.xor_expr())
+        return left
+
+    def xor_expr(self) -> Any:
+        left = self.and_expr()
+        while self.accept_kw("XOR"):
+            left = ("xor", left, self.and_expr())
+        return left
+
+    def and_expr(self) -> Any:
+        left = self.not_expr()
+        while self.accept_kw("AND"):
+            left = ("and", left, self.not_expr())
+        return left
+
+    def not_expr(self) -> Any:
+        if self.accept_kw("NOT"):
+            return ("not", self.not_expr())
+        return self.comparison()
+
+    def comparison(self) -> Any:
+        left = self.additive()
+        while True:
+            if self.at("=", "<>", "!=", "<", ">", "<=", ">=", "=~"):
+                op = self.next().value
+                left = ("cmp", "<>" if op == "!=" else op, left, self.additive())
+            elif self.accept_kw("IN"):
+                left = ("in", left, self.additive())
+            elif self.accept_kw("STARTS", "WITH"):
+                left = ("str", "starts", left, self.additive())
+            elif self.accept_kw("ENDS", "WITH"):
+                left = ("str", "ends", left, self.additive())
+            elif self.accept_kw("CONTAINS"):
+                left = ("str", "contains", left, self.additive())
+            elif self.accept_kw("IS"):
+                negate = self.accept_kw("NOT")
+                self.expect_kw("NULL")
+                left = ("isnull", left, negate)
+            else:
+                return left
+
+    def additive(self) -> Any:
+        left = self.multiplicative()
+        while self.at("+", "-"):
+            left = ("arith", self.next().value, left, self.multiplicative())
+        return left
+
+    def multiplicative(self) -> Any:
+        left = self.power()
+        while self.at("*", "/", "%"):
+            left = ("arith", self.next().value, left, self.power())
+        return left
+
+    def power(self) -> Any:
+        left = self.unary()
+        while self.accept("^"):
+            left = ("arith", "^", left, self.unary())
+        return left
+
+    def unary(self) -> Any:
+        if self.accept("-"):
+            return ("neg", self.unary())
+        self.accept("+")
+        return self.postfix()
+
+    def postfix(self) -> Any:
+        expr = self.atom()
+        while True:
+            if self.accept("."):
+                expr = ("prop", expr, self.identifier())
+            elif self.accept("["):
+                low = None if self.at("..") else self.expression()
+                if self.accept(".."):
+                    high = None if self.at("]") else self.expression()
+                    expr = ("slice", expr, low, high)
+                else:
+                    expr = ("index", expr, low)
+                self.expect("]")
+            elif self.at(":") and self.at_identifier(offset=1):
+                labels = []
+                while self.accept(":"):
+                    labels.append(self.identifier())
+                expr = ("haslabel", expr, labels)
+            else:
+                return expr
+
+    def atom(self) -> Any:
+        token = self.peek()
+        if token.kind in ("number", "string"):
+            self.next()
+            return ("lit", token.value)
+        if token.kind == "param":
+            self.next()
+            return ("param", token.value)
+        if token.kind == "quoted":
+            self.next()
+            return ("var", token.value)
+        if self.at("("):
+            if self.pattern_ahead():
+                return ("pattern", self.pattern_part())
+            self.next()
+            expr = self.expression()
+            self.expect(")")
+            return expr
+        if self.accept("["):
+            if self.at_identifier() and self.at_kw("IN", offset=1):
+                var = self.identifier()
+                self.next()
+                source = self.as_value(self.expression())
+                where = self.expression() if self.accept_kw("WHERE") else None
+                projection = self.expression() if self.accept("|") else None
+                self.expect("]")
+                return ("listcomp", var, source, where, projection)
+            items = []
+            if not self.at("]"):
+                items.append(self.expression())
+                while self.accept(","):
+                    items.append(self.expression())
+            self.expect("]")
+            return ("list", items)
+        if self.at("{"):
+            return ("map", self.map_items())
+        if token.kind != "name":
+            self.error("Unexpected token")
+        upper = token.value.upper()
+        if upper in ("TRUE", "FALSE", "NULL") and not self.at("(", offset=1):
+            self.next()
+            return ("lit", {"TRUE": True, "FALSE": False, "NULL": None}[upper])
+        if upper == "CASE":
+            return self.case()
+        if upper == "EXISTS" and self.at("{", offset=1):
+            self.pos += 2
+            self.accept_kw("MATCH")
+            parts = [self.pattern_part()]
+            while self.accept(","):
+                parts.append(self.pattern_part())
+            where = self.expression() if self.accept_kw("WHERE") else None
+            self.expect("}")
+            return ("exists", parts, where)
+        if self.at("(", offset=1):
+            return self.call()
+        if self.at(".", offset=1) and self.at_identifier(offset=2) and self.at("(", offset=3):
+            self.error("Namespaced functions are not supported")
+        self.next()
+        return ("var", token.value)
+
+    def case(self) -> Any:
+        self.next()
+        subject = None if self.at_kw("WHEN") else self.expression()
+        whens = []
+        while self.accept_kw("WHEN"):
+            condition = self.expression()
+            self.expect_kw("THEN")
+            whens.append((condition, self.expression()))
+        default = self.expression() if self.accept_kw("ELSE") else None
+        self.expect_kw("END")
+        return ("case", subject, whens, default)
+
+    def call(self) -> Any:
+        name = self.next().value.lower()
+        self.next()
+        if name in ("any", "all", "none", "single") and self.at_identifier() and self.at_kw("IN", offset=1):
+            var = self.identifier()
+            self.next()
+            source = self.as_value(self.expression())
+            self.expect_kw("WHERE")
+            predicate = self.expression()
+            self.expect(")")
+            return ("quant", name, var, source, predicate)
+        distinct = self.accept_kw("DISTINCT")
+        if name == "count" and self.accept("*"):
+            self.expect(")")
+            return ("agg", "count", False, None)
+        args = []
+        if not self.at(")"):
+            args.append(self.expression())
+            while self.accept(","):
+                args.append(self.expression())
+        self.expect(")")
+        args = [self.as_value(arg) for arg in args]
+        if name in AGGREGATES:
+            if len(args) != 1:
+                raise UnsupportedCypher(f"{name}() takes one argument")
+            return ("agg", name, distinct, args[0])
+        if name not in FUNCTIONS:
+            raise UnsupportedCypher(f"Unsupported function {name}()")
+        return ("call", name, args)
+
+
+@lru_cache(maxsize=512)
+def parse(query: str) -> Tuple[tuple, ...]:
+    """
+    Parse a statement of the supported subset
+
+    Raises:
+        UnsupportedCypher: Syntax outside the subset, or a write clause
+    """
+    return tuple(_Parser(query).query())
+
+
+def _has_aggregate(expr: Any) -> bool:
+    if isinstance(expr, list):
+        return any(_has_aggregate(child) for child in expr)
+    if not isinstance(expr, tuple) or not expr:
+        return False
+    if isinstance(expr[0], str):
+        if expr[0] == "agg":
+            return True
+        if expr[0] in ("listcomp", "quant", "pattern", "paths", "exists"):
+            return False
+        return any(_has_aggregate(child) for child in expr[1:])
+    return any(_has_aggregate(child) for child in expr)
+
+
+# ── Values ───────────────────────────────────────────────────────────────────
+
+def _key(value: Any) -> Any:
+    """Hashable identity of a value for grouping, DISTINCT and index lookups"""
+    if isinstance(value, (Node, Relationship)):
+        return (type(value).__name__, value.id)
+    if isinstance(value, Path):
+        return ("Path", tuple(r.id for r in value.rels), value.nodes[0].id)
+    if isinstance(value, list):
+        return ("list", tuple(_key(v) for v in value))
+    if isinstance(value, dict):
+        return ("map", tuple(sorted((k, _key(v)) for k, v in value.items())))
+    if isinstance(value, bool):
+        return ("bool", value)
+    return value
+
+
+def _sort_key(value: Any) -> tuple:
+    """Total order over mixed values; nulls sort last ascending"""
+    if value is None:
+        return (9,)
+    if isinstance(value, bool):
+        return (3, value)
+    if isinstance(value, (int, float)):
+        return (4, value) if not (isinstance(value, float) and math.isnan(value)) else (5,)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return (6, value.isoformat())
+    if isinstance(value, list):
+        return (1, tuple(_sort_key(v) for v in value))
+    if isinstance(value, (Node, Relationship)):
+        return (0, value.id)
+    return (7, str(value))
+
+
+def _equals(a: Any, b: Any) -> Optional[bool]:
+    if a is None or b is None:
+        return None
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    if isinstance(a, (Node, Relationship, Path)) or isinstance(b, (Node, Relationship, Path)):
+        return type(a) is type(b) and _key(a) == _key(b)
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return False
+        results = [_equals(x, y) for x, y in zip(a, b)]
+        return False if False in results else None if None in results else True
+    return a == b
+
+
+def _compare(op: str, a: Any, b: Any) -> Optional[bool]:
+    if op == "=":
+        return _equals(a, b)
+    if op == "<>":
+        result = _equals(a, b)
+        return None if result is None else not result
+    if a is None or b is None:
+        return None
+    if op == "=~":
+        return bool(re.fullmatch(b, a)) if isinstance(a, str) and isinstance(b, str) else None
+    numeric = (int, float)
+    comparable = (
+        (isinstance(a, numeric) and isinstance(b, numeric) and not isinstance(a, bool) and not isinstance(b, bool))
+        or (type(a) is type(b) and isinstance(a, (str, bool, datetime.date)))
+    )
+    if not comparable:
+        return None
+    if op == "<":
+        return a < b
+    if op == ">":
+        return a > b
+    if op == "<=":
+        return a <= b
+    return a >= b
+
+
+def _truth(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    raise UnsupportedCypher(f"Expected a boolean, got {value!r}")
+
+
+def _plain(value: Any) -> Any:
+    """Convert engine values to what Neo4jGraph.query returns (property dicts for nodes)"""
+    if isinstance(value, Node):
+        return dict(value.props)
+    if isinstance(value, Relationship):
+        return value.type
+    if isinstance(value, Path):
+        out: List[Any] = [dict(value.nodes[0].props)]
+        for rel, node in zip(value.rels, value.nodes[1:]):
+            out.extend([rel.type, dict(node.props)])
+        return out
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+def _to_string(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_number(cast: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def convert(value: Any) -> Any:
+        if value is None or isinstance(value, bool):
+            return None
+        try:
+            return cast(float(value)) if cast is int else cast(value)
+        except (TypeError, ValueError):
+            return None
+
+    return convert
+
+
+def _date(value: Any = None) -> Optional[datetime.date]:
+    if value is None:
+        return datetime.date.today()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value))
+    except ValueError:
+        raise UnsupportedCypher(f"Invalid date {value!r}")
+
+
+def _nullsafe(fn: Callable[..., Any]) -> Callable[..., Any]:
+    def call(*args: Any) -> Any:
+        return None if args and args[0] is None else fn(*args)
+
+    return call
+
+
+def _round(value: Any, precision: int = 0) -> Optional[float]:
+    return float(round(value, int(precision))) if value is not None else None
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "tolower": _nullsafe(lambda s: str(s).lower()),
+    "toupper": _nullsafe(lambda s: str(s).upper()),
+    "lower": _nullsafe(lambda s: str(s).lower()),
+    "upper": _nullsafe(lambda s: str(s).upper()),
+    "trim": _nullsafe(lambda s: str(s).strip()),
+    "ltrim": _nullsafe(lambda s: str(s).lstrip()),
+    "rtrim": _nullsafe(lambda s: str(s).rstrip()),
+    "tostring": _to_string,
+    "tointeger": _to_number(int),
+    "tofloat": _to_number(float),
+    "size": _nullsafe(len),
+    "length": _nullsafe(lambda v: len(v.rels) if isinstance(v, Path) else len(v)),
+    "coalesce": lambda *args: next((a for a in args if a is not None), None),
+    "abs": _nullsafe(abs),
+    "round": _nullsafe(_round),
+    "floor": _nullsafe(lambda v: float(math.floor(v))),
+    "ceil": _nullsafe(lambda v: float(math.ceil(v))),
+    "sqrt": _nullsafe(math.sqrt),
+    "split": _nullsafe(lambda s, sep: str(s).split(sep)),
+    "substring": _nullsafe(lambda s, start, length=None: s[start:] if length is None else s[start:start + length]),
+    "left": _nullsafe(lambda s, n: s[:n]),
+    "right": _nullsafe(lambda s, n: s[len(s) - n:] if n else ""),
+    "replace": _nullsafe(lambda s, old, new: s.replace(old, new)),
+    "reverse": _nullsafe(lambda v: v[::-1]),
+    "labels": _nullsafe(lambda n: sorted(n.labels)),
+    "type": _nullsafe(lambda r: r.type),
+    "id": _nullsafe(lambda e: e.id),
+    "elementid": _nullsafe(lambda e: str(e.id)),
+    "keys": _nullsafe(lambda e: sorted(e.props if isinstance(e, (Node, Relationship)) else e)),
+    "properties": _nullsafe(lambda e: dict(e.props) if isinstance(e, (Node, Relationship)) else dict(e)),
+    "head": _nullsafe(lambda v: v[0] if v else None),
+    "last": _nullsafe(lambda v: v[-1] if v else None),
+    "tail": _nullsafe(lambda v: v[1:]),
+    "range": lambda start, end, step=1: list(range(start, end + (1 if step > 0 else -1), step)),
+    "nodes": _nullsafe(lambda p: list(p.nodes)),
+    "relationships": _nullsafe(lambda p: list(p.rels)),
+    "exists": lambda v: v is not None and v is not False,
+    "date": _date,
+}
+
+
+# ── Execution ────────────────────────────────────────────────────────────────
+
+class _Executor:
+    """Runs parsed clauses over rows of variable bindings"""
+
+    def __init__(self, graph: "MemoryGraph", params: Dict[str, Any]):
+        self.graph = graph
+        self.params = params
+
+    def run(self, clauses: Iterable[tuple], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for clause in clauses:
+            rows = getattr(self, "_" + clause[0])(clause, rows)
+        return rows
+
+    # Clauses
+
+    def _match(self, clause: tuple, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        _, optional, parts, where = clause
+        out = []
+        for row in rows:
+            found = False
+            for bound, _ in self._match_parts(parts, 0, row, frozenset()):
+                if where is None or self.eval(where, bound) is True:
+                    out.append(bound)
+                    found = True
+            if optional and not found:
+                missing = dict(row)
+                for var in _pattern_vars(parts):
+                    missing.setdefault(var, None)
+                out.append(missing)
+        return out
+
+    def _unwind(self, clause: tuple, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        _, expr, var = clause
+        out = []
+        for row in rows:
+            values = self.eval(expr, row)
+            if values is None:
+                continue
+            for value in values if isinstance(values, list) else [values]:
+                out.append({**row, var: value})
+        return out
+
+    def _subquery(self, clause: tuple, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        clauses = clause[1]
+        returns = clauses[-1][0] == "return"
+        out = []
+        for row in rows:
+            results = self.run(clauses, [dict(row)])
+            if returns:
+                out.extend({**row, **result} for result in results)
+            else:
+                out.append(row)
+        return out
+
+    def _procedure(self, clause: tuple, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        _, name, args, yields, where = clause
+        procedure = self.graph.procedures().get(name)
+        if procedure is None:
+            raise UnsupportedCypher(f"Unsupported procedure {name}")
+        out = []
+        for row in rows:
+            for record in procedure(*[self.eval(a, row) for a in args]):
+                if yields:
+                    record = {alias: record[column] for column, alias in yields}
+                bound = {**row, **record}
+                if where is None or self.eval(where, bound) is True:
+                    out.append(bound)
+        return out
+
+    def _with(self, clause: tuple, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.project(clause[1], rows)
+
+    def _return(self, clause: tuple, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.project(clause[1], rows)
+
+    def project(self, projection: _Projection, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = list(projection.items)
+        if projection.star:
+            names = list(rows[0]) if rows else []
+            items = [(("var", k), k, k) for k in names] + items
+        aggregating = [_has_aggregate(expr) for expr, _, _ in items]
+
+        # (output row, scope for ORDER BY, group rows)
+        results: List[Tuple[Dict[str, Any], Dict[str, Any], Optional[list]]] = []
+        if any(aggregating):
+            groups: "OrderedDict[tuple, list]" = OrderedDict()
+            for row in rows:
+                key = tuple(_key(self.eval(expr, row)) for (expr, _, _), agg in zip(items, aggregating) if not agg)
+                groups.setdefault(key, []).append(row)
+            if not groups and all(aggregating):
+                groups[()] = []
+            for members in groups.values():
+                scope = members[0] if members else {}
+                out = {alias: self.eval(expr, scope, members) for expr, alias, _ in items}
+                results.append((out, scope, members))
+        else:
+            for row in rows:
+                results.append(({alias: self.eval(expr, row) for expr, alias, _ in items}, row, None))
+
+        if projection.distinct:
+            seen = set()
+            unique = []
+            for result in results:
+                key = tuple(_key(v) for v in result[0].values())
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(result)
+            results = unique
+
+        if projection.order:
+            columns = {text: alias for _, alias, text in items}
+            for expr, text, desc in reversed(projection.order):
+                def order_key(result, expr=expr, text=text):
+                    out, scope, members = result
+                    if text in columns:
+                        return _sort_key(out[columns[text]])
+                    if expr[0] == "var" and expr[1] in out:
+                        return _sort_key(out[expr[1]])
+                    return _sort_key(self.eval(expr, {**scope, **out}, members))
+                results.sort(key=order_key, reverse=desc)
+
+        rows = [out for out, _, _ in results]
+        if projection.skip is not None:
+            rows = rows[int(self.eval(projection.skip, {})):]
+        if projection.limit is not None:
+            rows = rows[:int(self.eval(projection.limit, {}))]
+        if projection.where is not None:
+            rows = [row for row in rows if self.eval(projection.where, row) is True]
+        return rows
+
+    # Pattern matching
+
+    def _match_parts(self, parts: List[_Part], i: int, row: Dict[str, Any],
+                     used: FrozenSet[int]) -> Iterator[Tuple[Dict[str, Any], FrozenSet[int]]]:
+        if i == len(parts):
+            yield row, used
+            return
+        for bound, now_used in self._match_part(parts[i], row, used):
+            yield from self._match_parts(parts, i + 1, bound, now_used)
+
+    def _candidates(self, pattern: _NodePattern, row: Dict[str, Any]) -> Tuple[int, Iterable[Node]]:
+        """Estimated size and nodes a pattern node can be matched from"""
+        graph = self.graph
+        if pattern.var and pattern.var in row:
+            value = row[pattern.var]
+            return (0, [value]) if isinstance(value, Node) else (0, [])
+        best: Optional[Tuple[int, Iterable[Node]]] = None
+        for prop, expr in pattern.props:
+            for label in pattern.labels:
+                index = graph._index.get((label, prop))
+                if index is None:
+                    continue
+                try:
+                    value = self.eval(expr, row)
+                except UnsupportedCypher:
+                    continue
+                nodes = index.get(_key(value), ()) if value is not None else ()
+                if best is None or len(nodes) < best[0]:
+                    best = (len(nodes), nodes)
+        if best is not None:
+            return best
+        if pattern.labels:
+            nodes = min((graph._by_label.get(label, []) for label in pattern.labels), key=len)
+            return len(nodes), nodes
+        return len(graph._nodes), list(graph._nodes.values())
+
+    def _props_ok(self, props: List[Tuple[str, Any]], values: Dict[str, Any], row: Dict[str, Any]) -> bool:
+        return all(_equals(values.get(key), self.eval(expr, row)) is True for key, expr in props)
+
+    def _bind_node(self, pattern: _NodePattern, node: Node, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if pattern.var and pattern.var in row:
+            bound = row[pattern.var]
+            if not isinstance(bound, Node) or bound.id != node.id:
+                return None
+        if not node.labels.issuperset(pattern.labels) or not self._props_ok(pattern.props, node.props, row):
+            return None
+        if pattern.var and pattern.var not in row:
+            return {**row, pattern.var: node}
+        return row
+
+    def _bind_rel(self, pattern: _RelPattern, rels: List[Relationship], row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not pattern.var:
+            return row
+        value: Any = rels if pattern.length else rels[0]
+        if pattern.var in row:
+            return row if _key(row[pattern.var]) == _key(value) else None
+        return {**row, pattern.var: value}
+
+    def _neighbors(self, node: Node, pattern: _RelPattern, reverse: bool) -> Iterator[Tuple[Relationship, Node]]:
+        graph = self.graph
+        direction = pattern.direction
+        if reverse and direction != "both":
+            direction = "in" if direction == "out" else "out"
+        for rel_type in pattern.types or list(graph._out):
+            if direction != "in":
+                for rel in graph._out.get(rel_type, {}).get(node.id, ()):
+                    yield rel, graph._nodes[rel.end]
+            if direction != "out":
+                for rel in graph._in.get(rel_type, {}).get(node.id, ()):
+                    yield rel, graph._nodes[rel.start]
+
+    def _traverse(self, node: Node, pattern: _RelPattern, reverse: bool, row: Dict[str, Any],
+                  used: FrozenSet[int]) -> Iterator[Tuple[List[Relationship], Node]]:
+        if pattern.length is None:
+            for rel, other in self._neighbors(node, pattern, reverse):
+                if rel.id not in used and self._props_ok(pattern.props, rel.props, row):
+                    yield [rel], other
+            return
+        low, high = pattern.length
+        high = self.graph.max_var_length if high is None else high
+        path: List[Relationship] = []
+        seen = set(used)
+
+        def walk(current: Node) -> Iterator[Tuple[List[Relationship], Node]]:
+            if len(path) >= low:
+                yield list(path), current
+            if len(path) == high:
+                return
+            for rel, other in self._neighbors(current, pattern, reverse):
+                if rel.id in seen or not self._props_ok(pattern.props, rel.props, row):
+                    continue
+                path.append(rel)
+                seen.add(rel.id)
+                yield from walk(other)
+                path.pop()
+                seen.discard(rel.id)
+
+        yield from walk(node)
+
+    def _match_part(self, part: _Part, row: Dict[str, Any],
+                    used: FrozenSet[int]) -> Iterator[Tuple[Dict[str, Any], FrozenSet[int]]]:
+        if part.shortest:
+            yield from self._shortest(part, row, used)
+            return
+        nodes = part.elements[0::2]
+        options = [self._candidates(pattern, row) for pattern in nodes]
+        anchor = min(range(len(nodes)), key=lambda i: options[i][0])
+        # Expand rightwards from the most selective node, then leftwards
+        steps = [(i, i + 1, i, False) for i in range(anchor, len(nodes) - 1)]
+        steps += [(i, i - 1, i - 1, True) for i in range(anchor, 0, -1)]
+        for node in options[anchor][1]:
+            bound = self._bind_node(nodes[anchor], node, row)
+            if bound is not None:
+                yield from self._expand(part, steps, 0, bound, {anchor: node}, {}, used)
+
+    def _expand(self, part: _Part, steps: list, j: int, row: Dict[str, Any], at: Dict[int, Node],
+                hops: Dict[int, List[Relationship]], used: FrozenSet[int]) -> Iterator[Tuple[Dict[str, Any], FrozenSet[int]]]:
+        if j == len(steps):
+            if part.var:
+                row = {**row, part.var: self._path(part, at[0], hops)}
+            yield row, used
+            return
+        source, target, r, reverse = steps[j]
+        pattern = part.elements[2 * r + 1]
+        for rels, node in self._traverse(at[source], pattern, reverse, row, used):
+            ordered = rels[::-1] if reverse else rels
+            bound = self._bind_node(part.elements[2 * target], node, row)
+            if bound is not None:
+                bound = self._bind_rel(pattern, ordered, bound)
+            if bound is not None:
+                yield from self._expand(
+                    part, steps, j + 1, bound, {**at, target: node}, {**hops, r: ordered},
+                    used | {rel.id for rel in rels},
+                )
+
+    def _path(self, part: _Part, start: Node, hops: Dict[int, List[Relationship]]) -> Path:
+        nodes, rels = [start], []
+        for r in range(len(part.elements) // 2):
+            for rel in hops[r]:
+                current = nodes[-1].id
+                rels.append(rel)
+                nodes.append(self.graph._nodes[rel.end if rel.start == current else rel.start])
+        return Path(nodes, rels)
+
+    def _shortest(self, part: _Part, row: Dict[str, Any],
+                  used: FrozenSet[int]) -> Iterator[Tuple[Dict[str, Any], FrozenSet[int]]]:
+        start_pattern, pattern, end_pattern = part.elements
+        low, high = pattern.length or (1, 1)
+        high = self.graph.max_var_length if high is None else high
+        target = row.get(end_pattern.var) if end_pattern.var else None
+        for start in self._candidates(start_pattern, row)[1]:
+            bound = self._bind_node(start_pattern, start, row)
+            if bound is None:
+                continue
+            # Breadth-first search remembering every parent at the discovery depth
+            depth_of = {start.id: 0}
+            parents: Dict[int, List[Tuple[Relationship, Node]]] = {}
+            frontier, depth = [start], 0
+            while frontier and depth < high:
+                depth += 1
+                reached = []
+                for node in frontier:
+                    for rel, other in self._neighbors(node, pattern, False):
+                        if rel.id in used or not self._props_ok(pattern.props, rel.props, bound):
+                            continue
+                        seen = depth_of.get(other.id)
+                        if seen is None:
+                            depth_of[other.id] = depth
+                            parents[other.id] = [(rel, node)]
+                            reached.append(other)
+                        elif seen == depth:
+                            parents[other.id].append((rel, node))
+                for node in reached if depth >= low else ():
+                    end_bound = self._bind_node(end_pattern, node, bound)
+                    if end_bound is None:
+                        continue
+                    routes = self._routes(parents, start.id, node)
+                    for rels in routes if part.shortest == "all" else [next(routes)]:
+                        result = self._bind_rel(pattern, rels, end_bound)
+                        if result is None:
+                            continue
+                        if part.var:
+                            result = {**result, part.var: self._path(part, start, {0: rels})}
+                        yield result, used | {rel.id for rel in rels}
+                if isinstance(target, Node) and target.id in depth_of:
+                    break
+                frontier = reached
+
+    def _routes(self, parents: Dict[int, List[Tuple[Relationship, Node]]], start: int, node: Node) -> Iterator[List[Relationship]]:
+        if node.id == start:
+            yield []
+            return
+        for rel, previous in parents[node.id]:
+            for route in self._routes(parents, start, previous):
+                yield route + [rel]
+
+    # Expressions
+
+    def eval(self, expr: Any, row: Dict[str, Any], group: Optional[list] = None) -> Any:
+        kind = expr[0]
+        if kind == "lit":
+            return expr[1]
+        if kind == "var":
+            if expr[1] not in row:
+                raise UnsupportedCypher(f"Variable `{expr[1]}` not defined")
+            return row[expr[1]]
+        if kind == "prop":
+            target = self.eval(expr[1], row, group)
+            if target is None:
+                return None
+            if isinstance(target, (Node, Relationship)):
+                return target.props.get(expr[2])
+            if isinstance(target, dict):
+                return target.get(expr[2])
+            if isinstance(target, (datetime.date, datetime.datetime)):
+                return getattr(target, expr[2], None)
+            raise UnsupportedCypher(f"Cannot read property {expr[2]} of {target!r}")
+        if kind == "param":
+            if expr[1] not in self.params:
+                raise UnsupportedCypher(f"Expected parameter ${expr[1]}")
+            return self.params[expr[1]]
+        if kind == "cmp":
+            return _compare(expr[1], self.eval(expr[2], row, group), self.eval(expr[3], row, group))
+        if kind == "and":
+            left = _truth(self.eval(expr[1], row, group))
+            if left is False:
+                return False
+            right = _truth(self.eval(expr[2], row, group))
+            return False if right is False else None if None in (left, right) else True
+        if kind == "or":
+            left = _truth(self.eval(expr[1], row, group))
+            if left is True:
+                return True
+            right = _truth(self.eval(expr[2], row, group))
+            return True if right is True else None if None in (left, right) else False
+        if kind == "xor":
+            left, right = _truth(self.eval(expr[1], row, group)), _truth(self.eval(expr[2], row, group))
+            return None if None in (left, right) else left != right
+        if kind == "not":
+            value = _truth(self.eval(expr[1], row, group))
+            return None if value is None else not value
+        if kind == "agg":
+            return self._aggregate(expr, group)
+        if kind == "call":
+            return FUNCTIONS[expr[1]](*[self.eval(arg, row, group) for arg in expr[2]])
+        if kind == "isnull":
+            value = self.eval(expr[1], row, group) is None
+            return not value if expr[2] else value
+        if kind == "in":
+            value, container = self.eval(expr[1], row, group), self.eval(expr[2], row, group)
+            if container is None:
+                return None
+            results = [_equals(value, item) for item in container]
+            return True if True in results else None if None in results or value is None else False
+        if kind == "str":
+            value, other = self.eval(expr[2], row, group), self.eval(expr[3], row, group)
+            if not isinstance(value, str) or not isinstance(other, str):
+                return None
+            if expr[1] == "starts":
+                return value.startswith(other)
+            if expr[1] == "ends":
+                return value.endswith(other)
+            return other in value
+        if kind == "arith":
+            return self._arith(expr[1], self.eval(expr[2], row, group), self.eval(expr[3], row, group))
+        if kind == "neg":
+            value = self.eval(expr[1], row, group)
+            return None if value is None else -value
+        if kind == "list":
+            return [self.eval(item, row, group) for item in expr[1]]
+        if kind == "map":
+            return {key: self.eval(value, row, group) for key, value in expr[1]}
+        if kind == "index":
+            container, index = self.eval(expr[1], row, group), self.eval(expr[2], row, group)
+            if container is None or index is None:
+                return None
+            if isinstance(container, (Node, Relationship)):
+                return container.props.get(index)
+            if isinstance(container, dict):
+                return container.get(index)
+            return container[index] if -len(container) <= index < len(container) else None
+        if kind == "slice":
+            container = self.eval(expr[1], row, group)
+            low = self.eval(expr[2], row, group) if expr[2] is not None else None
+            high = self.eval(expr[3], row, group) if expr[3] is not None else None
+            return None if container is None else container[low:high]
+        if kind == "case":
+            _, subject, whens, default = expr
+            value = self.eval(subject, row, group) if subject is not None else None
+            for condition, result in whens:
+                matched = _equals(value, self.eval(condition, row, group)) if subject is not None else self.eval(condition, row, group)
+                if matched is True:
+                    return self.eval(result, row, group)
+            return self.eval(default, row, group) if default is not None else None
+        if kind == "haslabel":
+            node = self.eval(expr[1], row, group)
+            return None if node is None else node.labels.issuperset(expr[2])
+        if kind == "pattern":
+            return next(self._match_part(expr[1], row, frozenset()), None) is not None
+        if kind == "paths":
+            return [bound[expr[1].var] for bound, _ in self._match_part(expr[1], row, frozenset())]
+        if kind == "exists":
+            return any(
+                expr[2] is None or self.eval(expr[2], bound) is True
+                for bound, _ in self._match_parts(expr[1], 0, row, frozenset())
+            )
+        if kind == "listcomp":
+            _, var, source, where, projection = expr
+            values = self.eval(source, row, group)
+            if values is None:
+                return None
+            out = []
+            for value in values:
+                scope = {**row, var: value}
+                if where is None or self.eval(where, scope) is True:
+                    out.append(self.eval(projection, scope) if projection is not None else value)
+            return out
+        if kind == "quant":
+            _, name, var, source, predicate = expr
+            values = self.eval(source, row, group)
+            if values is None:
+                return None
+            matches = sum(1 for value in values if self.eval(predicate, {**row, var: value}) is True)
+            return {"any": matches > 0, "all": matches == len(values), "none": matches == 0, "single": matches == 1}[name]
+        raise UnsupportedCypher(f"Unsupported expression {kind}")
+
+    @staticmethod
+    def _arith(op: str, a: Any, b: Any) -> Any:
+        if a is None or b is None:
+            return None
+        if op == "+":
+            if isinstance(a, list) or isinstance(b, list):
+                return (a if isinstance(a, list) else [a]) + (b if isinstance(b, list) else [b])
+            if isinstance(a, str) or isinstance(b, str):
+                return _to_string(a) + _to_string(b)
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        if op == "/":
+            if isinstance(a, int) and isinstance(b, int):
+                if b == 0:
+                    raise UnsupportedCypher("/ by zero")
+                return int(a / b)
+            return a / b if b else (math.nan if a == 0 else math.copysign(math.inf, a))
+        if op == "%":
+            return math.fmod(a, b) if isinstance(a, float) or isinstance(b, float) else int(math.fmod(a, b))
+        return float(a) ** b
+
+    def _aggregate(self, expr: tuple, group: Optional[list]) -> Any:
+        _, name, distinct, arg = expr
+        if group is None:
+            raise UnsupportedCypher(f"{name}() is only allowed in WITH and RETURN")
+        if arg is None:
+            return len(group)
+        values = [v for v in (self.eval(arg, row) for row in group) if v is not None]
+        if distinct:
+            seen, unique = set(), []
+            for value in values:
+                if _key(value) not in seen:
+                    seen.add(_key(value))
+                    unique.append(value)
+            values = unique
+        if name == "count":
+            return len(values)
+        if name == "collect":
+            return values
+        if name == "sum":
+            return sum(values) if values else 0
+        if name == "avg":
+            return sum(values) / len(values) if values else None
+        if not values:
+            return None
+        return (min if name == "min" else max)(values, key=_sort_key)
+
+
+def _pattern_vars(parts: List[_Part]) -> List[str]:
+    names = []
+    for part in parts:
+        if part.var:
+            names.append(part.var)
+        names.extend(element.var for element in part.elements if element.var)
+    return names
+
+
+# ── Graph ────────────────────────────────────────────────────────────────────
+
+_SCHEMA_TYPES = [
+    (bool, "BOOLEAN"), (int, "INTEGER"), (float, "FLOAT"), (str, "STRING"),
+    (datetime.datetime, "DATE_TIME"), (datetime.date, "DATE"), (list, "LIST"),
+]
+
+
+def _schema_type(value: Any) -> str:
+    return next((name for cls, name in _SCHEMA_TYPES if isinstance(value, cls)), "STRING")
+
+
+class MemoryGraph:
+    """Neo4jGraph stand-in keeping the movie graph in process memory
+
+    Nodes are found through per-label lists and (label, property) hash
+    indexes; relationships through per-type adjacency lists in both
+    directions. query() runs the read-only subset of Cypher the chain
+    generates: MATCH/OPTIONAL MATCH with WHERE, WITH and RETURN with
+    aggregation, DISTINCT, ORDER BY, SKIP and LIMIT, UNWIND, CALL
+    subqueries, variable-length and shortest paths.
+    """
+
+    def __init__(self, max_var_length: int = 15):
+        """
+        Initialize an empty graph
+
+        Args:
+            max_var_length: Hops an unbounded variable-length pattern may take
+        """
+        self.max_var_length = max_var_length
+        self._nodes: Dict[int, Node] = {}
+        self._by_label: Dict[str, List[Node]] = {}
+        self._index: Dict[Tuple[str, str], Dict[Any, List[Node]]] = {}
+        self._out: Dict[str, Dict[int, List[Relationship]]] = {}
+        self._in: Dict[str, Dict[int, List[Relationship]]] = {}
+        self._edges: set = set()
+        self._relationships = 0
+        self._lock = threading.RLock()
+        self.schema = ""
+        self.structured_schema: Dict[str, Any] = {}
+        self._enhanced_schema = False
+        self.refresh_schema()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs: Any) -> "MemoryGraph":
+        """Build a graph from a movies_small.csv style file (CSV, JSON Lines or JSON)"""
+        graph = cls(**kwargs)
+        graph.load(path)
+        return graph
+
+    # Building
+
+    def add_node(self, labels: Iterable[str], properties: Optional[Dict[str, Any]] = None) -> Node:
+        with self._lock:
+            node = Node(len(self._nodes), labels, {k: v for k, v in (properties or {}).items() if v is not None})
+            self._nodes[node.id] = node
+            for label in node.labels:
+                self._by_label.setdefault(label, []).append(node)
+                for prop, value in node.props.items():
+                    self._index.setdefault((label, prop), {}).setdefault(_key(value), []).append(node)
+            return node
+
+    def set_property(self, node: Node, prop: str, value: Any):
+        """Set (or with None remove) a property, keeping the hash indexes current"""
+        with self._lock:
+            old = node.props.get(prop)
+            for label in node.labels:
+                index = self._index.setdefault((label, prop), {})
+                if old is not None:
+                    index[_key(old)].remove(node)
+                if value is not None:
+                    index.setdefault(_key(value), []).append(node)
+            if value is None:
+                node.props.pop(prop, None)
+            else:
+                node.props[prop] = value
+
+    def merge_node(self, label: str, key: str, value: Any) -> Node:
+        """The node with label and key = value, created if missing"""
+        with self._lock:
+            existing = self._index.get((label, key), {}).get(_key(value))
+            return existing[0] if existing else self.add_node([label], {key: value})
+
+    def add_relationship(self, start: Node, rel_type: str, end: Node,
+                         properties: Optional[Dict[str, Any]] = None) -> Relationship:
+        with self._lock:
+            rel = Relationship(self._relationships, rel_type, start.id, end.id, dict(properties or {}))
+            self._relationships += 1
+            self._out.setdefault(rel_type, {}).setdefault(start.id, []).append(rel)
+            self._in.setdefault(rel_type, {}).setdefault(end.id, []).append(rel)
+            return rel
+
+    def merge_relationship(self, start: Node, rel_type: str, end: Node):
+        """Connect two nodes unless they already are by this type"""
+        with self._lock:
+            edge = (start.id, rel_type, end.id)
+            if edge not in self._edges:
+                self._edges.add(edge)
+                self.add_relationship(start, rel_type, end)
+
+    def load_records(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Merge normalized movie rows with the semantics of loader.BATCH_QUERY
+
+        Args:
+            rows: Rows from loader.read_records
+
+        Returns:
+            Rows merged
+        """
+        count = 0
+        with self._lock:
+            for row in rows:
+                movie = self.merge_node("Movie", "id", row["id"])
+                released = None
+                if row.get("released"):
+                    try:
+                        released = datetime.date.fromisoformat(str(row["released"]))
+                    except ValueError:
+                        logger.warning(f"Skipping unparseable release date {row['released']!r} of movie {row['id']}")
+                self.set_property(movie, "released", released)
+                self.set_property(movie, "title", row.get("title"))
+                self.set_property(movie, "imdbRating", row.get("imdbRating"))
+                for name in row.get("directors", []):
+                    self.merge_relationship(self.merge_node("Person", "name", name), "DIRECTED", movie)
+                for name in row.get("actors", []):
+                    self.merge_relationship(self.merge_node("Person", "name", name), "ACTED_IN", movie)
+                for name in row.get("genres", []):
+                    self.merge_relationship(movie, "IN_GENRE", self.merge_node("Genre", "name", name))
+                count += 1
+            self.refresh_schema()
+        return count
+
+    def load(self, path: str) -> Dict[str, Any]:
+        """
+        Load the same local files as Neo4jDatabase.load_movie_data
+
+        Args:
+            path: CSV, JSON Lines or JSON file in the movies_small.csv layout
+
+        Returns:
+            Report with rows, nodes and relationships
+        """
+        rows = self.load_records(read_records(path))
+        logger.info(f"Loaded {rows} rows into memory: {len(self._nodes)} nodes, {self._relationships} relationships")
+        return {"rows": rows, "nodes": len(self._nodes), "relationships": self._relationships}
+
+    # Neo4jGraph interface
+
+    @property
+    def get_schema(self) -> str:
+        return self.schema
+
+    @property
+    def get_structured_schema(self) -> Dict[str, Any]:
+        return self.structured_schema
+
+    def refresh_schema(self):
+        """Derive the structured and text schema from the data, as Neo4jGraph reports it"""
+        node_props: Dict[str, Dict[str, str]] = {}
+        for label, nodes in sorted(self._by_label.items()):
+            props = node_props.setdefault(label, {})
+            for node in nodes:
+                for prop, value in node.props.items():
+                    props.setdefault(prop, _schema_type(value))
+        rel_props: Dict[str, Dict[str, str]] = {}
+        patterns = set()
+        for rel_type, adjacency in self._out.items():
+            for rels in adjacency.values():
+                for rel in rels:
+                    for start in self._nodes[rel.start].labels:
+                        for end in self._nodes[rel.end].labels:
+                            patterns.add((start, rel_type, end))
+                    for prop, value in rel.props.items():
+                        rel_props.setdefault(rel_type, {}).setdefault(prop, _schema_type(value))
+        self.structured_schema = {
+            "node_props": {
+                label: [{"property": p, "type": t} for p, t in props.items()] for label, props in node_props.items()
+            },
+            "rel_props": {
+                rel_type: [{"property": p, "type": t} for p, t in props.items()] for rel_type, props in rel_props.items()
+            },
+            "relationships": [{"start": s, "type": t, "end": e} for s, t, e in sorted(patterns)],
+            "metadata": {"constraint": [], "index": []},
+        }
+        from neo4j_graphrag.schema import format_schema
+        self.schema = format_schema(self.structured_schema, self._enhanced_schema)
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        """
+        Run a read-only statement
+
+        Raises:
+            UnsupportedCypher: The statement is outside the supported subset
+        """
+        statement = query.strip()
+        prefix = re.match(r"(?i)(EXPLAIN|PROFILE)\s+", statement)
+        if prefix:
+            statement = statement[prefix.end():]
+        clauses = parse(statement)
+        if prefix and prefix.group(1).upper() == "EXPLAIN":
+            return []
+        if clauses[-1][0] not in ("return", "procedure"):
+            raise UnsupportedCypher("Query cannot conclude with " + clauses[-1][0].upper())
+        rows = _Executor(self, dict(params or {})).run(clauses, [{}])
+        return [{k: _plain(v) for k, v in row.items()} for row in rows]
+
+    def explain(self, query: str, params: Optional[dict] = None) -> Dict[str, Any]:
+        """Check that a statement parses; the engine has no cost model, so the plan is empty"""
+        parse(query.strip())
+        return {}
+
+    def procedures(self) -> Dict[str, Callable[..., List[Dict[str, Any]]]]:
+        return {
+            "db.labels": lambda: [{"label": label} for label in sorted(self._by_label)],
+            "db.relationshiptypes": lambda: [{"relationshipType": t} for t in sorted(self._out)],
+            "db.propertykeys": lambda: [{"propertyKey": k} for k in sorted({p for _, p in self._index})],
+            "db.awaitindexes": lambda *args: [],
+        }
+
+    def add_graph_documents(self, graph_documents: Any, include_source: bool = False):
+        raise UnsupportedCypher("The in-memory graph is read-only")
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "nodes": len(self._nodes),
+            "relationships": self._relationships,
+            "labels": {label: len(nodes) for label, nodes in self._by_label.items()},
+            "relationship_types": {t: sum(len(r) for r in adj.values()) for t, adj in self._out.items()},
+        }
@@ -0,0 +1,221 @@
+"""
+Literal-to-parameter rewriting of generated Cypher for plan-cache reuse
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Schema and administration commands need literal options and names
+UNTOUCHED = re.compile(
+    r"^\s*(SHOW|ALTER|GRANT|DENY|REVOKE|START|STOP|USE|DROP\s+(CONSTRAINT|INDEX)|"
+    r"CREATE\s+(OR\s+REPLACE\s+)?(CONSTRAINT|DATABASE|ALIAS|USER|ROLE|(RANGE\s+|TEXT\s+|POINT\s+|FULLTEXT\s+|VECTOR\s+|LOOKUP\s+)?INDEX))\b",
+    re.IGNORECASE,
+)
+NUMBER = re.compile(r"\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+ESCAPES = {"\\": "\\", "'": "'", '"': '"', "n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+def _read_string(query: str, start: int) -> Tuple[str, int]:
+    """Decode the string literal opening at start; returns (value, index after it)"""
+    quote = query[start]
+    chars = []
+    i = start + 1
+    while i < len(query):
+        ch = query[i]
+        if ch == "\\" and i + 1 < len(query):
+            nxt = query[i + 1]
+            if nxt == "u" and i + 5 < len(query):
+                chars.append(chr(int(query[i + 2:i + 6], 16)))
+                i += 6
+                continue
+            chars.append(ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        if ch == quote:
+            return "".join(chars), i + 1
+        chars.append(ch)
+        i += 1
+    raise ValueError("Unterminated string literal")
+
+
+def parameterize(query: str, prefix: str = "p") -> Tuple[str, Dict[str, Any]]:
+    """
+    Lift string and number literals out of a Cypher statement
+
+    Comments, backtick identifiers, existing $parameters and variable-length
+    bounds such as *1..3 (which cannot be parameters) are left as they are.
+
+    Args:
+        query: Cypher statement
+        prefix: Name prefix of the generated parameters
+
+    Returns:
+        Tuple of (template, params); the template is identical for statements
+        that differ only in their literal values
+    """
+    if UNTOUCHED.match(query):
+        return query, {}
+    used = set(re.findall(r"\$(\w+)", query))
+    params: Dict[str, Any] = {}
+    out = []
+    counter = 0
+    i = 0
+    n = len(query)
+
+    def next_name() -> str:
+        nonlocal counter
+        while f"{prefix}{counter}" in used:
+            counter += 1
+        name = f"{prefix}{counter}"
+        counter += 1
+        return name
+
+    while i < n:
+        ch = query[i]
+        if query.startswith("//", i):
+            end = query.find("\n", i)
+            end = n if end == -1 else end
+            out.append(query[i:end])
+            i = end
+        elif query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append(query[i:end])
+            i = end
+        elif ch == "`":
+            end = query.find("`", i + 1)
+            end = n if end == -1 else end + 1
+            out.append(query[i:end])
+            i = end
+        elif ch == "$":
+            match = IDENTIFIER.match(query, i + 1)
+            end = match.end() if match else i + 1
+            out.append(query[i:end])
+            i = end
+        elif ch in ("'", '"'):
+            try:
+                value, end = _read_string(query, i)
+            except ValueError:
+                out.append(query[i:])
+                break
+            name = next_name()
+            params[name] = value
+            out.append(f"${name}")
+            i = end
+        elif ch.isalpha() or ch == "_":
+            match = IDENTIFIER.match(query, i)
+            out.append(match.group())
+            i = match.end()
+        elif ch.isdigit():
+            match = NUMBER.match(query, i)
+            text = match.group()
+            before = "".join(out).rstrip()
+            if before.endswith("*") or before.endswith(".."):
+                out.append(text)
+            else:
+                name = next_name()
+                params[name] = float(text) if any(c in text for c in ".eE") else int(text)
+                out.append(f"${name}")
+            i = match.end()
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out), params
+
+
+def template_key(query: str) -> str:
+    """Literal-free form of a statement, for keying per-shape caches"""
+    return parameterize(query)[0]
+
+
+class QueryParameterizer:
+    """Rewrites statements before execution and tracks plan-cache reuse"""
+
+    def __init__(self, plan_cache_size: int = 1000):
+        """
+        Initialize the rewriter
+
+        Args:
+            plan_cache_size: Templates remembered when estimating plan-cache
+                hits, matching the server's query cache size
+        """
+        self.plan_cache_size = plan_cache_size
+        self.executions = 0
+        self.template_hits = 0
+        self.literal_hits = 0
+        self._templates: "OrderedDict[str, None]" = OrderedDict()
+        self._literals: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _seen(self, cache: "OrderedDict[str, None]", key: str) -> bool:
+        hit = key in cache
+        cache[key] = None
+        cache.move_to_end(key)
+        if len(cache) > self.plan_cache_size:
+            cache.popitem(last=False)
+        return hit
+
+    def rewrite(self, query: str, params: Optional[dict] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Parameterize a statement; caller-supplied params are kept
+
+        Args:
+            query: Cypher statement
+            params: Existing parameters
+
+        Returns:
+            Tuple of (template, merged params)
+        """
+        template, lifted = parameterize(query)
+        with self._lock:
+            self.executions += 1
+            self.template_hits += self._seen(self._templates, template)
+            self.literal_hits += self._seen(self._literals, query)
+        return template, {**lifted, **(params or {})}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Plan-cache reuse estimated from the statements sent
+
+        Returns:
+            Executions, distinct templates, and the hit rate of templates
+            versus the hit rate the literal statements would have had
+        """
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "templates": len(self._templates),
+                "plan_cache_hits": self.template_hits,
+                "plan_cache_hit_rate": self.template_hits / self.executions if self.executions else 0.0,
+                "literal_hit_rate": self.literal_hits / self.executions if self.executions else 0.0,
+            }
+
+
+class ParameterizedGraph:
+    """Graph proxy sending parameterized statements to the database"""
+
+    def __init__(self, graph: Any, parameterizer: Optional[QueryParameterizer] = None):
+        self._graph = graph
+        self.parameterizer = parameterizer or QueryParameterizer()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._graph, name)
+
+    def query(self, query: str, params: Optional[dict] = None) -> Any:
+        return self._graph.query(*self.parameterizer.rewrite(query, params))
+
+    @property
+    def stream(self) -> Any:
+        # Only present when the wrapped graph can stream
+        inner = self._graph.stream
+
+        def stream(query: str, params: Optional[dict] = None, **kwargs: Any) -> Any:
+            return inner(*self.parameterizer.rewrite(query, params), **kwargs)
+
+        return stream
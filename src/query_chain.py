@@ -2,9 +2,23 @@
 Query chain creation and management for Neo4j Cypher QA
 """
 
-from langchain_neo4j.chains.graph_qa.cypher import GraphCypherQAChain
+from langchain_neo4j.chains.graph_qa.cypher import GraphCypherQAChain, construct_schema
+from langchain_neo4j.chains.graph_qa.cypher_utils import Schema
 from langchain_core.prompts import FewShotPromptTemplate, PromptTemplate
-from typing import Any
+from typing import Any, Optional
+import json
+
+from src.cache import CypherCache, hash_text
+from src.columnar import ColumnarGraph
+from src.cost_guard import CostGuard
+from src.deadline import DeadlineGeneration
+from src.example_store import ExampleStore
+from src.parameterize import ParameterizedGraph, QueryParameterizer
+from src.results import LimitedGraph
+from src.schema_pruning import SchemaPruner
+from src.schema_snapshot import SchemaSnapshot
+from src.semantic_cache import SemanticCypherCache
+from src.templates import TemplateMatcher
 
 
 def get_few_shot_examples():
@@ -47,18 +61,43 @@ def get_few_shot_examples():
     ]
 
 
-def create_cypher_prompt():
+def create_example_store(k: int = 4, token_budget: Optional[int] = 400) -> ExampleStore:
+    """
+    Indexes the built-in few-shot examples for per-question selection
+
+    Args:
+        k: Maximum number of examples placed in each prompt
+        token_budget: Maximum estimated tokens spent on examples
+
+    Returns:
+        ExampleStore seeded with get_few_shot_examples()
+    """
+    return ExampleStore(get_few_shot_examples(), k=k, token_budget=token_budget)
+
+
+def create_cypher_prompt(
+    example_selector: Optional[ExampleStore] = None,
+    examples: Optional[list] = None,
+):
     """
     Creates a few-shot prompt template matching the notebook
+
+    Args:
+        example_selector: Optional ExampleStore choosing examples per question
+        examples: Optional fixed example list; when neither is given every
+            built-in example is included
     """
-    examples = get_few_shot_examples()
-    
     example_prompt = PromptTemplate.from_template(
         "User input: {question}\nCypher query: {query}"
     )
     
+    if example_selector is not None:
+        example_source = {"example_selector": example_selector}
+    else:
+        example_source = {"examples": examples if examples is not None else get_few_shot_examples()}
+
     prompt = FewShotPromptTemplate(
-        examples=examples,
+        **example_source,
         example_prompt=example_prompt,
         prefix=(
             "Task: Generate a Cypher statement to query a Neo4j graph database.\n"
@@ -76,14 +115,85 @@ def create_cypher_prompt():
     return prompt
 
 
-def create_qa_chain(graph: Any, llm: Any, verbose: bool = True):
+def get_prompt_version(prompt: FewShotPromptTemplate) -> str:
+    """
+    Fingerprints the prompt template and its examples
+
+    Args:
+        prompt: Few-shot prompt used for Cypher generation
+
+    Returns:
+        Short hash that changes whenever the wording or examples change
+    """
+    examples = prompt.examples
+    if examples is None:
+        examples = getattr(prompt.example_selector, "version", type(prompt.example_selector).__name__)
+    payload = json.dumps(
+        [prompt.prefix, prompt.suffix, prompt.example_prompt.template, examples],
+        sort_keys=True,
+        default=str,
+    )
+    return hash_text(payload)
+
+
+def create_qa_chain(
+    graph: Any,
+    llm: Any,
+    verbose: bool = True,
+    cache: Optional[CypherCache] = None,
+    semantic_cache: Optional[SemanticCypherCache] = None,
+    example_store: Optional[ExampleStore] = None,
+    schema_pruner: Optional[SchemaPruner] = None,
+    schema_snapshot: Optional[SchemaSnapshot] = None,
+    return_intermediate_steps: bool = False,
+    top_k: int = 10,
+    stream_results: bool = False,
+    columnar: bool = False,
+    cost_guard: Optional[CostGuard] = None,
+    parameterizer: Optional[QueryParameterizer] = None,
+    template_matcher: Optional[TemplateMatcher] = None,
+    enforce_deadlines: bool = False,
+):
     """
     Creates a GraphCypherQAChain with custom prompting
+
+    Args:
+        graph: Neo4jGraph (or compatible) instance
+        llm: Chat model used for Cypher generation
+        verbose: Whether the chain logs intermediate steps
+        cache: Optional CypherCache placed in front of Cypher generation
+        semantic_cache: Optional SemanticCypherCache consulted after an exact miss
+        example_store: Optional ExampleStore selecting few-shot examples per question
+        schema_pruner: Optional SchemaPruner trimming the prompt schema per question
+        schema_snapshot: Optional SchemaSnapshot supplying the schema instead of
+            a full refresh; later snapshot refreshes are pushed into the chain
+        return_intermediate_steps: Include the generated Cypher in the output
+            under 'intermediate_steps'
+        top_k: Maximum rows returned per question
+        stream_results: Pull only top_k rows from the server instead of
+            materializing the whole result and slicing it
+        columnar: Return results as a ColumnarResult (Arrow table) instead of
+            a list of dicts
+        cost_guard: Optional CostGuard checking generated Cypher with EXPLAIN
+            before it runs; only approved Cypher reaches the caches
+        parameterizer: Optional QueryParameterizer lifting literals out of the
+            generated Cypher into query parameters so the server reuses plans
+        template_matcher: Optional TemplateMatcher answering recognized
+            question shapes before any cache or LLM is consulted
+        enforce_deadlines: Limit Cypher generation to its share of the current
+            Deadline and stop waiting when the query is cancelled
     """
     # Refresh schema
-    graph.refresh_schema()
+    if schema_snapshot is not None:
+        schema_snapshot.attach(graph)
+    else:
+        graph.refresh_schema()
+    if schema_pruner is not None:
+        schema_pruner.refresh(graph)
+    if template_matcher is not None:
+        template_matcher.refresh(graph)
     
-    prompt = create_cypher_prompt()
+    prompt = create_cypher_prompt(example_store)
     
     chain = GraphCypherQAChain.from_llm(
         graph=graph,
@@ -92,15 +202,73 @@ def create_qa_chain(graph: Any, llm: Any, verbose: bool = True):
         return_direct=True,  # Set to True as per notebook
         allow_dangerous_requests=True,
         verbose=verbose,
+        return_intermediate_steps=return_intermediate_steps,
+        top_k=top_k,
         cypher_llm_kwargs={
             "prompt": prompt,
             "stop": ["\n\n", "```"],
         },
     )
+
+    if parameterizer is not None:
+        chain.graph = ParameterizedGraph(graph, parameterizer)
+    if stream_results:
+        chain.graph = LimitedGraph(chain.graph, top_k)
+    if columnar:
+        chain.graph = ColumnarGraph(chain.graph)
+
+    if schema_pruner is not None:
+        chain.cypher_generation_chain = schema_pruner.wrap(chain.cypher_generation_chain)
+
+    if cost_guard is not None:
+        chain.cypher_generation_chain = cost_guard.wrap(chain.cypher_generation_chain, graph)
+
+    if schema_snapshot is not None:
+        schema_snapshot.add_listener(
+            lambda changed: sync_chain_schema(chain, changed, schema_pruner)
+        )
+
+    # Tiers are wrapped inside-out: exact cache, then semantic cache, then LLM.
+    # The version is read per lookup so example store edits change the keys.
+    for tier in (semantic_cache, cache):
+        if tier is not None:
+            chain.cypher_generation_chain = tier.wrap(
+                chain.cypher_generation_chain,
+                schema_source=lambda: graph.schema,
+                prompt_version=lambda: get_prompt_version(prompt),
+            )
+
+    if template_matcher is not None:
+        chain.cypher_generation_chain = template_matcher.wrap(chain.cypher_generation_chain)
+
+    if enforce_deadlines:
+        chain.cypher_generation_chain = DeadlineGeneration(chain.cypher_generation_chain)
     
     return chain
 
 
+def sync_chain_schema(chain: GraphCypherQAChain, graph: Any, schema_pruner: Optional[SchemaPruner] = None):
+    """
+    Pushes a refreshed graph schema into an existing chain
+
+    Args:
+        chain: Chain built by create_qa_chain
+        graph: Graph whose schema was refreshed
+        schema_pruner: SchemaPruner used by the chain, if any
+    """
+    structured = graph.get_structured_schema
+    chain.graph_schema = construct_schema(
+        structured, [], [], bool(getattr(graph, "_enhanced_schema", False))
+    )
+    if chain.cypher_query_corrector is not None:
+        # Keep the corrector's class, e.g. a traced subclass
+        chain.cypher_query_corrector = type(chain.cypher_query_corrector)(
+            [Schema(el["start"], el["type"], el["end"]) for el in structured.get("relationships", [])]
+        )
+    if schema_pruner is not None:
+        schema_pruner.refresh(graph)
+
+
 def add_custom_examples(new_examples: list) -> list:
     """
     Allows dynamic addition of new examples for improved performance
@@ -0,0 +1,362 @@
+"""
+Streaming, paginated query results with a per-query memory cap
+"""
+
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import neo4j
+
+from src.columnar import ColumnarResult
+from src.cost_guard import is_write
+
+logger = logging.getLogger(__name__)
+
+TRAILING_PAGE = re.compile(r"(?:\s+SKIP\s+(\d+))?(?:\s+LIMIT\s+(\d+))?$", re.IGNORECASE)
+
+
+def estimate_row_bytes(row: Dict[str, Any]) -> int:
+    """Approximate in-memory size of a result row from its JSON length"""
+    return len(json.dumps(row, default=str))
+
+
+def _inner(query: str) -> str:
+    return query.strip().rstrip(";")
+
+
+def split_page(query: str) -> Tuple[str, int, Optional[int]]:
+    """
+    Split a read query into its statement and trailing literal SKIP/LIMIT
+
+    Args:
+        query: Cypher ending in RETURN, optionally ORDER BY, SKIP and LIMIT
+
+    Returns:
+        (statement without SKIP/LIMIT, skip, limit or None)
+
+    Raises:
+        ValueError: The query cannot be paged safely: it writes, is a UNION,
+            returns nothing or has a parameterized SKIP/LIMIT
+    """
+    statement = _inner(query).rstrip()
+    if is_write(statement):
+        raise ValueError("statement writes to the database")
+    if re.search(r"\bUNION\b", statement, re.IGNORECASE):
+        raise ValueError("UNION results have no single order")
+    if not re.search(r"\bRETURN\b", statement, re.IGNORECASE):
+        raise ValueError("statement returns no rows")
+    match = TRAILING_PAGE.search(statement)
+    statement, skip, limit = statement[:match.start()], match.group(1), match.group(2)
+    if re.search(r"\b(SKIP|LIMIT)\s+\S+$", statement, re.IGNORECASE):
+        raise ValueError("only literal SKIP and LIMIT can be paged")
+    return statement, int(skip or 0), int(limit) if limit else None
+
+
+def skip_limit_query(query: str) -> str:
+    """
+    Turn a read query into one page fetched with $skip and $limit
+
+    SKIP/LIMIT are appended to the statement itself, after its ORDER BY, so
+    pages follow the query's own order. A literal SKIP/LIMIT the query already
+    has is dropped; ResultPager folds it into $skip and $limit.
+
+    Args:
+        query: Cypher ending in RETURN
+
+    Returns:
+        Query taking $skip and $limit parameters
+
+    Raises:
+        ValueError: The query cannot be paged safely (see split_page)
+    """
+    return f"{split_page(query)[0]}\nSKIP $skip LIMIT $limit"
+
+
+def keyset_query(query: str, key: str) -> str:
+    """
+    Wrap a read query for keyset pagination on a returned column
+
+    Pages are ordered by the key and start after $after (null for the first
+    page), so deep pages cost the same as the first one when the key is indexed.
+
+    Args:
+        query: Cypher ending in RETURN
+        key: Returned column with unique, comparable values
+
+    Returns:
+        Query taking $after and $limit parameters
+    """
+    column = f"`{key.replace('`', '``')}`"
+    return (
+        f"CALL {{\n{_inner(query)}\n}}\n"
+        f"WITH * WHERE $after IS NULL OR {column} > $after\n"
+        f"RETURN * ORDER BY {column} LIMIT $limit"
+    )
+
+
+class ResultCursor:
+    """Lazily pulls records from an open session, fetch_size records at a time"""
+
+    def __init__(
+        self,
+        driver: Any,
+        query: str,
+        params: Optional[dict] = None,
+        database: Optional[str] = None,
+        fetch_size: int = 1000,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialize the cursor (the query runs on first fetch)
+
+        Args:
+            driver: neo4j.Driver to open the session on
+            query: Cypher statement
+            params: Query parameters
+            database: Database name
+            fetch_size: Records pulled from the server per round-trip
+            max_rows: Stop after this many rows
+            max_bytes: Stop once the estimated size of returned rows exceeds this
+            timeout: Transaction timeout in seconds
+            transform: Function applied to each row, e.g. value sanitizing
+            metadata: Transaction metadata, e.g. to find it for termination
+        """
+        self.driver = driver
+        self.query = query
+        self.params = params or {}
+        self.database = database
+        self.fetch_size = fetch_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.transform = transform
+        self.metadata = metadata
+        self.rows_read = 0
+        self.bytes_read = 0
+        self.truncated = False
+        self.exhausted = False
+        self._session: Optional[Any] = None
+        self._records: Optional[Iterator[Any]] = None
+
+    def _open(self):
+        self._session = self.driver.session(database=self.database, fetch_size=self.fetch_size)
+        try:
+            result = self._session.run(neo4j.Query(self.query, metadata=self.metadata, timeout=self.timeout), self.params)
+        except Exception:
+            self.close()
+            raise
+        self._records = iter(result)
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        if self.exhausted:
+            return None
+        if self.max_rows is not None and self.rows_read >= self.max_rows:
+            self.truncated = True
+            self.close()
+            return None
+        if self._records is None:
+            self._open()
+        record = next(self._records, None)
+        if record is None:
+            self.close()
+            return None
+        row = record.data()
+        if self.transform is not None:
+            row = self.transform(row)
+        self.rows_read += 1
+        if self.max_bytes is not None:
+            self.bytes_read += estimate_row_bytes(row)
+            if self.bytes_read > self.max_bytes:
+                logger.warning(f"Result truncated at {self.rows_read} rows by the {self.max_bytes} byte cap")
+                self.truncated = True
+                self.close()
+        return row
+
+    def fetch(self, n: int) -> List[Dict[str, Any]]:
+        """Return up to n further rows"""
+        rows = []
+        while len(rows) < n:
+            row = self._next()
+            if row is None:
+                break
+            rows.append(row)
+        return rows
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            row = self._next()
+            if row is None:
+                return
+            yield row
+
+    def __getitem__(self, item: slice) -> List[Dict[str, Any]]:
+        """
+        Support result[:n] as used by GraphCypherQAChain: only n rows are pulled
+        and the rest of the result is discarded server-side
+        """
+        if not isinstance(item, slice) or item.step not in (None, 1) or (item.start or 0) < 0:
+            raise TypeError("ResultCursor only supports forward slices like [:n]")
+        if item.stop is None:
+            rows = list(self)
+        else:
+            rows = self.fetch(item.stop)
+            self.close()
+        return rows[item.start or 0:]
+
+    @property
+    def has_more(self) -> bool:
+        return not self.exhausted
+
+    def close(self):
+        """Release the session; unread records are discarded"""
+        self.exhausted = True
+        self._records = None
+        session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def __enter__(self) -> "ResultCursor":
+        return self
+
+    def __exit__(self, *exc: Any):
+        self.close()
+
+
+class ResultPager:
+    """Holds the rows shown for one query and fetches further pages on demand"""
+
+    def __init__(
+        self,
+        graph: Any,
+        query: str,
+        rows: Optional[List[Dict[str, Any]]] = None,
+        page_size: int = 50,
+        max_rows: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+        key: Optional[str] = None,
+    ):
+        """
+        Initialize the pager
+
+        Args:
+            graph: Neo4jGraph (or compatible) used to fetch further pages
+            query: Cypher whose results are paged
+            rows: Rows already fetched, e.g. the chain's first page, as a list
+                or a ColumnarResult
+            page_size: Rows fetched per load_more()
+            max_rows: Hard cap on rows held for this query
+            max_bytes: Hard cap on the estimated size of rows held
+            key: Returned column for keyset pagination (rows must then be
+                ordered by it); skip/limit pagination when None
+
+        Statements that write, UNIONs and parameterized SKIP/LIMIT are never
+        re-run: only the rows given are held.
+        """
+        self.graph = graph
+        self.query = query
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.key = key
+        try:
+            _, self.offset, self.limit = split_page(query)
+            self.pageable = True
+        except ValueError as e:
+            logger.info(f"Result will not be paged: {str(e)}")
+            self.offset, self.limit, self.pageable = 0, None, False
+        # Columnar first pages stay columnar; later pages are appended zero-copy
+        self.rows: Any = ColumnarResult.from_rows([]) if isinstance(rows, ColumnarResult) else []
+        self.bytes = 0
+        self.truncated = False
+        self.has_more = True
+        if rows is not None:
+            self._extend(rows)
+            self.has_more = not self.truncated and len(rows) >= page_size
+        if not self.pageable or (self.limit is not None and len(self.rows) >= self.limit):
+            self.has_more = False
+
+    def _extend(self, rows: Any):
+        if isinstance(self.rows, ColumnarResult):
+            self._extend_columnar(rows)
+            return
+        for row in rows:
+            size = estimate_row_bytes(row)
+            if len(self.rows) >= self.max_rows or self.bytes + size > self.max_bytes:
+                self.truncated = True
+                self.has_more = False
+                return
+            self.rows.append(row)
+            self.bytes += size
+
+    def _extend_columnar(self, rows: Any):
+        page = rows if isinstance(rows, ColumnarResult) else ColumnarResult.from_rows(rows)
+        take = min(len(page), self.max_rows - len(self.rows))
+        if len(page):
+            take = min(take, int((self.max_bytes - self.bytes) // max(page.nbytes / len(page), 1)))
+        if take < len(page):
+            self.truncated = True
+            self.has_more = False
+        page = page[:max(take, 0)]
+        self.rows = ColumnarResult.concat([self.rows, page])
+        self.bytes += page.nbytes
+
+    def load_more(self) -> Any:
+        """
+        Fetch the next page
+
+        Returns:
+            Newly added rows (empty once the result or a cap is reached), in
+            the same form as rows
+        """
+        if not self.has_more:
+            return []
+        limit = min(self.page_size, self.max_rows - len(self.rows))
+        # One extra row tells whether another page exists, unless the query's
+        # own LIMIT ends the result first
+        fetch = limit + 1
+        if self.key is None:
+            if self.limit is not None:
+                fetch = min(fetch, self.limit - len(self.rows))
+            params = {"skip": self.offset + len(self.rows), "limit": fetch}
+            page = self.graph.query(skip_limit_query(self.query), params)
+        else:
+            after = self.rows[-1].get(self.key) if self.rows else None
+            page = self.graph.query(keyset_query(self.query, self.key), {"after": after, "limit": fetch})
+        before = len(self.rows)
+        self._extend(page[:limit])
+        if len(page) <= limit:
+            self.has_more = False
+        elif len(self.rows) >= self.max_rows:
+            self.truncated = True
+            self.has_more = False
+        return self.rows[before:]
+
+
+class LimitedGraph:
+    """Graph proxy whose query() streams only the first `limit` rows of a result"""
+
+    def __init__(self, graph: Any, limit: int):
+        """
+        Initialize the proxy
+
+        Args:
+            graph: Graph with a stream() method, e.g. PooledNeo4jGraph; other
+                graphs fall back to query() and are sliced afterwards
+            limit: Rows pulled per query, normally the chain's top_k
+        """
+        self._graph = graph
+        self.limit = limit
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._graph, name)
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        if hasattr(self._graph, "stream"):
+            return self._graph.stream(query, params, fetch_size=self.limit)[: self.limit]
+        return self._graph.query(query, params)[: self.limit]
@@ -0,0 +1,249 @@
+"""
+Question-relevant schema pruning for the Cypher generation prompt
+"""
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_neo4j.chains.graph_qa.cypher import construct_schema
+
+from src.example_store import estimate_tokens
+from src.stats import hide_stats_label
+
+logger = logging.getLogger(__name__)
+
+_NAME_PARTS = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_WORDS = re.compile(r"[A-Za-z]+")
+_SUFFIXES = ("ing", "ed", "er", "or")
+_IGNORED = frozenset("a an and the in on of to by for with from is are has have".split())
+
+
+def stem(word: str) -> str:
+    """
+    Reduce a word to a crude stem so that actors/acted/ACTED_IN meet
+
+    Args:
+        word: Single word
+
+    Returns:
+        Lowercased word with a common English suffix removed
+    """
+    word = word.lower()
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        word = word[:-1]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def name_terms(name: str) -> Set[str]:
+    """Stems of a schema name split on camelCase and underscores, plus the whole name"""
+    parts = {stem(p) for p in _NAME_PARTS.findall(name) if p.lower() not in _IGNORED}
+    parts.add(stem(name.replace("_", "")))
+    return parts
+
+
+class SchemaPruner:
+    """Indexes a structured graph schema and emits the part a question touches"""
+
+    def __init__(
+        self,
+        structured_schema: Optional[Dict[str, Any]] = None,
+        aliases: Optional[Dict[str, List[str]]] = None,
+        is_enhanced: bool = False,
+    ):
+        """
+        Initialize the pruner
+
+        Args:
+            structured_schema: Neo4jGraph.get_structured_schema output
+            aliases: Extra words mapped to labels or relationship types,
+                e.g. {"who": ["Person"], "film": ["Movie"]}
+            is_enhanced: Whether the schema carries enhanced statistics
+        """
+        self.aliases = {stem(k): v for k, v in (aliases or {}).items()}
+        self.is_enhanced = is_enhanced
+        self.requests = 0
+        self.pruned_requests = 0
+        self.tokens_full = 0
+        self.tokens_sent = 0
+        self.last_tokens_saved = 0
+        self._lock = threading.Lock()
+        self._schema: Dict[str, Any] = {"node_props": {}, "rel_props": {}, "relationships": []}
+        self._full_schema = ""
+        self._full_tokens = 0
+        self._terms: Dict[str, Set[Tuple[str, str, Optional[str]]]] = defaultdict(set)
+        self._neighbours: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        if structured_schema is not None:
+            self.load(structured_schema)
+
+    def refresh(self, graph: Any):
+        """Re-index from a graph's current structured schema"""
+        self.is_enhanced = bool(getattr(graph, "_enhanced_schema", self.is_enhanced))
+        self.load(graph.get_structured_schema)
+
+    def load(self, structured_schema: Dict[str, Any]):
+        """
+        Parse a structured schema into the term and adjacency indexes
+
+        Args:
+            structured_schema: Dict with node_props, rel_props and relationships
+        """
+        structured_schema = hide_stats_label(structured_schema)
+        terms: Dict[str, Set[Tuple[str, str, Optional[str]]]] = defaultdict(set)
+        neighbours: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        for label, props in structured_schema.get("node_props", {}).items():
+            for term in name_terms(label):
+                terms[term].add(("label", label, None))
+            for prop in props:
+                for term in name_terms(prop["property"]):
+                    terms[term].add(("node_prop", label, prop["property"]))
+        for rel_type, props in structured_schema.get("rel_props", {}).items():
+            for prop in props:
+                for term in name_terms(prop["property"]):
+                    terms[term].add(("rel_prop", rel_type, prop["property"]))
+        for rel in structured_schema.get("relationships", []):
+            for term in name_terms(rel["type"]):
+                terms[term].add(("rel", rel["type"], None))
+            neighbours[rel["start"]].append(rel)
+            if rel["end"] != rel["start"]:
+                neighbours[rel["end"]].append(rel)
+        for alias, targets in self.aliases.items():
+            for target in targets:
+                kind = "rel" if target.isupper() else "label"
+                terms[alias].add((kind, target, None))
+
+        full_schema = construct_schema(structured_schema, [], [], self.is_enhanced)
+        with self._lock:
+            self._schema = structured_schema
+            self._terms = terms
+            self._neighbours = neighbours
+            self._full_schema = full_schema
+            self._full_tokens = estimate_tokens(full_schema)
+
+    def select(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Compute the schema subgraph relevant to a question
+
+        Args:
+            question: Raw user question
+
+        Returns:
+            Structured schema subset, or None when nothing in the question matched
+        """
+        hits: Set[Tuple[str, str, Optional[str]]] = set()
+        for word in _WORDS.findall(question):
+            if word.lower() not in _IGNORED:
+                hits |= self._terms.get(stem(word), set())
+        if not hits:
+            return None
+
+        labels: Set[str] = set()
+        rel_types: Set[str] = set()
+        props: Set[Tuple[str, str]] = set()
+        for kind, owner, prop in hits:
+            if kind == "label":
+                labels.add(owner)
+            elif kind == "rel":
+                rel_types.add(owner)
+            else:
+                props.add((owner, prop))
+                (labels if kind == "node_prop" else rel_types).add(owner)
+
+        schema = self._schema
+        for rel in schema.get("relationships", []):
+            if rel["type"] in rel_types:
+                labels.update((rel["start"], rel["end"]))
+
+        # 1-hop neighbourhood: every relationship touching a selected label
+        touching = set()
+        for label in labels:
+            touching.update(id(rel) for rel in self._neighbours.get(label, []))
+        relationships = [rel for rel in schema.get("relationships", []) if id(rel) in touching]
+        neighbour_labels = {rel[end] for rel in relationships for end in ("start", "end")}
+
+        node_props = {}
+        for label, label_props in schema.get("node_props", {}).items():
+            if label in labels:
+                node_props[label] = label_props
+            elif label in neighbour_labels:
+                touched = [p for p in label_props if (label, p["property"]) in props]
+                if touched:
+                    node_props[label] = touched
+        rel_props = {
+            rel_type: type_props
+            for rel_type, type_props in schema.get("rel_props", {}).items()
+            if rel_type in rel_types or any(rel_type == r["type"] for r in relationships)
+        }
+        return {"node_props": node_props, "rel_props": rel_props, "relationships": relationships}
+
+    def prune(self, question: str) -> str:
+        """
+        Build the schema text to place in the prompt for a question
+
+        Args:
+            question: Raw user question
+
+        Returns:
+            Pruned schema string, or the full schema if nothing matched
+        """
+        subset = self.select(question)
+        schema = self._full_schema if subset is None else construct_schema(subset, [], [], self.is_enhanced)
+        sent = estimate_tokens(schema)
+        with self._lock:
+            self.requests += 1
+            self.pruned_requests += subset is not None
+            self.tokens_full += self._full_tokens
+            self.tokens_sent += sent
+            self.last_tokens_saved = self._full_tokens - sent
+        logger.debug(f"Schema pruning saved {self.last_tokens_saved} prompt tokens")
+        return schema
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get pruning metrics
+
+        Returns:
+            Dictionary with request counts and prompt tokens saved
+        """
+        saved = self.tokens_full - self.tokens_sent
+        return {
+            "requests": self.requests,
+            "pruned_requests": self.pruned_requests,
+            "full_schema_tokens": self._full_tokens,
+            "tokens_saved": saved,
+            "avg_tokens_saved": saved / self.requests if self.requests else 0.0,
+            "last_tokens_saved": self.last_tokens_saved,
+        }
+
+    def wrap(self, generator: Runnable) -> "PrunedSchemaGeneration":
+        """
+        Feed the pruned schema to a Cypher generation runnable
+
+        Args:
+            generator: The prompt | llm | parser runnable of the chain
+
+        Returns:
+            Runnable that swaps the schema input before calling the generator
+        """
+        return PrunedSchemaGeneration(generator, self)
+
+
+class PrunedSchemaGeneration(Runnable):
+    """Runnable that replaces the full schema input with the pruned one"""
+
+    def __init__(self, generator: Runnable, pruner: SchemaPruner):
+        self.generator = generator
+        self.pruner = pruner
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        pruned = dict(input, schema=self.pruner.prune(input["question"]))
+        return self.generator.invoke(pruned, config, **kwargs)
@@ -0,0 +1,207 @@
+"""
+Persistent, versioned schema snapshots with cheap change detection
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.cache import hash_text
+from src.stats import STATS_LABEL
+
+logger = logging.getLogger(__name__)
+
+# Token-store lookups only: no node or relationship scans, unlike the
+# APOC/meta introspection behind Neo4jGraph.refresh_schema().
+FINGERPRINT_QUERY = """
+CALL { CALL db.labels() YIELD label RETURN collect(label) AS labels }
+CALL { CALL db.relationshipTypes() YIELD relationshipType RETURN collect(relationshipType) AS rel_types }
+CALL { CALL db.propertyKeys() YIELD propertyKey RETURN collect(propertyKey) AS property_keys }
+RETURN labels, rel_types, property_keys
+"""
+
+
+class SchemaSnapshot:
+    """Schema kept on disk with a fingerprint and refreshed only when the graph changed"""
+
+    def __init__(self, path: str, source: str = "", check_interval: float = 300.0):
+        """
+        Initialize the snapshot
+
+        Args:
+            path: JSON file the snapshot is persisted to
+            source: Identifier of the database (e.g. URI and name); a snapshot
+                taken from a different source is ignored
+            check_interval: Seconds between background change checks
+        """
+        self.path = path
+        self.source = source
+        self.check_interval = check_interval
+        self.fingerprint: Optional[str] = None
+        self.schema: Optional[str] = None
+        self.structured_schema: Optional[Dict[str, Any]] = None
+        self.saved_at: Optional[float] = None
+        self.checks = 0
+        self.refreshes = 0
+        self._listeners: List[Callable[[Any], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self) -> bool:
+        """
+        Read the snapshot from disk
+
+        Returns:
+            True if a snapshot for this source was loaded, False otherwise
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("source") != self.source:
+            logger.info(f"Ignoring schema snapshot taken from another database: {self.path}")
+            return False
+        self.fingerprint = data["fingerprint"]
+        self.schema = data["schema"]
+        self.structured_schema = data["structured_schema"]
+        self.saved_at = data.get("saved_at")
+        return True
+
+    def save(self):
+        """Write the snapshot to disk atomically"""
+        self.saved_at = time.time()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "source": self.source,
+                    "fingerprint": self.fingerprint,
+                    "saved_at": self.saved_at,
+                    "schema": self.schema,
+                    "structured_schema": self.structured_schema,
+                },
+                f,
+                default=str,
+            )
+        os.replace(tmp_path, self.path)
+
+    def fetch_fingerprint(self, graph: Any) -> str:
+        """
+        Compute the current schema fingerprint of a graph
+
+        Args:
+            graph: Neo4jGraph (or compatible) instance
+
+        Returns:
+            Hash of the sorted label, relationship type and property key lists,
+            without the (:GraphStats) label
+        """
+        result = graph.query(FINGERPRINT_QUERY)
+        row = dict(result[0]) if result else {}
+        # Creating the counters node is not a schema change worth a refresh
+        row["labels"] = [label for label in row.get("labels") or [] if label != STATS_LABEL]
+        payload = json.dumps(
+            [sorted(row.get(k) or []) for k in ("labels", "rel_types", "property_keys")]
+        )
+        return hash_text(payload)
+
+    def apply(self, graph: Any):
+        """Install the snapshot on a graph without running introspection queries"""
+        graph.structured_schema = self.structured_schema
+        graph.schema = self.schema
+
+    def attach(self, graph: Any):
+        """
+        Give a graph its schema, from disk when possible
+
+        Args:
+            graph: Neo4jGraph created with refresh_schema=False
+        """
+        with self._lock:
+            if self.structured_schema is None and not self.load():
+                self._refresh(graph, self.fetch_fingerprint(graph))
+                return
+            self.apply(graph)
+        logger.info("Schema loaded from snapshot")
+
+    def refresh(self, graph: Any):
+        """Force a full schema refresh and persist the result"""
+        with self._lock:
+            self._refresh(graph, self.fetch_fingerprint(graph))
+
+    def _refresh(self, graph: Any, fingerprint: str):
+        graph.refresh_schema()
+        self.fingerprint = fingerprint
+        self.schema = graph.schema
+        self.structured_schema = graph.structured_schema
+        self.refreshes += 1
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning(f"Failed to persist schema snapshot: {str(e)}")
+        logger.info("Schema refreshed and snapshot updated")
+        for listener in list(self._listeners):
+            listener(graph)
+
+    def check(self, graph: Any) -> bool:
+        """
+        Refresh the schema only if the graph's fingerprint changed
+
+        Args:
+            graph: Neo4jGraph (or compatible) instance
+
+        Returns:
+            True if a refresh happened, False otherwise
+        """
+        fingerprint = self.fetch_fingerprint(graph)
+        with self._lock:
+            self.checks += 1
+            if fingerprint == self.fingerprint:
+                return False
+            self._refresh(graph, fingerprint)
+            return True
+
+    def add_listener(self, listener: Callable[[Any], None]):
+        """Register a callback run with the graph after every refresh"""
+        self._listeners.append(listener)
+
+    def start(self, graph: Any) -> threading.Thread:
+        """
+        Check for schema changes in a background thread
+
+        The first check runs immediately, so a stale snapshot served at
+        startup is corrected without blocking the caller.
+
+        Args:
+            graph: Neo4jGraph (or compatible) instance
+
+        Returns:
+            The daemon thread running the checks
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.check(graph)
+                except Exception as e:
+                    logger.warning(f"Schema change check failed: {str(e)}")
+                self._stop.wait(self.check_interval)
+
+        self._thread = threading.Thread(target=run, name="schema-snapshot", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Stop the background checks"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
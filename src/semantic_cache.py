@@ -0,0 +1,284 @@
+"""
+Semantic near-duplicate cache for generated Cypher
+"""
+
+import logging
+import re
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.runnables import Runnable
+
+from src.cache import CachedCypherGeneration, hash_text, normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Names, titles and numbers decide which rows a query returns, so two
+# questions may only share Cypher when these tokens agree exactly.
+_ENTITY = re.compile(r"'[^']+'|\"[^\"]+\"|\b\d+(?:\.\d+)?\b|(?<!^)(?<![.?!]\s)\b[A-Z][\w']*")
+
+# Phrasings that ask for the same thing are folded together before embedding,
+# and filler words are dropped so they do not dominate short questions.
+_CANONICAL_PHRASES = [
+    (re.compile(r"\b(how many|number of|total number of|count of)\b"), "count"),
+    (re.compile(r"\b(which|what are|show me|show|find|give me|list all|list)\b"), "list"),
+    (re.compile(r"\b(films?)\b"), "movies"),
+    (re.compile(r"\b(actors|actresses|artists|cast)\b"), "actors"),
+]
+_STOPWORDS = frozenset(
+    "a an the is are was were there in on of to do does did exist exists "
+    "database db all me please".split()
+)
+
+
+def extract_entities(question: str) -> frozenset:
+    """
+    Pull out the literal-bearing tokens of a question
+
+    Args:
+        question: Raw user question
+
+    Returns:
+        Set of quoted strings, numbers and capitalized words (lowercased)
+    """
+    return frozenset(m.strip("'\"").lower() for m in _ENTITY.findall(question.strip()))
+
+
+class HashedEmbedder:
+    """Offline question embedding from hashed word and character n-grams"""
+
+    def __init__(self, dim: int = 128, char_ngram: int = 3, word_weight: float = 2.0):
+        """
+        Initialize the embedder
+
+        Args:
+            dim: Size of the embedding vector
+            char_ngram: Length of the character n-grams
+            word_weight: Weight of word unigrams/bigrams relative to char n-grams
+        """
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.word_weight = word_weight
+
+    def canonicalize(self, question: str) -> str:
+        """Normalize a question and fold common phrasings together"""
+        text = normalize_question(question)
+        for pattern, replacement in _CANONICAL_PHRASES:
+            text = pattern.sub(replacement, text)
+        words = [w for w in text.split() if w not in _STOPWORDS]
+        return " ".join(w for i, w in enumerate(words) if i == 0 or w != words[i - 1])
+
+    def features(self, text: str) -> List[str]:
+        """Return the n-gram features of a canonicalized question"""
+        words = text.split()
+        feats = [f"w:{w}" for w in words]
+        feats += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {text} "
+        n = self.char_ngram
+        feats += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return feats
+
+    def embed(self, question: str) -> np.ndarray:
+        """
+        Embed a question
+
+        Args:
+            question: Raw user question
+
+        Returns:
+            L2-normalized float32 vector of length dim
+        """
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self.features(self.canonicalize(question)):
+            h = zlib.crc32(feat.encode("utf-8"))
+            weight = self.word_weight if feat[0] != "c" else 1.0
+            vec[h % self.dim] += weight if (h >> 31) & 1 else -weight
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+
+class _Bucket:
+    """Entries sharing one entity set, with their vectors in one contiguous matrix"""
+
+    __slots__ = ("vectors", "rows")
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((1, dim), dtype=np.float32)
+        self.rows: List[int] = []
+
+    def view(self) -> np.ndarray:
+        """The filled part of the matrix, a view rather than a copy"""
+        return self.vectors[: len(self.rows)]
+
+    def append(self, row: int, vec: np.ndarray) -> int:
+        """Add an entry and return its position in the bucket"""
+        position = len(self.rows)
+        if position == len(self.vectors):
+            grown = np.zeros((2 * position, self.vectors.shape[1]), dtype=np.float32)
+            grown[:position] = self.vectors
+            self.vectors = grown
+        self.vectors[position] = vec
+        self.rows.append(row)
+        return position
+
+    def remove(self, position: int) -> Optional[int]:
+        """Remove the entry at a position, returning the row moved into it, if any"""
+        last = len(self.rows) - 1
+        moved = self.rows.pop()
+        if position == last:
+            return None
+        self.vectors[position] = self.vectors[last]
+        self.rows[position] = moved
+        return moved
+
+
+class SemanticCypherCache:
+    """Bounded cache that reuses Cypher for questions that embed close together"""
+
+    # A hit needs the same entity set, so entries are bucketed by it and a
+    # lookup scores only its own bucket with one matvec over a contiguous
+    # matrix. Questions without names or numbers share one bucket, which is
+    # the worst case: as many rows as such entries, and never a copy.
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        threshold: float = 0.9,
+        embedder: Optional[HashedEmbedder] = None,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            capacity: Maximum number of stored questions (bounds memory use)
+            threshold: Minimum cosine similarity for a hit
+            embedder: Embedding used for questions, defaults to HashedEmbedder()
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.embedder = embedder or HashedEmbedder()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rows_scored = 0
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._cypher: List[Optional[str]] = [None] * capacity
+        self._entities: List[frozenset] = [frozenset()] * capacity
+        self._buckets: Dict[frozenset, _Bucket] = {}
+        self._position: List[int] = [0] * capacity
+        self._count = 0
+        self._clock = 0
+        self._namespace: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _check_namespace(self, schema: str, prompt_version: str):
+        """Reset when the schema or prompt changes, as stored Cypher is then stale"""
+        namespace = hash_text(f"{hash_text(schema)}\x00{prompt_version}")
+        if namespace != self._namespace:
+            if self._count:
+                logger.info(f"Schema or prompt changed, dropping {self._count} semantic cache entries")
+            self._cypher = [None] * self.capacity
+            self._entities = [frozenset()] * self.capacity
+            self._buckets = {}
+            self._count = 0
+            self._namespace = namespace
+
+    def get(self, question: str, schema: str, prompt_version: str) -> Optional[str]:
+        """
+        Find Cypher stored for a semantically equivalent question
+
+        Returns:
+            The stored Cypher, or None if nothing passes the threshold
+        """
+        vec = self.embedder.embed(question)
+        entities = extract_entities(question)
+        with self._lock:
+            self._check_namespace(schema, prompt_version)
+            bucket = self._buckets.get(entities)
+            if bucket is not None:
+                scores = bucket.view() @ vec
+                self.rows_scored += len(scores)
+                index = int(np.argmax(scores))
+                best = bucket.rows[index]
+                if scores[index] >= self.threshold:
+                    self._clock += 1
+                    self._last_used[best] = self._clock
+                    self.hits += 1
+                    return self._cypher[best]
+            self.misses += 1
+            return None
+
+    def put(self, question: str, schema: str, prompt_version: str, cypher: str):
+        """Store Cypher for a question, evicting the least recently used entry when full"""
+        vec = self.embedder.embed(question)
+        entities = extract_entities(question)
+        with self._lock:
+            self._check_namespace(schema, prompt_version)
+            if self._count < self.capacity:
+                row = self._count
+                self._count += 1
+            else:
+                row = int(np.argmin(self._last_used))
+                self._unlink(row)
+                self.evictions += 1
+            self._clock += 1
+            self._last_used[row] = self._clock
+            self._cypher[row] = cypher
+            self._entities[row] = entities
+            bucket = self._buckets.get(entities)
+            if bucket is None:
+                bucket = self._buckets[entities] = _Bucket(self.embedder.dim)
+            self._position[row] = bucket.append(row, vec)
+
+    def _unlink(self, row: int):
+        """Take a row out of its entity bucket"""
+        bucket = self._buckets[self._entities[row]]
+        moved = bucket.remove(self._position[row])
+        if moved is not None:
+            self._position[moved] = self._position[row]
+        if not bucket.rows:
+            del self._buckets[self._entities[row]]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with size, entity buckets, rows scored, hits, misses,
+            evictions and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": self._count,
+            "buckets": len(self._buckets),
+            "rows_scored": self.rows_scored,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def wrap(
+        self,
+        generator: Runnable,
+        schema_source: Callable[[], str],
+        prompt_version: Union[str, Callable[[], str]],
+    ) -> CachedCypherGeneration:
+        """
+        Put this cache in front of a Cypher generation runnable
+
+        Args:
+            generator: The prompt | llm | parser runnable of the chain
+            schema_source: Callable returning the current graph schema
+            prompt_version: Fingerprint of the prompt template and examples, or a
+                callable returning it on each lookup
+
+        Returns:
+            Runnable that serves near-duplicate hits and falls back to the generator
+        """
+        return CachedCypherGeneration(generator, self, schema_source, prompt_version)
@@ -0,0 +1,309 @@
+"""
+Headless HTTP/JSON query service with in-flight request coalescing
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.cache import normalize_question
+from src.deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(RuntimeError):
+    """Raised when the work queue is full"""
+
+
+def _rows(result: Any) -> Any:
+    return result.to_pylist() if hasattr(result, "to_pylist") else result
+
+
+def chain_answerer(
+    chain: Any,
+    tracer: Optional[Any] = None,
+    deadline_factory: Optional[Callable[[], Deadline]] = None,
+) -> Callable[[str], Dict[str, Any]]:
+    """
+    Build the function answering one question through a create_qa_chain chain
+
+    Args:
+        chain: Chain built with return_intermediate_steps=True
+        tracer: Tracer the chain was instrumented with; adds a latency breakdown
+        deadline_factory: Called per question for a Deadline, e.g. get_query_deadline
+
+    Returns:
+        Function mapping a question to a JSON-serializable payload
+    """
+    def answer(question: str) -> Dict[str, Any]:
+        deadline = deadline_factory() if deadline_factory is not None else None
+        with deadline.scope() if deadline is not None else nullcontext():
+            if tracer is not None:
+                result, trace = tracer.invoke(chain, question)
+                breakdown = trace.breakdown()
+            else:
+                result, breakdown = chain.invoke({"query": question}), None
+        steps = result.get("intermediate_steps") or []
+        return {
+            "question": question,
+            "cypher": steps[0].get("query") if steps else None,
+            "result": _rows(result.get("result")),
+            "trace": breakdown,
+        }
+
+    return answer
+
+
+class QueryService:
+    """Bounded worker pool answering questions, one execution per distinct in-flight question"""
+
+    def __init__(
+        self,
+        answer: Callable[[str], Dict[str, Any]],
+        workers: int = 8,
+        queue_size: int = 64,
+        timeout: float = 60.0,
+    ):
+        """
+        Initialize the service
+
+        Args:
+            answer: Function answering one question, e.g. chain_answerer(chain)
+            workers: Questions answered concurrently
+            queue_size: Distinct questions waiting beyond the busy workers
+                before new ones are refused
+            timeout: Seconds a request waits for its answer
+        """
+        self.answer = answer
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa-worker")
+
+    def submit(self, question: str) -> Tuple[Future, bool]:
+        """
+        Start answering a question, or join the identical one already running
+
+        Returns:
+            (future, coalesced)
+
+        Raises:
+            Overloaded: Every worker is busy and the queue is full
+        """
+        key = normalize_question(question)
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, True
+            if not self._slots.acquire(blocking=False):
+                self.rejected += 1
+                raise Overloaded("Query queue is full")
+            self.executions += 1
+            future = self._executor.submit(self._run, key, question)
+            self._inflight[key] = future
+        return future, False
+
+    def _run(self, key: str, question: str) -> Dict[str, Any]:
+        try:
+            return self.answer(question)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            self._slots.release()
+
+    def ask(self, question: str) -> Dict[str, Any]:
+        """
+        Answer a question
+
+        Raises:
+            Overloaded: The queue is full
+            TimeoutError: No answer within timeout
+        """
+        future, coalesced = self.submit(question)
+        try:
+            payload = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"No answer within {self.timeout:.0f}s")
+        return dict(payload, coalesced=coalesced)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "inflight": len(self._inflight),
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def serve(
+    service: QueryService,
+    port: int,
+    host: str = "0.0.0.0",
+    metrics: Optional[Any] = None,
+    keepalive: float = 30.0,
+    background: bool = True,
+) -> ThreadingHTTPServer:
+    """
+    Serve POST /query, GET /health and (with metrics) GET /metrics
+
+    POST /query takes {"question": "..."} and returns the answer payload;
+    429 with Retry-After when the queue is full, 504 on timeout. Connections
+    are kept alive between requests.
+
+    Args:
+        service: QueryService answering the questions
+        port: Port to listen on (0 picks a free one)
+        host: Interface to bind
+        metrics: Optional tracing Metrics rendered at /metrics
+        keepalive: Idle seconds before a kept-alive connection is closed
+        background: Serve from a daemon thread instead of blocking
+
+    Returns:
+        The server; call shutdown() to stop it
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = keepalive
+
+        def _send(self, status: int, payload: Any, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/health":
+                self._send(200, {"status": "ok", **service.stats()})
+            elif path == "/metrics" and metrics is not None:
+                self._send(200, metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/query":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                question = json.loads(self.rfile.read(length) or b"{}").get("question")
+            except (ValueError, AttributeError):
+                question = None
+            if not isinstance(question, str) or not question.strip():
+                self._send(400, {"error": "body must be JSON with a non-empty 'question'"})
+                return
+            try:
+                self._send(200, service.ask(question))
+            except Overloaded as e:
+                self._send(429, {"error": str(e)}, headers={"Retry-After": "1"})
+            except (TimeoutError, DeadlineExceeded) as e:
+                self._send(504, {"error": str(e)})
+            except Exception as e:
+                logger.error(f"Query failed: {str(e)}")
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    logger.info(f"Serving queries on {host}:{server.server_address[1]}")
+    if background:
+        threading.Thread(target=server.serve_forever, name="qa-server", daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m src.server --port 8080"""
+    import argparse
+
+    from config import (
+        get_cost_guard, get_cypher_cache, get_llm, get_parameterizer, get_query_deadline,
+        get_result_limits, get_schema_snapshot, get_semantic_cache, get_template_matcher,
+        get_tracer, setup_environment,
+    )
+    from src.database import Neo4jDatabase
+    from src.query_chain import create_example_store, create_qa_chain
+    from src.schema_pruning import SchemaPruner
+
+    parser = argparse.ArgumentParser(description="Serve natural language questions over HTTP")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", "8")))
+    parser.add_argument("--queue", type=int, default=int(os.getenv("SERVER_QUEUE", "64")))
+    parser.add_argument("--timeout", type=float, default=float(os.getenv("SERVER_TIMEOUT", "60")))
+    args = parser.parse_args(argv)
+
+    uri, username, password, _ = setup_environment()
+    database_name = os.getenv("NEO4J_DATABASE", "neo4j")
+    snapshot = get_schema_snapshot(uri, database_name)
+    database = Neo4jDatabase(uri, username, password, schema_snapshot=snapshot, database=database_name)
+    if not database.connect():
+        return 1
+
+    tracer = get_tracer()
+    chain = create_qa_chain(
+        database.graph, get_llm(),
+        verbose=False,
+        cache=get_cypher_cache(),
+        semantic_cache=get_semantic_cache(),
+        example_store=create_example_store(),
+        schema_pruner=SchemaPruner(),
+        schema_snapshot=snapshot,
+        return_intermediate_steps=True,
+        top_k=get_result_limits()["page_size"],
+        stream_results=True,
+        columnar=True,
+        cost_guard=get_cost_guard(),
+        parameterizer=get_parameterizer(),
+        template_matcher=get_template_matcher(),
+        enforce_deadlines=True,
+    )
+    tracer.instrument(chain)
+    service = QueryService(
+        chain_answerer(chain, tracer, get_query_deadline),
+        workers=args.workers,
+        queue_size=args.queue,
+        timeout=args.timeout,
+    )
+    tracer.metrics.add_gauges("qa_server", service.stats)
+    try:
+        serve(service, args.port, args.host, metrics=tracer.metrics, background=False)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
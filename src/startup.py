@@ -0,0 +1,295 @@
+"""
+Process start-up: import profiling, boot-time warm-up of the shared chain and readiness probes
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def import_profile(target: str, top: int = 20) -> List[Dict[str, Any]]:
+    """
+    Measure what importing a module costs, per imported module
+
+    Runs a fresh interpreter with -X importtime so nothing is cached.
+
+    Args:
+        target: Module to import, e.g. 'src.query_chain'
+        top: Entries returned
+
+    Returns:
+        Dicts with module, self_ms and cumulative_ms, most expensive first
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, cwd=os.path.dirname(APP_PATH),
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        entries.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    entries.sort(key=lambda e: -e["cumulative_ms"])
+    return entries[:top]
+
+
+class Resources:
+    """The process-wide objects every session shares"""
+
+    def __init__(self, graph: Any, chain: Any, tracer: Any, recorder: Optional[Any] = None):
+        self.graph = graph
+        self.chain = chain
+        self.tracer = tracer
+        self.recorder = recorder
+
+
+class Warmup:
+    """Builds the shared resources once in the background and reports readiness"""
+
+    def __init__(self, build: Optional[Callable[["Warmup"], Any]] = None):
+        """
+        Initialize the warm-up
+
+        Args:
+            build: Function building the resources; it may time its steps with
+                step(). Defaults to build_resources
+        """
+        self.build = build or build_resources
+        self.state = "idle"
+        self.error: Optional[BaseException] = None
+        self.steps: Dict[str, float] = {}
+        self.result: Any = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Time one warm-up step"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round(time.perf_counter() - start, 3)
+
+    def start(self) -> "Warmup":
+        """Start building in a daemon thread; later calls do nothing"""
+        with self._lock:
+            if self.state != "idle":
+                return self
+            self.state = "warming"
+            self.started_at = time.time()
+        threading.Thread(target=self._run, name="qa-warmup", daemon=True).start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.result = self.build(self)
+            self.state = "ready"
+            logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s: {self.steps}")
+        except BaseException as e:
+            self.error = e
+            self.state = "failed"
+            logger.error(f"Warm-up failed: {str(e)}")
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Block until the resources are built, starting the build if needed
+
+        Raises:
+            TimeoutError: Still warming after timeout
+            Exception: Whatever the build raised
+        """
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError("Warm-up still in progress")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "steps": dict(self.steps),
+            "error": str(self.error) if self.error else None,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+        }
+
+
+def build_resources(warmup: Warmup) -> Resources:
+    """
+    Build the driver pool, LLM client, chain and tracer, then ping both backends
+
+    The first question then pays for neither imports, connection set-up,
+    schema loading nor the first TLS handshake with the LLM provider.
+    """
+    with warmup.step("imports"):
+        from config import (
+            get_cost_guard, get_cypher_cache, get_llm, get_neo4j_manager, get_parameterizer,
+            get_result_limits, get_schema_snapshot, get_semantic_cache, get_template_matcher,
+            get_tracer, get_traffic_recorder, setup_environment, _get_secret,
+        )
+        from src.query_chain import create_example_store, create_qa_chain
+        from src.schema_pruning import SchemaPruner
+
+    neo4j_uri, neo4j_username, neo4j_password, _ = setup_environment()
+    neo4j_database = _get_secret("NEO4J_DATABASE") or os.getenv("NEO4J_DATABASE") or "neo4j"
+    with warmup.step("database"):
+        manager = get_neo4j_manager(neo4j_uri, neo4j_username, neo4j_password, neo4j_database)
+        graph = manager.graph(refresh_schema=False)
+        graph.query("RETURN 1 AS ok")
+    with warmup.step("llm"):
+        llm = get_llm()
+        if (_get_secret("WARMUP_LLM_PING") or "true").lower() not in ("0", "false", "no"):
+            try:
+                llm.invoke("Reply with OK.", stop=["\n"])
+            except Exception as e:
+                logger.warning(f"LLM warm-up ping failed: {str(e)}")
+
+    with warmup.step("chain"):
+        tracer = get_tracer()
+        snapshot = get_schema_snapshot(neo4j_uri, neo4j_database)
+        parameterizer = get_parameterizer()
+        template_matcher = get_template_matcher()
+        chain = create_qa_chain(
+            graph, llm,
+            cache=get_cypher_cache(),
+            semantic_cache=get_semantic_cache(),
+            example_store=create_example_store(),
+            schema_pruner=SchemaPruner(),
+            schema_snapshot=snapshot,
+            return_intermediate_steps=True,
+            top_k=get_result_limits()["page_size"],
+            stream_results=True,
+            columnar=True,
+            cost_guard=get_cost_guard(),
+            parameterizer=parameterizer,
+            template_matcher=template_matcher,
+            enforce_deadlines=True,
+        )
+        tracer.instrument(chain)
+        if parameterizer is not None:
+            tracer.metrics.add_gauges("qa_plan_cache", parameterizer.stats)
+        if template_matcher is not None:
+            tracer.metrics.add_gauges("qa_template", template_matcher.stats)
+        recorder = get_traffic_recorder()
+        if recorder is not None:
+            tracer.metrics.add_gauges("qa_traffic", recorder.stats)
+        snapshot.start(graph)
+    return Resources(graph, chain, tracer, recorder)
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def boot(build: Optional[Callable[[Warmup], Any]] = None) -> Warmup:
+    """
+    The process-wide warm-up, started on first call
+
+    A failed warm-up is replaced, so the next call retries the build.
+
+    Args:
+        build: Build function used if this call creates the warm-up
+
+    Returns:
+        The running or finished Warmup
+    """
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None or _warmup.state == "failed":
+            _warmup = Warmup(build)
+        return _warmup.start()
+
+
+def serve_probes(warmup: Warmup, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve /live (process up), /ready (200 once warm, else 503) and /startup (warm-up status)
+
+    Args:
+        warmup: Warm-up whose state is reported
+        port: Port to listen on (0 picks a free one)
+        host: Interface to bind
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/live":
+                status, payload = 200, {"status": "ok"}
+            elif path == "/ready":
+                status, payload = (200 if warmup.ready else 503), {"ready": warmup.ready, "state": warmup.state}
+            elif path == "/startup":
+                status, payload = 200, warmup.status()
+            else:
+                status, payload = 404, {"error": "not found"}
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="qa-probes", daemon=True).start()
+    logger.info(f"Serving readiness probes on {host}:{server.server_address[1]}")
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    python -m src.startup [streamlit options]: start the warm-up and probes,
+    then run the Streamlit app in this process so it finds the chain built.
+    python -m src.startup --profile-imports src.query_chain: import cost report.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Start the app with a pre-warmed chain")
+    parser.add_argument("--profile-imports", metavar="MODULE", help="Print the import cost of MODULE and exit")
+    parser.add_argument("--probe-port", type=int, default=int(os.getenv("READINESS_PORT", "8502")))
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    if args.profile_imports:
+        print(json.dumps(import_profile(args.profile_imports), indent=2))
+        return 0
+
+    serve_probes(boot(), args.probe_port)
+    from streamlit.web import cli as streamlit_cli
+    sys.argv = ["streamlit", "run", APP_PATH, *streamlit_args]
+    return streamlit_cli.main()
+
+
+if __name__ == "__main__":
+    # Streamlit runs app.py in this process and it imports src.startup by
+    # name; without the alias it would get a second module with its own
+    # warm-up, and the probes would report one the app never uses
+    sys.modules["src.startup"] = sys.modules[__name__]
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+"""
+Batched, cached database statistics
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAT_KEYS = ("movies", "actors", "directors", "genres")
+
+# Label of the counters node; bookkeeping, not movie data to generate Cypher for
+STATS_LABEL = "GraphStats"
+
+# One round-trip. Label counts come from the count store; the people counts
+# use EXISTS degree checks per Person instead of scanning every relationship
+# for count(DISTINCT p).
+STATS_QUERY = """
+CALL { MATCH (m:Movie) RETURN count(m) AS movies }
+CALL { MATCH (p:Person) WHERE EXISTS { (p)-[:ACTED_IN]->() } RETURN count(p) AS actors }
+CALL { MATCH (p:Person) WHERE EXISTS { (p)-[:DIRECTED]->() } RETURN count(p) AS directors }
+CALL { MATCH (g:Genre) RETURN count(g) AS genres }
+RETURN movies, actors, directors, genres
+"""
+
+COUNTERS_READ_QUERY = """
+MATCH (s:GraphStats {key: $key})
+RETURN s.movies AS movies, s.actors AS actors, s.directors AS directors, s.genres AS genres
+"""
+
+COUNTERS_WRITE_QUERY = """
+MERGE (s:GraphStats {key: $key})
+SET s.movies = $movies, s.actors = $actors, s.directors = $directors, s.genres = $genres
+"""
+
+COUNTERS_INCREMENT_QUERY = """
+MATCH (s:GraphStats {key: $key})
+SET s.movies = coalesce(s.movies, 0) + $movies,
+    s.actors = coalesce(s.actors, 0) + $actors,
+    s.directors = coalesce(s.directors, 0) + $directors,
+    s.genres = coalesce(s.genres, 0) + $genres
+RETURN s.movies AS movies, s.actors AS actors, s.directors AS directors, s.genres AS genres
+"""
+
+
+def hide_stats_label(structured_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drop the counters node label from a structured schema
+
+    Args:
+        structured_schema: Dict with node_props, rel_props and relationships
+
+    Returns:
+        Copy of the schema without the (:GraphStats) label
+    """
+    schema = dict(structured_schema)
+    schema["node_props"] = {
+        label: props for label, props in structured_schema.get("node_props", {}).items() if label != STATS_LABEL
+    }
+    schema["relationships"] = [
+        rel for rel in structured_schema.get("relationships", [])
+        if STATS_LABEL not in (rel.get("start"), rel.get("end"))
+    ]
+    return schema
+
+
+class GraphStats:
+    """Movie graph statistics collected in one query and cached with a TTL"""
+
+    def __init__(self, graph: Any, ttl: float = 30.0, counters: bool = False, key: str = "graph"):
+        """
+        Initialize the stats collector
+
+        Args:
+            graph: Neo4jGraph (or compatible) instance
+            ttl: Seconds a collected result is served from cache
+            counters: Read maintained counters from a (:GraphStats) node instead
+                of counting; loaders keep it current via apply_delta/recount
+            key: Key of the (:GraphStats) node
+        """
+        self.graph = graph
+        self.ttl = ttl
+        self.counters = counters
+        self.key = key
+        self.queries = 0
+        self._cached: Optional[Dict[str, int]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row(result: list) -> Optional[Dict[str, int]]:
+        if not result or any(result[0].get(k) is None for k in STAT_KEYS):
+            return None
+        return {k: int(result[0][k]) for k in STAT_KEYS}
+
+    def _count(self) -> Dict[str, int]:
+        self.queries += 1
+        return self._row(self.graph.query(STATS_QUERY)) or dict.fromkeys(STAT_KEYS, 0)
+
+    def _store(self, stats: Dict[str, int]) -> Dict[str, int]:
+        self._cached = stats
+        self._expires_at = time.time() + self.ttl
+        return dict(stats)
+
+    def get(self, refresh: bool = False) -> Dict[str, int]:
+        """
+        Get database statistics
+
+        Args:
+            refresh: Bypass the cache
+
+        Returns:
+            Dictionary with movie, actor, director and genre counts
+        """
+        with self._lock:
+            if not refresh and self._cached is not None and time.time() < self._expires_at:
+                return dict(self._cached)
+            if self.counters:
+                self.queries += 1
+                stats = self._row(self.graph.query(COUNTERS_READ_QUERY, {"key": self.key}))
+                if stats is None:
+                    stats = self._count()
+                    self.graph.query(COUNTERS_WRITE_QUERY, {"key": self.key, **stats})
+                return self._store(stats)
+            return self._store(self._count())
+
+    def recount(self) -> Dict[str, int]:
+        """Count from scratch and, in counters mode, overwrite the stored counters"""
+        with self._lock:
+            stats = self._count()
+            if self.counters:
+                self.graph.query(COUNTERS_WRITE_QUERY, {"key": self.key, **stats})
+            return self._store(stats)
+
+    def apply_delta(self, **deltas: int) -> Dict[str, int]:
+        """
+        Add ingestion deltas to the maintained counters
+
+        Call after the ingested data is committed; if the counters node does
+        not exist yet it is seeded with a full count instead.
+
+        Args:
+            **deltas: Increments for movies, actors, directors and/or genres
+
+        Returns:
+            Updated statistics
+        """
+        params = {"key": self.key, **{k: int(deltas.get(k, 0)) for k in STAT_KEYS}}
+        with self._lock:
+            if not self.counters:
+                self._cached = None
+                return {}
+            stats = self._row(self.graph.query(COUNTERS_INCREMENT_QUERY, params))
+            if stats is None:
+                stats = self._count()
+                self.graph.query(COUNTERS_WRITE_QUERY, {"key": self.key, **stats})
+            return self._store(stats)
+
+    def invalidate(self):
+        """Drop the cached result"""
+        with self._lock:
+            self._cached = None
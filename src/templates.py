@@ -0,0 +1,265 @@
+"""
+Deterministic question templates answering recognized shapes without the LLM
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from src.index_advisor import NODE_PATTERN, _quote
+from src.parameterize import parameterize
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = r"\d+(?:\.\d+)?"
+_NUMBER_WORD = re.compile(rf"(?<![\w.]){_NUMBER}(?![\w.])")
+
+
+def normalize(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation (apostrophes are kept)"""
+    return _WHITESPACE.sub(" ", question.lower()).strip().rstrip("?.! ")
+
+
+def cypher_literal(value: Any) -> str:
+    """Render a value as a Cypher literal"""
+    if isinstance(value, str):
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    return repr(value)
+
+
+def _slot_property(template: str, name: str) -> Optional[Tuple[str, str]]:
+    """(label, property) the parameter $name is compared with, if it can be told"""
+    labels: Dict[str, str] = {}
+    for match in NODE_PATTERN.finditer(template):
+        var, label, props = match.groups()
+        if var:
+            labels.setdefault(var, label)
+        found = re.search(rf"(\w+)\s*:\s*\${name}\b", props or "")
+        if found:
+            return label, found.group(1)
+    found = re.search(rf"\b(\w+)\.(\w+)\s*=\s*\${name}\b", template)
+    if found and found.group(1) in labels:
+        return labels[found.group(1)], found.group(2)
+    return None
+
+
+class QuestionTemplate:
+    """One question shape compiled from an example pair"""
+
+    def __init__(self, question: str, query: str):
+        """
+        Compile an example
+
+        Literals of the query that also appear in the question become slots:
+        strings are resolved against known entity values, numbers are taken
+        as written. Literals not found in the question stay fixed.
+
+        Args:
+            question: Example question
+            query: Its Cypher; doubled braces from prompt examples are accepted
+        """
+        self.question = question
+        self.template, params = parameterize(query.replace("{{", "{").replace("}}", "}"))
+        text = normalize(question)
+        spans = []
+        self.slots: List[Tuple[str, str, Optional[Tuple[str, str]]]] = []
+        self.fixed: Dict[str, Any] = {}
+        for name, value in params.items():
+            span = self._find(text, value, spans)
+            if span is None:
+                self.fixed[name] = value
+                continue
+            if isinstance(value, str):
+                kind, target = "entity", _slot_property(self.template, name)
+                if target is None:
+                    self.fixed[name] = value
+                    continue
+            else:
+                kind, target = ("float" if isinstance(value, float) else "int"), None
+            spans.append((span[0], span[1], len(self.slots)))
+            self.slots.append((name, kind, target))
+
+        pattern, last = "", 0
+        for start, end, index in sorted(spans):
+            kind = self.slots[index][1]
+            pattern += re.escape(text[last:start]) + (f"(?P<s{index}>.+?)" if kind == "entity" else f"(?P<s{index}>{_NUMBER})")
+            last = end
+        pattern += re.escape(text[last:])
+        self.pattern = re.compile("^" + pattern.replace(r"\ ", r"\s+") + "$")
+        # Literal characters; more specific shapes are tried first
+        self.specificity = len(text) - sum(end - start for start, end, _ in spans)
+
+    @staticmethod
+    def _find(text: str, value: Any, taken: List[Tuple[int, int, int]]) -> Optional[Tuple[int, int]]:
+        def free(start: int, end: int) -> bool:
+            return all(end <= s or start >= e for s, e, _ in taken)
+
+        if isinstance(value, str):
+            needle = value.lower()
+            start = text.find(needle)
+            while start != -1:
+                if free(start, start + len(needle)):
+                    return start, start + len(needle)
+                start = text.find(needle, start + 1)
+            return None
+        if isinstance(value, bool):
+            return None
+        for match in _NUMBER_WORD.finditer(text):
+            if float(match.group()) == value and free(*match.span()):
+                return match.span()
+        return None
+
+    @property
+    def targets(self) -> List[Tuple[str, str]]:
+        return [target for _, kind, target in self.slots if kind == "entity"]
+
+    def render(self, question: str, entities: "EntityIndex") -> Optional[str]:
+        """
+        Cypher for a question of this shape
+
+        Returns:
+            The statement with literals filled in, or None if the question does
+            not match or an entity is unknown
+        """
+        match = self.pattern.match(normalize(question))
+        if match is None:
+            return None
+        values = dict(self.fixed)
+        for index, (name, kind, target) in enumerate(self.slots):
+            raw = match.group(f"s{index}")
+            if kind == "entity":
+                value = entities.resolve(target, raw)
+                if value is None:
+                    return None
+            else:
+                value = float(raw) if kind == "float" else int(float(raw))
+            values[name] = value
+        # Longest names first so $p1 never replaces the start of $p10
+        cypher = self.template
+        for name in sorted(values, key=len, reverse=True):
+            cypher = re.sub(rf"\${name}\b", lambda _: cypher_literal(values[name]), cypher)
+        return cypher
+
+
+class EntityIndex:
+    """Known property values (titles, names) for resolving slot text"""
+
+    def __init__(self, max_values: int = 100_000):
+        """
+        Initialize the index
+
+        Args:
+            max_values: Values loaded per label and property
+        """
+        self.max_values = max_values
+        self._values: Dict[Tuple[str, str], Dict[str, str]] = {}
+
+    def load(self, graph: Any, targets: List[Tuple[str, str]]):
+        """Read the distinct values of each (label, property) from the graph"""
+        for label, prop in sorted(set(targets)):
+            rows = graph.query(
+                f"MATCH (n:{_quote(label)}) WHERE n.{_quote(prop)} IS NOT NULL "
+                f"RETURN DISTINCT n.{_quote(prop)} AS value LIMIT {int(self.max_values)}"
+            )
+            self._values[(label, prop)] = {
+                normalize(str(row["value"])): row["value"] for row in rows if isinstance(row.get("value"), str)
+            }
+            logger.info(f"Indexed {len(self._values[(label, prop)])} values of {label}.{prop}")
+
+    def resolve(self, target: Tuple[str, str], text: str) -> Optional[str]:
+        """Canonical value for text, ignoring case and a leading 'the'"""
+        values = self._values.get(target, {})
+        key = normalize(text)
+        if key in values:
+            return values[key]
+        if key.startswith("the "):
+            return values.get(key[4:])
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._values.values())
+
+
+class TemplateMatcher:
+    """Answers questions matching known shapes; everything else goes to the LLM"""
+
+    def __init__(self, examples: List[Dict[str, str]], entities: Optional[EntityIndex] = None):
+        """
+        Initialize the matcher
+
+        Args:
+            examples: Dicts with 'question' and 'query' keys, e.g.
+                get_few_shot_examples()
+            entities: Index of known entity values; filled by refresh()
+        """
+        self.entities = entities or EntityIndex()
+        self.templates: List[QuestionTemplate] = []
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        for example in examples:
+            self.add(example["question"], example["query"])
+
+    def add(self, question: str, query: str):
+        """Compile one more example pair"""
+        self.templates.append(QuestionTemplate(question, query))
+        self.templates.sort(key=lambda t: -t.specificity)
+
+    def refresh(self, graph: Any):
+        """Load the entity values the templates need"""
+        self.entities.load(graph, [target for t in self.templates for target in t.targets])
+
+    def match(self, question: str) -> Optional[str]:
+        """
+        Cypher for a recognized question
+
+        Returns:
+            The statement, or None when no template matches
+        """
+        cypher = next((c for c in (t.render(question, self.entities) for t in self.templates) if c), None)
+        with self._lock:
+            if cypher is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cypher
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "templates": len(self.templates),
+            "entities": len(self.entities),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def wrap(self, generator: Runnable) -> "TemplateCypherGeneration":
+        """
+        Put the matcher in front of a Cypher generation runnable
+
+        Args:
+            generator: Runnable producing Cypher from {'question', 'schema'}
+
+        Returns:
+            Runnable answering recognized questions and falling back to the generator
+        """
+        return TemplateCypherGeneration(generator, self)
+
+
+class TemplateCypherGeneration(Runnable):
+    """Runnable that tries the templates before calling the generator"""
+
+    def __init__(self, generator: Runnable, matcher: TemplateMatcher):
+        self.generator = generator
+        self.matcher = matcher
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        cypher = self.matcher.match(input["question"])
+        if cypher is not None:
+            return cypher
+        return self.generator.invoke(input, config, **kwargs)
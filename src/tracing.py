@@ -0,0 +1,408 @@
+"""
+Per-stage tracing and metrics for the QA chain
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import patch_config
+from langchain_neo4j.chains.graph_qa.cypher_utils import CypherQueryCorrector
+
+from src.semantic_cache import SemanticCypherCache
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["QueryTrace"]] = contextvars.ContextVar("qa_trace", default=None)
+
+
+class QueryTrace:
+    """Spans and counters collected while answering one question"""
+
+    def __init__(self, question: str):
+        self.question = question
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.rows: Optional[int] = None
+        self.cache: Optional[str] = None
+        self.cypher: Optional[str] = None
+        self.error: Optional[str] = None
+        self.total_ms = 0.0
+        self.reached: set = set()
+
+    def add_span(self, name: str, start: float, end: float, **attrs: Any):
+        span = {"name": name, "start_ms": (start - self._t0) * 1000, "duration_ms": (end - start) * 1000}
+        span.update(attrs)
+        self.spans.append(span)
+
+    def stage_ms(self) -> Dict[str, float]:
+        """Total milliseconds per span name"""
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span["name"]] = stages.get(span["name"], 0.0) + span["duration_ms"]
+        return stages
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Compact latency breakdown for display"""
+        result = {f"{name}_ms": round(ms, 1) for name, ms in self.stage_ms().items()}
+        result["total_ms"] = round(self.total_ms, 1)
+        result["cache"] = self.cache
+        result["rows"] = self.rows
+        result["tokens"] = {"prompt": self.prompt_tokens, "completion": self.completion_tokens}
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.started_at,
+            "question": self.question,
+            "total_ms": self.total_ms,
+            "spans": self.spans,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "rows": self.rows,
+            "cache": self.cache,
+            "cypher": self.cypher,
+            "error": self.error,
+        }
+
+
+def current_trace() -> Optional[QueryTrace]:
+    """The trace of the question being answered in this context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block as a span of the current trace; a no-op outside a trace
+
+    Yields a dict whose entries are stored on the span, e.g. rows.
+    """
+    trace = _current.get()
+    extra: Dict[str, Any] = dict(attrs)
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        if trace is not None:
+            trace.add_span(name, start, time.perf_counter(), **extra)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records LLM spans and token usage on the current trace"""
+
+    def __init__(self):
+        self._starts: Dict[UUID, float] = {}
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        start = self._starts.pop(run_id, None)
+        trace = _current.get()
+        if trace is None or start is None:
+            return
+        prompt_tokens, completion_tokens = _token_usage(response)
+        trace.prompt_tokens += prompt_tokens
+        trace.completion_tokens += completion_tokens
+        trace.add_span("llm", start, time.perf_counter(), prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._starts.pop(run_id, None)
+
+
+def _token_usage(response: LLMResult) -> tuple:
+    """Prompt and completion tokens from chat usage metadata or provider llm_output"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class _ReachedMarker(Runnable):
+    """Notes on the trace that a cache tier missed and called through"""
+
+    def __init__(self, generator: Runnable, tier: str):
+        self.generator = generator
+        self.tier = tier
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        trace = _current.get()
+        if trace is not None:
+            trace.reached.add(self.tier)
+        return self.generator.invoke(input, config, **kwargs)
+
+
+class TracedGeneration(Runnable):
+    """Outermost generation wrapper: times the stage and forwards callbacks as config"""
+
+    def __init__(self, generator: Runnable, tiers: List[str]):
+        self.generator = generator
+        self.tiers = tiers
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        # GraphCypherQAChain passes callbacks as a keyword that RunnableSequence
+        # drops, so hand them over in the config for the LLM callbacks to fire
+        callbacks = kwargs.pop("callbacks", None)
+        if callbacks is not None:
+            config = patch_config(config, callbacks=callbacks)
+        with span("generation"):
+            cypher = self.generator.invoke(input, config, **kwargs)
+        trace = _current.get()
+        if trace is not None:
+            trace.cache = next((tier for tier in self.tiers if tier not in trace.reached), None)
+            trace.cypher = cypher
+        return cypher
+
+
+class TracedCypherQueryCorrector(CypherQueryCorrector):
+    """CypherQueryCorrector whose corrections are recorded as validation spans"""
+
+    def __call__(self, query: str) -> str:
+        with span("validation"):
+            return super().__call__(query)
+
+
+class _TracedGraph:
+    """Graph proxy recording execution spans and row counts"""
+
+    def __init__(self, graph: Any):
+        self._graph = graph
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._graph, name)
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        with span("execution") as attrs:
+            rows = self._graph.query(query, params)
+            if hasattr(rows, "__len__"):
+                attrs["rows"] = len(rows)
+        trace = _current.get()
+        if trace is not None and hasattr(rows, "__len__"):
+            trace.rows = (trace.rows or 0) + len(rows)
+        return rows
+
+
+class Metrics:
+    """Prometheus-style counters and latency histograms fed by finished traces"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries: Dict[str, int] = {"ok": 0, "error": 0}
+        self.cache_hits: Dict[str, int] = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.rows = 0
+        self._histograms: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._gauges: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def add_gauges(self, prefix: str, source: Callable[[], Dict[str, Any]]):
+        """
+        Export the numeric values of a stats() dict as gauges
+
+        Args:
+            prefix: Metric name prefix, e.g. 'qa_plan_cache'
+            source: Callable returning the current stats
+        """
+        with self._lock:
+            self._gauges.append((prefix, source))
+
+    def _observe(self, stage: str, seconds: float):
+        counts = self._histograms.setdefault(stage, [0] * (len(self.BUCKETS) + 1))
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self._sums[stage] = self._sums.get(stage, 0.0) + seconds
+
+    def observe(self, trace: QueryTrace):
+        """Add a finished trace to the metrics"""
+        with self._lock:
+            self.queries["error" if trace.error else "ok"] += 1
+            if trace.cache:
+                self.cache_hits[trace.cache] = self.cache_hits.get(trace.cache, 0) + 1
+            self.tokens["prompt"] += trace.prompt_tokens
+            self.tokens["completion"] += trace.completion_tokens
+            self.rows += trace.rows or 0
+            for stage, ms in trace.stage_ms().items():
+                self._observe(stage, ms / 1000)
+            self._observe("total", trace.total_ms / 1000)
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = ["# TYPE qa_queries_total counter"]
+        with self._lock:
+            lines += [f'qa_queries_total{{status="{k}"}} {v}' for k, v in self.queries.items()]
+            lines.append("# TYPE qa_cache_hits_total counter")
+            lines += [f'qa_cache_hits_total{{tier="{k}"}} {v}' for k, v in sorted(self.cache_hits.items())]
+            lines.append("# TYPE qa_tokens_total counter")
+            lines += [f'qa_tokens_total{{kind="{k}"}} {v}' for k, v in self.tokens.items()]
+            lines.append("# TYPE qa_rows_total counter")
+            lines.append(f"qa_rows_total {self.rows}")
+            lines.append("# TYPE qa_stage_seconds histogram")
+            for stage, counts in sorted(self._histograms.items()):
+                for bound, count in zip(self.BUCKETS, counts):
+                    lines.append(f'qa_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'qa_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {counts[-1]}')
+                lines.append(f'qa_stage_seconds_sum{{stage="{stage}"}} {self._sums[stage]:.6f}')
+                lines.append(f'qa_stage_seconds_count{{stage="{stage}"}} {counts[-1]}')
+            gauges = list(self._gauges)
+        for prefix, source in gauges:
+            for key, value in source().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """
+        Serve /metrics from a daemon thread
+
+        Args:
+            port: Port to listen on (0 picks a free one)
+            host: Interface to bind
+
+        Returns:
+            The running server; call shutdown() to stop it
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="qa-metrics", daemon=True).start()
+        logger.info(f"Serving metrics on {host}:{server.server_address[1]}/metrics")
+        return server
+
+
+class JsonlExporter:
+    """Appends every finished trace to a JSON Lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: QueryTrace):
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Creates traces per question and exports them to metrics and logs"""
+
+    def __init__(self, metrics: Optional[Metrics] = None, exporters: Optional[List[Any]] = None):
+        """
+        Initialize the tracer
+
+        Args:
+            metrics: Metrics registry fed by every trace; a new one by default
+            exporters: Objects with export(trace), e.g. JsonlExporter
+        """
+        self.metrics = metrics or Metrics()
+        self.exporters = exporters or []
+        self.handler = TracingCallbackHandler()
+
+    @contextmanager
+    def trace(self, question: str) -> Iterator[QueryTrace]:
+        """Collect spans for one question; nested chain stages attach to it"""
+        trace = QueryTrace(question)
+        token = _current.set(trace)
+        try:
+            yield trace
+        except Exception as e:
+            trace.error = str(e)
+            raise
+        finally:
+            _current.reset(token)
+            trace.total_ms = (time.perf_counter() - trace._t0) * 1000
+            self.metrics.observe(trace)
+            for exporter in self.exporters:
+                try:
+                    exporter.export(trace)
+                except Exception as e:
+                    logger.warning(f"Trace export failed: {str(e)}")
+
+    def instrument(self, chain: Any) -> Any:
+        """
+        Add generation, validation and execution spans to a create_qa_chain chain
+
+        Cache tiers are detected below the outermost generator so a hit is
+        attributed to the tier that answered.
+
+        Args:
+            chain: Chain built by create_qa_chain
+
+        Returns:
+            The same chain
+        """
+        tiers = []
+        layer = chain.cypher_generation_chain
+        while hasattr(layer, "generator"):
+            inner = layer.generator
+            if hasattr(layer, "cache") or hasattr(layer, "matcher"):
+                if hasattr(layer, "matcher"):
+                    tier = "template"
+                else:
+                    tier = "semantic" if isinstance(layer.cache, SemanticCypherCache) else "exact"
+                layer.generator = _ReachedMarker(inner, tier)
+                tiers.append(tier)
+            layer = inner
+        chain.cypher_generation_chain = TracedGeneration(chain.cypher_generation_chain, tiers)
+        if chain.cypher_query_corrector is not None:
+            chain.cypher_query_corrector = TracedCypherQueryCorrector(chain.cypher_query_corrector.schemas)
+        chain.graph = _TracedGraph(chain.graph)
+        return chain
+
+    def invoke(self, chain: Any, question: str, on_trace: Optional[Callable[[QueryTrace], Any]] = None) -> tuple:
+        """
+        Answer a question through an instrumented chain
+
+        Args:
+            chain: Instrumented chain
+            question: Question to answer
+            on_trace: Called with the trace as it starts, so a caller can
+                still read it (e.g. the generated Cypher) when the question fails
+
+        Returns:
+            (chain result, finished QueryTrace)
+        """
+        with self.trace(question) as trace:
+            if on_trace is not None:
+                on_trace(trace)
+            result = chain.invoke({"query": question}, config={"callbacks": [self.handler]})
+        return result, trace
@@ -0,0 +1,439 @@
+"""
+Production traffic recorder and scaled replay load tester
+"""
+
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.batch import percentile
+from src.benchmark import STUB_CYPHER, StubLLM
+from src.cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Record keys are kept short: the log holds every sampled question in production
+# t: unix time, q: question, c: generated Cypher, ms: total latency,
+# st: stage latencies, n: rows, k: cache tier, s: status, e: error
+
+
+class TrafficRecorder:
+    """Appends sampled production questions and their outcome to a compact JSONL log"""
+
+    STATUSES = ("ok", "timeout", "cancelled", "error")
+
+    def __init__(self, path: str, sample_rate: float = 1.0, seed: Optional[int] = None):
+        """
+        Initialize the recorder
+
+        Args:
+            path: Log file, appended to; parent directories are created
+            sample_rate: Fraction of questions recorded, 0 to 1. Sampling is
+                uniform so the log keeps the production mix of questions
+            seed: Random seed for the sampling decision
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.recorded = 0
+        self.sampled_out = 0
+        self.write_errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(
+        self,
+        question: str,
+        total_ms: float,
+        cypher: Optional[str] = None,
+        rows: Optional[int] = None,
+        breakdown: Optional[Dict[str, Any]] = None,
+        status: str = "ok",
+        error: Optional[str] = None,
+    ) -> bool:
+        """
+        Record one answered (or failed) question
+
+        Args:
+            question: Question as asked
+            total_ms: Wall time spent on it
+            cypher: Generated Cypher, if any
+            rows: Rows returned; defaults to the breakdown's row count
+            breakdown: QueryTrace.breakdown() for stage latencies and cache tier
+            status: One of STATUSES
+            error: Error message for failed questions
+
+        Returns:
+            Whether the question was sampled and written
+        """
+        if status not in self.STATUSES:
+            raise ValueError(f"Unknown status: {status}")
+        with self._lock:
+            if self.sample_rate < 1 and self._random.random() >= self.sample_rate:
+                self.sampled_out += 1
+                return False
+
+        entry: Dict[str, Any] = {"t": round(time.time(), 3), "q": question, "ms": round(total_ms, 1), "s": status}
+        if cypher:
+            entry["c"] = cypher
+        breakdown = breakdown or {}
+        stages = {
+            key[:-3]: value for key, value in breakdown.items()
+            if key.endswith("_ms") and key != "total_ms" and value
+        }
+        if stages:
+            entry["st"] = stages
+        if rows is None:
+            rows = breakdown.get("rows")
+        if rows is not None:
+            entry["n"] = rows
+        if breakdown.get("cache"):
+            entry["k"] = breakdown["cache"]
+        if error:
+            entry["e"] = error[:500]
+
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                self.write_errors += 1
+                logger.warning(f"Could not record traffic: {str(e)}")
+                return False
+            self.recorded += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "sampled_out": self.sampled_out,
+                "write_errors": self.write_errors,
+                "sample_rate": self.sample_rate,
+            }
+
+
+def load_traffic(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a traffic log, plain or gzip-compressed (.gz), in arrival order
+
+    Lines that cannot be parsed, e.g. a partial last line, are skipped.
+
+    Args:
+        path: Log written by TrafficRecorder
+
+    Returns:
+        Records sorted by time
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get("q"):
+                records.append(entry)
+    records.sort(key=lambda entry: entry.get("t", 0))
+    return records
+
+
+class RecordedLLM(StubLLM):
+    """Stub LLM answering each recorded question with the Cypher generated in production"""
+
+    cypher: Dict[str, str] = {}
+    delays: Dict[str, float] = {}
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]], recorded_latency: bool = True) -> "RecordedLLM":
+        """
+        Build the stub from a traffic log
+
+        Args:
+            records: Records from load_traffic
+            recorded_latency: Sleep for the recorded generation time of each
+                question instead of answering immediately
+        """
+        cypher, delays = {}, {}
+        for entry in records:
+            key = normalize_question(entry["q"])
+            if entry.get("c"):
+                cypher[key] = entry["c"]
+            generation = (entry.get("st") or {}).get("generation")
+            if recorded_latency and generation:
+                delays[key] = generation / 1000
+        return cls(cypher=cypher, delays=delays)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        question = prompt.rsplit("User input:", 1)[-1].split("\nCypher query:", 1)[0].strip()
+        # Cost guard retries append the rejected attempt on a new line
+        key = normalize_question(question.split("\n", 1)[0])
+        delay = self.delays.get(key, self.latency)
+        if delay:
+            time.sleep(delay)
+        if key in self.cypher:
+            return self.cypher[key]
+        return STUB_CYPHER[zlib.crc32(key.encode("utf-8")) % len(STUB_CYPHER)]
+
+
+def _latency_summary(values_ms: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(percentile(values_ms, 50), 1),
+        "p95": round(percentile(values_ms, 95), 1),
+        "p99": round(percentile(values_ms, 99), 1),
+        "max": round(max(values_ms, default=0.0), 1),
+    }
+
+
+def _is_error(entry: Dict[str, Any]) -> bool:
+    # An abandoned question is the user's doing, not a failure
+    return entry.get("s", "ok") not in ("ok", "cancelled")
+
+
+def replay(
+    records: Sequence[Dict[str, Any]],
+    answer: Callable[[str], Dict[str, Any]],
+    speed: float = 1.0,
+    concurrency: int = 8,
+    max_gap: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Re-drive recorded traffic, keeping its arrival pattern at a multiple of real time
+
+    Latency is measured from each question's scheduled arrival, so time spent
+    waiting for a free worker counts; service time excludes it.
+
+    Args:
+        records: Records from load_traffic
+        answer: Function answering one question, e.g. server.chain_answerer(chain)
+        speed: Replay speed, e.g. 1 for real time and 50 for 50x
+        concurrency: Questions in flight at most
+        max_gap: Longest recorded idle gap in seconds kept before scaling;
+            longer gaps (nights, weekends) are shortened to it
+
+    Returns:
+        JSON-serializable report with throughput, latency percentiles, error
+        rate and the same figures as recorded
+    """
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    schedule, offset = [], 0.0
+    for index, entry in enumerate(records):
+        if index:
+            gap = max(0.0, entry.get("t", 0) - records[index - 1].get("t", 0))
+            offset += (min(gap, max_gap) if max_gap is not None else gap) / speed
+        schedule.append(offset)
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    service: List[float] = []
+    errors: Dict[str, int] = {}
+    mismatched_rows = 0
+    start = time.perf_counter()
+
+    def work(entry: Dict[str, Any], due: float):
+        nonlocal mismatched_rows
+        began = time.perf_counter()
+        error, rows = None, None
+        try:
+            result = answer(entry["q"])
+            rows = result.get("result") if isinstance(result, dict) else result
+        except Exception as e:
+            error = type(e).__name__
+        finished = time.perf_counter()
+        with lock:
+            latencies.append((finished - start - due) * 1000)
+            service.append((finished - began) * 1000)
+            if error is not None:
+                errors[error] = errors.get(error, 0) + 1
+            elif entry.get("n") is not None and hasattr(rows, "__len__") and len(rows) != entry["n"]:
+                mismatched_rows += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="qa-replay") as executor:
+        futures = []
+        for entry, due in zip(records, schedule):
+            delay = start + due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(work, entry, due))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    failed = sum(errors.values())
+    recorded_errors = sum(1 for entry in records if _is_error(entry))
+    span = records[-1].get("t", 0) - records[0].get("t", 0) if records else 0
+    report = {
+        "config": {"questions": len(records), "speed": speed, "concurrency": concurrency, "max_gap": max_gap},
+        "requests": len(records),
+        "errors": failed,
+        "error_rate": failed / len(records) if records else 0.0,
+        "errors_by_type": errors,
+        "mismatched_rows": mismatched_rows,
+        "seconds": round(elapsed, 3),
+        "throughput_qps": len(records) / elapsed if elapsed else 0.0,
+        "latency_ms": _latency_summary(latencies),
+        "service_ms": _latency_summary(service),
+        "recorded": {
+            "seconds": round(span, 3),
+            "error_rate": recorded_errors / len(records) if records else 0.0,
+            "latency_ms": _latency_summary([entry.get("ms", 0.0) for entry in records]),
+        },
+    }
+    logger.info(
+        f"Replayed {len(records)} questions at {speed:g}x in {elapsed:.1f}s "
+        f"({report['throughput_qps']:.2f} q/s, {failed} errors)"
+    )
+    return report
+
+
+COMPARED = (
+    ("throughput_qps",),
+    ("error_rate",),
+    ("latency_ms", "p50"),
+    ("latency_ms", "p95"),
+    ("latency_ms", "p99"),
+    ("service_ms", "p50"),
+    ("service_ms", "p95"),
+    ("service_ms", "p99"),
+)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare two replay reports, e.g. the current and the next build on the same log
+
+    Args:
+        baseline: Report of the reference build
+        candidate: Report of the build under test
+
+    Returns:
+        Per metric: baseline, candidate, delta (candidate - baseline) and the
+        relative change in percent (None when the baseline is zero)
+    """
+    deltas = {}
+    for path in COMPARED:
+        before, after = baseline, candidate
+        for key in path:
+            before, after = (before or {}).get(key), (after or {}).get(key)
+        before, after = before or 0.0, after or 0.0
+        deltas[".".join(path)] = {
+            "baseline": before,
+            "candidate": after,
+            "delta": after - before,
+            "change_pct": round((after - before) / before * 100, 1) if before else None,
+        }
+    return deltas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    python -m src.traffic replay traffic.jsonl --speed 10 -o candidate.json
+    python -m src.traffic compare baseline.json candidate.json
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay recorded traffic and compare builds")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("replay", help="Re-drive a traffic log against the chain")
+    run.add_argument("log", help="Traffic log written by the recorder (.jsonl or .jsonl.gz)")
+    run.add_argument("--speed", type=float, default=1.0, help="Multiple of real time, e.g. 1 to 50")
+    run.add_argument("-c", "--concurrency", type=int, default=8)
+    run.add_argument("--max-gap", type=float, default=None, help="Cap recorded idle gaps at this many seconds")
+    run.add_argument("--limit", type=int, default=None, help="Replay only the first N questions")
+    run.add_argument("--stub-llm", action="store_true", help="Answer with the recorded Cypher instead of the LLM")
+    run.add_argument("--stub-db", action="store_true", help="Run the Cypher against a stub graph instead of Neo4j")
+    run.add_argument("--db-latency", type=float, default=0.0, help="Stub graph seconds per query")
+    run.add_argument("--data", default=None, help="Movies file loaded into an in-memory graph instead of Neo4j")
+    run.add_argument("--no-cache", action="store_true", help="Send every question to the generator")
+    run.add_argument("-o", "--out", default=None, help="Write the JSON report here instead of stdout")
+    diff = commands.add_parser("compare", help="Show the deltas between two replay reports")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.candidate, encoding="utf-8") as f:
+            candidate = json.load(f)
+        print(json.dumps(compare(baseline, candidate), indent=2))
+        return 0
+
+    from config import (
+        get_cost_guard, get_llm, get_neo4j_manager, get_parameterizer, get_query_deadline,
+        get_result_limits, get_template_matcher, get_tracer, setup_environment,
+    )
+    from src.benchmark import StubGraph
+    from src.cache import CypherCache
+    from src.query_chain import create_example_store, create_qa_chain
+    from src.schema_pruning import SchemaPruner
+    from src.semantic_cache import SemanticCypherCache
+    from src.server import chain_answerer
+
+    records = load_traffic(args.log)[:args.limit]
+    if args.data:
+        from src.memory_graph import MemoryGraph
+        graph = MemoryGraph.from_file(args.data)
+    elif args.stub_db:
+        graph = StubGraph(latency=args.db_latency)
+    else:
+        uri, username, password, _ = setup_environment()
+        graph = get_neo4j_manager(uri, username, password, os.getenv("NEO4J_DATABASE", "neo4j")).graph()
+    llm = RecordedLLM.from_records(records) if args.stub_llm else get_llm()
+
+    tracer = get_tracer()
+    chain = create_qa_chain(
+        graph, llm,
+        verbose=False,
+        # Fresh in-memory caches: every build starts cold, and replayed (or
+        # stubbed) Cypher never reaches the production cache
+        cache=None if args.no_cache else CypherCache(),
+        semantic_cache=None if args.no_cache else SemanticCypherCache(),
+        example_store=create_example_store(),
+        schema_pruner=SchemaPruner(),
+        return_intermediate_steps=True,
+        top_k=get_result_limits()["page_size"],
+        stream_results=True,
+        columnar=True,
+        # The stub graph cannot EXPLAIN
+        cost_guard=None if args.stub_db and not args.data else get_cost_guard(),
+        parameterizer=get_parameterizer(),
+        template_matcher=get_template_matcher(),
+        enforce_deadlines=True,
+    )
+    tracer.instrument(chain)
+    report = replay(
+        records,
+        chain_answerer(chain, tracer, get_query_deadline),
+        speed=args.speed,
+        concurrency=args.concurrency,
+        max_gap=args.max_gap,
+    )
+    report["config"].update(stub_llm=args.stub_llm, cache=not args.no_cache, graph=type(graph).__name__, log=args.log)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,3 +3,62 @@ import os
 
 # Add the project root to the python path so imports from 'src' work
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from langchain_core.language_models.fake import FakeListLLM
+
+
+class FakeGraph:
+    """Minimal Neo4jGraph stand-in for chain tests"""
+
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else [{"count": 1}]
+        self.queries = []
+        self.schema = "Node properties:\nMovie {title: STRING}"
+        self.structured_schema = {
+            "node_props": {"Movie": [{"property": "title", "type": "STRING"}]},
+            "rel_props": {},
+            "relationships": [],
+        }
+        self.refreshes = 0
+
+    @property
+    def get_schema(self):
+        return self.schema
+
+    @property
+    def get_structured_schema(self):
+        return self.structured_schema
+
+    def query(self, query, params=None):
+        self.queries.append((query, params or {}))
+        return list(self.rows)
+
+    def refresh_schema(self):
+        self.refreshes += 1
+
+    def add_graph_documents(self, graph_documents, include_source=False):
+        pass
+
+
+class RecordingLLM(FakeListLLM):
+    """FakeListLLM that remembers the prompts it was given"""
+
+    prompts: list = []
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(prompt)
+        return super()._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        return self._call(prompt, stop=stop, **kwargs)
+
+
+@pytest.fixture
+def fake_graph():
+    return FakeGraph()
+
+
+@pytest.fixture
+def fake_llm():
+    return RecordingLLM(responses=["MATCH (m:Movie) RETURN count(m) AS count"] * 100, prompts=[])
@@ -0,0 +1,164 @@
+"""
+Unit tests for the async QA pipeline
+"""
+
+import asyncio
+import itertools
+import time
+
+from langchain_core.language_models.fake import FakeListLLM
+
+from conftest import FakeGraph
+from src.async_chain import AsyncNeo4jGraph, create_async_qa_pipeline
+from src.cache import CypherCache
+from src.query_chain import create_example_store
+
+
+class SlowLLM(FakeListLLM):
+    """FakeListLLM whose async calls take a fixed time"""
+
+    delay: float = 0.05
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self.responses[0]
+
+
+class FakeAsyncGraph:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def query(self, query, params=None, max_rows=None):
+        self.queries.append(query)
+        return list(self.rows[:max_rows])
+
+
+class FakeAsyncRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+
+class FakeAsyncResult:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+
+    def __aiter__(self):
+        return self._records()
+
+    async def _records(self):
+        for row in self.rows:
+            self.log["pulled"] += 1
+            yield FakeAsyncRecord(row)
+
+    async def consume(self):
+        self.log["consumed"] += 1
+
+
+class FakeAsyncSession:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, params):
+        return FakeAsyncResult(self.rows, self.log)
+
+
+class FakeAsyncDriver:
+    def __init__(self, rows):
+        self.rows = rows
+        self.log = {"pulled": 0, "consumed": 0, "fetch_size": None}
+
+    def session(self, database=None, fetch_size=None):
+        self.log["fetch_size"] = fetch_size
+        return FakeAsyncSession(self.rows, self.log)
+
+
+def test_answer_generates_and_executes(fake_graph, fake_llm):
+    async_graph = FakeAsyncGraph([{"count": i} for i in range(20)])
+    pipeline = create_async_qa_pipeline(
+        fake_graph, fake_llm, async_graph=async_graph, example_store=create_example_store(k=2)
+    )
+
+    answer = asyncio.run(pipeline.answer("How many movies are there?"))
+
+    assert answer["query"] == "MATCH (m:Movie) RETURN count(m) AS count"
+    assert len(answer["result"]) == 10
+    assert async_graph.queries == [answer["query"]]
+    assert "Tom Hanks" in fake_llm.prompts[0] or "artists" in fake_llm.prompts[0]
+
+
+def test_falls_back_to_threaded_sync_graph(fake_graph, fake_llm):
+    pipeline = create_async_qa_pipeline(fake_graph, fake_llm)
+    result = asyncio.run(pipeline.ainvoke({"query": "Count movies"}))
+
+    assert result["result"] == fake_graph.rows
+    assert len(fake_graph.queries) == 1
+
+
+def test_questions_overlap(fake_graph):
+    llm = SlowLLM(responses=["MATCH (m:Movie) RETURN count(m)"], delay=0.05)
+    pipeline = create_async_qa_pipeline(fake_graph, llm, async_graph=FakeAsyncGraph([]))
+
+    async def run_many():
+        return await asyncio.gather(*(pipeline.answer(f"Question {i}") for i in range(50)))
+
+    start = time.perf_counter()
+    answers = asyncio.run(run_many())
+    assert len(answers) == 50
+    assert time.perf_counter() - start < 50 * 0.05 / 2
+
+
+def test_cache_hit_skips_llm(fake_graph, fake_llm):
+    pipeline = create_async_qa_pipeline(fake_graph, fake_llm, cache=CypherCache(), async_graph=FakeAsyncGraph([]))
+
+    async def run_twice():
+        await pipeline.answer("How many movies?")
+        await pipeline.answer("how many movies")
+
+    asyncio.run(run_twice())
+    assert fake_llm.i == 1
+
+
+def test_async_graph_stops_pulling_at_top_k(fake_graph, fake_llm):
+    driver = FakeAsyncDriver([{"count": i} for i in range(1000)])
+    async_graph = AsyncNeo4jGraph("bolt://unused", "neo4j", "pw", driver=driver)
+    pipeline = create_async_qa_pipeline(fake_graph, fake_llm, async_graph=async_graph, top_k=10)
+
+    answer = asyncio.run(pipeline.answer("How many movies are there?"))
+
+    assert answer["result"] == [{"count": i} for i in range(10)]
+    assert driver.log == {"pulled": 10, "consumed": 1, "fetch_size": 10}
+
+
+def test_threaded_fallback_streams_only_top_k(fake_llm):
+    pulled = []
+
+    def records():
+        for i in range(1000):
+            pulled.append(i)
+            yield {"count": i}
+
+    class LazyRows:
+        def __getitem__(self, window):
+            return list(itertools.islice(records(), window.start, window.stop))
+
+    class StreamGraph(FakeGraph):
+        def stream(self, query, params=None, fetch_size=1000):
+            return LazyRows()
+
+    pipeline = create_async_qa_pipeline(StreamGraph(), fake_llm, top_k=5)
+    result = asyncio.run(pipeline.ainvoke({"query": "Count movies"}))
+
+    assert result["result"] == [{"count": i} for i in range(5)]
+    assert pulled == list(range(5))
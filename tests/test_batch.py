@@ -0,0 +1,125 @@
+"""
+Unit tests for the batch question runner
+"""
+
+import json
+import os
+import threading
+import time
+
+from conftest import FakeGraph, RecordingLLM
+from src.batch import BatchRunner, TokenBucket, load_questions, rate_limit_llm
+from src.cache import CypherCache
+from src.cost_guard import CostGuard
+from src.query_chain import create_qa_chain
+
+SAMPLE_QUERIES = os.path.join(os.path.dirname(__file__), "..", "data", "sample_queries.json")
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_load_questions_from_sample_file():
+    questions = load_questions(SAMPLE_QUERIES)
+    assert questions
+    assert all(isinstance(q, str) and q for q in questions)
+
+
+def test_load_questions_text_and_jsonl(tmp_path):
+    txt = tmp_path / "q.txt"
+    txt.write_text("Who directed Heat?\n\nTop rated movies\n")
+    jsonl = tmp_path / "q.jsonl"
+    jsonl.write_text('{"question": "a"}\n{"question": "b"}\n')
+    assert load_questions(str(txt)) == ["Who directed Heat?", "Top rated movies"]
+    assert load_questions(str(jsonl)) == ["a", "b"]
+
+
+def test_runs_chain_and_streams_results(tmp_path, fake_graph, fake_llm):
+    chain = create_qa_chain(fake_graph, fake_llm, verbose=False, return_intermediate_steps=True)
+    out = tmp_path / "results.jsonl"
+    runner = BatchRunner(lambda q: chain.invoke({"query": q}), concurrency=3)
+
+    summary = runner.run([f"How many movies {i}?" for i in range(6)], str(out))
+
+    records = read_jsonl(out)
+    assert summary["total"] == summary["succeeded"] == 6
+    assert summary["questions_per_sec"] > 0
+    assert sorted(r["index"] for r in records) == list(range(6))
+    assert all(r["ok"] and r["cypher"].startswith("MATCH") for r in records)
+    assert records[0]["result"] == [{"count": 1}]
+
+
+def test_concurrency_is_bounded(tmp_path):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def answer(question):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {"result": question}
+
+    BatchRunner(answer, concurrency=2).run([str(i) for i in range(8)], str(tmp_path / "out.jsonl"))
+    assert peak[0] == 2
+
+
+def test_retries_then_records_failure(tmp_path):
+    calls = {}
+
+    def answer(question):
+        calls[question] = calls.get(question, 0) + 1
+        if question == "bad" or calls[question] < 2:
+            raise RuntimeError("rate limited")
+        return {"result": "ok"}
+
+    out = tmp_path / "out.jsonl"
+    summary = BatchRunner(answer, max_retries=2, backoff_base=0.001).run(["good", "bad"], str(out))
+
+    records = {r["question"]: r for r in read_jsonl(out)}
+    assert records["good"]["ok"] and records["good"]["attempts"] == 2
+    assert not records["bad"]["ok"] and records["bad"]["error"] == "rate limited"
+    assert records["bad"]["attempts"] == 3
+    assert summary["failed"] == 1 and summary["retries"] == 3
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+class CountingBucket(TokenBucket):
+    def __init__(self):
+        super().__init__(rate=1000)
+        self.taken = 0
+
+    def acquire(self):
+        self.taken += 1
+        super().acquire()
+
+
+def test_rate_limit_counts_llm_calls_only():
+    class PlanGraph(FakeGraph):
+        def explain(self, query):
+            risky = "CartesianProduct" if "," in query else "ProduceResults"
+            return {"operatorType": risky, "arguments": {"EstimatedRows": 1}, "children": []}
+
+    llm = RecordingLLM(responses=["MATCH (m:Movie), (p:Person) RETURN count(*)",
+                                  "MATCH (m:Movie) RETURN count(m) AS count"], prompts=[])
+    chain = create_qa_chain(PlanGraph(), llm, verbose=False, cache=CypherCache(), cost_guard=CostGuard())
+    bucket = CountingBucket()
+    rate_limit_llm(chain, bucket)
+
+    chain.invoke({"query": "How many movies are there?"})
+    # The cost guard's regeneration was a second LLM call
+    assert len(llm.prompts) == 2 and bucket.taken == 2
+    chain.invoke({"query": "How many movies are there?"})
+    # Served from the cache: no LLM call, no token
+    assert len(llm.prompts) == 2 and bucket.taken == 2
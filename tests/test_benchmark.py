@@ -0,0 +1,60 @@
+"""
+Unit tests for the offline benchmark harness
+"""
+
+import json
+
+from src.benchmark import StageTimer, StubGraph, StubLLM, instrument_chain, main, run_benchmark
+from src.cache import CypherCache
+from src.query_chain import create_qa_chain
+
+
+def test_stub_llm_is_deterministic():
+    llm = StubLLM()
+    assert llm.invoke("User input: How many movies?") == llm.invoke("User input: How many movies?")
+
+
+def test_stub_llm_answers_by_the_question_alone():
+    llm = StubLLM(responses=[f"RETURN {i}" for i in range(50)])
+
+    def prompt(examples, question):
+        return f"{examples}\n\nUser input: {question}\nCypher query:"
+
+    answers = {llm.invoke(prompt("", f"Question {i}?")) for i in range(20)}
+    assert len(answers) > 1
+    assert llm.invoke(prompt("Examples A", "Top movies?")) == llm.invoke(prompt("Examples B", "Top movies?"))
+
+
+def test_instrumented_chain_records_every_stage():
+    timer = StageTimer()
+    chain = create_qa_chain(StubGraph(), StubLLM(), verbose=False)
+    instrument_chain(chain, timer)
+
+    timer.begin()
+    result = chain.invoke({"query": "How many movies are there?"})
+    timer.end()
+
+    assert result["result"]
+    assert set(timer.samples[0]) == {"prompt", "generation", "validation", "execution"}
+
+
+def test_cache_hits_skip_generation_samples():
+    report = run_benchmark(
+        ["How many movies?"], concurrency=[1], rounds=3, trace_memory=False,
+        chain_kwargs={"cache": CypherCache()},
+    )
+    stages = report["runs"][0]["stages"]
+    assert stages["generation"]["count"] == 1
+    assert stages["execution"]["count"] == stages["total"]["count"] == 3
+
+
+def test_report_is_json(tmp_path):
+    out = tmp_path / "bench.json"
+    assert main(["--concurrency", "1", "2", "--rounds", "1", "-o", str(out)]) == 0
+
+    report = json.loads(out.read_text())
+    assert [run["clients"] for run in report["runs"]] == [1, 2]
+    run = report["runs"][0]
+    assert run["throughput_qps"] > 0 and run["peak_traced_bytes"] > 0
+    assert {"p50_ms", "p95_ms", "p99_ms"} <= set(run["stages"]["total"])
+    assert report["peak_rss_bytes"] > 0
@@ -0,0 +1,69 @@
+"""
+Unit tests for the question-to-Cypher cache
+"""
+
+from src.cache import CypherCache, normalize_question
+from src.query_chain import create_qa_chain
+
+
+def test_normalize_question():
+    """Case, whitespace and punctuation do not change the key"""
+    assert normalize_question("  How many   MOVIES are there? ") == "how many movies are there"
+    assert normalize_question("Schindler's List") == "schindlers list"
+    assert normalize_question("rating above 8.5") != normalize_question("rating above 85")
+
+
+def test_hit_miss_and_lru_eviction():
+    cache = CypherCache(max_size=2)
+    assert cache.get("q1", "s", "v") is None
+    cache.put("q1", "s", "v", "RETURN 1")
+    cache.put("q2", "s", "v", "RETURN 2")
+    assert cache.get("Q1?", "s", "v") == "RETURN 1"
+    cache.put("q3", "s", "v", "RETURN 3")
+
+    assert cache.get("q2", "s", "v") is None
+    assert cache.get("q1", "s", "v") == "RETURN 1"
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    cache = CypherCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr("src.cache.time.time", lambda: now[0])
+    cache.put("q", "s", "v", "RETURN 1")
+    now[0] += 11
+    assert cache.get("q", "s", "v") is None
+    assert len(cache) == 0
+
+
+def test_schema_change_invalidates():
+    cache = CypherCache()
+    cache.put("q1", "schema-a", "v", "RETURN 1")
+    assert cache.get("q2", "schema-b", "v") is None
+    assert len(cache) == 0
+
+
+def test_disk_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CypherCache(path=path)
+    cache.put("q", "s", "v", "RETURN 1")
+    cache.close()
+
+    reopened = CypherCache(path=path)
+    assert reopened.get("q", "s", "v") == "RETURN 1"
+    reopened.close()
+
+
+def test_chain_skips_llm_on_cache_hit(fake_graph, fake_llm):
+    cache = CypherCache()
+    chain = create_qa_chain(fake_graph, fake_llm, verbose=False, cache=cache)
+
+    chain.invoke({"query": "How many movies?"})
+    chain.invoke({"query": "how many movies"})
+
+    assert fake_llm.i == 1
+    assert cache.stats()["hits"] == 1
+    assert len(fake_graph.queries) == 2
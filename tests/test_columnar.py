@@ -0,0 +1,68 @@
+"""
+Unit tests for columnar query results
+"""
+
+import io
+
+import pyarrow.parquet as pq
+from neo4j.time import Date
+
+from conftest import FakeGraph
+from src.columnar import ColumnarGraph, ColumnarResult
+from src.query_chain import create_qa_chain
+from src.results import ResultPager
+
+ROWS = [{"title": f"Movie {i}", "rating": 7.0 + i / 10, "released": Date(2000 + i, 1, 1)} for i in range(20)]
+
+
+def test_rows_become_typed_columns():
+    result = ColumnarResult.from_rows(ROWS)
+    types = {field.name: str(field.type) for field in result.table.schema}
+    assert types == {"title": "string", "rating": "double", "released": "date32[day]"}
+    assert len(result) == 20 and result[0]["title"] == "Movie 0"
+
+
+def test_mixed_and_missing_values_fall_back_safely():
+    result = ColumnarResult.from_rows([{"a": 1, "b": {"x": 1}}, {"a": "one"}])
+    assert result.columns == ["a", "b"]
+    assert list(result) == [{"a": "1", "b": {"x": 1}}, {"a": "one", "b": None}]
+
+
+def test_slices_share_buffers_and_frame_is_cached():
+    result = ColumnarResult.from_rows(ROWS)
+    page = result[5:10]
+    assert len(page) == 5 and page[0]["title"] == "Movie 5"
+    assert page.table.column(0).chunks[0].buffers()[1].address == result.table.column(0).chunks[0].buffers()[1].address
+    assert result.to_pandas() is result.to_pandas()
+
+
+def test_scalar_and_exports():
+    assert ColumnarResult.from_rows([{"count": 3}]).scalar() == ("count", 3)
+    result = ColumnarResult.from_rows(ROWS[:2])
+    assert result.scalar() is None
+    assert result.to_csv().decode().splitlines()[0] == '"title","rating","released"'
+    assert pq.read_table(io.BytesIO(result.to_parquet())).num_rows == 2
+
+
+def test_chain_returns_columnar_result(fake_llm):
+    chain = create_qa_chain(FakeGraph(rows=ROWS), fake_llm, verbose=False, top_k=10, columnar=True)
+    result = chain.invoke({"query": "List movies"})
+    assert isinstance(chain.graph, ColumnarGraph)
+    assert isinstance(result["result"], ColumnarResult) and len(result["result"]) == 10
+
+
+class SkipLimitGraph(FakeGraph):
+    def query(self, query, params=None):
+        return self.rows[params["skip"]: params["skip"] + params["limit"]]
+
+
+def test_pager_appends_columnar_pages_and_caps_memory():
+    graph = SkipLimitGraph(rows=ROWS)
+    first = ColumnarResult.from_rows(ROWS[:5])
+    pager = ResultPager(graph, "MATCH (m:Movie) RETURN m", rows=first, page_size=5, max_rows=12)
+
+    pager.load_more()
+    assert isinstance(pager.rows, ColumnarResult) and len(pager.rows) == 10
+    pager.load_more()
+    assert len(pager.rows) == 12 and pager.truncated and not pager.has_more
+    assert pager.rows[11]["title"] == "Movie 11"
@@ -0,0 +1,177 @@
+"""
+Unit tests for the shared Neo4j connection pool
+"""
+
+import gc
+
+import pytest
+from langchain_neo4j import Neo4jGraph
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+from src.connection import ConnectionManager, PooledNeo4jGraph, get_connection_manager
+from src.database import Neo4jDatabase
+
+
+class FakeDriver:
+    def __init__(self, fail_verify=False):
+        self.fail_verify = fail_verify
+        self.closed = False
+
+    def verify_connectivity(self):
+        if self.fail_verify:
+            raise ServiceUnavailable("down")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeFactory:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.drivers = []
+        self.configs = []
+
+    def __call__(self, uri, auth=None, **config):
+        self.configs.append(config)
+        driver = FakeDriver(fail_verify=len(self.drivers) < self.failures)
+        self.drivers.append(driver)
+        return driver
+
+
+def make_manager(factory, **kwargs):
+    return ConnectionManager("bolt://x", "u", "p", driver_factory=factory, backoff_base=0, **kwargs)
+
+
+def test_driver_is_created_once_with_pool_config():
+    factory = FakeFactory()
+    manager = make_manager(factory, pool_size=7)
+
+    assert manager.driver is manager.driver
+    assert len(factory.drivers) == 1
+    assert factory.configs[0]["max_connection_pool_size"] == 7
+
+
+def test_connect_retries_with_backoff():
+    factory = FakeFactory(failures=2)
+    manager = make_manager(factory, max_retries=3)
+
+    driver = manager.driver
+    assert driver is factory.drivers[-1]
+    assert len(factory.drivers) == 3
+    assert factory.drivers[0].closed
+
+
+def test_connect_gives_up():
+    manager = make_manager(FakeFactory(failures=5), max_retries=2)
+    with pytest.raises(ServiceUnavailable):
+        manager.driver
+
+
+def test_reconnect_replaces_stale_driver_once():
+    factory = FakeFactory()
+    manager = make_manager(factory)
+    stale = manager.driver
+
+    fresh = manager.reconnect(stale)
+    assert fresh is not stale and stale.closed
+    assert manager.reconnect(stale) is fresh
+    assert manager.reconnects == 1
+
+
+def test_last_lease_closes_driver():
+    factory = FakeFactory()
+    manager = make_manager(factory)
+    first = manager.graph(refresh_schema=False)
+    second = manager.graph(refresh_schema=False)
+    driver = first._driver
+
+    first.close()
+    assert not driver.closed
+    second.close()
+    assert driver.closed and manager.leases == 0
+    with pytest.raises(RuntimeError):
+        first.query("RETURN 1")
+
+
+def test_managers_are_shared_per_database():
+    a = get_connection_manager("bolt://shared", "u", "p", "neo4j")
+    assert get_connection_manager("bolt://shared", "u", "p", "neo4j") is a
+    assert get_connection_manager("bolt://shared", "u", "p", "other") is not a
+
+
+def test_password_change_retires_the_old_manager():
+    factory = FakeFactory()
+    old = get_connection_manager("bolt://rotated", "u", "p1", driver_factory=factory, backoff_base=0)
+    graph = old.graph(refresh_schema=False)
+    driver = graph._driver
+
+    new = get_connection_manager("bolt://rotated", "u", "p2", driver_factory=factory, backoff_base=0)
+    assert new is not old and not driver.closed
+    graph.close()
+    assert driver.closed
+
+    idle = new.driver
+    get_connection_manager("bolt://rotated", "u", "p3", driver_factory=factory, backoff_base=0)
+    assert idle.closed
+
+
+def test_collected_graph_gives_its_lease_back():
+    manager = make_manager(FakeFactory())
+    graph = manager.graph(refresh_schema=False)
+    driver = graph._driver
+    assert manager.leases == 1
+
+    del graph
+    gc.collect()
+    assert manager.leases == 0 and driver.closed
+
+
+def test_database_close_releases_lease(monkeypatch):
+    manager = make_manager(FakeFactory())
+    monkeypatch.setattr("src.connection.PooledNeo4jGraph.query", lambda self, q, *a, **k: [{"ok": 1}])
+    monkeypatch.setattr("src.connection.PooledNeo4jGraph.refresh_schema", lambda self: None)
+    db = Neo4jDatabase("bolt://x", "u", "p", manager=manager)
+
+    assert db.connect()
+    assert manager.leases == 1
+    db.close()
+    assert manager.leases == 0 and db.graph is None
+
+
+def test_lost_connection_replays_reads_but_not_writes(monkeypatch):
+    calls = []
+
+    def flaky_query(self, query, params=None, session_params=None):
+        calls.append(self._driver)
+        if len(calls) % 2:
+            raise SessionExpired("connection reset")
+        return [{"ok": 1}]
+
+    monkeypatch.setattr(Neo4jGraph, "query", flaky_query)
+    factory = FakeFactory()
+    graph = PooledNeo4jGraph(make_manager(factory), refresh_schema=False)
+
+    assert graph.query("MATCH (m:Movie) RETURN count(m) AS n") == [{"ok": 1}]
+    assert calls[0] is not calls[1] and calls[0].closed
+
+    with pytest.raises(SessionExpired):
+        graph.query("MERGE (m:Movie {id: '1'}) RETURN m")
+    assert len(calls) == 3 and len(factory.drivers) == 3
+
+
+def test_prompt_schema_leaves_out_the_stats_node(monkeypatch):
+    def refresh_schema(self):
+        self.structured_schema = {
+            "node_props": {
+                "Movie": [{"property": "title", "type": "STRING"}],
+                "GraphStats": [{"property": "movies", "type": "INTEGER"}],
+            },
+            "rel_props": {},
+            "relationships": [],
+            "metadata": {"constraint": [], "index": []},
+        }
+
+    monkeypatch.setattr(Neo4jGraph, "refresh_schema", refresh_schema)
+    graph = PooledNeo4jGraph(make_manager(FakeFactory()))
+    assert list(graph.get_structured_schema["node_props"]) == ["Movie"]
+    assert "Movie" in graph.schema and "GraphStats" not in graph.schema
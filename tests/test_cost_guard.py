@@ -0,0 +1,167 @@
+"""
+Unit tests for the EXPLAIN cost guard
+"""
+
+import json
+
+import pytest
+from neo4j.exceptions import CypherSyntaxError
+
+from conftest import FakeGraph, RecordingLLM
+from src.cache import CypherCache
+from src.cost_guard import CostGuard, QueryRejected, inject_limit, is_write, plan_operators
+from src.query_chain import create_qa_chain
+
+CHEAP = "MATCH (m:Movie) RETURN count(m) AS count"
+WIDE = "MATCH (m:Movie) RETURN m.title AS title"
+CARTESIAN = "MATCH (m:Movie), (p:Person) RETURN m.title, p.name"
+UNBOUNDED = "MATCH (a:Person)-[:ACTED_IN*]-(b:Person) RETURN b.name LIMIT 10"
+
+
+def plan(operator, rows, children=None, details=""):
+    return {
+        "operatorType": f"{operator}@neo4j",
+        "arguments": {"EstimatedRows": rows, "Details": details},
+        "children": children or [],
+    }
+
+
+PLANS = {
+    CHEAP: plan("ProduceResults", 1, [plan("NodeCountFromCountStore", 1)]),
+    WIDE: plan("ProduceResults", 90000, [plan("NodeByLabelScan", 90000)]),
+    CARTESIAN: plan("ProduceResults", 5e8, [plan("CartesianProduct", 5e8, [plan("NodeByLabelScan", 9e4)])]),
+    UNBOUNDED: plan("ProduceResults", 10, [plan("VarLengthExpand(All)", 1e6)]),
+}
+
+
+class PlanGraph(FakeGraph):
+    """FakeGraph answering EXPLAIN from canned plans"""
+
+    def __init__(self):
+        super().__init__()
+        self.explained = []
+
+    def explain(self, query):
+        self.explained.append(query)
+        if query not in PLANS:
+            raise CypherSyntaxError("Invalid input")
+        return PLANS[query]
+
+
+def make_chain(responses, **guard_options):
+    graph = PlanGraph()
+    llm = RecordingLLM(responses=responses, prompts=[])
+    guard = CostGuard(limit_rows=10000, inject_limit=500, **guard_options)
+    chain = create_qa_chain(graph, llm, verbose=False, cost_guard=guard, return_intermediate_steps=True)
+    return chain, graph, llm, guard
+
+
+def test_plan_operators_flattens_tree():
+    ops = plan_operators(PLANS[CARTESIAN])
+    assert [op["operator"] for op in ops] == ["ProduceResults", "CartesianProduct", "NodeByLabelScan"]
+    assert ops[1]["estimated_rows"] == 5e8
+
+
+def test_inject_limit_only_where_safe():
+    assert inject_limit(WIDE + ";", 100) == WIDE + "\nLIMIT 100"
+    assert inject_limit(UNBOUNDED, 100) == UNBOUNDED
+    assert inject_limit("MATCH (m:Movie) SET m.seen = true RETURN m", 100) is None
+    assert inject_limit("MATCH (m:Movie) RETURN m UNION MATCH (m:Movie) RETURN m", 100) is None
+
+
+def test_keywords_inside_literals_are_not_writes():
+    title = "MATCH (m:Movie) WHERE m.title = 'Set It Off' RETURN m.title AS title"
+    assert not is_write(title)
+    assert not is_write('MATCH (m:Movie) WHERE toLower(m.title) CONTAINS "delete" RETURN m')
+    assert not is_write("MATCH (m:Movie {title: 'Don\\'t Create'}) RETURN m // merge later")
+    assert not is_write("MATCH (m:`Drop Zone`) RETURN m")
+    assert is_write("MATCH (m:Movie {title: 'Heat'}) SET m.seen = true")
+    assert inject_limit(title, 100) == title + "\nLIMIT 100"
+
+
+def test_cheap_query_is_allowed():
+    chain, graph, _, guard = make_chain([CHEAP])
+    result = chain.invoke({"query": "How many movies are there?"})
+    assert result["intermediate_steps"][0]["query"] == CHEAP
+    assert guard.stats()["allow"] == 1
+
+
+def test_large_result_gets_limit():
+    chain, graph, _, guard = make_chain([WIDE])
+    result = chain.invoke({"query": "List all movies"})
+    assert result["intermediate_steps"][0]["query"] == WIDE + "\nLIMIT 500"
+    assert graph.queries[-1][0] == WIDE + "\nLIMIT 500"
+
+
+def test_risky_query_is_regenerated_with_feedback():
+    chain, graph, llm, guard = make_chain([CARTESIAN, CHEAP])
+    result = chain.invoke({"query": "Movies and people"})
+    assert result["intermediate_steps"][0]["query"] == CHEAP
+    assert "CartesianProduct" in llm.prompts[1]
+    assert guard.stats() == {"allow": 1, "limit": 0, "regenerate": 1, "reject": 0}
+
+
+def test_reject_after_regenerations_and_never_cache(tmp_path):
+    log = tmp_path / "decisions.jsonl"
+    graph = PlanGraph()
+    llm = RecordingLLM(responses=[UNBOUNDED, CARTESIAN], prompts=[])
+    cache = CypherCache()
+    chain = create_qa_chain(graph, llm, verbose=False, cache=cache,
+                            cost_guard=CostGuard(decision_log=str(log)))
+
+    with pytest.raises(QueryRejected) as excinfo:
+        chain.invoke({"query": "Who is connected to Tom Hanks?"})
+
+    assert "CartesianProduct" in str(excinfo.value)
+    assert len(cache) == 0 and graph.queries == []
+    entries = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [e["attempt"] for e in entries] == [0, 1]
+    assert entries[0]["reasons"] == ["unbounded variable-length path"]
+
+
+def test_invalid_cypher_rejected_directly():
+    chain, _, _, _ = make_chain(["MATCH (m:Movie RETURN m"], risky_action="reject")
+    with pytest.raises(QueryRejected, match="EXPLAIN failed"):
+        chain.invoke({"query": "broken"})
+
+
+def test_decisions_are_cached_per_statement():
+    guard = CostGuard()
+    graph = PlanGraph()
+    guard.check(graph, CHEAP)
+    guard.check(graph, CHEAP)
+    assert graph.explained == [CHEAP]
+
+
+def test_guard_fails_open_when_explain_unavailable():
+    class DownGraph(FakeGraph):
+        def explain(self, query):
+            raise OSError("connection refused")
+
+    assert CostGuard().check(DownGraph(), WIDE).action == "allow"
+
+
+def test_decisions_are_shared_across_literal_values():
+    guard = CostGuard(limit_rows=10, inject_limit=5)
+    graph = PlanGraph()
+    graph.explain = lambda query: graph.explained.append(query) or PLANS[WIDE]
+    first = guard.check(graph, "MATCH (m:Movie) WHERE m.year = 1999 RETURN m.title AS title")
+    second = guard.check(graph, "MATCH (m:Movie) WHERE m.year = 2004 RETURN m.title AS title")
+    assert len(graph.explained) == 1
+    assert first.action == second.action == "limit"
+    assert second.cypher == "MATCH (m:Movie) WHERE m.year = 2004 RETURN m.title AS title\nLIMIT 5"
+
+
+def test_estimates_near_a_threshold_are_rechecked_per_literal():
+    selective = "MATCH (m:Movie) WHERE m.year = 1899 RETURN m.title AS title"
+    broad = "MATCH (m:Movie) WHERE m.year = 1999 RETURN m.title AS title"
+    graph = PlanGraph()
+    rows = {selective: 2000, broad: 50000}
+    graph.explain = lambda query: graph.explained.append(query) or plan("ProduceResults", rows[query])
+    guard = CostGuard(limit_rows=10000, inject_limit=500)
+
+    assert guard.check(graph, selective).action == "allow"
+    # 2000 estimated rows is within a factor of ten of limit_rows: not shared
+    decision = guard.check(graph, broad)
+    assert graph.explained == [selective, broad]
+    assert decision.action == "limit" and decision.cypher.endswith("LIMIT 500")
@@ -0,0 +1,122 @@
+"""
+Unit tests for query deadlines and cancellation
+"""
+
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from conftest import FakeGraph
+from src.connection import ConnectionManager
+from src.deadline import (
+    Deadline, DeadlineExceeded, DeadlineGeneration, QueryCancelled, current_deadline, run_with_deadline,
+)
+from src.query_chain import create_qa_chain
+
+
+class Record(dict):
+    def data(self):
+        return dict(self)
+
+
+class RecordingDriver:
+    """Driver whose execute_query records statements; SHOW TRANSACTIONS finds one"""
+
+    def __init__(self):
+        self.calls = []
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+    def execute_query(self, query, parameters_=None, database_=None, **kwargs):
+        self.calls.append((query, parameters_))
+        text = getattr(query, "text", query)
+        if text.startswith("SHOW TRANSACTIONS"):
+            return [Record(ids=["neo4j-transaction-7"])], None, None
+        return [Record(n=1)], None, None
+
+
+def pooled_graph():
+    driver = RecordingDriver()
+    manager = ConnectionManager("bolt://x", "u", "p", driver_factory=lambda uri, auth=None, **c: driver)
+    return manager.graph(refresh_schema=False), driver
+
+
+def test_budget_split_and_expiry():
+    deadline = Deadline(budget=10, llm_share=0.3)
+    assert deadline.llm_timeout() == pytest.approx(3, abs=0.01)
+    assert deadline.db_timeout() == pytest.approx(10, abs=0.01)
+    with pytest.raises(DeadlineExceeded):
+        Deadline(budget=0).check()
+
+
+def test_generation_gets_its_share():
+    slow = RunnableLambda(lambda _: time.sleep(0.5) or "MATCH (n) RETURN n")
+    generation = DeadlineGeneration(slow)
+    assert DeadlineGeneration(RunnableLambda(lambda _: "ok")).invoke({"question": "q"}) == "ok"
+    with Deadline(budget=0.2, llm_share=0.5).scope():
+        start = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            generation.invoke({"question": "q"})
+        assert time.perf_counter() - start < 0.3
+
+
+def test_cancel_interrupts_waiting_generation():
+    generation = DeadlineGeneration(RunnableLambda(lambda _: time.sleep(0.5) or "x"))
+    deadline = Deadline(budget=5)
+    threading.Timer(0.05, deadline.cancel, args=("superseded",)).start()
+    with deadline.scope(), pytest.raises(QueryCancelled, match="superseded"):
+        generation.invoke({"question": "q"})
+
+
+def test_query_runs_with_deadline_timeout_and_metadata():
+    graph, driver = pooled_graph()
+    deadline = Deadline(budget=5)
+    with deadline.scope():
+        assert graph.query("MATCH (n) RETURN count(n) AS n") == [{"n": 1}]
+    query = driver.calls[0][0]
+    assert query.metadata == {"qa_query_id": deadline.query_id}
+    assert 4 < query.timeout <= 5
+
+    deadline.cancel("superseded")
+    assert "SHOW TRANSACTIONS" in driver.calls[1][0]
+    assert driver.calls[2] == ("TERMINATE TRANSACTIONS $ids", {"ids": ["neo4j-transaction-7"]})
+
+
+def test_stream_uses_remaining_budget():
+    graph, _ = pooled_graph()
+    deadline = Deadline(budget=5)
+    with deadline.scope():
+        cursor = graph.stream("MATCH (n) RETURN n")
+    assert cursor.metadata == deadline.metadata() and cursor.timeout <= 5
+
+
+def test_abandoned_wait_cancels_query():
+    deadline = Deadline(budget=5)
+    cancelled = threading.Event()
+    deadline.on_cancel("work", cancelled.set)
+
+    def interrupt(_):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run_with_deadline(lambda: time.sleep(0.3), deadline, on_wait=interrupt, poll=0.01)
+    assert cancelled.is_set() and deadline.cancelled
+
+
+def test_run_with_deadline_scopes_the_work(fake_llm):
+    chain = create_qa_chain(FakeGraph(), fake_llm, verbose=False, enforce_deadlines=True)
+    deadline = Deadline(budget=5)
+    seen = []
+
+    def answer():
+        seen.append(current_deadline())
+        return chain.invoke({"query": "How many movies?"})
+
+    assert run_with_deadline(answer, deadline)["result"] == [{"count": 1}]
+    assert seen == [deadline] and current_deadline() is None
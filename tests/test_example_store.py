@@ -0,0 +1,72 @@
+"""
+Unit tests for the indexed few-shot example store
+"""
+
+from src.cache import CypherCache
+from src.example_store import ExampleStore, estimate_tokens
+from src.query_chain import create_cypher_prompt, create_example_store, create_qa_chain, get_few_shot_examples
+
+
+def test_selects_most_similar_examples():
+    store = create_example_store(k=2, token_budget=None)
+    selected = store.select_examples({"question": "How many movies has Brad Pitt acted in?"})
+
+    assert len(selected) == 2
+    assert selected[0]["question"] == "How many movies has Tom Hanks acted in?"
+
+
+def test_token_budget_limits_selection():
+    examples = get_few_shot_examples()
+    budget = estimate_tokens(examples[0]["question"] + examples[0]["query"])
+    store = ExampleStore(examples, k=5, token_budget=budget)
+
+    selected = store.select_examples({"question": "How many artists are there?"})
+    spent = sum(estimate_tokens(e["question"] + e["query"]) for e in selected)
+    assert 1 <= len(selected) and spent <= budget
+
+
+def test_incremental_add_and_remove():
+    store = ExampleStore(get_few_shot_examples(), k=1)
+    custom = {"question": "Who directed The Matrix?", "query": "MATCH (p:Person)-[:DIRECTED]->(m:Movie) RETURN p.name"}
+    version = store.version
+
+    example_id = store.add_example(custom)
+    assert store.select_examples({"question": "Who directed Heat?"}) == [custom]
+    assert store.version != version
+
+    assert store.remove_example(example_id)
+    assert custom not in store.select_examples({"question": "Who directed Heat?"})
+    assert len(store) == len(get_few_shot_examples())
+    assert not store.remove_example(example_id)
+
+
+def test_readding_updates_in_place():
+    store = ExampleStore(get_few_shot_examples())
+    first = get_few_shot_examples()[0]
+    store.add_example({"question": first["question"], "query": "RETURN 1"})
+
+    assert len(store) == len(get_few_shot_examples())
+
+
+def test_prompt_uses_selector():
+    prompt = create_cypher_prompt(create_example_store(k=1))
+    formatted = prompt.format(question="Which actors played in the movie Heat?", schema="S")
+
+    assert "Casino" in formatted
+    assert "Tom Hanks" not in formatted
+
+
+def test_example_edits_invalidate_cached_cypher(fake_graph, fake_llm):
+    store = create_example_store(k=1)
+    chain = create_qa_chain(fake_graph, fake_llm, verbose=False, cache=CypherCache(), example_store=store)
+    chain.invoke({"query": "Who directed Heat?"})
+    chain.invoke({"query": "Who directed Heat?"})
+    assert fake_llm.i == 1
+
+    example_id = store.add_example({"question": "Who directed The Matrix?", "query": "MATCH (p:Person) RETURN p.name"})
+    chain.invoke({"query": "Who directed Heat?"})
+    assert fake_llm.i == 2
+
+    store.remove_example(example_id)
+    chain.invoke({"query": "Who directed Heat?"})
+    assert fake_llm.i == 2
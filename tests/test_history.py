@@ -0,0 +1,117 @@
+"""
+Unit tests for the bounded query history
+"""
+
+import os
+
+from src.columnar import ColumnarResult
+from src.history import QueryHistory
+
+ROWS = [{"title": f"Movie {i}", "rating": 7.5} for i in range(50)]
+
+
+def test_ring_buffer_keeps_only_metadata():
+    history = QueryHistory(capacity=3)
+    for i in range(5):
+        history.add(f"Question {i}", {"query": f"Question {i}", "result": ROWS}, 0.1, cypher="MATCH (m) RETURN m")
+
+    recent = history.recent()
+    assert len(history) == 3
+    assert [e["question"] for e in recent] == ["Question 2", "Question 3", "Question 4"]
+    assert "result" not in recent[0] and recent[0]["rows"] == 50
+    history.close()
+
+
+def test_payloads_load_lazily_in_their_original_form():
+    history = QueryHistory()
+    plain = history.add("plain", {"result": ROWS}, 0.1)
+    columnar = history.add("columnar", {"result": ColumnarResult.from_rows(ROWS)}, 0.2, trace={"total_ms": 200})
+
+    assert history.load(plain["id"]) == ROWS
+    loaded = history.load(columnar["id"])
+    assert isinstance(loaded, ColumnarResult) and loaded.to_pylist() == ROWS
+    assert history.load(columnar["id"]) is loaded
+    assert history.recent(1)[0]["trace"] == {"total_ms": 200}
+    history.close()
+
+
+def test_disk_retention_prunes_oldest():
+    history = QueryHistory(max_stored=2)
+    first = history.add("first", ROWS, 0.1)
+    for q in ("second", "third"):
+        history.add(q, ROWS, 0.1)
+    assert history.load(first["id"]) is None
+    assert [e["question"] for e in history.search("")] == ["third", "second"]
+    history.close()
+
+
+def test_temporary_store_is_removed_on_close():
+    history = QueryHistory()
+    path = history.path
+    assert os.path.exists(path)
+    history.close()
+    assert not os.path.exists(path)
+
+
+def test_persistent_history_is_scoped_to_its_session(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    first = QueryHistory(path=path, session_id="alice")
+    first.add("How many movies has Tom Hanks acted in?", ROWS[:1], 0.1)
+    first.add("List 100% rated movies", ROWS[:1], 0.1)
+    first.close()
+
+    other = QueryHistory(path=path, session_id="bob", max_stored=1)
+    assert len(other) == 0 and other.search("") == []
+    other.add("Which genres exist?", ROWS[:1], 0.1)
+    hidden = other.add("Who directed Heat?", ROWS[:1], 0.1)
+    assert [e["question"] for e in other.search("")] == ["Who directed Heat?"]
+    assert len(other.search("", all_sessions=True)) == 3
+
+    second = QueryHistory(path=path, session_id="alice")
+    assert [e["question"] for e in second.recent()][0].startswith("How many")
+    assert [e["question"] for e in second.search("tom hanks")] == ["How many movies has Tom Hanks acted in?"]
+    assert [e["question"] for e in second.search("100%")] == ["List 100% rated movies"]
+    assert other.load(hidden["id"]) == ROWS[:1] and second.load(hidden["id"]) is None
+    second.clear()
+    assert len(second) == 0 and second.search("") == []
+    assert len(second.search("", all_sessions=True)) == 1
+    second.close()
+    other.close()
+    assert os.path.exists(path)
+
+
+def test_old_and_excess_sessions_are_pruned(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    for session in ("a", "b", "c"):
+        history = QueryHistory(path=path, session_id=session)
+        history.add(f"{session} question", ROWS[:1], 0.1)
+        history.close()
+    # Sessions that never come back are still bounded by the global cap...
+    capped = QueryHistory(path=path, session_id="d", max_total=2)
+    capped.add("d question", ROWS[:1], 0.1)
+    assert [e["question"] for e in capped.search("", all_sessions=True)] == ["d question", "c question"]
+    capped._db.execute("UPDATE query_history SET created = created - 40 * 86400 WHERE session = 'c'")
+    capped._db.commit()
+    capped.close()
+
+    # ...and by age, applied when a store is opened
+    aged = QueryHistory(path=path, session_id="e", max_age_days=30)
+    assert [e["question"] for e in aged.search("", all_sessions=True)] == ["d question"]
+    aged.close()
+
+
+def test_configured_history_is_keyed_by_a_stable_session(tmp_path, monkeypatch):
+    from config import get_query_history
+
+    monkeypatch.setenv("HISTORY_PATH", str(tmp_path / "history.sqlite"))
+    monkeypatch.setenv("HISTORY_SESSION", "team")
+    first = get_query_history()
+    first.add("Who directed Heat?", ROWS[:1], 0.1)
+    first.close()
+
+    second = get_query_history()
+    assert second.session_id == "team" and [e["question"] for e in second.recent()] == ["Who directed Heat?"]
+    second.close()
+    signed_in = get_query_history(session_id="alice@example.com")
+    assert signed_in.session_id == "alice@example.com"
+    signed_in.close()
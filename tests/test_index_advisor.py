@@ -0,0 +1,121 @@
+"""
+Unit tests for the index advisor
+"""
+
+from conftest import FakeGraph
+from src.history import QueryHistory
+from src.index_advisor import IndexAdvisor, db_hits, load_statements, predicate_properties
+
+BY_TITLE = "MATCH (m:Movie {title: 'Casino'})<-[:ACTED_IN]-(a:Person) RETURN a.name AS actor"
+BY_NAME = "MATCH (a:Person)-[:ACTED_IN]->(m:Movie) WHERE a.name = 'Tom Hanks' RETURN count(m)"
+BY_RATING = "MATCH (m:Movie) WHERE m.imdbRating > 8.0 RETURN m.title AS title"
+BY_WORD = "MATCH (g:Genre) WHERE g.name CONTAINS 'Sci' RETURN g.name"
+
+
+class IndexGraph(FakeGraph):
+    """FakeGraph answering SHOW INDEXES, duplicate checks and PROFILE"""
+
+    def __init__(self, indexes=None, duplicates=0):
+        super().__init__()
+        self.indexes = indexes or []
+        self.duplicates = duplicates
+        self.created = []
+
+    def query(self, query, params=None):
+        self.queries.append((query, params or {}))
+        if query.startswith("SHOW INDEXES"):
+            return self.indexes
+        if "AS duplicates" in query:
+            return [{"duplicates": self.duplicates}]
+        if query.startswith("CREATE"):
+            self.created.append(query)
+        return []
+
+    def profile(self, query):
+        hits = 10 if self.created else 1000
+        return {"dbHits": 1, "children": [{"dbHits": hits, "children": []}]}
+
+
+def index(label, prop, kind="RANGE"):
+    return {"name": f"{label}_{prop}", "type": kind, "entityType": "NODE",
+            "labelsOrTypes": [label], "properties": [prop], "owningConstraint": None}
+
+
+def test_predicate_properties():
+    assert predicate_properties(BY_TITLE) == [("Movie", "title", "=")]
+    assert predicate_properties(BY_NAME) == [("Person", "name", "=")]
+    assert predicate_properties(BY_RATING) == [("Movie", "imdbRating", ">")]
+    assert predicate_properties(BY_WORD) == [("Genre", "name", "CONTAINS")]
+    assert predicate_properties("MATCH (m:Movie) WHERE m.title <> 'x' RETURN m") == []
+
+
+def test_recommends_missing_indexes_only():
+    advisor = IndexAdvisor(min_uses=2, check_unique=False)
+    advisor.observe_all([BY_TITLE, BY_TITLE, BY_RATING, BY_RATING, BY_WORD, BY_WORD, BY_NAME])
+    graph = IndexGraph(indexes=[index("Movie", "title")])
+
+    recs = {(r["label"], r["property"]): r for r in advisor.recommend(graph)}
+
+    assert set(recs) == {("Movie", "imdbRating"), ("Genre", "name")}
+    assert recs[("Genre", "name")]["index_type"] == "TEXT"
+    assert recs[("Movie", "imdbRating")]["statement"] == (
+        "CREATE RANGE INDEX advisor_movie_imdbrating_range IF NOT EXISTS FOR (n:`Movie`) ON (n.`imdbRating`)"
+    )
+
+
+def test_unique_properties_get_constraints():
+    advisor = IndexAdvisor(min_uses=1)
+    advisor.observe(BY_NAME)
+    assert advisor.recommend(IndexGraph())[0]["index_type"] == "UNIQUE"
+    assert advisor.recommend(IndexGraph(duplicates=3))[0]["index_type"] == "RANGE"
+
+
+def test_write_statements_are_ignored():
+    advisor = IndexAdvisor(min_uses=1)
+    advisor.observe("MERGE (p:Person {name: 'X'}) RETURN p")
+    assert advisor.recommend(IndexGraph()) == []
+
+
+def test_report_profiles_before_and_after_creation():
+    advisor = IndexAdvisor(min_uses=1, check_unique=False)
+    advisor.observe_all([BY_RATING, "MATCH (m:Movie) WHERE m.imdbRating > 7.5 RETURN m.title AS title"])
+    graph = IndexGraph()
+
+    dry = advisor.report(graph)
+    assert dry["created"] == [] and graph.created == []
+    assert dry["queries"] == [{"cypher": BY_RATING, "db_hits_before": 1001, "db_hits_after": None}]
+
+    report = advisor.report(graph, create=True)
+    assert len(report["created"]) == 1
+    assert report["queries"][0]["db_hits_after"] == 11
+    assert graph.queries[-1][0] == "CALL db.awaitIndexes(300)"
+
+
+def test_observe_history_and_statement_files(tmp_path):
+    history = QueryHistory()
+    history.add("Casino cast", [], 0.1, cypher=BY_TITLE)
+    advisor = IndexAdvisor(min_uses=1, check_unique=False)
+    advisor.observe_history(history)
+    history.close()
+    assert advisor.uses[("Movie", "title")] == 1
+
+    # A fresh QueryHistory on the same file is a new session; it still sees
+    # what other sessions recorded
+    db = str(tmp_path / "history.sqlite")
+    for session in ("alice", "bob"):
+        writer = QueryHistory(path=db, session_id=session)
+        writer.add(f"{session} top movies", [], 0.1, cypher=BY_RATING)
+        writer.close()
+    reader = QueryHistory(path=db)
+    advisor = IndexAdvisor(min_uses=1, check_unique=False)
+    advisor.observe_history(reader)
+    reader.close()
+    assert advisor.uses[("Movie", "imdbRating")] == 2
+
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"cypher": "%s"}\n{"ok": false}\n' % BY_RATING.replace('"', '\\"'))
+    assert load_statements(str(path)) == [BY_RATING]
+
+
+def test_db_hits_sums_tree():
+    assert db_hits({"dbHits": 2, "children": [{"dbHits": 3}, {"children": [{"dbHits": 5}]}]}) == 10
@@ -0,0 +1,125 @@
+"""
+Unit tests for the multi-backend LLM router
+"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import FakeGraph
+from src.llm_router import Backend, BackendPool, LLMRouter, NoBackendAvailable, backend_from_spec
+from src.query_chain import create_qa_chain
+
+CYPHER = "MATCH (m:Movie) RETURN count(m) AS count"
+
+
+class StubModel:
+    """Backend model answering after a delay, or failing"""
+
+    def __init__(self, answer, latency=0.0, fail=False):
+        self.answer = answer
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.stops = []
+        self._lock = threading.Lock()
+
+    def invoke(self, messages, stop=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.stops.append(stop)
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("429 Too Many Requests")
+        return self.answer
+
+
+def test_routes_to_fastest_backend():
+    slow, fast = StubModel("slow", 0.03), StubModel("fast", 0.0)
+    pool = BackendPool([Backend("slow", slow), Backend("fast", fast)], hedge_delay=5)
+    pool.invoke("prompt")
+    pool.invoke("prompt")
+    assert [pool.invoke("prompt") for _ in range(3)] == ["fast"] * 3
+    assert pool.ranked()[0].name == "fast"
+
+
+def test_hedged_request_wins_over_slow_primary():
+    slow, fast = StubModel("slow", 0.5), StubModel("fast", 0.0)
+    pool = BackendPool([Backend("slow", slow), Backend("fast", fast)], hedge_delay=0.05)
+    start = time.perf_counter()
+    assert pool.invoke("prompt", stop=["\n\n"]) == "fast"
+    assert time.perf_counter() - start < 0.4
+    assert fast.stops == [["\n\n"]]
+    stats = pool.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_no_hedge_when_primary_is_quick():
+    primary, spare = StubModel("primary"), StubModel("spare")
+    pool = BackendPool([Backend("a", primary), Backend("b", spare)], hedge_delay=0.2)
+    assert pool.invoke("prompt") == "primary"
+    assert spare.calls == 0 and pool.stats()["hedges"] == 0
+
+
+def test_hedge_delay_follows_primary_percentile():
+    backend = Backend("a", StubModel("x"))
+    pool = BackendPool([backend], hedge_min_samples=3, hedge_default=1.0)
+    assert pool.delay_for(backend) == 1.0
+    for seconds in (0.1, 0.2, 0.3):
+        backend.record_success(seconds)
+    assert pool.delay_for(backend) == pytest.approx(0.3, abs=0.011)
+
+
+def test_failover_and_circuit_breaker():
+    broken, healthy = StubModel("broken", fail=True), StubModel("ok")
+    pool = BackendPool(
+        [Backend("broken", broken, failure_threshold=2, reset_timeout=0.1), Backend("ok", healthy)],
+        hedge_delay=5,
+    )
+    assert pool.invoke("prompt") == "ok"
+    assert pool.stats()["failovers"] == 1
+    # Rank the broken backend first again so it trips its breaker
+    pool.backends[0].latency = None
+    pool.backends[1].latency = 1.0
+    pool.invoke("prompt")
+    assert pool.stats()["backends"]["broken"]["circuit"] == "open"
+    calls = broken.calls
+    pool.invoke("prompt")
+    assert broken.calls == calls
+
+    time.sleep(0.12)
+    assert pool.stats()["backends"]["broken"]["circuit"] == "half-open"
+    broken.fail = False
+    pool.backends[1].latency = 10.0
+    assert pool.invoke("prompt") == "broken"
+    assert pool.stats()["backends"]["broken"]["circuit"] == "closed"
+
+
+def test_all_circuits_open():
+    pool = BackendPool([Backend("a", StubModel("a", fail=True), failure_threshold=1, reset_timeout=60)])
+    with pytest.raises(ConnectionError):
+        pool.invoke("prompt")
+    with pytest.raises(NoBackendAvailable):
+        pool.invoke("prompt")
+
+
+def test_timeout():
+    pool = BackendPool([Backend("a", StubModel("a", 0.3))], timeout=0.05)
+    with pytest.raises(TimeoutError):
+        pool.invoke("prompt")
+
+
+def test_router_drives_the_chain():
+    pool = BackendPool([Backend("a", StubModel(CYPHER, fail=True)), Backend("b", StubModel(CYPHER))], hedge_delay=5)
+    graph = FakeGraph()
+    chain = create_qa_chain(graph, LLMRouter(pool=pool), verbose=False)
+    assert chain.invoke({"query": "How many movies?"})["result"] == [{"count": 1}]
+    assert graph.queries[0][0] == CYPHER
+
+
+def test_backend_from_spec():
+    backend = backend_from_spec({"provider": "stub", "name": "local", "latency": 0.0, "failure_threshold": 5})
+    assert backend.name == "local" and backend.failure_threshold == 5
+    with pytest.raises(ValueError):
+        backend_from_spec({"provider": "nope"})
@@ -0,0 +1,141 @@
+"""
+Unit tests for the offline bulk loader
+"""
+
+import json
+
+import pytest
+
+from conftest import FakeGraph
+from src.loader import BATCH_QUERY, GENRE_QUERY, PERSON_QUERY, SCHEMA_STATEMENTS, BulkLoader, read_records
+
+HEADER = "movieId,released,title,imdbRating,director,actors,genres\n"
+
+
+def write_csv(tmp_path, rows=10):
+    path = tmp_path / "movies.csv"
+    lines = [
+        f"{i},1995-01-0{i % 9 + 1},Movie {i},7.{i},Director {i},Actor A|Actor {i} ,Drama|Action\n"
+        for i in range(rows)
+    ]
+    path.write_text(HEADER + "".join(lines))
+    return str(path)
+
+
+class FlakyGraph(FakeGraph):
+    """FakeGraph whose batch writes fail from a given call onwards"""
+
+    def __init__(self, fail_from=None):
+        super().__init__(rows=[])
+        self.fail_from = fail_from
+        self.batches = []
+
+    def query(self, query, params=None):
+        if query == BATCH_QUERY:
+            if self.fail_from is not None and len(self.batches) >= self.fail_from:
+                raise RuntimeError("write failed")
+            self.batches.append(params["batch"])
+        return super().query(query, params)
+
+
+def test_read_records_normalizes_csv(tmp_path):
+    row = next(read_records(write_csv(tmp_path)))
+    assert row["id"] == "0"
+    assert row["imdbRating"] == 7.0
+    assert row["actors"] == ["Actor A", "Actor 0"]
+    assert row["genres"] == ["Drama", "Action"]
+
+
+def test_read_records_jsonl(tmp_path):
+    path = tmp_path / "movies.jsonl"
+    path.write_text(json.dumps({"movieId": 1, "title": "X", "actors": ["A"], "genres": "Drama"}) + "\n")
+    row = next(read_records(str(path)))
+    assert row["actors"] == ["A"] and row["genres"] == ["Drama"] and row["imdbRating"] is None
+
+
+def test_constraints_first_then_batches(tmp_path):
+    graph = FlakyGraph()
+    progress = []
+    report = BulkLoader(graph, batch_size=3, workers=2, progress=progress.append).load(write_csv(tmp_path))
+
+    assert [q for q, _ in graph.queries[: len(SCHEMA_STATEMENTS)]] == SCHEMA_STATEMENTS
+    # Shared nodes are merged by one writer before any parallel batch runs
+    first_batch = next(i for i, (q, _) in enumerate(graph.queries) if q == BATCH_QUERY)
+    entities = graph.queries[len(SCHEMA_STATEMENTS): first_batch]
+    people = [name for q, params in entities if q == PERSON_QUERY for name in params["names"]]
+    assert len(people) == 21 and "Actor A" in people
+    assert [params["names"] for q, params in entities if q == GENRE_QUERY] == [["Action", "Drama"]]
+    assert "MERGE (p:Person" not in BATCH_QUERY and "MERGE (g:Genre" not in BATCH_QUERY
+    assert sorted(len(b) for b in graph.batches) == [1, 3, 3, 3]
+    assert report["rows"] == 10 and report["batches"] == 4
+    assert len(progress) == 4 and "rows_per_sec" in progress[-1]
+
+
+def test_resumes_after_failure(tmp_path):
+    path = write_csv(tmp_path)
+    checkpoint = str(tmp_path / "load.ckpt")
+
+    with pytest.raises(RuntimeError):
+        BulkLoader(FlakyGraph(fail_from=2), batch_size=3, workers=1, checkpoint_path=checkpoint, max_retries=1).load(path)
+    assert json.load(open(checkpoint))["done"] == [0, 1]
+
+    graph = FlakyGraph()
+    report = BulkLoader(graph, batch_size=3, workers=1, checkpoint_path=checkpoint).load(path)
+    assert report["skipped_batches"] == 2
+    assert report["rows"] == 4
+    assert [row["id"] for batch in graph.batches for row in batch] == ["6", "7", "8", "9"]
+
+
+class CountingGraph(FakeGraph):
+    """FakeGraph that keeps enough state to answer the loader's delta queries"""
+
+    def __init__(self, actors=(), fail_from=None):
+        super().__init__(rows=[])
+        self.movies, self.genres, self.people = set(), set(), set()
+        self.acted, self.directed = set(actors), set()
+        self.fail_from = fail_from
+        self.writes = 0
+
+    def query(self, query, params=None):
+        super().query(query, params)
+        if query == PERSON_QUERY:
+            rows = [{"name": n, "acted": n in self.acted, "directed": n in self.directed} for n in params["names"]]
+            self.people.update(params["names"])
+            return rows
+        if query == GENRE_QUERY:
+            created = len(set(params["names"]) - self.genres)
+            self.genres.update(params["names"])
+            return [{"created": created}]
+        if query == BATCH_QUERY:
+            if self.fail_from is not None and self.writes >= self.fail_from:
+                raise RuntimeError("write failed")
+            self.writes += 1
+            created = len({row["id"] for row in params["batch"]} - self.movies)
+            for row in params["batch"]:
+                self.movies.add(row["id"])
+                self.acted.update(row["actors"])
+                self.directed.update(row["directors"])
+            return [{"movies": created}]
+        return []
+
+
+def test_loader_reports_stats_deltas_as_batches_commit(tmp_path):
+    path = write_csv(tmp_path)
+    checkpoint = str(tmp_path / "load.ckpt")
+    graph = CountingGraph(actors=["Actor A"], fail_from=2)
+    deltas = []
+
+    def on_delta(**delta):
+        deltas.append(delta)
+
+    with pytest.raises(RuntimeError):
+        BulkLoader(graph, batch_size=3, workers=1, checkpoint_path=checkpoint, max_retries=1,
+                   on_delta=on_delta).load(path)
+    graph.fail_from = None
+    BulkLoader(graph, batch_size=3, workers=2, checkpoint_path=checkpoint, on_delta=on_delta).load(path)
+    # Rerunning a finished load adds nothing
+    BulkLoader(graph, batch_size=3, workers=2, on_delta=on_delta).load(path)
+
+    totals = {k: sum(d.get(k, 0) for d in deltas) for k in ("movies", "actors", "directors", "genres")}
+    # "Actor A" had already acted before the load
+    assert totals == {"movies": 10, "actors": 10, "directors": 10, "genres": 2}
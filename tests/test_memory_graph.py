@@ -0,0 +1,183 @@
+"""
+Unit tests for the in-memory graph engine
+"""
+
+import csv
+import datetime
+import json
+
+import pytest
+
+from conftest import RecordingLLM
+from src.benchmark import SAMPLE_QUERIES, run_benchmark
+from src.database import Neo4jDatabase
+from src.memory_graph import MemoryGraph, UnsupportedCypher
+from src.parameterize import QueryParameterizer
+from src.query_chain import create_qa_chain, get_few_shot_examples
+from src.schema_snapshot import FINGERPRINT_QUERY
+
+MOVIES = [
+    ("1", "Casino", "1995-11-22", "8.2", "Martin Scorsese", "Robert De Niro|Sharon Stone|Joe Pesci", "Crime|Drama"),
+    ("2", "Heat", "1995-12-15", "8.3", "Michael Mann", "Al Pacino|Robert De Niro|Val Kilmer", "Action|Crime|Drama"),
+    ("3", "Toy Story", "1995-11-22", "8.3", "John Lasseter", "Tom Hanks|Tim Allen", "Adventure|Animation|Comedy"),
+    ("4", "Schindler's List", "1993-12-15", "8.9", "Steven Spielberg", "Liam Neeson|Ben Kingsley", "Drama|War"),
+    ("5", "Forrest Gump", "1994-07-06", "8.8", "Robert Zemeckis", "Tom Hanks|Robin Wright", "Comedy|Drama"),
+    ("6", "Apollo 13", "1995-06-30", "7.6", "Ron Howard", "Tom Hanks|Kevin Bacon", "Action|Drama"),
+]
+
+
+@pytest.fixture
+def movies_file(tmp_path):
+    path = tmp_path / "movies_small.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["movieId", "title", "released", "imdbRating", "director", "actors", "genres"])
+        writer.writerows(MOVIES)
+    return str(path)
+
+
+@pytest.fixture
+def graph(movies_file):
+    return MemoryGraph.from_file(movies_file)
+
+
+def test_load_merges_like_the_bulk_loader(graph, movies_file):
+    stats = graph.stats()
+    assert stats["labels"] == {"Movie": 6, "Person": 17, "Genre": 7}
+    assert stats["relationship_types"] == {"DIRECTED": 6, "ACTED_IN": 14, "IN_GENRE": 14}
+    # Reloading the same file merges instead of duplicating
+    graph.load(movies_file)
+    assert graph.stats() == stats
+    assert graph.query("MATCH (m:Movie {title: 'Heat'}) RETURN m.released AS released")[0]["released"] == datetime.date(1995, 12, 15)
+
+
+def test_schema_matches_the_movie_model(graph):
+    relationships = {(r["start"], r["type"], r["end"]) for r in graph.get_structured_schema["relationships"]}
+    assert relationships == {("Person", "ACTED_IN", "Movie"), ("Person", "DIRECTED", "Movie"), ("Movie", "IN_GENRE", "Genre")}
+    assert "Movie {id: STRING, released: DATE, title: STRING, imdbRating: FLOAT}" in graph.schema
+    assert "(:Person)-[:ACTED_IN]->(:Movie)" in graph.schema
+
+
+def test_few_shot_examples_run(graph):
+    actors, casino, hanks, schindler, both, prolific, rated, top = (
+        graph.query(example["query"].replace("{{", "{").replace("}}", "}")) for example in get_few_shot_examples()
+    )
+    assert actors == [{"actors": 11}]
+    assert sorted(r["actor"] for r in casino) == ["Joe Pesci", "Robert De Niro", "Sharon Stone"]
+    assert hanks == [{"movies": 3}]
+    assert sorted(r["genre"] for r in schindler) == ["Drama", "War"]
+    assert both == [{"actor": "Tom Hanks"}]
+    assert sorted((r["actor"], r["count"]) for r in prolific) == [("Robert De Niro", 2), ("Tom Hanks", 3)]
+    assert len(rated) == 5
+    assert [r["title"] for r in top] == ["Schindler's List", "Forrest Gump", "Heat"]
+
+
+def test_sample_query_patterns_run(graph):
+    with open(SAMPLE_QUERIES, encoding="utf-8") as f:
+        cases = json.load(f)["test_cases"]
+    runnable = [c["expected_pattern"] for c in cases if "RETURN" in c["expected_pattern"]]
+    assert graph.query(runnable[0]) == [{"count(m)": 6}]
+    assert graph.query(runnable[1]) == [{"count(m)": 3}]
+
+
+def test_aggregation_ordering_and_projection(graph):
+    rows = graph.query(
+        "MATCH (g:Genre)<-[:IN_GENRE]-(m:Movie) RETURN g.name AS genre, count(*) AS movies "
+        "ORDER BY movies DESC, genre LIMIT 2"
+    )
+    assert rows == [{"genre": "Drama", "movies": 5}, {"genre": "Action", "movies": 2}]
+    assert graph.query("MATCH (m:Movie) RETURN avg(m.imdbRating) AS r")[0]["r"] == pytest.approx(8.35)
+    assert graph.query("MATCH (m:Movie) WHERE m.title STARTS WITH 'Zzz' RETURN count(m) AS n") == [{"n": 0}]
+    rows = graph.query(
+        "MATCH (m:Movie) WITH m.released.year AS year, collect(m.title) AS titles "
+        "WHERE size(titles) > 1 RETURN year, titles"
+    )
+    assert rows == [{"year": 1995, "titles": ["Casino", "Heat", "Toy Story", "Apollo 13"]}]
+    assert graph.query("MATCH (m:Movie {title: 'Heat'}) RETURN m")[0]["m"]["title"] == "Heat"
+
+
+def test_parameters_and_where_filters(graph):
+    rows = graph.query(
+        "MATCH (a:Person)-[:ACTED_IN]->(m:Movie)<-[:ACTED_IN]-(co:Person) "
+        "WHERE a.name = $name AND m.imdbRating >= $rating RETURN DISTINCT co.name AS name ORDER BY name",
+        {"name": "Tom Hanks", "rating": 8.0},
+    )
+    assert [r["name"] for r in rows] == ["Robin Wright", "Tim Allen"]
+    rows = graph.query("MATCH (p:Person) WHERE toLower(p.name) CONTAINS 'rob' RETURN p.name AS name ORDER BY name")
+    assert [r["name"] for r in rows] == ["Robert De Niro", "Robert Zemeckis", "Robin Wright"]
+    rows = graph.query("MATCH (p:Person)-[:DIRECTED]->(m) WHERE NOT (p)-[:ACTED_IN]->() AND m.title IN ['Heat', 'Casino'] RETURN count(p) AS n")
+    assert rows == [{"n": 2}]
+
+
+def test_optional_match_and_paths(graph):
+    rows = graph.query(
+        "MATCH (m:Movie) OPTIONAL MATCH (m)-[:IN_GENRE]->(g:Genre {name: 'War'}) "
+        "RETURN m.title AS title, g.name AS war ORDER BY title LIMIT 2"
+    )
+    assert rows == [{"title": "Apollo 13", "war": None}, {"title": "Casino", "war": None}]
+    rows = graph.query(
+        "MATCH p = shortestPath((a:Person {name: 'Al Pacino'})-[:ACTED_IN*]-(b:Person {name: 'Joe Pesci'})) "
+        "RETURN length(p) AS hops, [n IN nodes(p) | coalesce(n.name, n.title)] AS route"
+    )
+    assert rows == [{"hops": 4, "route": ["Al Pacino", "Heat", "Robert De Niro", "Casino", "Joe Pesci"]}]
+    rows = graph.query("MATCH (a:Person {name: 'Al Pacino'})-[:ACTED_IN*2]-(b:Person) RETURN b.name AS name ORDER BY name")
+    assert [r["name"] for r in rows] == ["Robert De Niro", "Val Kilmer"]
+
+
+def test_pattern_arguments_are_lists_of_paths(graph):
+    rows = graph.query(
+        "MATCH (m:Movie) WHERE size((m)<-[:ACTED_IN]-()) > 2 "
+        "RETURN m.title AS title, size((m)<-[:ACTED_IN]-()) AS n ORDER BY title"
+    )
+    assert rows == [{"title": "Casino", "n": 3}, {"title": "Heat", "n": 3}]
+    rows = graph.query(
+        "MATCH (p:Person {name: 'Tom Hanks'}) "
+        "RETURN [path IN (p)-[:ACTED_IN]->(:Movie {released: date('1995-11-22')}) | length(path)] AS hops"
+    )
+    assert rows == [{"hops": [1]}]
+
+
+def test_procedures_and_subqueries(graph):
+    fingerprint = graph.query(FINGERPRINT_QUERY)[0]
+    assert fingerprint["labels"] == ["Genre", "Movie", "Person"]
+    assert fingerprint["rel_types"] == ["ACTED_IN", "DIRECTED", "IN_GENRE"]
+    assert graph.query("RETURN 1 AS ok") == [{"ok": 1}]
+    assert graph.query("EXPLAIN MATCH (n) RETURN n") == []
+
+
+def test_unsupported_statements_raise(graph):
+    for statement in (
+        "CREATE (m:Movie {title: 'New'})",
+        "MATCH (m:Movie) SET m.title = 'x'",
+        "MATCH (m:Movie) RETURN m UNION MATCH (m:Movie) RETURN m",
+        "MATCH (m:Movie)",
+        "MATCH (m:Movie) RETURN apoc.text.join(m.title)",
+    ):
+        with pytest.raises(UnsupportedCypher):
+            graph.query(statement)
+
+
+def test_chain_runs_offline(graph):
+    llm = RecordingLLM(
+        responses=["MATCH (a:Person {name: 'Tom Hanks'})-[:ACTED_IN]->(m:Movie) RETURN count(m) AS movies"],
+        prompts=[],
+    )
+    chain = create_qa_chain(graph, llm, verbose=False, parameterizer=QueryParameterizer())
+    assert chain.invoke({"query": "How many movies has Tom Hanks acted in?"})["result"] == [{"movies": 3}]
+    assert "(:Person)-[:ACTED_IN]->(:Movie)" in llm.prompts[0]
+
+
+def test_database_wraps_memory_graph(movies_file):
+    database = Neo4jDatabase("memory://", "", "", graph=MemoryGraph())
+    assert database.connect()
+    assert database.load_movie_data(movies_file)
+    assert database.get_stats(refresh=True) == {"movies": 6, "actors": 11, "directors": 6, "genres": 7}
+    assert database.execute_query("MATCH (m:Movie) RETURN m.title AS title", max_rows=2) == [
+        {"title": "Casino"}, {"title": "Heat"},
+    ]
+
+
+def test_benchmark_against_memory_graph(graph):
+    report = run_benchmark(["How many movies are there?"], concurrency=[2], rounds=2, trace_memory=False, graph=graph)
+    assert report["config"]["graph"] == "MemoryGraph"
+    assert report["runs"][0]["questions"] == 2
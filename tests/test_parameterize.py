@@ -0,0 +1,94 @@
+"""
+Unit tests for Cypher literal-to-parameter rewriting
+"""
+
+from conftest import FakeGraph, RecordingLLM
+from src.parameterize import ParameterizedGraph, QueryParameterizer, parameterize
+from src.query_chain import create_qa_chain
+from src.results import LimitedGraph
+from src.tracing import Metrics
+
+
+def test_strings_and_numbers_become_parameters():
+    template, params = parameterize(
+        "MATCH (m:Movie {title: 'Schindler\\'s List'}) WHERE m.imdbRating > 8.5 AND m.year < 2000 RETURN m.title LIMIT 3"
+    )
+    assert template == "MATCH (m:Movie {title: $p0}) WHERE m.imdbRating > $p1 AND m.year < $p2 RETURN m.title LIMIT $p3"
+    assert params == {"p0": "Schindler's List", "p1": 8.5, "p2": 2000, "p3": 3}
+
+
+def test_identifiers_comments_and_path_bounds_are_kept():
+    query = (
+        "// movies from 1999\n"
+        "MATCH (a:`Person 2`)-[:KNOWS*1..3]->(b1:Person) "
+        "WHERE b1.name = \"Keanu\" AND a.age > $min_age RETURN b1.name /* 'x' */"
+    )
+    template, params = parameterize(query)
+    assert template == (
+        "// movies from 1999\n"
+        "MATCH (a:`Person 2`)-[:KNOWS*1..3]->(b1:Person) "
+        "WHERE b1.name = $p0 AND a.age > $min_age RETURN b1.name /* 'x' */"
+    )
+    assert params == {"p0": "Keanu"}
+
+
+def test_generated_names_avoid_existing_parameters():
+    template, params = parameterize("MATCH (m) WHERE m.a = $p0 AND m.b = 'x' RETURN m")
+    assert template == "MATCH (m) WHERE m.a = $p0 AND m.b = $p1 RETURN m"
+    assert params == {"p1": "x"}
+
+
+def test_schema_commands_are_untouched():
+    query = "CREATE INDEX movie_title IF NOT EXISTS FOR (m:Movie) ON (m.title) OPTIONS {indexProvider: 'range-1.0'}"
+    assert parameterize(query) == (query, {})
+
+
+def test_plan_cache_hits_counted_by_template():
+    rewriter = QueryParameterizer()
+    for name in ("Tom Hanks", "Meg Ryan", "Tom Hanks"):
+        rewriter.rewrite(f"MATCH (p:Person {{name: '{name}'}}) RETURN p")
+    stats = rewriter.stats()
+    assert stats["executions"] == 3 and stats["templates"] == 1
+    assert stats["plan_cache_hit_rate"] == 2 / 3
+    assert stats["literal_hit_rate"] == 1 / 3
+
+
+def test_plan_cache_is_bounded():
+    rewriter = QueryParameterizer(plan_cache_size=1)
+    for query in ("MATCH (m:Movie) RETURN m", "MATCH (p:Person) RETURN p", "MATCH (m:Movie) RETURN m"):
+        rewriter.rewrite(query)
+    assert rewriter.stats()["plan_cache_hits"] == 0
+
+
+def test_graph_proxy_keeps_caller_params():
+    graph = FakeGraph()
+    ParameterizedGraph(graph).query("MATCH (m) WHERE m.year = 1999 RETURN m SKIP $skip", {"skip": 10})
+    assert graph.queries == [("MATCH (m) WHERE m.year = $p0 RETURN m SKIP $skip", {"p0": 1999, "skip": 10})]
+
+
+def test_stream_only_exposed_when_wrapped_graph_streams():
+    proxy = ParameterizedGraph(FakeGraph())
+    assert not hasattr(proxy, "stream")
+    LimitedGraph(proxy, 1).query("MATCH (m) RETURN m LIMIT 5")
+
+
+def test_chain_sends_parameterized_cypher():
+    graph = FakeGraph()
+    llm = RecordingLLM(responses=["MATCH (m:Movie {title: 'Casino'}) RETURN m.title AS title"], prompts=[])
+    rewriter = QueryParameterizer()
+    chain = create_qa_chain(graph, llm, verbose=False, parameterizer=rewriter, return_intermediate_steps=True)
+
+    result = chain.invoke({"query": "Find Casino"})
+
+    assert result["intermediate_steps"][0]["query"] == "MATCH (m:Movie {title: 'Casino'}) RETURN m.title AS title"
+    assert graph.queries == [("MATCH (m:Movie {title: $p0}) RETURN m.title AS title", {"p0": "Casino"})]
+
+
+def test_stats_exported_as_gauges():
+    metrics = Metrics()
+    rewriter = QueryParameterizer()
+    rewriter.rewrite("RETURN 1")
+    metrics.add_gauges("qa_plan_cache", rewriter.stats)
+    text = metrics.render()
+    assert "# TYPE qa_plan_cache_executions gauge" in text
+    assert "qa_plan_cache_executions 1" in text
@@ -0,0 +1,169 @@
+"""
+Unit tests for streaming and paginated results
+"""
+
+import pytest
+
+from conftest import FakeGraph
+from src.query_chain import create_qa_chain
+from src.results import LimitedGraph, ResultCursor, ResultPager, keyset_query, skip_limit_query
+
+
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+
+class FakeSession:
+    def __init__(self, rows, log):
+        self.rows = rows
+        self.log = log
+        self.closed = False
+
+    def run(self, query, params):
+        self.log["runs"] += 1
+        for row in self.rows:
+            self.log["pulled"] += 1
+            yield FakeRecord(row)
+
+    def close(self):
+        self.closed = True
+        self.log["closed"] += 1
+
+
+class FakeDriver:
+    def __init__(self, rows):
+        self.rows = rows
+        self.log = {"runs": 0, "pulled": 0, "closed": 0, "fetch_size": None}
+
+    def session(self, database=None, fetch_size=None):
+        self.log["fetch_size"] = fetch_size
+        return FakeSession(self.rows, self.log)
+
+
+class PagedGraph(FakeGraph):
+    """FakeGraph answering skip/limit and keyset page queries over a fixed result"""
+
+    def __init__(self, total):
+        super().__init__(rows=[{"id": i, "title": f"Movie {i}"} for i in range(total)])
+
+    def query(self, query, params=None):
+        self.queries.append((query, params or {}))
+        params = params or {}
+        if "$skip" in query:
+            return self.rows[params["skip"]: params["skip"] + params["limit"]]
+        if "$after" in query:
+            after = params["after"]
+            rows = [r for r in self.rows if after is None or r["id"] > after]
+            return rows[: params["limit"]]
+        return list(self.rows)
+
+
+ROWS = [{"n": i} for i in range(100)]
+
+
+def test_cursor_pulls_lazily_and_releases_session():
+    driver = FakeDriver(ROWS)
+    cursor = ResultCursor(driver, "MATCH (n) RETURN n", fetch_size=10)
+    assert driver.log["runs"] == 0
+
+    assert cursor.fetch(3) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert driver.log["pulled"] == 3 and cursor.has_more
+    assert cursor[:2] == [{"n": 3}, {"n": 4}]
+    assert driver.log["closed"] == 1 and driver.log["fetch_size"] == 10
+    assert not cursor.has_more and cursor.fetch(5) == []
+
+
+def test_cursor_caps_rows_and_bytes():
+    rows_capped = ResultCursor(FakeDriver(ROWS), "q", max_rows=5)
+    assert len(list(rows_capped)) == 5 and rows_capped.truncated
+
+    bytes_capped = ResultCursor(FakeDriver(ROWS), "q", max_bytes=40)
+    rows = list(bytes_capped)
+    assert 1 < len(rows) < 10 and bytes_capped.truncated
+
+    complete = ResultCursor(FakeDriver(ROWS[:3]), "q")
+    assert len(list(complete)) == 3 and not complete.truncated
+
+
+def test_cursor_rejects_unsupported_slices():
+    with pytest.raises(TypeError):
+        ResultCursor(FakeDriver(ROWS), "q")[::2]
+
+
+def test_page_queries_wrap_generated_cypher():
+    assert skip_limit_query("MATCH (m:Movie) RETURN m.title AS title ORDER BY title LIMIT 10;") == (
+        "MATCH (m:Movie) RETURN m.title AS title ORDER BY title\nSKIP $skip LIMIT $limit"
+    )
+    assert "`title` > $after" in keyset_query("MATCH (m:Movie) RETURN m.title AS title", "title")
+    for query in (
+        "MERGE (m:Movie {title: 'New'}) RETURN m",
+        "MATCH (m:Movie) DETACH DELETE m",
+        "MATCH (m:Movie) RETURN m LIMIT $n",
+        "MATCH (m:Movie) RETURN m UNION MATCH (m:Movie) RETURN m",
+    ):
+        with pytest.raises(ValueError):
+            skip_limit_query(query)
+
+
+def test_pager_never_reruns_writes():
+    graph = PagedGraph(25)
+    pager = ResultPager(graph, "MERGE (m:Movie {id: 1}) RETURN m", rows=graph.rows[:10], page_size=10)
+    assert not pager.has_more
+    assert pager.load_more() == [] and graph.queries == []
+
+
+def test_pager_keeps_the_query_skip_and_limit():
+    graph = PagedGraph(100)
+    pager = ResultPager(graph, "MATCH (m:Movie) RETURN m ORDER BY m.id SKIP 5 LIMIT 25", rows=graph.rows[5:15], page_size=10)
+    while pager.has_more:
+        pager.load_more()
+    assert pager.rows == graph.rows[5:30]
+    assert [params["skip"] for _, params in graph.queries] == [15, 25]
+
+
+def test_pager_fetches_pages_until_the_end():
+    graph = PagedGraph(25)
+    pager = ResultPager(graph, "MATCH (m:Movie) RETURN m", rows=graph.rows[:10], page_size=10)
+
+    assert pager.has_more
+    assert len(pager.load_more()) == 10
+    assert len(pager.load_more()) == 5
+    assert not pager.has_more and not pager.truncated
+    assert pager.rows == graph.rows
+    assert pager.load_more() == []
+
+
+def test_pager_keyset_pagination():
+    graph = PagedGraph(12)
+    pager = ResultPager(graph, "MATCH (m:Movie) RETURN m.id AS id", page_size=5, key="id")
+    while pager.has_more:
+        pager.load_more()
+    assert [r["id"] for r in pager.rows] == list(range(12))
+    assert graph.queries[1][1]["after"] == 4
+
+
+def test_pager_enforces_memory_cap():
+    graph = PagedGraph(100)
+    pager = ResultPager(graph, "MATCH (m:Movie) RETURN m", rows=graph.rows[:10], page_size=10, max_rows=25)
+    while pager.has_more:
+        pager.load_more()
+    assert len(pager.rows) == 25 and pager.truncated
+
+
+def test_streaming_chain_pulls_only_top_k(fake_llm):
+    driver = FakeDriver(ROWS)
+
+    class StreamGraph(FakeGraph):
+        def stream(self, query, params=None, fetch_size=1000):
+            return ResultCursor(driver, query, params, fetch_size=fetch_size)
+
+    chain = create_qa_chain(StreamGraph(), fake_llm, verbose=False, top_k=5, stream_results=True)
+    result = chain.invoke({"query": "How many movies are there?"})
+
+    assert isinstance(chain.graph, LimitedGraph)
+    assert result["result"] == ROWS[:5]
+    assert driver.log["pulled"] == 5 and driver.log["closed"] == 1
@@ -0,0 +1,75 @@
+"""
+Unit tests for question-relevant schema pruning
+"""
+
+from src.query_chain import create_qa_chain
+from src.schema_pruning import SchemaPruner, stem
+
+SCHEMA = {
+    "node_props": {
+        "Movie": [{"property": "title", "type": "STRING"}, {"property": "imdbRating", "type": "FLOAT"}],
+        "Person": [{"property": "name", "type": "STRING"}],
+        "Genre": [{"property": "name", "type": "STRING"}],
+        "Award": [{"property": "year", "type": "INTEGER"}],
+        "Studio": [{"property": "founded", "type": "INTEGER"}],
+    },
+    "rel_props": {"WON": [{"property": "year", "type": "INTEGER"}]},
+    "relationships": [
+        {"start": "Person", "type": "ACTED_IN", "end": "Movie"},
+        {"start": "Movie", "type": "IN_GENRE", "end": "Genre"},
+        {"start": "Person", "type": "WON", "end": "Award"},
+        {"start": "Studio", "type": "OWNS", "end": "Studio"},
+    ],
+}
+
+
+def test_stem_joins_word_forms():
+    assert stem("actors") == stem("acted") == stem("ACTED")
+    assert stem("movies") == stem("Movie")
+    assert stem("genres") == stem("GENRE")
+
+
+def test_prunes_to_touched_labels_and_one_hop():
+    pruner = SchemaPruner(SCHEMA)
+    schema = pruner.prune("List the genres of Casino")
+
+    assert "(:Movie)-[:IN_GENRE]->(:Genre)" in schema
+    assert "(:Person)-[:ACTED_IN]->(:Movie)" in schema
+    assert "Award" not in schema
+    assert "Studio" not in schema
+    assert pruner.last_tokens_saved > 0
+
+
+def test_falls_back_to_full_schema():
+    pruner = SchemaPruner(SCHEMA)
+    schema = pruner.prune("Hello there")
+
+    assert "Studio" in schema and "Award" in schema
+    stats = pruner.stats()
+    assert stats["requests"] == 1
+    assert stats["pruned_requests"] == 0
+    assert stats["tokens_saved"] == 0
+
+
+def test_aliases():
+    pruner = SchemaPruner(SCHEMA, aliases={"who": ["Person"]})
+    assert "Person" in pruner.select("Who won?")["node_props"]
+
+
+def test_chain_sends_pruned_schema(fake_graph, fake_llm):
+    fake_graph.structured_schema = SCHEMA
+    pruner = SchemaPruner()
+    chain = create_qa_chain(fake_graph, fake_llm, verbose=False, schema_pruner=pruner)
+
+    chain.invoke({"query": "How many awards are there?"})
+
+    assert "Award {year: INTEGER}" in fake_llm.prompts[-1]
+    assert "Studio" not in fake_llm.prompts[-1]
+    assert pruner.stats()["pruned_requests"] == 1
+
+
+def test_stats_node_is_not_indexed():
+    schema = dict(SCHEMA, node_props={**SCHEMA["node_props"], "GraphStats": [{"property": "movies", "type": "INTEGER"}]})
+    pruner = SchemaPruner(schema)
+    assert "GraphStats" not in pruner.prune("How many movies are there?")
+    assert "GraphStats" not in pruner.prune("Show the graph stats")
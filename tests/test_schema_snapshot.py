@@ -0,0 +1,94 @@
+"""
+Unit tests for persistent schema snapshots
+"""
+
+import time
+
+from conftest import FakeGraph
+from src.query_chain import create_qa_chain
+from src.schema_snapshot import FINGERPRINT_QUERY, SchemaSnapshot
+
+
+class MetaGraph(FakeGraph):
+    """FakeGraph that answers the fingerprint query and counts refreshes"""
+
+    def __init__(self):
+        super().__init__()
+        self.labels = ["Movie"]
+
+    def query(self, query, params=None):
+        if query == FINGERPRINT_QUERY:
+            return [{"labels": list(self.labels), "rel_types": [], "property_keys": ["title"]}]
+        return super().query(query, params)
+
+    def refresh_schema(self):
+        super().refresh_schema()
+        self.structured_schema = {
+            "node_props": {label: [{"property": "title", "type": "STRING"}] for label in self.labels},
+            "rel_props": {},
+            "relationships": [],
+        }
+        self.schema = "Node properties:\n" + "\n".join(self.labels)
+
+
+def test_attach_loads_from_disk_without_refresh(tmp_path):
+    path = str(tmp_path / "schema.json")
+    first = MetaGraph()
+    SchemaSnapshot(path, source="db").attach(first)
+    assert first.refreshes == 1
+
+    second = MetaGraph()
+    SchemaSnapshot(path, source="db").attach(second)
+    assert second.refreshes == 0
+    assert second.schema == first.schema
+
+
+def test_snapshot_from_other_source_is_ignored(tmp_path):
+    path = str(tmp_path / "schema.json")
+    SchemaSnapshot(path, source="a").attach(MetaGraph())
+
+    graph = MetaGraph()
+    SchemaSnapshot(path, source="b").attach(graph)
+    assert graph.refreshes == 1
+
+
+def test_check_refreshes_only_on_change(tmp_path):
+    graph = MetaGraph()
+    snapshot = SchemaSnapshot(str(tmp_path / "schema.json"))
+    snapshot.attach(graph)
+
+    assert not snapshot.check(graph)
+    graph.labels.append("Person")
+    assert snapshot.check(graph)
+    assert graph.refreshes == 2
+    assert "Person" in graph.schema
+
+    # The statistics counters node appearing is not a schema change
+    graph.labels.append("GraphStats")
+    assert not snapshot.check(graph)
+    assert graph.refreshes == 2
+
+
+def test_refresh_is_pushed_into_chain(tmp_path, fake_llm):
+    graph = MetaGraph()
+    snapshot = SchemaSnapshot(str(tmp_path / "schema.json"))
+    chain = create_qa_chain(graph, fake_llm, verbose=False, schema_snapshot=snapshot)
+    assert "Person" not in chain.graph_schema
+
+    graph.labels.append("Person")
+    snapshot.check(graph)
+    assert "Person" in chain.graph_schema
+
+
+def test_background_thread_stops(tmp_path):
+    graph = MetaGraph()
+    snapshot = SchemaSnapshot(str(tmp_path / "schema.json"), check_interval=0.01)
+    snapshot.attach(graph)
+    thread = snapshot.start(graph)
+    deadline = time.time() + 5
+    while snapshot.checks < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    snapshot.stop()
+
+    assert snapshot.checks >= 2
+    assert not thread.is_alive()
@@ -0,0 +1,99 @@
+"""
+Unit tests for the semantic near-duplicate cache
+"""
+
+
+import numpy as np
+
+from src.query_chain import create_qa_chain
+from src.semantic_cache import HashedEmbedder, SemanticCypherCache, _Bucket, extract_entities
+
+
+def test_rephrasings_embed_together():
+    embedder = HashedEmbedder()
+    base = embedder.embed("How many movies are there?")
+
+    assert float(base @ embedder.embed("Count the movies")) > 0.95
+    assert float(base @ embedder.embed("How many actors are there?")) < 0.9
+
+
+def test_entities_must_match():
+    cache = SemanticCypherCache()
+    cache.put("How many movies has Tom Hanks acted in?", "s", "v", "HANKS")
+
+    assert cache.get("how many movies has Tom Hanks acted in", "s", "v") == "HANKS"
+    assert cache.get("How many movies has Tom Cruise acted in?", "s", "v") is None
+    assert extract_entities("Which actors played in Casino?") == {"casino"}
+
+
+def test_bounded_capacity_evicts_least_recently_used():
+    cache = SemanticCypherCache(capacity=2)
+    cache.put("Count the movies", "s", "v", "MOVIES")
+    cache.put("Count the genres", "s", "v", "GENRES")
+    assert cache.get("How many movies are there?", "s", "v") == "MOVIES"
+    cache.put("Count the directors", "s", "v", "DIRECTORS")
+
+    assert len(cache) == 2
+    assert cache.get("Count the genres", "s", "v") is None
+    assert cache.get("Count the movies", "s", "v") == "MOVIES"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_schema_change_resets():
+    cache = SemanticCypherCache()
+    cache.put("Count the movies", "schema-a", "v", "MOVIES")
+    assert cache.get("Count the movies", "schema-b", "v") is None
+    assert len(cache) == 0
+
+
+class PoolEmbedder(HashedEmbedder):
+    """Cheap embedder cycling through random unit vectors, to fill a cache fast"""
+
+    def __init__(self):
+        super().__init__()
+        pool = np.random.default_rng(0).standard_normal((997, self.dim)).astype(np.float32)
+        self.pool = pool / np.linalg.norm(pool, axis=1, keepdims=True)
+        self.calls = 0
+
+    def embed(self, question):
+        self.calls += 1
+        return self.pool[self.calls % len(self.pool)]
+
+
+def test_worst_case_bucket_is_scored_in_place(monkeypatch):
+    # Entity-free questions all share one bucket, the largest a lookup can scan
+    cache = SemanticCypherCache(capacity=100_000, embedder=PoolEmbedder())
+    for i in range(cache.capacity - 2):
+        variant = "".join(chr(97 + int(digit)) for digit in str(i))
+        cache.put(f"list movies sorted by rating variant {variant}", "s", "v", "X")
+    cache.embedder = HashedEmbedder()
+    cache.put("How many movies are there?", "s", "v", "COUNT")
+    cache.put("How many movies has Tom Hanks acted in?", "s", "v", "HANKS")
+    assert len(cache) == cache.capacity and cache.stats()["buckets"] == 2
+
+    views = []
+    original = _Bucket.view
+    monkeypatch.setattr(_Bucket, "view", lambda bucket: views.append((bucket, original(bucket))) or views[-1][1])
+
+    scored = cache.rows_scored
+    assert cache.get("Count the movies", "s", "v") == "COUNT"
+    assert cache.rows_scored - scored == cache.capacity - 1
+    assert cache.get("how many movies has Tom Hanks acted in", "s", "v") == "HANKS"
+    assert cache.rows_scored - scored == cache.capacity
+    # Each lookup scores a view of its bucket's matrix, never a copy
+    assert all(np.shares_memory(view, bucket.vectors) for bucket, view in views)
+
+    # Evicting from the middle of a bucket keeps the moved entry reachable
+    cache.put("Count the genres", "s", "v", "GENRES")
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("Count the genres", "s", "v") == "GENRES"
+    assert cache.get("Count the movies", "s", "v") == "COUNT"
+
+
+def test_chain_serves_rephrasing_from_cache(fake_graph, fake_llm):
+    chain = create_qa_chain(fake_graph, fake_llm, verbose=False, semantic_cache=SemanticCypherCache())
+
+    chain.invoke({"query": "How many movies are there?"})
+    chain.invoke({"query": "Count the movies"})
+
+    assert fake_llm.i == 1
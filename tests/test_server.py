@@ -0,0 +1,109 @@
+"""
+Unit tests for the HTTP query service
+"""
+
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import FakeGraph, RecordingLLM
+from src.query_chain import create_qa_chain
+from src.server import Overloaded, QueryService, chain_answerer, serve
+from src.tracing import Tracer
+
+CYPHER = "MATCH (m:Movie) RETURN count(m) AS count"
+
+
+class SlowGraph(FakeGraph):
+    def query(self, query, params=None):
+        time.sleep(0.2)
+        return super().query(query, params)
+
+
+def test_identical_burst_runs_once():
+    graph = SlowGraph()
+    llm = RecordingLLM(responses=[CYPHER] * 10, prompts=[])
+    chain = create_qa_chain(graph, llm, verbose=False, return_intermediate_steps=True)
+    service = QueryService(chain_answerer(chain), workers=4, queue_size=0)
+    results = []
+
+    def ask():
+        results.append(service.ask("How many movies are there?"))
+
+    threads = [threading.Thread(target=ask) for _ in range(100)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(llm.prompts) == 1 and len(graph.queries) == 1
+    assert all(r["result"] == [{"count": 1}] and r["cypher"] == CYPHER for r in results)
+    stats = service.stats()
+    assert stats["executions"] == 1 and stats["coalesced"] == 99
+    service.close()
+
+
+def test_full_queue_is_refused():
+    release = threading.Event()
+    service = QueryService(lambda q: release.wait() and {"question": q}, workers=1, queue_size=1)
+    service.submit("first")
+    service.submit("second")
+    service.submit("Second?")  # same question, joins the queued one
+    with pytest.raises(Overloaded):
+        service.submit("third")
+    release.set()
+    assert service.stats()["rejected"] == 1
+    service.close()
+
+
+@pytest.fixture
+def server():
+    release = threading.Event()
+
+    def answer(question):
+        if question == "block":
+            release.wait(2)
+        return {"question": question, "cypher": None, "result": [{"n": 1}], "trace": None}
+
+    service = QueryService(answer, workers=1, queue_size=0, timeout=2)
+    tracer = Tracer()
+    httpd = serve(service, 0, "127.0.0.1", metrics=tracer.metrics)
+    yield httpd.server_address[1], release
+    release.set()
+    httpd.shutdown()
+    service.close()
+
+
+def post(conn, body):
+    conn.request("POST", "/query", body=json.dumps(body), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, response.getheader("Retry-After"), json.loads(response.read())
+
+
+def test_http_round_trip_with_keepalive(server):
+    port, _ = server
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    assert post(conn, {"question": "How many?"})[2]["result"] == [{"n": 1}]
+    # Same connection serves the next requests
+    assert post(conn, {"question": "Again?"})[0] == 200
+    assert post(conn, {"nope": 1})[0] == 400
+    conn.request("GET", "/health")
+    health = json.loads(conn.getresponse().read())
+    assert health["status"] == "ok" and health["executions"] == 2
+    conn.request("GET", "/metrics")
+    assert b"qa_queries_total" in conn.getresponse().read()
+    conn.close()
+
+
+def test_http_backpressure(server):
+    port, release = server
+    blocker = threading.Thread(target=lambda: post(http.client.HTTPConnection("127.0.0.1", port, timeout=5), {"question": "block"}))
+    blocker.start()
+    time.sleep(0.1)
+    status, retry_after, body = post(http.client.HTTPConnection("127.0.0.1", port, timeout=5), {"question": "other"})
+    assert status == 429 and retry_after == "1"
+    release.set()
+    blocker.join()
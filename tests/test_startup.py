@@ -0,0 +1,111 @@
+"""
+Unit tests for boot-time warm-up and readiness probes
+"""
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from src import startup
+from src.startup import Warmup, import_profile, serve_probes
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_warmup_builds_once_in_background():
+    release = threading.Event()
+    calls = []
+
+    def build(warmup):
+        calls.append(1)
+        with warmup.step("database"):
+            release.wait(5)
+        return "resources"
+
+    warmup = Warmup(build).start()
+    warmup.start()
+    assert warmup.state == "warming" and not warmup.ready
+    with pytest.raises(TimeoutError):
+        warmup.wait(timeout=0.05)
+    release.set()
+    assert warmup.wait(timeout=5) == "resources"
+    assert warmup.ready and calls == [1]
+    assert "database" in warmup.status()["steps"]
+
+
+def test_failed_warmup_reraises_and_boot_retries(monkeypatch):
+    monkeypatch.setattr(startup, "_warmup", None)
+    attempts = []
+
+    def build(warmup):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database unavailable")
+        return "resources"
+
+    first = startup.boot(build)
+    with pytest.raises(ConnectionError):
+        first.wait(timeout=5)
+    assert first.state == "failed"
+    assert first.status()["error"] == "database unavailable"
+
+    second = startup.boot(build)
+    assert second is not first
+    assert second.wait(timeout=5) == "resources"
+    assert startup.boot() is second
+
+
+def test_probes_report_readiness():
+    release = threading.Event()
+    warmup = Warmup(lambda w: release.wait(5)).start()
+    server = serve_probes(warmup, 0, "127.0.0.1")
+    port = server.server_address[1]
+    try:
+        assert _get(port, "/live") == (200, {"status": "ok"})
+        status, payload = _get(port, "/ready")
+        assert status == 503 and payload["state"] == "warming"
+        release.set()
+        warmup.wait(timeout=5)
+        assert _get(port, "/ready")[0] == 200
+        status, payload = _get(port, "/startup")
+        assert status == 200 and payload["state"] == "ready"
+        assert _get(port, "/missing")[0] == 404
+    finally:
+        server.shutdown()
+
+
+def test_import_profile_lists_modules():
+    entries = import_profile("json", top=1000)
+    assert any(e["module"] == "json" for e in entries)
+    assert entries == sorted(entries, key=lambda e: -e["cumulative_ms"])
+
+
+def test_first_paint_imports_stay_light():
+    code = "import config, src.history, src.startup, sys; print(sorted(m for m in sys.modules if m.split('.')[0] in ('pyarrow', 'langchain_neo4j', 'langchain_groq')))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(startup.APP_PATH))
+    assert out.stdout.strip() == "[]"
+
+
+def test_module_run_shares_its_warmup_with_the_app():
+    code = (
+        "import runpy, sys\n"
+        "sys.argv = ['startup', '--profile-imports', 'json']\n"
+        "try:\n"
+        "    runpy.run_module('src.startup', run_name='__main__', alter_sys=True)\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "from src.startup import boot\n"
+        "print(boot.__module__)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(startup.APP_PATH))
+    assert out.stdout.strip().splitlines()[-1] == "__main__"
@@ -0,0 +1,76 @@
+"""
+Unit tests for batched, cached database statistics
+"""
+
+from conftest import FakeGraph
+from src.stats import COUNTERS_INCREMENT_QUERY, COUNTERS_READ_QUERY, STATS_QUERY, GraphStats
+
+COUNTS = {"movies": 10, "actors": 20, "directors": 5, "genres": 3}
+
+
+class StatsGraph(FakeGraph):
+    """FakeGraph that keeps a (:GraphStats) node in memory"""
+
+    def __init__(self):
+        super().__init__()
+        self.counters = None
+
+    def query(self, query, params=None):
+        self.queries.append((query, params or {}))
+        if query == STATS_QUERY:
+            return [dict(COUNTS)]
+        if query == COUNTERS_READ_QUERY:
+            return [dict(self.counters)] if self.counters else []
+        if query == COUNTERS_INCREMENT_QUERY:
+            if not self.counters:
+                return []
+            for key in self.counters:
+                self.counters[key] += params[key]
+            return [dict(self.counters)]
+        self.counters = {k: params[k] for k in COUNTS}
+        return []
+
+
+def test_single_round_trip_and_ttl_cache():
+    graph = StatsGraph()
+    stats = GraphStats(graph, ttl=60)
+
+    assert stats.get() == COUNTS
+    assert stats.get() == COUNTS
+    assert len(graph.queries) == 1
+    stats.get(refresh=True)
+    assert len(graph.queries) == 2
+
+
+def test_expired_cache_requeries(monkeypatch):
+    graph = StatsGraph()
+    stats = GraphStats(graph, ttl=5)
+    now = [100.0]
+    monkeypatch.setattr("src.stats.time.time", lambda: now[0])
+
+    stats.get()
+    now[0] += 6
+    stats.get()
+    assert len(graph.queries) == 2
+
+
+def test_counters_mode_seeds_then_reads_counters():
+    graph = StatsGraph()
+    stats = GraphStats(graph, ttl=0, counters=True)
+
+    assert stats.get() == COUNTS
+    assert graph.counters == COUNTS
+    graph.queries.clear()
+    stats.get()
+    assert [q for q, _ in graph.queries] == [COUNTERS_READ_QUERY]
+
+
+def test_apply_delta_increments_counters():
+    graph = StatsGraph()
+    stats = GraphStats(graph, counters=True)
+    stats.recount()
+
+    updated = stats.apply_delta(movies=2, actors=1)
+    assert updated["movies"] == 12
+    assert updated["actors"] == 21
+    assert stats.get() == updated
@@ -0,0 +1,89 @@
+"""
+Unit tests for the template fast path
+"""
+
+from conftest import FakeGraph, RecordingLLM
+from src.query_chain import create_qa_chain, get_few_shot_examples
+from src.templates import QuestionTemplate, TemplateMatcher, cypher_literal
+from src.tracing import Tracer
+
+
+class EntityGraph(FakeGraph):
+    """FakeGraph answering the entity index queries"""
+
+    VALUES = {
+        "Movie": ["Heat", "Schindler's List", "The Matrix"],
+        "Person": ["Keanu Reeves", "Tom Hanks"],
+        "Genre": ["Drama", "Crime"],
+    }
+
+    def query(self, query, params=None):
+        self.queries.append((query, params or {}))
+        for label, values in self.VALUES.items():
+            if query.startswith(f"MATCH (n:`{label}`)") and "DISTINCT" in query:
+                return [{"value": v} for v in values]
+        return list(self.rows)
+
+
+def matcher():
+    m = TemplateMatcher(get_few_shot_examples())
+    m.refresh(EntityGraph())
+    return m
+
+
+def test_entity_slots_resolve_to_known_values():
+    m = matcher()
+    assert m.match("how many movies has keanu reeves acted in?") == (
+        "MATCH (a:Person {name: 'Keanu Reeves'})-[:ACTED_IN]->(m:Movie) RETURN count(m) AS movies"
+    )
+    assert m.match("Which actors played in the movie the matrix") == (
+        "MATCH (m:Movie {title: 'The Matrix'})<-[:ACTED_IN]-(a:Person) RETURN a.name AS actor"
+    )
+    assert m.match("List all the genres of the movie Schindler's List").startswith(
+        "MATCH (m:Movie {title: 'Schindler\\'s List'})"
+    )
+
+
+def test_numbers_and_multiple_slots():
+    m = matcher()
+    assert m.match("List top 5 movies by rating").endswith("LIMIT 5")
+    assert "m.imdbRating > 7.5" in m.match("Find movies with imdb rating higher than 7.5")
+    assert "g1.name = 'Crime' AND g2.name = 'Drama'" in m.match(
+        "Which actors have worked in movies from both the crime and drama genres?"
+    )
+
+
+def test_unknown_entities_and_shapes_fall_through():
+    m = matcher()
+    assert m.match("Which actors played in the movie Nonexistent?") is None
+    assert m.match("When was Heat released?") is None
+    assert m.stats()["hits"] == 0 and m.stats()["misses"] == 2
+
+
+def test_literals_missing_from_question_stay_fixed():
+    template = QuestionTemplate("Which actors acted in more than one movie?",
+                                "MATCH (a)-[:ACTED_IN]->(m) WITH a, count(m) AS n WHERE n > 1 RETURN a")
+    assert template.slots == [] and template.fixed == {"p0": 1}
+
+
+def test_cypher_literal_escapes():
+    assert cypher_literal("it's \\ here") == "'it\\'s \\\\ here'"
+    assert cypher_literal(8.0) == "8.0"
+
+
+def test_chain_skips_llm_on_match_and_traces_tier():
+    graph = EntityGraph()
+    llm = RecordingLLM(responses=["MATCH (m:Movie {title: 'Heat'}) RETURN m.released"], prompts=[])
+    m = TemplateMatcher(get_few_shot_examples())
+    chain = create_qa_chain(graph, llm, verbose=False, template_matcher=m, return_intermediate_steps=True)
+    tracer = Tracer()
+    tracer.instrument(chain)
+
+    _, trace = tracer.invoke(chain, "How many movies has Tom Hanks acted in?")
+    assert llm.prompts == []
+    assert trace.cache == "template"
+
+    result, trace = tracer.invoke(chain, "When was Heat released?")
+    assert len(llm.prompts) == 1 and trace.cache is None
+    assert result["intermediate_steps"][0]["query"].startswith("MATCH (m:Movie")
+    assert m.stats()["hit_rate"] == 0.5
@@ -0,0 +1,106 @@
+"""
+Unit tests for per-stage tracing and metrics
+"""
+
+import json
+import urllib.request
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.cache import CypherCache
+from src.query_chain import create_qa_chain, sync_chain_schema
+from src.semantic_cache import SemanticCypherCache
+from src.tracing import JsonlExporter, Metrics, TracedCypherQueryCorrector, Tracer, span
+
+CYPHER = "MATCH (m:Movie) RETURN count(m) AS count"
+
+
+class UsageChatModel(FakeListChatModel):
+    """Fake chat model reporting token usage like ChatGroq"""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(
+            content=CYPHER,
+            usage_metadata={"input_tokens": 120, "output_tokens": 12, "total_tokens": 132},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_trace_records_stages_tokens_and_rows(fake_graph):
+    tracer = Tracer()
+    chain = tracer.instrument(create_qa_chain(fake_graph, UsageChatModel(responses=[CYPHER]), verbose=False))
+
+    result, trace = tracer.invoke(chain, "How many movies are there?")
+
+    assert result["result"] == [{"count": 1}]
+    assert {"generation", "llm", "validation", "execution"} <= set(trace.stage_ms())
+    assert (trace.prompt_tokens, trace.completion_tokens) == (120, 12)
+    assert trace.rows == 1 and trace.cache is None
+    breakdown = trace.breakdown()
+    assert breakdown["total_ms"] >= breakdown["generation_ms"]
+
+
+def test_cache_hits_are_attributed_to_the_answering_tier(fake_graph, fake_llm):
+    tracer = Tracer()
+    chain = tracer.instrument(create_qa_chain(
+        fake_graph, fake_llm, verbose=False, cache=CypherCache(), semantic_cache=SemanticCypherCache(),
+    ))
+
+    _, miss = tracer.invoke(chain, "How many movies are there?")
+    _, exact = tracer.invoke(chain, "How many movies are there?")
+    _, semantic = tracer.invoke(chain, "Count the movies")
+
+    assert miss.cache is None and "llm" not in exact.stage_ms()
+    assert exact.cache == "exact"
+    assert semantic.cache == "semantic"
+    assert tracer.metrics.cache_hits == {"exact": 1, "semantic": 1}
+
+
+def test_schema_sync_keeps_traced_corrector(fake_graph, fake_llm):
+    chain = Tracer().instrument(create_qa_chain(fake_graph, fake_llm, verbose=False))
+    sync_chain_schema(chain, fake_graph)
+    assert isinstance(chain.cypher_query_corrector, TracedCypherQueryCorrector)
+
+
+def test_errors_and_jsonl_export(tmp_path, fake_graph, fake_llm):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(exporters=[JsonlExporter(str(path))])
+    chain = tracer.instrument(create_qa_chain(fake_graph, fake_llm, verbose=False))
+    tracer.invoke(chain, "How many movies are there?")
+
+    def broken(query, params=None):
+        raise RuntimeError("db down")
+
+    fake_graph.query = broken
+    try:
+        tracer.invoke(chain, "How many movies are there?")
+    except RuntimeError:
+        pass
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["error"] for line in lines] == [None, "db down"]
+    assert tracer.metrics.queries == {"ok": 1, "error": 1}
+
+
+def test_span_outside_trace_is_noop():
+    with span("execution") as attrs:
+        attrs["rows"] = 3
+
+
+def test_prometheus_endpoint(fake_graph, fake_llm):
+    tracer = Tracer(metrics=Metrics())
+    chain = tracer.instrument(create_qa_chain(fake_graph, fake_llm, verbose=False))
+    tracer.invoke(chain, "How many movies are there?")
+
+    server = tracer.metrics.serve(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        text = urllib.request.urlopen(url, timeout=5).read().decode()
+    finally:
+        server.shutdown()
+
+    assert 'qa_queries_total{status="ok"} 1' in text
+    assert 'qa_stage_seconds_count{stage="execution"} 1' in text
+    assert 'qa_stage_seconds_bucket{stage="total",le="+Inf"} 1' in text
@@ -0,0 +1,140 @@
+"""
+Unit tests for the traffic recorder and replay load tester
+"""
+
+import gzip
+import json
+import time
+
+import pytest
+
+from conftest import FakeGraph, RecordingLLM
+from src.benchmark import StubGraph
+from src.query_chain import create_qa_chain
+from src.server import chain_answerer
+from src.tracing import Tracer
+from src.traffic import RecordedLLM, TrafficRecorder, compare, load_traffic, main, replay
+
+CYPHER = "MATCH (m:Movie) RETURN m.title AS title"
+
+
+def test_recorder_writes_compact_records(tmp_path):
+    path = tmp_path / "logs" / "traffic.jsonl"
+    recorder = TrafficRecorder(str(path))
+    breakdown = {"generation_ms": 812.4, "execution_ms": 20.0, "validation_ms": 0.0, "total_ms": 840.1,
+                 "cache": "semantic", "rows": 3, "tokens": {"prompt": 10, "completion": 5}}
+    assert recorder.record("Top movies?", 840.1, cypher=CYPHER, breakdown=breakdown)
+    assert recorder.record("Slow one", 30000, status="timeout")
+    assert recorder.record("Broken", 12.0, status="error", error="SyntaxError: bad")
+    with pytest.raises(ValueError):
+        recorder.record("x", 1.0, status="weird")
+
+    first, timeout, error = load_traffic(str(path))
+    assert {k: v for k, v in first.items() if k != "t"} == {
+        "q": "Top movies?", "ms": 840.1, "s": "ok", "c": CYPHER,
+        "st": {"generation": 812.4, "execution": 20.0}, "n": 3, "k": "semantic",
+    }
+    assert timeout["s"] == "timeout" and "c" not in timeout
+    assert error["e"] == "SyntaxError: bad"
+    assert recorder.stats()["recorded"] == 3
+
+
+def test_sampling_keeps_the_configured_fraction(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"), sample_rate=0.25, seed=7)
+    written = sum(recorder.record(f"question {i}", 1.0) for i in range(2000))
+    assert 400 < written < 600
+    assert recorder.stats()["sampled_out"] == 2000 - written
+    with pytest.raises(ValueError):
+        TrafficRecorder(str(tmp_path / "x.jsonl"), sample_rate=1.5)
+
+
+def test_load_reads_gzip_and_skips_partial_lines(tmp_path):
+    path = tmp_path / "traffic.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write('{"t":2,"q":"b","ms":1}\n{"t":1,"q":"a","ms":1}\n{"t":3,"q":')
+    assert [r["q"] for r in load_traffic(str(path))] == ["a", "b"]
+
+
+def test_replay_scales_arrival_gaps():
+    records = [{"t": 100.0 + i, "q": f"q{i}", "ms": 5.0, "s": "ok", "n": 1} for i in range(5)]
+    records[3]["s"] = "timeout"
+    starts = []
+
+    def answer(question):
+        starts.append(time.perf_counter())
+        if question == "q4":
+            raise TimeoutError("slow")
+        return {"result": [{"n": 1}, {"n": 2}] if question == "q2" else [{"n": 1}]}
+
+    report = replay(records, answer, speed=20, concurrency=2)
+    # Four one-second gaps at 20x take about 0.2s
+    assert 0.15 <= starts[-1] - starts[0] < 0.6
+    assert report["requests"] == 5 and report["errors"] == 1
+    assert report["errors_by_type"] == {"TimeoutError": 1}
+    assert report["error_rate"] == 0.2 and report["recorded"]["error_rate"] == 0.2
+    assert report["mismatched_rows"] == 1
+    assert report["recorded"]["seconds"] == 4.0
+    assert set(report["latency_ms"]) == {"p50", "p95", "p99", "max"}
+
+    # Long idle gaps can be capped before scaling
+    gapped = [{"t": 0, "q": "a"}, {"t": 3600, "q": "b"}]
+    assert replay(gapped, lambda q: {"result": []}, speed=50, max_gap=1)["seconds"] < 0.5
+    with pytest.raises(ValueError):
+        replay(records, answer, speed=0)
+
+
+def test_recorded_llm_replays_production_cypher():
+    cypher = "MATCH (m:Movie) WHERE m.imdbRating > 8 RETURN m.title AS title"
+    records = [{"t": 1, "q": "Movies rated above 8?", "c": cypher, "st": {"generation": 1.0}}]
+    llm = RecordedLLM.from_records(records)
+    graph = StubGraph(rows=4)
+    chain = create_qa_chain(graph, llm, verbose=False, return_intermediate_steps=True)
+    payload = chain_answerer(chain)("movies rated above 8")
+    assert payload["cypher"] == cypher
+    assert len(payload["result"]) == 4
+    assert llm.delays == {"movies rated above 8": 0.001}
+
+
+def test_compare_reports_deltas_between_builds(tmp_path, capsys):
+    baseline = {"throughput_qps": 10.0, "error_rate": 0.0, "latency_ms": {"p50": 100.0, "p95": 200.0, "p99": 400.0}}
+    candidate = {"throughput_qps": 12.0, "error_rate": 0.05, "latency_ms": {"p50": 80.0, "p95": 250.0, "p99": 400.0}}
+    deltas = compare(baseline, candidate)
+    assert deltas["throughput_qps"] == {"baseline": 10.0, "candidate": 12.0, "delta": 2.0, "change_pct": 20.0}
+    assert deltas["error_rate"]["delta"] == 0.05 and deltas["error_rate"]["change_pct"] is None
+    assert deltas["latency_ms.p95"]["change_pct"] == 25.0
+
+    paths = []
+    for name, report in (("a.json", baseline), ("b.json", candidate)):
+        paths.append(str(tmp_path / name))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            json.dump(report, f)
+    assert main(["compare", *paths]) == 0
+    assert json.loads(capsys.readouterr().out)["latency_ms.p50"]["delta"] == -20.0
+
+
+def test_failed_question_keeps_its_generated_cypher():
+    class BrokenGraph(FakeGraph):
+        def query(self, query, params=None):
+            raise RuntimeError("Neo.ClientError.Statement.SyntaxError")
+
+    tracer = Tracer()
+    chain = create_qa_chain(BrokenGraph(), RecordingLLM(responses=[CYPHER], prompts=[]), verbose=False)
+    tracer.instrument(chain)
+    traces = []
+    with pytest.raises(RuntimeError):
+        tracer.invoke(chain, "List all movies", on_trace=traces.append)
+    assert traces[0].cypher == CYPHER and traces[0].error
+
+
+def test_stubbed_replay_leaves_the_production_cache_alone(tmp_path, monkeypatch, capsys):
+    cache_path = tmp_path / "cypher_cache.db"
+    monkeypatch.setenv("CYPHER_CACHE_PATH", str(cache_path))
+    log = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(log))
+    recorder.record("How many movies are there?", 900, cypher="MATCH (m:Movie) RETURN count(m) AS count")
+    recorder.record("Unrecorded question", 30000, status="timeout")
+
+    assert main(["replay", str(log), "--speed", "50", "--stub-llm", "--stub-db"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["requests"] == 2 and report["config"]["cache"]
+    assert not cache_path.exists()